@@ -0,0 +1,294 @@
+"""
+ORAIL CITIZEN AI - Lazy Environment Bootstrap
+Geospatial Poverty Mapping Framework
+
+Loaded by config/environment.py. The deep learning frameworks (torch,
+tensorflow), langchain and the plotting stack are exposed as proxies that
+import on first attribute access, and the compute device is only selected
+when it is first used. CPU-only batch workers that never touch these
+frameworks start in the time it takes to import NumPy and pandas.
+
+Startup budget check for batch workers:
+    python -m config.bootstrap --budget 2.0 --forbid-heavy
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import sys
+import threading
+import time
+
+BOOTSTRAP_STARTED = time.perf_counter()
+
+# Modules whose presence in sys.modules means a heavy framework was loaded
+HEAVY_MODULES = ["torch", "tensorflow", "langchain", "matplotlib"]
+
+_IMPORT_TIMES = {}
+_LAZY_MODULES = {}
+_DEVICE_NAMESPACES = []
+_READY_AT = None
+_LOCK = threading.RLock()
+
+
+def timed_import(name):
+    """Import a module and record how long the first import took"""
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _LOCK:
+        _IMPORT_TIMES.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name, on_load=None):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_on_load", on_load)
+        _LAZY_MODULES[name] = self
+
+    def _resolve(self):
+        module = self._lazy_module
+        if module is None:
+            with _LOCK:
+                module = self._lazy_module
+                if module is None:
+                    module = timed_import(self._lazy_name)
+                    if self._lazy_on_load is not None:
+                        self._lazy_on_load(module)
+                    object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._resolve(), attr, value)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __repr__(self):
+        if self._lazy_module is None:
+            return f"<lazy module '{self._lazy_name}' (not loaded)>"
+        return repr(self._lazy_module)
+
+
+def is_loaded(proxy):
+    """True if a lazy proxy has already imported its module"""
+    return object.__getattribute__(proxy, "_lazy_module") is not None
+
+
+def is_available(proxy):
+    """True if the proxied module can be imported, without importing it"""
+    name = object.__getattribute__(proxy, "_lazy_name")
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def _configure_tensorflow(tf_module):
+    """Enable GPU memory growth before TensorFlow initialises its devices"""
+    gpus = tf_module.config.experimental.list_physical_devices("GPU")
+    if gpus:
+        try:
+            for gpu in gpus:
+                tf_module.config.experimental.set_memory_growth(gpu, True)
+            print(f"TensorFlow GPU: {len(gpus)} device(s) available")
+        except RuntimeError as e:
+            print(f"GPU config error: {e}")
+
+
+def _configure_pyplot(plt_module):
+    """Apply the project plot defaults"""
+    plt_module.style.use("default")
+    plt_module.rcParams["figure.figsize"] = (12, 8)
+    plt_module.rcParams["font.size"] = 10
+
+
+def _bind_device_namespaces(torch_module):
+    """Swap the device proxy for the real device in namespaces that asked for it"""
+    with _LOCK:
+        namespaces = list(_DEVICE_NAMESPACES)
+        _DEVICE_NAMESPACES.clear()
+    for namespace in namespaces:
+        if namespace.get("device") is device:
+            namespace["device"] = device.resolve(torch_module)
+
+
+torch = LazyModule("torch", on_load=_bind_device_namespaces)
+tf = LazyModule("tensorflow", on_load=_configure_tensorflow)
+langchain = LazyModule("langchain")
+mpl = LazyModule("matplotlib")
+plt = LazyModule("matplotlib.pyplot", on_load=_configure_pyplot)
+sns = LazyModule("seaborn")
+
+
+class LazyDevice:
+    """Compute device that is selected the first time it is used
+
+    Resolves to torch.device('cuda') or torch.device('cpu'), or the string
+    'cpu' when PyTorch is not installed. The proxy itself is not a
+    torch.device: config/environment.py hands out the resolved device (see
+    bind_device), and code holding the proxy passes ``device.resolve()``.
+    """
+
+    def __init__(self):
+        self._device = None
+
+    def resolve(self, torch_module=None):
+        """Select the device, importing torch on the first call"""
+        if self._device is None:
+            with _LOCK:
+                if self._device is None:
+                    try:
+                        torch_ = torch_module or torch
+                        if torch_.cuda.is_available():
+                            self._device = torch_.device("cuda")
+                            print(f"GPU: {torch_.cuda.get_device_name(0)}")
+                            print(f"CUDA version: {torch_.version.cuda}")
+                        else:
+                            self._device = torch_.device("cpu")
+                            print("Using CPU for PyTorch")
+                    except ImportError as e:
+                        print(f"GPU libraries not available: {e}")
+                        self._device = "cpu"
+        return self._device
+
+    @property
+    def resolved(self):
+        """True once the device has been selected"""
+        return self._device is not None
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.resolve(), attr)
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        if self._device is None:
+            return "<lazy device (not selected)>"
+        return repr(self._device)
+
+    def __eq__(self, other):
+        return self.resolve() == other
+
+    def __hash__(self):
+        return hash(self.resolve())
+
+
+device = LazyDevice()
+
+
+def bind_device(namespace):
+    """Rebind ``namespace['device']`` from the proxy to the real device
+
+    Used when config/environment.py is exec()'d into a notebook, where no
+    module __getattr__ can resolve the name on access. The swap happens as
+    soon as the torch proxy loads, so ``model.to(device)`` and
+    ``torch.zeros(..., device=device)`` see a real torch.device (both touch
+    ``torch`` before ``device`` is looked up).
+    """
+    namespace["device"] = device
+    if is_loaded(torch):
+        namespace["device"] = device.resolve()
+    else:
+        with _LOCK:
+            _DEVICE_NAMESPACES.append(namespace)
+
+
+def mark_ready():
+    """Record the end of environment bootstrap"""
+    global _READY_AT
+    if _READY_AT is None:
+        _READY_AT = time.perf_counter()
+    return _READY_AT - BOOTSTRAP_STARTED
+
+
+def import_report():
+    """Return bootstrap timings and which heavy frameworks are loaded"""
+    with _LOCK:
+        imports = dict(_IMPORT_TIMES)
+    ready = _READY_AT if _READY_AT is not None else time.perf_counter()
+    return {
+        "bootstrap_seconds": round(ready - BOOTSTRAP_STARTED, 4),
+        "imports": {name: round(sec, 4) for name, sec in imports.items()},
+        "lazy_loaded": {
+            name: is_loaded(proxy) for name, proxy in _LAZY_MODULES.items()
+        },
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+        "device_selected": device.resolved,
+    }
+
+
+def print_import_report(report=None):
+    """Print the import-time report"""
+    report = report or import_report()
+    print("Environment bootstrap report:")
+    print(f"  Bootstrap time: {report['bootstrap_seconds']:.3f}s")
+    for name, seconds in sorted(report["imports"].items(), key=lambda kv: -kv[1]):
+        print(f"  import {name}: {seconds:.3f}s")
+    for name, loaded in report["lazy_loaded"].items():
+        print(f"  {name}: {'loaded' if loaded else 'deferred'}")
+
+
+def check_startup_budget(budget_seconds, forbid_heavy=False):
+    """Raise RuntimeError if bootstrap exceeded its time budget
+
+    With ``forbid_heavy`` the check also fails when any heavy framework was
+    imported, which is what CPU-only batch workers should assert.
+    """
+    report = import_report()
+    problems = []
+    if report["bootstrap_seconds"] > budget_seconds:
+        problems.append(
+            f"bootstrap took {report['bootstrap_seconds']:.3f}s "
+            f"(budget {budget_seconds:.3f}s)"
+        )
+    if forbid_heavy and report["heavy_loaded"]:
+        problems.append(f"heavy modules loaded: {', '.join(report['heavy_loaded'])}")
+    if problems:
+        raise RuntimeError("Startup budget exceeded: " + "; ".join(problems))
+    return report
+
+
+def main(argv=None):
+    """Bootstrap like a batch worker and check it against a startup budget"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget", type=float, default=None, help="seconds")
+    parser.add_argument("--forbid-heavy", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print JSON report")
+    args = parser.parse_args(argv)
+
+    for name in ("numpy", "pandas"):
+        try:
+            timed_import(name)
+        except ImportError as e:
+            print(f"Package import error: {e}")
+    mark_ready()
+
+    report = import_report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_import_report(report)
+
+    if args.budget is not None:
+        try:
+            check_startup_budget(args.budget, forbid_heavy=args.forbid_heavy)
+        except RuntimeError as e:
+            print(e)
+            return 1
+        print(f"Startup within budget ({args.budget:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,12 @@
 # ORAIL CITIZEN AI - Environment Configuration
 # Generated for Cursor IDE
+#
+# torch, tf, langchain and plt are lazy proxies from config/bootstrap.py:
+# they import on first attribute access, and `device` is selected on first use
+# (a real torch.device by the time torch is used).
 
 import os
 import sys
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -22,41 +23,29 @@ if PROJECT_ROOT not in sys.path:
 # Set working directory
 os.chdir(PROJECT_ROOT)
 
-# GPU configuration
-try:
-    import torch
-    import tensorflow as tf
-    
-    # PyTorch GPU setup
-    if torch.cuda.is_available():
-        device = torch.device('cuda')
-        print(f'GPU: {torch.cuda.get_device_name(0)}')
-        print(f'CUDA version: {torch.version.cuda}')
-    else:
-        device = torch.device('cpu')
-        print('Using CPU for PyTorch')
-    
-    # TensorFlow GPU setup
-    gpus = tf.config.experimental.list_physical_devices('GPU')
-    if gpus:
-        try:
-            for gpu in gpus:
-                tf.config.experimental.set_memory_growth(gpu, True)
-            print(f'TensorFlow GPU: {len(gpus)} device(s) available')
-        except RuntimeError as e:
-            print(f'GPU config error: {e}')
-    
-except ImportError as e:
-    print(f'GPU libraries not available: {e}')
-    device = 'cpu'
-
-# Configure matplotlib for better plots
-plt.style.use('default')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 10
+# Lazy framework proxies and deferred device selection
+from config.bootstrap import (
+    timed_import, mark_ready, import_report, print_import_report, bind_device,
+    torch, tf, langchain, mpl, plt, sns, device as _lazy_device,
+)
+
+if __name__ == 'config.environment':
+    # Imported as a module: `device` resolves to the real device on access
+    def __getattr__(name):
+        if name == 'device':
+            return _lazy_device.resolve()
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+else:
+    # exec()'d into a notebook: `device` becomes the real device once torch loads
+    bind_device(globals())
+
+np = timed_import('numpy')
+pd = timed_import('pandas')
+mark_ready()
 
 print('ORAIL CITIZEN AI Environment Loaded')
 print(f'Project root: {PROJECT_ROOT}')
 print(f'Python: {sys.version.split()[0]}')
 print(f'NumPy: {np.__version__}')
 print(f'Pandas: {pd.__version__}')
+print(f"Bootstrap time: {import_report()['bootstrap_seconds']:.2f}s")
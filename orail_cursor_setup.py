@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""
+r"""
 ORAIL CITIZEN AI - Cursor IDE Execution Script
 Geospatial Poverty Mapping Framework
 
@@ -17,12 +17,20 @@ Project Directory: C:\Users\josze\MYRworkspace-CitizenAI-poverty-mapping
 
 import os
 import sys
-import subprocess
 import json
+import argparse
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+from scripts.python.provisioning.installer import install_packages, print_report as print_install_report
+from scripts.python.provisioning.manifest import (
+    SetupManifest, write_if_changed, write_json_if_changed
+)
+from scripts.python.provisioning.package_probe import (
+    format_result, installed_versions, probe_packages
+)
+
 # ============================================================================
 # PROJECT CONFIGURATION (Based on your system scan)
 # ============================================================================
@@ -116,8 +124,7 @@ class CursorIntegration:
         
         # Save workspace configuration
         workspace_path = os.path.join(ORailConfig.PROJECT_ROOT, "orail-citizenai.code-workspace")
-        with open(workspace_path, 'w') as f:
-            json.dump(workspace_config, f, indent=2)
+        write_json_if_changed(workspace_path, workspace_config)
         
         print(f"✅ Created Cursor workspace: {workspace_path}")
         return workspace_path
@@ -147,8 +154,7 @@ class CursorIntegration:
         settings_dir = os.path.join(ORailConfig.PROJECT_ROOT, ".vscode")
         settings_path = os.path.join(settings_dir, "settings.json")
         
-        with open(settings_path, 'w') as f:
-            json.dump(cursor_settings, f, indent=2)
+        write_json_if_changed(settings_path, cursor_settings)
         
         print(f"✅ Created Cursor settings: {settings_path}")
         return settings_path
@@ -161,28 +167,15 @@ class EnvironmentSetup:
     """Setup development environment using existing installations"""
     
     @staticmethod
-    def check_existing_packages():
-        """Check existing Python packages from your system"""
+    def check_existing_packages(deep_import_check=False):
+        """Check existing Python packages from installed package metadata"""
         print("🔍 CHECKING EXISTING PACKAGES...")
         
-        # Known installed packages from your scan
-        installed_packages = {
-            'numpy': '1.26.4',
-            'pandas': '2.2.2', 
-            'matplotlib': '3.9.2',
-            'tensorflow': '2.19.0',
-            'torch': '2.5.1',
-            'scikit-learn': '1.5.1',
-            'jupyter': '1.0.0',
-            'plotly': '5.24.1',
-            'seaborn': '0.13.2',
-            'requests': '2.32.3',
-            'streamlit': '1.37.1'
-        }
-        
-        print("📦 INSTALLED PACKAGES:")
-        for package, version in installed_packages.items():
-            print(f"   ✅ {package}: {version}")
+        core_packages = [
+            'numpy', 'pandas', 'matplotlib', 'tensorflow', 'torch',
+            'scikit-learn', 'jupyter', 'plotly', 'seaborn', 'requests',
+            'streamlit'
+        ]
         
         # Check for missing packages needed for geospatial analysis
         missing_packages = [
@@ -191,18 +184,26 @@ class EnvironmentSetup:
             'openai', 'anthropic', 'langchain'
         ]
         
+        # Probe everything in one concurrent pass without importing anything
+        results = probe_packages(core_packages + missing_packages, deep=deep_import_check)
+        
+        print("📦 INSTALLED PACKAGES:")
+        for package in core_packages:
+            status = "✅" if results[package]["installed"] else "⚠️ "
+            print(f"   {status} {format_result(results[package])}")
+        
         print("\n🔍 CHECKING GEOSPATIAL & AI PACKAGES:")
         for package in missing_packages:
-            try:
-                __import__(package)
-                print(f"   ✅ {package}: Available")
-            except ImportError:
-                print(f"   ⚠️  {package}: Not installed (will install)")
+            result = results[package]
+            if result["installed"] and result.get("import_ok") is not False:
+                print(f"   ✅ {format_result(result)}")
+            else:
+                print(f"   ⚠️  {format_result(result)} (will install)")
         
-        return installed_packages
+        return installed_versions(results)
     
     @staticmethod
-    def install_missing_packages():
+    def install_missing_packages(offline=False, dry_run=False):
         """Install missing packages for geospatial analysis"""
         print("\n📦 INSTALLING MISSING PACKAGES...")
         
@@ -223,15 +224,11 @@ class EnvironmentSetup:
             "cartopy"
         ]
         
-        for package in packages_to_install:
-            try:
-                print(f"Installing {package}...")
-                subprocess.run([
-                    ORailConfig.PYTHON_EXE, "-m", "pip", "install", package
-                ], check=True, capture_output=True)
-                print(f"   ✅ {package} installed successfully")
-            except subprocess.CalledProcessError as e:
-                print(f"   ⚠️  {package} installation failed: {e}")
+        # One resolve for the whole missing set, through the shared wheelhouse
+        wheelhouse = os.path.join(ORailConfig.PROJECT_ROOT, "data", "cache", "wheelhouse")
+        report = install_packages(packages_to_install, python_exe=ORailConfig.PYTHON_EXE,
+                                  wheelhouse=wheelhouse, offline=offline, dry_run=dry_run)
+        print_install_report(report)
         
         print("✅ Package installation complete")
     
@@ -240,12 +237,13 @@ class EnvironmentSetup:
         """Create environment configuration file"""
         env_content = f"""# ORAIL CITIZEN AI - Environment Configuration
 # Generated for Cursor IDE
+#
+# torch, tf, langchain and plt are lazy proxies from config/bootstrap.py:
+# they import on first attribute access, and `device` is selected on first use
+# (a real torch.device by the time torch is used).
 
 import os
 import sys
-import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -262,49 +260,36 @@ if PROJECT_ROOT not in sys.path:
 # Set working directory
 os.chdir(PROJECT_ROOT)
 
-# GPU configuration
-try:
-    import torch
-    import tensorflow as tf
-    
-    # PyTorch GPU setup
-    if torch.cuda.is_available():
-        device = torch.device('cuda')
-        print(f'🖥️  GPU: {{torch.cuda.get_device_name(0)}}')
-        print(f'🔥 CUDA version: {{torch.version.cuda}}')
-    else:
-        device = torch.device('cpu')
-        print('🖥️  Using CPU for PyTorch')
-    
-    # TensorFlow GPU setup
-    gpus = tf.config.experimental.list_physical_devices('GPU')
-    if gpus:
-        try:
-            for gpu in gpus:
-                tf.config.experimental.set_memory_growth(gpu, True)
-            print(f'🔥 TensorFlow GPU: {{len(gpus)}} device(s) available')
-        except RuntimeError as e:
-            print(f'⚠️  GPU config error: {{e}}')
-    
-except ImportError as e:
-    print(f'⚠️  GPU libraries not available: {{e}}')
-    device = 'cpu'
-
-# Configure matplotlib for better plots
-plt.style.use('default')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 10
+# Lazy framework proxies and deferred device selection
+from config.bootstrap import (
+    timed_import, mark_ready, import_report, print_import_report, bind_device,
+    torch, tf, langchain, mpl, plt, sns, device as _lazy_device,
+)
+
+if __name__ == 'config.environment':
+    # Imported as a module: `device` resolves to the real device on access
+    def __getattr__(name):
+        if name == 'device':
+            return _lazy_device.resolve()
+        raise AttributeError(f'module {{__name__!r}} has no attribute {{name!r}}')
+else:
+    # exec()'d into a notebook: `device` becomes the real device once torch loads
+    bind_device(globals())
+
+np = timed_import('numpy')
+pd = timed_import('pandas')
+mark_ready()
 
 print('🚀 ORAIL CITIZEN AI Environment Loaded!')
 print(f'📁 Project root: {{PROJECT_ROOT}}')
 print(f'🐍 Python: {{sys.version.split()[0]}}')
 print(f'📊 NumPy: {{np.__version__}}')
 print(f'🐼 Pandas: {{pd.__version__}}')
+print(f"⏱️  Bootstrap time: {{import_report()['bootstrap_seconds']:.2f}}s")
 """
         
         env_path = os.path.join(ORailConfig.PROJECT_ROOT, "config", "environment.py")
-        with open(env_path, 'w') as f:
-            f.write(env_content)
+        write_if_changed(env_path, env_content)
         
         print(f"✅ Created environment.py: {env_path}")
         return env_path
@@ -369,17 +354,11 @@ class ProjectInitializer:
                         "# Create sample poverty data\n",
                         "print('📊 Creating sample poverty mapping data...')\n",
                         "\n",
-                        "# Generate sample data for poverty mapping\n",
+                        "# Generate reproducible sample data for poverty mapping\n",
+                        "from scripts.python.data_processing.synthetic_data import generate_frame\n",
+                        "\n",
                         "n_locations = 1000\n",
-                        "sample_data = pd.DataFrame({\n",
-                        "    'latitude': np.random.uniform(14.0, 15.0, n_locations),\n",
-                        "    'longitude': np.random.uniform(120.0, 121.0, n_locations),\n",
-                        "    'poverty_rate': np.random.beta(2, 5, n_locations),\n",
-                        "    'population': np.random.randint(100, 10000, n_locations),\n",
-                        "    'education_index': np.random.uniform(0.3, 0.9, n_locations),\n",
-                        "    'health_index': np.random.uniform(0.4, 0.95, n_locations),\n",
-                        "    'infrastructure_index': np.random.uniform(0.2, 0.8, n_locations)\n",
-                        "})\n",
+                        "sample_data = generate_frame(n_locations, seed=42)\n",
                         "\n",
                         "print(f'✅ Created dataset with {len(sample_data)} locations')\n",
                         "sample_data.head()"
@@ -449,8 +428,7 @@ class ProjectInitializer:
         }
         
         notebook_path = os.path.join(ORailConfig.PROJECT_ROOT, "notebooks", "01_orail_getting_started.ipynb")
-        with open(notebook_path, 'w') as f:
-            json.dump(notebook_content, f, indent=2)
+        write_json_if_changed(notebook_path, notebook_content)
         
         print(f"✅ Created starter notebook: {notebook_path}")
         return notebook_path
@@ -550,8 +528,7 @@ Ready to map poverty with AI! 🌍📊🤖
 """
         
         readme_path = os.path.join(ORailConfig.PROJECT_ROOT, "README.md")
-        with open(readme_path, 'w') as f:
-            f.write(readme_content)
+        write_if_changed(readme_path, readme_content)
         
         print(f"✅ Created README.md: {readme_path}")
         return readme_path
@@ -560,8 +537,12 @@ Ready to map poverty with AI! 🌍📊🤖
 # MAIN EXECUTION FUNCTION
 # ============================================================================
 
-def main():
-    """Main execution function for Cursor IDE setup"""
+def main(deep_import_check=False, offline=False, incremental=False, dry_run=False):
+    """Main execution function for Cursor IDE setup
+    
+    With incremental (or dry_run) each step is checked against the
+    content-hash manifest in data/cache and skipped when unchanged.
+    """
     
     print("🚀 ORAIL CITIZEN AI - CURSOR IDE SETUP")
     print("=" * 60)
@@ -569,33 +550,49 @@ def main():
     print("Using your existing installations from system scan")
     print()
     
+    manifest = SetupManifest(
+        os.path.join(ORailConfig.PROJECT_ROOT, "data", "cache", "setup_manifest.json"),
+        dry_run=dry_run, force=not (incremental or dry_run))
+    config_values = {k: v for k, v in vars(ORailConfig).items() if k.isupper()}
+    
+    def step(name, func):
+        return manifest.run(name, func, inputs=config_values)
+    
     try:
         # 1. Create project directory structure
         print("📁 CREATING PROJECT STRUCTURE...")
-        project_root = ORailConfig.ensure_project_directory()
-        print(f"✅ Project directory created: {project_root}")
+        project_root = step("ensure_project_directory", ORailConfig.ensure_project_directory)
+        print(f"✅ Project directory: {project_root or ORailConfig.PROJECT_ROOT}")
         
         # 2. Check existing packages
         print("\n🔍 CHECKING EXISTING PACKAGES...")
-        installed_packages = EnvironmentSetup.check_existing_packages()
+        installed_packages = EnvironmentSetup.check_existing_packages(deep_import_check)
         
         # 3. Install missing packages
         print("\n📦 INSTALLING MISSING PACKAGES...")
-        EnvironmentSetup.install_missing_packages()
+        EnvironmentSetup.install_missing_packages(offline, dry_run)
         
         # 4. Create environment configuration
         print("\n⚙️  CREATING ENVIRONMENT CONFIG...")
-        env_path = EnvironmentSetup.create_environment_file()
+        env_path = step("create_environment_file", EnvironmentSetup.create_environment_file)
         
         # 5. Setup Cursor IDE integration
         print("\n🎯 SETTING UP CURSOR IDE...")
-        workspace_path = CursorIntegration.create_cursor_workspace()
-        settings_path = CursorIntegration.create_cursor_settings()
+        workspace_path = step("create_cursor_workspace", CursorIntegration.create_cursor_workspace)
+        settings_path = step("create_cursor_settings", CursorIntegration.create_cursor_settings)
         
         # 6. Create project files
         print("\n📝 CREATING PROJECT FILES...")
-        notebook_path = ProjectInitializer.create_starter_notebook()
-        readme_path = ProjectInitializer.create_readme()
+        notebook_path = step("create_starter_notebook", ProjectInitializer.create_starter_notebook)
+        readme_path = step("create_readme", ProjectInitializer.create_readme)
+        
+        manifest.save()
+        if incremental or dry_run:
+            print("\n📋 SETUP STEPS:")
+            manifest.print_summary()
+        if dry_run:
+            print("\n📝 Dry run: no files were written")
+            return True
         
         # 7. Final summary
         print("\n" + "=" * 60)
@@ -632,7 +629,18 @@ def main():
         return False
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(description="ORAIL CITIZEN AI - Cursor IDE Setup")
+    parser.add_argument("--deep-check", action="store_true",
+                        help="also import each package in an isolated subprocess")
+    parser.add_argument("--offline", action="store_true",
+                        help="install only from the local wheelhouse in data/cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip steps whose inputs and outputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list the steps that would run without writing anything")
+    args = parser.parse_args()
+    success = main(deep_import_check=args.deep_check, offline=args.offline,
+                   incremental=args.incremental, dry_run=args.dry_run)
     if success:
         print("\n✅ Ready for ORAIL CITIZEN AI development in Cursor IDE!")
     else:
@@ -74,16 +74,25 @@ cat("2D map saved: outputs/orail_test/kerala_2d_map.png\n")
 
 cat("\nStep 3: Testing elevation data...\n")
 
+# Cached DEM mosaic written by the Python elevation cache (no network I/O):
+#   python -m scripts.python.geospatial.dem_cache mosaic --bbox 74.5 8.0 77.5 12.8 --zoom 8 --out data/cache/dem/kerala_z8.bin
+dem_cache_file <- "data/cache/dem/kerala_z8.bin"
+
 # Try to get real elevation data
 elevation_data <- tryCatch({
-  cat("Downloading elevation data from AWS...\n")
-  
-  bbox_points <- data.frame(
-    x = c(kerala_bbox[1], kerala_bbox[3]),
-    y = c(kerala_bbox[2], kerala_bbox[4])
-  )
-  
-  get_elev_raster(locations = bbox_points, z = 8, src = "aws", clip = "bbox")
+  if (file.exists(dem_cache_file)) {
+    cat("Using cached elevation mosaic:", dem_cache_file, "\n")
+    rast(dem_cache_file)
+  } else {
+    cat("Downloading elevation data from AWS...\n")
+    
+    bbox_points <- data.frame(
+      x = c(kerala_bbox[1], kerala_bbox[3]),
+      y = c(kerala_bbox[2], kerala_bbox[4])
+    )
+    
+    get_elev_raster(locations = bbox_points, z = 8, src = "aws", clip = "bbox")
+  }
   
 }, error = function(e) {
   cat("Creating synthetic elevation data...\n")
@@ -0,0 +1,110 @@
+"""
+ORAIL CITIZEN AI - Cell Aggregation Benchmark
+Geospatial Poverty Mapping Framework
+
+Times streaming grid and hex aggregation against a pandas groupby on
+floored float keys, checks that the square-cell tables agree, and checks
+that every hexagon id is the nearest hexagon centre to its point.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_aggregation --rows 5000000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import synthetic_points
+from scripts.python.geospatial.aggregation import (
+    SQRT3,
+    CellAggregator,
+    hex_cell_centres,
+    hex_cell_ids,
+)
+
+
+def pandas_grid(frame, cell_deg):
+    """Reference: groupby on floored float coordinates"""
+    keyed = frame.assign(
+        lat_key=np.floor((frame["latitude"] + 90.0) / cell_deg) * cell_deg,
+        lon_key=np.floor((frame["longitude"] + 180.0) / cell_deg) * cell_deg,
+        pop_pov=frame["population"] * frame["poverty_rate"],
+    )
+    grouped = keyed.groupby(["lat_key", "lon_key"]).agg(
+        count=("population", "size"), population=("population", "sum"), pop_pov=("pop_pov", "sum")
+    )
+    grouped["poverty_rate"] = grouped["pop_pov"] / grouped["population"]
+    return grouped.reset_index()
+
+
+def check_hex(lat, lon, size_deg):
+    """True if each point's hex centre is at least as near as the 6 neighbours"""
+    ids = hex_cell_ids(lat, lon, size_deg)
+    c_lat, c_lon = hex_cell_centres(ids, size_deg)
+    own = np.hypot(lon - c_lon, lat - c_lat)
+    step = SQRT3 * size_deg
+    for angle in np.radians(np.arange(0, 360, 60)):
+        n_lon = c_lon + step * np.cos(angle)
+        n_lat = c_lat + step * np.sin(angle)
+        if np.any(np.hypot(lon - n_lon, lat - n_lat) < own - 1e-9):
+            return False
+    return True
+
+
+def main(argv=None):
+    """Run the aggregation comparison"""
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Cell aggregation benchmark")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=1 << 20)
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[0.1, 0.02, 0.005])
+    args = parser.parse_args(argv)
+
+    points = synthetic_points(args.rows)
+    frame = pd.DataFrame(points)
+
+    print(f"Rows: {args.rows:,}  resolutions: {args.resolutions}")
+    ok = True
+    for kind in ("grid", "hex"):
+        start = time.perf_counter()
+        aggregator = CellAggregator(args.resolutions, kind)
+        for a in range(0, args.rows, args.chunk_rows):
+            aggregator.update({name: values[a : a + args.chunk_rows] for name, values in points.items()})
+        tables = {res: aggregator.table(res) for res in args.resolutions}
+        seconds = time.perf_counter() - start
+        cells = ", ".join(f"{len(t['cell_id']):,}" for t in tables.values())
+        print(f"{kind:<5} streaming, all resolutions: {seconds:.2f}s  cells: {cells}")
+
+    start = time.perf_counter()
+    references = {res: pandas_grid(frame, res) for res in args.resolutions}
+    pandas_seconds = time.perf_counter() - start
+    print(f"pandas groupby, all resolutions:  {pandas_seconds:.2f}s")
+
+    grid = CellAggregator(args.resolutions, "grid")
+    grid.update(points)
+    for res in args.resolutions:
+        table, ref = grid.table(res), references[res]
+        ref = ref.sort_values(["lat_key", "lon_key"])
+        order = np.lexsort((table["longitude"], table["latitude"]))
+        match = (
+            len(ref) == len(table["cell_id"])
+            and np.array_equal(ref["count"].to_numpy(), table["count"][order])
+            and np.array_equal(ref["population"].to_numpy(), table["population"][order])
+            and np.allclose(ref["poverty_rate"].to_numpy(), table["poverty_rate"][order])
+        )
+        print(f"  grid {res:g} matches pandas: {match}")
+        ok &= match
+
+    sample = slice(0, min(args.rows, 200_000))
+    for res in args.resolutions:
+        nearest = check_hex(points["latitude"][sample], points["longitude"][sample], res)
+        print(f"  hex {res:g} ids are nearest centres: {nearest}")
+        ok &= nearest
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+ORAIL CITIZEN AI - Batch Inference Benchmark
+Geospatial Poverty Mapping Framework
+
+Fits a ridge model on a synthetic store, then predicts every row three
+ways in fresh interpreters: everything in memory at once (the pandas way),
+the engine on a thread pool and the engine on a process pool. Compares
+the predictions and peak RSS. Then interrupts a run part way and checks
+that the rerun resumes from the checkpoint and gives the same column, and
+that changing the model invalidates the checkpoint.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_batch_inference --rows 20000000
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import BENCH_DIR, run_isolated
+from scripts.python.data_processing.poverty_store import PovertyStore
+from scripts.python.data_processing.synthetic_data import write_synthetic_store
+from scripts.python.modeling.batch_inference import fit_store, load_model, predict_store
+from scripts.python.modeling.spatial_cv import build_features
+
+
+def predict_in_memory(store_path, model_path):
+    """Baseline: load every feature column, predict in one call"""
+    model, card = load_model(model_path)
+    frame = PovertyStore(store_path).to_pandas(card["features"])
+    predictions = model.predict(build_features({c: frame[c].to_numpy() for c in card["features"]},
+                                               card["features"])).astype(np.float32)
+    return float(predictions.sum(dtype=np.float64))
+
+
+def predict_engine(store_path, model_path, column, executor, workers):
+    report = predict_store(store_path, model_path, column, executor=executor, workers=workers, force=True)
+    return report["rows_per_second"]
+
+
+def column_sum(store_path, column):
+    return float(PovertyStore(store_path).column(column).sum(dtype=np.float64))
+
+
+def main(argv=None):
+    """Run the batch inference benchmark"""
+    parser = argparse.ArgumentParser(description="Batch inference benchmark")
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    root = os.path.join(BENCH_DIR, "batch_inference")
+    shutil.rmtree(root, ignore_errors=True)
+    store_path = os.path.join(root, "points.store")
+    model_path = os.path.join(root, "ridge.json")
+    write_synthetic_store(store_path, args.rows)
+    card = fit_store(store_path, model_path, sample=200_000)
+    ok = True
+
+    memory_sum, memory_seconds, memory_rss = run_isolated(predict_in_memory, store_path, model_path)
+    thread_rate, thread_seconds, thread_rss = run_isolated(
+        predict_engine, store_path, model_path, "pred_thread", "thread", args.workers
+    )
+    process_rate, process_seconds, process_rss = run_isolated(
+        predict_engine, store_path, model_path, "pred_process", "process", args.workers
+    )
+    store = PovertyStore(store_path)
+    ok &= np.array_equal(store.column("pred_thread"), store.column("pred_process"))
+    ok &= np.isclose(column_sum(store_path, "pred_thread"), memory_sum, rtol=1e-6)
+
+    # Interrupt after two checkpoints, then resume
+    calls = []
+
+    def interrupt(rows, total):
+        calls.append(rows)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+
+    batch_rows = max(1024, args.rows // 64)
+    try:
+        predict_store(store_path, model_path, "pred_resume", batch_rows, workers=2, checkpoint_every=8,
+                      progress=interrupt)
+        ok = False
+    except KeyboardInterrupt:
+        pass
+    checkpoint = json.loads((Path(store_path) / "pred_resume.checkpoint.json").read_text())
+    resumed = predict_store(store_path, model_path, "pred_resume", batch_rows, workers=2)
+    store = PovertyStore(store_path)
+    ok &= 0 < resumed["resumed_batches"] == len(checkpoint["done"]) < resumed["batches"]
+    ok &= np.array_equal(store.column("pred_resume"), store.column("pred_thread"))
+    again = predict_store(store_path, model_path, "pred_resume", batch_rows, workers=2)
+    ok &= again["computed_rows"] == 0
+
+    fit_store(store_path, model_path, sample=100_000, seed=1)
+    refit = predict_store(store_path, model_path, "pred_resume", batch_rows, workers=2)
+    ok &= refit["resumed_batches"] == 0 and refit["computed_rows"] == args.rows
+    shutil.rmtree(root, ignore_errors=True)
+
+    print(f"{args.rows:,} rows, ridge on {len(card['features'])} features")
+    print(f"In memory:      {memory_seconds:6.2f}s  peak RSS {memory_rss:7.0f} MB")
+    print(f"Engine threads: {thread_seconds:6.2f}s  peak RSS {thread_rss:7.0f} MB  ({thread_rate:,} rows/s)")
+    print(f"Engine process: {process_seconds:6.2f}s  peak RSS {process_rss:7.0f} MB  ({process_rate:,} rows/s; "
+          f"parent only)")
+    print(f"Resume: interrupted with {len(checkpoint['done'])}/{resumed['batches']} batches checkpointed, "
+          f"rerun computed {resumed['computed_rows']:,} rows")
+    print(f"All checks passed: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
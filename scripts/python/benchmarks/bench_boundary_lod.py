@@ -0,0 +1,185 @@
+"""
+ORAIL CITIZEN AI - Boundary Level of Detail Benchmark
+Geospatial Poverty Mapping Framework
+
+Builds the LOD cache for a synthetic tiling of "states" that share wiggly
+borders (a jittered lattice cut into blocks, plus an island filling a hole
+in its neighbour), in Web Mercator metres like the Datasource layers. For
+each level it reports vertex counts and build time, and samples random
+points to measure gaps and overlaps between neighbours, comparing the
+shared-arc simplification with naive per-ring Douglas-Peucker. Also times
+a second build (served from the cache) and shows which level is picked for
+a few map widths.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_boundary_lod --blocks 6 --cells 400
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import INDIA_BBOX
+from scripts.python.geospatial.boundary_lod import (
+    BoundaryLOD,
+    count_crossings,
+    douglas_peucker,
+)
+from scripts.python.geospatial.shapefile_reader import (
+    Shapefile,
+    lonlat_to_mercator,
+    write_polygons,
+)
+from scripts.python.geospatial.state_join import PolygonLayer
+
+WEB_MERCATOR_PRJ = (
+    'PROJCS["WGS_1984_Web_Mercator_Auxiliary_Sphere",GEOGCS["GCS_WGS_1984",'
+    'DATUM["D_WGS_1984",SPHEROID["WGS_1984",6378137.0,298.257223563]],'
+    'PRIMEM["Greenwich",0.0],UNIT["Degree",0.0174532925199433]],'
+    'PROJECTION["Mercator_Auxiliary_Sphere"],UNIT["Meter",1.0]]'
+)
+
+
+def synthetic_tiling(blocks=6, cells=400, bbox=INDIA_BBOX, seed=5):
+    """blocks x blocks polygons on a shared jittered lattice (Mercator metres)"""
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = bbox
+    n = blocks * cells + 1
+    lon = np.linspace(lon_min, lon_max, n)
+    lat = np.linspace(lat_min, lat_max, n)
+    grid = np.stack(np.meshgrid(lon, lat), axis=-1)
+    # Smooth displacement field (meandering borders) plus fine jitter, both
+    # with gradients well under 1 so lattice cells never fold over
+    idx = np.arange(n, dtype=np.float64)
+    rows, cols = np.meshgrid(idx, idx, indexing="ij")
+    shift = np.zeros((n, n, 2))
+    for _ in range(6):
+        wavelength = rng.uniform(cells / 3, cells * 2)
+        k = 2 * np.pi / wavelength
+        angle, phase = rng.uniform(0, 2 * np.pi, 2)
+        wave = np.sin(k * (np.cos(angle) * cols + np.sin(angle) * rows) + phase)
+        shift += (0.05 / k) * wave[..., None] * rng.uniform(-1, 1, 2)
+    shift += 0.1 * rng.uniform(-1, 1, (n, n, 2))
+    # Fade the normal component out towards the outer frame
+    shift[..., 1] *= np.clip(np.minimum(rows, n - 1 - rows) / cells, 0, 1)
+    shift[..., 0] *= np.clip(np.minimum(cols, n - 1 - cols) / cells, 0, 1)
+    step = np.array([lon[1] - lon[0], lat[1] - lat[0]])
+    xy = lonlat_to_mercator((grid + shift * step).reshape(-1, 2)).reshape(n, n, 2)
+
+    polygons, names = [], []
+    for bi in range(blocks):
+        for bj in range(blocks):
+            r0, r1 = bi * cells, (bi + 1) * cells
+            c0, c1 = bj * cells, (bj + 1) * cells
+            ring = np.concatenate(
+                [
+                    xy[r0, c0:c1],
+                    xy[r0:r1, c1],
+                    xy[r1, c1:c0:-1],
+                    xy[r1:r0:-1, c0],
+                    xy[r0, c0:c0 + 1],
+                ]
+            )
+            # Clockwise like shapefile outer rings, starting mid-border as
+            # digitised rings usually do
+            ring = np.roll(ring[:-1][::-1], -int(rng.integers(len(ring) - 1)), axis=0)
+            polygons.append([np.vstack([ring, ring[:1]])])
+            names.append(f"state_{bi}_{bj}")
+    # An island polygon exactly filling a hole in the first block
+    centre = polygons[0][0][:-1].mean(axis=0)
+    theta = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+    extent = np.ptp(polygons[0][0], axis=0) * 0.15
+    radius = 1 + 0.2 * np.sin(7 * theta) + 0.03 * rng.standard_normal(len(theta))
+    island = centre + np.column_stack([np.cos(-theta), np.sin(-theta)]) * radius[:, None] * extent
+    island = np.vstack([island, island[:1]])
+    polygons[0].append(island[::-1])
+    polygons.append([island])
+    names.append("island")
+    return polygons, names
+
+
+def naive_simplify(polygons, tolerance):
+    """Per-ring Douglas-Peucker, ignoring neighbours"""
+    return [[ring[douglas_peucker(ring, tolerance)] for ring in rings] for rings in polygons]
+
+
+def coverage_errors(polygons, points, inside):
+    """Fraction of sample points covered by no polygon or by more than one"""
+    covered = np.zeros(len(points), dtype=np.int32)
+    for rings in polygons:
+        layer = PolygonLayer([rings])
+        covered += layer.assign(points[:, 1], points[:, 0]) >= 0
+    gaps = float(np.mean(inside & (covered == 0)))
+    overlaps = float(np.mean(covered > 1))
+    return gaps, overlaps
+
+
+def main(argv=None):
+    """Run the LOD benchmark"""
+    parser = argparse.ArgumentParser(description="Boundary LOD benchmark")
+    parser.add_argument("--blocks", type=int, default=6)
+    parser.add_argument("--cells", type=int, default=400, help="lattice steps per block side")
+    parser.add_argument("--tolerances", type=float, nargs="+", default=[500, 2000, 8000, 30000])
+    parser.add_argument("--samples", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    polygons, names = synthetic_tiling(args.blocks, args.cells)
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    try:
+        layer_path = os.path.join(tmp, "states.shp")
+        write_polygons(
+            layer_path, polygons, [{"State_Name": n} for n in names],
+            [("State_Name", "C", 40, 0)], prj_wkt=WEB_MERCATOR_PRJ,
+        )
+        cache_root = os.path.join(tmp, "lod")
+
+        start = time.perf_counter()
+        lod = BoundaryLOD.build(layer_path, args.tolerances, cache_root)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        BoundaryLOD.build(layer_path, args.tolerances, cache_root)
+        cached_seconds = time.perf_counter() - start
+
+        stacked = np.concatenate([r for p in polygons for r in p])
+        lo, hi = stacked.min(axis=0), stacked.max(axis=0)
+        points = rng.uniform(lo, hi, size=(args.samples, 2))
+        inside = np.zeros(len(points), dtype=bool)
+        for rings in polygons:
+            inside |= PolygonLayer([rings]).assign(points[:, 1], points[:, 0]) >= 0
+
+        ok = True
+        print(f"Source: {len(polygons)} polygons, {len(stacked):,} vertices")
+        print(f"Build: {build_seconds:.2f}s   cached reopen: {cached_seconds * 1000:.1f} ms")
+        print(f"{'tolerance m':>12}{'vertices':>10}{'repaired':>10}"
+              f"{'gaps':>10}{'overlaps':>10}{'naive gaps':>12}{'naive ovl':>11}{'crossings':>11}")
+        for level in lod.levels[1:]:
+            with Shapefile(level["path"]) as shp:
+                simplified = [[np.array(r) for r in shp.rings(i)] for i in range(len(shp))]
+            gaps, overlaps = coverage_errors(simplified, points, inside)
+            n_gaps, n_overlaps = coverage_errors(
+                naive_simplify(polygons, level["tolerance"]), points, inside
+            )
+            crossings = sum(count_crossings(rings) for rings in simplified)
+            ok &= overlaps == 0 and crossings == 0 and level["invalid"] == 0
+            print(f"{level['tolerance']:>12g}{level['vertices']:>10,}{level['repaired']:>10}"
+                  f"{gaps:>10.4%}{overlaps:>10.4%}{n_gaps:>12.4%}{n_overlaps:>11.4%}{crossings:>11}")
+
+        extent = mercator_extent = (lo[0], lo[1], hi[0], hi[1])
+        for width in (256, 1024, 4096, 16384):
+            level = lod.level_for_scale(mercator_extent, width)
+            pixel = (extent[2] - extent[0]) / width
+            print(f"  {width:>6}px wide ({pixel:,.0f} m/px) -> tolerance {level['tolerance']:g}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"No overlaps or crossings: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+ORAIL CITIZEN AI - Chip Extractor Benchmark
+Geospatial Poverty Mapping Framework
+
+Writes a grid of synthetic multi-band uint16 scenes (one per interleave
+layout, so bsq/bil/bip are all exercised) and scatters points over them,
+some past the outer edge. Extracts chips with the windowed engine and
+with the naive approach (read the whole scene for every point, then crop)
+in fresh interpreters, and compares time and peak RSS. Checks that every
+chip equals a direct crop of its scene, that edge chips are padded with
+nodata, that points outside all scenes are reported missing and that
+random access through ChipDataset returns the right chips.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_chip_extractor --points 20000 --tile-pixels 2048
+"""
+
+import argparse
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import BENCH_DIR, run_isolated
+from scripts.python.geospatial.chip_extractor import (
+    ChipDataset,
+    EnviRaster,
+    assign_tiles,
+    extract_chips,
+    write_envi_raster,
+)
+
+NODATA = 65535
+BANDS = ("blue", "green", "red", "nir")
+
+
+def synthetic_scenes(root, grid, pixels, origin=(74.0, 8.0), degrees=1.0, seed=3):
+    """grid x grid adjacent uint16 scenes; returns their header paths"""
+    rng = np.random.default_rng(seed)
+    layouts = ("bsq", "bil", "bip")
+    paths = []
+    for i in range(grid):
+        for j in range(grid):
+            min_lon, min_lat = origin[0] + j * degrees, origin[1] + i * degrees
+            data = rng.integers(0, 10_000, (len(BANDS), pixels, pixels), dtype=np.uint16)
+            path = write_envi_raster(
+                os.path.join(root, f"scene_{i}_{j}.bin"), data,
+                (min_lon, min_lat, min_lon + degrees, min_lat + degrees),
+                interleave=layouts[(i * grid + j) % 3], band_names=BANDS, nodata=NODATA,
+            )
+            paths.append(str(path.with_suffix(".hdr")))
+    return paths
+
+
+def naive_extract(points, rasters, size):
+    """Baseline: load the whole scene for every point, then crop"""
+    lat, lon = points["latitude"], points["longitude"]
+    opened = [EnviRaster(p) for p in rasters]
+    tile = assign_tiles(lat, lon, [r.bounds for r in opened])
+    half = size // 2
+    total = 0
+    for k in np.flatnonzero(tile >= 0):
+        raster = opened[tile[k]]
+        scene, _ = raster.window(0, 0, raster.rows, raster.cols)
+        row, col = (int(np.floor(v)) for v in raster.pixel(lat[k], lon[k]))
+        padded = np.pad(scene, ((0, 0), (half, half), (half, half)), constant_values=NODATA)
+        chip = padded[:, row:row + size, col:col + size]
+        total += int(chip.sum(dtype=np.int64))
+    return total
+
+
+def engine_extract(points, rasters, out_dir, size, workers):
+    return extract_chips(points, rasters, out_dir, size, labels=("poverty_rate",), shard_chips=2048,
+                         workers=workers)
+
+
+def main(argv=None):
+    """Run the chip extractor benchmark"""
+    parser = argparse.ArgumentParser(description="Chip extractor benchmark")
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--grid", type=int, default=2)
+    parser.add_argument("--tile-pixels", type=int, default=2048)
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--naive-points", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    root = os.path.join(BENCH_DIR, "chip_extractor")
+    shutil.rmtree(root, ignore_errors=True)
+    rasters = synthetic_scenes(os.path.join(root, "scenes"), args.grid, args.tile_pixels)
+    rng = np.random.default_rng(11)
+    # Slightly wider than the mosaic: some points fall outside every scene
+    points = {
+        "latitude": rng.uniform(8.0 - 0.02, 8.0 + args.grid + 0.02, args.points),
+        "longitude": rng.uniform(74.0 - 0.02, 74.0 + args.grid + 0.02, args.points),
+        "poverty_rate": rng.beta(2, 5, args.points).astype(np.float32),
+    }
+    out_dir = os.path.join(root, "chips")
+    ok = True
+
+    report, engine_seconds, engine_rss = run_isolated(
+        engine_extract, points, rasters, out_dir, args.size, args.workers
+    )
+    sample = {k: v[:args.naive_points] for k, v in points.items()}
+    _, naive_seconds, naive_rss = run_isolated(naive_extract, sample, rasters, args.size)
+
+    chips = ChipDataset(out_dir)
+    ids = chips.point_ids()
+    opened = [EnviRaster(p) for p in rasters]
+    tile = assign_tiles(points["latitude"], points["longitude"], [r.bounds for r in opened])
+    ok &= len(chips) == int(np.count_nonzero(tile >= 0)) == report["chips"]
+    ok &= report["missing"] == args.points - len(chips) > 0
+    ok &= np.array_equal(np.sort(ids), np.flatnonzero(tile >= 0))
+    ok &= np.allclose(chips.labels("poverty_rate"), points["poverty_rate"][ids])
+    ok &= chips[0].shape == (len(BANDS), args.size, args.size) and chips[0].dtype == np.uint16
+
+    # Every sampled chip equals a padded crop of the full scene
+    half = args.size // 2
+    picks = rng.choice(len(chips), min(300, len(chips)), replace=False)
+    batch = chips.batch(picks)
+    valid = chips.index.column("valid_fraction")
+    scenes = {}
+    for n, i in enumerate(picks):
+        t = int(chips.index.column("tile")[i])
+        if t not in scenes:
+            r = opened[t]
+            scenes[t] = np.pad(r.window(0, 0, r.rows, r.cols)[0], ((0, 0), (half, half), (half, half)),
+                               constant_values=NODATA)
+        row, col = (int(np.floor(v)) for v in opened[t].pixel(points["latitude"][ids[i]],
+                                                              points["longitude"][ids[i]]))
+        expected = scenes[t][:, row:row + args.size, col:col + args.size]
+        ok &= np.array_equal(batch[n], expected) and np.array_equal(chips[int(i)], expected)
+        ok &= np.isclose(valid[i], np.count_nonzero(expected[0] != NODATA) / args.size ** 2)
+    ok &= report["edge_chips"] > 0 and bool(np.any(chips[int(np.argmin(valid))] == NODATA))
+    shutil.rmtree(root, ignore_errors=True)
+
+    per_naive = naive_seconds / max(len(sample["latitude"]), 1)
+    per_engine = engine_seconds / max(args.points, 1)
+    scene_mb = len(BANDS) * args.tile_pixels ** 2 * 2 / 1e6
+    print(f"{args.points:,} points over {args.grid}x{args.grid} scenes of {args.tile_pixels}px x {len(BANDS)} "
+          f"bands ({scene_mb:.0f} MB each), {args.size}px chips")
+    print(f"Windowed engine: {engine_seconds:6.2f}s ({per_engine * 1e6:8.1f} us/chip)  peak RSS {engine_rss:6.0f} MB  "
+          f"{report['jobs']} jobs, {report['shards']} shards")
+    print(f"Whole-scene:     {naive_seconds:6.2f}s ({per_naive * 1e6:8.1f} us/chip)  peak RSS {naive_rss:6.0f} MB  "
+          f"({len(sample['latitude'])} points)")
+    print(f"Chips {report['chips']:,}, missing {report['missing']:,}, padded at edges {report['edge_chips']:,}")
+    print(f"All checks passed: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
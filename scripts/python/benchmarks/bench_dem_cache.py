@@ -0,0 +1,188 @@
+"""
+ORAIL CITIZEN AI - Elevation Cache Benchmark
+Geospatial Poverty Mapping Framework
+
+Writes a local folder of Terrarium PNG tiles for a synthetic terrain over
+the Kerala box (every PNG filter type is exercised), seeds the DEM cache
+from it and from an ESRI ASCII grid, then assembles mosaics with the cache
+offline. Checks the decoded tiles against the encoded elevations, the
+resampled grid against the analytic terrain, and reports the cost of a
+repeat mosaic (memory-mapped windows) against decoding the PNGs again,
+which is what every run paid before.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_dem_cache --zoom 9
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from scripts.python.geospatial.dem_cache import (
+    TILE_SIZE,
+    DemCache,
+    decode_png,
+    elevation_to_terrarium,
+    pixel_bounds,
+    terrarium_to_elevation,
+    tiles_for_bbox,
+    write_envi,
+)
+from scripts.python.geospatial.shapefile_reader import mercator_to_lonlat
+
+KERALA_BBOX = (74.5, 8.0, 77.5, 12.8)
+
+
+def terrain(lon, lat):
+    """Smooth synthetic elevation: coast to Western Ghats, with ridges"""
+    ghats = 2200.0 * np.exp(-(((lon - 76.9) / 0.35) ** 2))
+    ridges = 300.0 * np.sin(lat * 7.0) * np.cos(lon * 5.0)
+    return np.maximum(ghats + ridges + 800.0 * (lon - 74.8), -50.0)
+
+
+def encode_png_rgb(rgb, filters):
+    """RGB PNG bytes using the given filter type per row (0-4)"""
+    height, width, bpp = rgb.shape
+    data = rgb.reshape(height, width * bpp).astype(np.int64)
+    rows = []
+    for r in range(height):
+        line = data[r]
+        up = data[r - 1] if r else np.zeros_like(line)
+        left = np.concatenate([np.zeros(bpp, dtype=np.int64), line[:-bpp]])
+        upleft = np.concatenate([np.zeros(bpp, dtype=np.int64), up[:-bpp]])
+        ftype = int(filters[r])
+        if ftype == 0:
+            pred = 0
+        elif ftype == 1:
+            pred = left
+        elif ftype == 2:
+            pred = up
+        elif ftype == 3:
+            pred = (left + up) // 2
+        else:
+            p = left + up - upleft
+            pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - upleft)
+            pred = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+        rows.append(bytes([ftype]) + ((line - pred) % 256).astype(np.uint8).tobytes())
+
+    def chunk(tag, body):
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + chunk(b"IEND", b"")
+    )
+
+
+def tile_elevation(z, x, y):
+    """Analytic terrain sampled at a tile's pixel centres"""
+    min_x, min_y, max_x, max_y = pixel_bounds(x * TILE_SIZE, y * TILE_SIZE, (x + 1) * TILE_SIZE, (y + 1) * TILE_SIZE, z)
+    step = (max_x - min_x) / TILE_SIZE
+    mx = min_x + (np.arange(TILE_SIZE) + 0.5) * step
+    my = max_y - (np.arange(TILE_SIZE) + 0.5) * step
+    lonlat = mercator_to_lonlat(np.stack(np.meshgrid(mx, my), axis=-1))
+    return terrain(lonlat[..., 0], lonlat[..., 1])
+
+
+def main(argv=None):
+    """Run the elevation cache benchmark"""
+    parser = argparse.ArgumentParser(description="Elevation cache benchmark")
+    parser.add_argument("--zoom", type=int, default=9)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    tmp = tempfile.mkdtemp()
+    try:
+        tiles = tiles_for_bbox(KERALA_BBOX, args.zoom)
+        source = os.path.join(tmp, "terrarium")
+        expected = {}
+        for z, x, y in tiles:
+            rgb = elevation_to_terrarium(tile_elevation(z, x, y))
+            expected[(z, x, y)] = terrarium_to_elevation(rgb)
+            os.makedirs(os.path.join(source, str(z), str(x)), exist_ok=True)
+            with open(os.path.join(source, str(z), str(x), f"{y}.png"), "wb") as f:
+                f.write(encode_png_rgb(rgb, rng.integers(0, 5, TILE_SIZE)))
+
+        cache = DemCache(os.path.join(tmp, "cache"), offline=True)
+        start = time.perf_counter()
+        seeded = cache.seed_tiles(source)
+        seed_seconds = time.perf_counter() - start
+        decoded_ok = all(
+            np.array_equal(np.load(cache.tile_path(*t)), expected[t]) for t in tiles
+        )
+
+        # Before: every run decodes the full tile set again (on top of downloading it)
+        start = time.perf_counter()
+        for name in sorted(os.listdir(os.path.join(source, str(args.zoom))))[:2]:
+            folder = os.path.join(source, str(args.zoom), name)
+            for y in os.listdir(folder):
+                with open(os.path.join(folder, y), "rb") as f:
+                    terrarium_to_elevation(decode_png(f.read()))
+        per_tile = (time.perf_counter() - start) / sum(
+            len(os.listdir(os.path.join(source, str(args.zoom), n)))
+            for n in sorted(os.listdir(os.path.join(source, str(args.zoom))))[:2]
+        )
+
+        times = []
+        for _ in range(args.repeats):
+            cache.stats["bytes_read"] = 0
+            start = time.perf_counter()
+            mosaic = cache.mosaic(KERALA_BBOX, args.zoom)
+            times.append(time.perf_counter() - start)
+        rows, cols = mosaic["elevation"].shape
+        read_bytes = cache.stats["bytes_read"]
+        total_bytes = len(tiles) * TILE_SIZE * TILE_SIZE * 4
+
+        # A small window touches one or two tiles only
+        small = cache.mosaic((76.0, 10.0, 76.1, 10.1), args.zoom)
+
+        # ESRI ASCII grid seed one zoom deeper, checked against the terrain
+        lon = np.linspace(74.5, 77.5, 601)
+        lat = np.linspace(12.8, 8.0, 961)
+        cell = 3.0 / 600
+        grid = terrain(*np.meshgrid(lon, lat))
+        asc = os.path.join(tmp, "kerala.asc")
+        with open(asc, "w", encoding="ascii") as f:
+            f.write(f"ncols 601\nnrows 961\nxllcenter 74.5\nyllcenter 8.0\ncellsize {cell}\nNODATA_value -9999\n")
+            np.savetxt(f, grid, fmt="%.2f")
+        start = time.perf_counter()
+        grid_tiles = cache.seed_file(asc, args.zoom + 1)
+        asc_seconds = time.perf_counter() - start
+        inner = (74.6, 8.1, 77.4, 12.7)
+        deep = cache.mosaic(inner, args.zoom + 1)
+        b = deep["bounds"]
+        r, c = deep["elevation"].shape
+        step = (b[2] - b[0]) / c
+        mx = b[0] + (np.arange(c) + 0.5) * step
+        my = b[3] - (np.arange(r) + 0.5) * step
+        ll = mercator_to_lonlat(np.stack(np.meshgrid(mx, my), axis=-1))
+        grid_error = float(np.nanmax(np.abs(deep["elevation"] - terrain(ll[..., 0], ll[..., 1]))))
+
+        envi = write_envi(os.path.join(tmp, "kerala.bin"), mosaic)
+        envi_ok = os.path.getsize(envi) == rows * cols * 4
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"Zoom {args.zoom}: {len(tiles)} tiles for the Kerala box, mosaic {rows}x{cols}")
+    print(f"Seed from PNG folder: {seeded} tiles in {seed_seconds:.2f}s; decoded exactly: {decoded_ok}")
+    print(f"Decode per run (before): {per_tile * len(tiles):.2f}s for the tile set, plus the download")
+    print(f"Cached mosaic (offline): best {min(times) * 1000:.1f} ms, read {read_bytes / (1 << 20):.1f} of {total_bytes / (1 << 20):.1f} MB in the tiles")
+    print(f"Small window: {small['tiles']} tile(s), {small['elevation'].shape[0]}x{small['elevation'].shape[1]} px")
+    print(f"ASCII grid seed z{args.zoom + 1}: {grid_tiles} tiles in {asc_seconds:.2f}s, "
+          f"max error vs terrain {grid_error:.2f} m")
+    print(f"Network fetches: {cache.stats['fetched']}; ENVI export size ok: {envi_ok}")
+    ok = decoded_ok and cache.stats["fetched"] == 0 and grid_error < 25.0 and envi_ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
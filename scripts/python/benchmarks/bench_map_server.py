@@ -0,0 +1,142 @@
+"""
+ORAIL CITIZEN AI - Map Server Load Test
+Geospatial Poverty Mapping Framework
+
+Starts the map server in-process on a free port over a synthetic store and
+tile pyramid, then drives it with concurrent keep-alive clients issuing a
+skewed mix of tile and bbox requests (a few hot areas, a long tail).
+Reports throughput, client-side latency and the server's cache counters,
+and checks bbox answers against a brute-force NumPy filter.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_map_server --rows 1000000 --clients 32
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import percentiles, synthetic_states
+from scripts.python.data_processing.synthetic_data import DEFAULT_BBOX, write_synthetic_store
+from scripts.python.geospatial.state_join import PolygonLayer, join_store
+from scripts.python.visualization.map_server import MapData, create_server
+from scripts.python.visualization.tile_pyramid import TilePyramid
+
+
+def _client(port, requests):
+    """One keep-alive connection issuing a list of paths; returns latencies"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies = []
+    for path in requests:
+        start = time.perf_counter()
+        conn.request("GET", path)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            raise RuntimeError(f"{path}: HTTP {response.status}")
+    conn.close()
+    return latencies
+
+
+def _get_json(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", path)
+    body = json.loads(conn.getresponse().read())
+    conn.close()
+    return body
+
+
+def main(argv=None):
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description="Map server load test")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--max-zoom", type=int, default=10)
+    parser.add_argument("--cache-mb", type=float, default=16)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "points.store")
+        tiles_dir = os.path.join(tmp, "tiles")
+        write_synthetic_store(store_path, args.rows, workers=1)
+        polygons, names = synthetic_states(grid=3, vertices=500, bbox=DEFAULT_BBOX)
+        join_store(store_path, PolygonLayer(polygons, names), workers=1)
+        TilePyramid(tiles_dir).build(store_path, max_zoom=args.max_zoom, workers=1)
+
+        data = MapData(tiles_dir, store_path, files_dir=tmp)
+        server = create_server(data, port=0, cache_bytes=int(args.cache_mb * (1 << 20)))
+        port = server.server_address[1]
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        tiles = [name for name in TilePyramid(tiles_dir).index["tiles"]]
+        boxes = []
+        for _ in range(400):
+            lat, lon = rng.uniform(14.05, 14.9), rng.uniform(120.05, 120.9)
+            boxes.append((round(lon, 3), round(lat, 3), round(lon + 0.08, 3), round(lat + 0.08, 3)))
+
+        def pick(items):
+            # Zipf-like popularity: a few hot items, a long tail
+            return items[min(int(rng.zipf(1.3)) - 1, len(items) - 1)]
+
+        workload = []
+        for _ in range(args.clients):
+            paths = []
+            for _ in range(args.requests):
+                roll = rng.random()
+                if roll < 0.7:
+                    paths.append(f"/tiles/{pick(tiles)}.png")
+                elif roll < 0.97:
+                    box = pick(boxes)
+                    paths.append(
+                        "/query/bbox?min_lon={}&min_lat={}&max_lon={}&max_lat={}".format(*box)
+                    )
+                else:
+                    paths.append("/query/states")
+            workload.append(paths)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            latencies = sum(pool.map(lambda paths: _client(port, paths), workload), [])
+        seconds = time.perf_counter() - start
+
+        metrics = _get_json(port, "/metrics")
+        lat, lon = data.store.column("latitude"), data.store.column("longitude")
+        pop = data.store.column("population").astype(np.float64)
+        ok = True
+        for box in boxes[:20]:
+            answer = _get_json(port, "/query/bbox?min_lon={}&min_lat={}&max_lon={}&max_lat={}".format(*box))
+            mask = (lon >= box[0]) & (lat >= box[1]) & (lon <= box[2]) & (lat <= box[3])
+            ok &= answer["count"] == int(mask.sum()) and answer["population"] == int(pop[mask].sum())
+
+        server.shutdown()
+        server.server_close()
+        del data
+
+    p = percentiles(latencies, (50, 95, 99))
+    cache = metrics["cache"]
+    print(f"Requests: {len(latencies):,} from {args.clients} clients in {seconds:.2f}s "
+          f"({len(latencies) / seconds:,.0f} req/s)")
+    print(f"Latency ms: p50 {p['p50'] * 1000:.2f}  p95 {p['p95'] * 1000:.2f}  p99 {p['p99'] * 1000:.2f}")
+    print(f"Cache: hit rate {cache['hit_rate']:.1%}  entries {cache['entries']:,}  "
+          f"{cache['bytes'] / (1 << 20):.1f}/{cache['max_bytes'] / (1 << 20):.1f} MB  "
+          f"evictions {cache['evictions']:,}")
+    for route, stats in sorted(metrics["routes"].items()):
+        print(f"  {route:<14}{stats['requests']:>8,} req  p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms")
+    print(f"bbox answers match brute force: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
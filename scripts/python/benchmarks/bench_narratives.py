@@ -0,0 +1,144 @@
+"""
+ORAIL CITIZEN AI - Narrative Generation Benchmark
+Geospatial Poverty Mapping Framework
+
+Runs the narrative pipeline against the local mock LLM server (fixed
+latency per request, injected HTTP 500s and a server-side rate limit):
+one request at a time as a baseline, then concurrent and batched. Checks
+that every cell gets exactly one narrative despite the failures, that an
+interrupted run (cancelled part way, with a torn last line) resumes to the
+same results as an uninterrupted one, and that 429 answers are retried.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_narratives --cells 1000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import write_store
+from scripts.python.geospatial.aggregation import CELL_SCHEMA
+from scripts.python.llm_integration.mock_llm_server import create_mock_server
+from scripts.python.llm_integration.narratives import (
+    HTTPBackend,
+    agenerate_narratives,
+    generate_narratives,
+    load_records,
+)
+
+
+def synthetic_cells(path, n, seed=3):
+    rng = np.random.default_rng(seed)
+    data = {
+        "cell_id": np.arange(n, dtype=np.int64) * 7 + 1_000_000,
+        "latitude": rng.uniform(8, 35, n),
+        "longitude": rng.uniform(68, 97, n),
+        "count": rng.integers(1, 500, n),
+        "population": rng.integers(1_000, 2_000_000, n),
+        "poverty_rate": rng.beta(2, 5, n),
+        "poverty_rate_unweighted": rng.beta(2, 5, n),
+        "education_index": rng.uniform(0.3, 0.9, n),
+        "health_index": rng.uniform(0.4, 0.95, n),
+        "infrastructure_index": rng.uniform(0.2, 0.8, n),
+    }
+    write_store(path, data, CELL_SCHEMA)
+    return path
+
+
+def result_lines(path):
+    return [json.loads(line) for line in Path(path).read_text(encoding="utf-8").splitlines()]
+
+
+def main(argv=None):
+    """Run the narrative generation benchmark"""
+    parser = argparse.ArgumentParser(description="Narrative generation benchmark")
+    parser.add_argument("--cells", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.05, help="mock seconds per request")
+    parser.add_argument("--error-rate", type=float, default=0.03)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    server = create_mock_server(latency=args.latency, error_rate=args.error_rate, rate_limit=100)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    backend = HTTPBackend(base_url, "mock", max_batch=args.batch_size)
+    ok = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        records = load_records(synthetic_cells(tmp / "cells.store", args.cells))
+        ids = [r["id"] for r in records]
+
+        sample = records[: max(20, args.cells // 20)]
+        serial = generate_narratives(sample, tmp / "serial.jsonl", backend, concurrency=1, batch_size=1,
+                                     backoff=0.05)
+
+        full = generate_narratives(records, tmp / "full.jsonl", backend, concurrency=args.concurrency,
+                                   batch_size=args.batch_size, rate=50, backoff=0.05)
+        expected = {e["id"]: e["text"] for e in result_lines(tmp / "full.jsonl")}
+        ok &= full["completed"] == len(records) and full["failed"] == 0 and sorted(expected) == sorted(ids)
+
+        # Interrupted run: cancel part way, tear the last line, resume
+        resumed_path = tmp / "resumed.jsonl"
+
+        async def interrupted():
+            try:
+                await asyncio.wait_for(
+                    agenerate_narratives(records, resumed_path, backend, concurrency=args.concurrency,
+                                         batch_size=args.batch_size, backoff=0.05),
+                    timeout=max(0.3, full["seconds"] / 3),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+        asyncio.run(interrupted())
+        before = len(result_lines(resumed_path))
+        with open(resumed_path, "a", encoding="utf-8") as f:
+            f.write('{"id": "torn", "te')
+        resumed = generate_narratives(records, resumed_path, backend, concurrency=args.concurrency,
+                                      batch_size=args.batch_size, backoff=0.05)
+        entries = [e for e in result_lines(resumed_path) if "text" in e]
+        ok &= 0 < before < len(records) and resumed["skipped"] == before
+        ok &= len(entries) == len(records) and {e["id"]: e["text"] for e in entries} == expected
+
+        # No client-side limit against a 20 req/s server: 429s are retried
+        server.shutdown()
+        server.server_close()
+        limited_server = create_mock_server(latency=0.01, rate_limit=20)
+        threading.Thread(target=limited_server.serve_forever, daemon=True).start()
+        limited_url = f"http://127.0.0.1:{limited_server.server_address[1]}/v1"
+        limited = generate_narratives(records[:100], tmp / "limited.jsonl", HTTPBackend(limited_url, "mock", max_batch=1),
+                                      concurrency=16, batch_size=1, backoff=0.05, max_retries=10)
+        ok &= limited["completed"] == 100 and limited["rate_limited"] > 0
+        limited_server.shutdown()
+        limited_server.server_close()
+        metrics_saved = (tmp / "full.metrics.json").exists()
+        ok &= metrics_saved
+
+    latency = full["request_latency"]
+    print(f"{args.cells} cells, mock latency {args.latency * 1000:.0f} ms/request, "
+          f"{args.error_rate:.0%} injected errors, server limit 100 req/s")
+    print(f"Sequential: {serial['records_per_second']:.1f} records/s over {len(sample)} records")
+    print(f"Concurrency {args.concurrency}, batch {args.batch_size}, 50 req/s: "
+          f"{full['records_per_second']:.1f} records/s "
+          f"({full['records_per_second'] / serial['records_per_second']:.0f}x), "
+          f"{full['requests']} requests, {full['retries']} retries")
+    print(f"Request latency p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms, "
+          f"p99 {latency['p99'] * 1000:.0f} ms")
+    print(f"Resume: {before} records written before interruption, {resumed['completed']} generated "
+          f"on rerun, {len(entries)} total")
+    print(f"Rate limited server: {limited['rate_limited']} x 429 retried, {limited['completed']}/100 completed")
+    print(f"All checks passed: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+ORAIL CITIZEN AI - Poverty Store Benchmark
+Geospatial Poverty Mapping Framework
+
+Compares loading the poverty point dataset from CSV (pandas.read_csv) with
+the columnar store: full read, and a latitude/longitude projection. Every
+loader runs in its own interpreter so peak RSS is measured independently.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_poverty_store --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import BENCH_DIR, run_isolated, synthetic_points
+from scripts.python.data_processing.poverty_store import PovertyStore, convert_csv
+
+
+def load_csv(csv_path):
+    """Load the CSV the way the notebooks do and touch every column"""
+    import pandas as pd
+
+    frame = pd.read_csv(csv_path)
+    return float(sum(frame[name].sum() for name in frame.columns))
+
+
+def load_store(store_path, columns=None):
+    """Open the store and touch every value of the projected columns"""
+    import pandas  # noqa: F401 - same import baseline as load_csv
+
+    store = PovertyStore(store_path)
+    return float(sum(np.sum(values, dtype=np.float64) for values in store.read(columns).values()))
+
+
+def prepare(n_rows, workdir):
+    """Write the benchmark CSV and convert it to a store"""
+    import pandas as pd
+
+    os.makedirs(workdir, exist_ok=True)
+    csv_path = os.path.join(workdir, f"poverty_{n_rows}.csv")
+    store_path = os.path.join(workdir, f"poverty_{n_rows}.store")
+    if not os.path.exists(csv_path):
+        pd.DataFrame(synthetic_points(n_rows)).to_csv(csv_path, index=False)
+
+    start = time.perf_counter()
+    convert_csv(csv_path, store_path)
+    convert_seconds = time.perf_counter() - start
+    return csv_path, store_path, convert_seconds
+
+
+def du_mb(path):
+    """Size of a file or directory in MB"""
+    if os.path.isfile(path):
+        return os.path.getsize(path) / 1e6
+    return sum(e.stat().st_size for e in os.scandir(path) if e.is_file()) / 1e6
+
+
+def main(argv=None):
+    """Run the CSV vs columnar store comparison"""
+    parser = argparse.ArgumentParser(description="CSV vs columnar store load benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workdir", default=BENCH_DIR)
+    args = parser.parse_args(argv)
+
+    csv_path, store_path, convert_seconds = prepare(args.rows, args.workdir)
+    print(f"Rows: {args.rows:,}")
+    print(f"CSV size: {du_mb(csv_path):.1f} MB, store size: {du_mb(store_path):.1f} MB")
+    print(f"CSV -> store conversion: {convert_seconds:.2f}s")
+
+    cases = [
+        ("pandas.read_csv (all columns)", load_csv, (csv_path,)),
+        ("store (all columns)", load_store, (store_path,)),
+        ("store (latitude, longitude)", load_store, (store_path, ["latitude", "longitude"])),
+    ]
+    print(f"{'loader':<34}{'seconds':>10}{'peak RSS MB':>14}")
+    for label, func, func_args in cases:
+        _, seconds, rss = run_isolated(func, *func_args)
+        rss_text = f"{rss:.0f}" if rss is not None else "n/a"
+        print(f"{label:<34}{seconds:>10.3f}{rss_text:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
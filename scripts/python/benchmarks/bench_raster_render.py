@@ -0,0 +1,115 @@
+"""
+ORAIL CITIZEN AI - Raster Renderer Benchmark
+Geospatial Poverty Mapping Framework
+
+Times binning and shading of synthetic points at several point counts and
+image sizes, showing that shading/PNG cost follows pixels, not points.
+Checks the binned grid against a per-point np.add.at reference, and times
+the matplotlib scatter the notebooks use when matplotlib is installed.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_raster_render --rows 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import synthetic_points
+from scripts.python.data_processing.synthetic_data import DEFAULT_BBOX
+from scripts.python.visualization.raster_render import Canvas, shade, write_png
+
+CANVAS_BBOX = (DEFAULT_BBOX[2], DEFAULT_BBOX[0], DEFAULT_BBOX[3], DEFAULT_BBOX[1])
+
+
+def reference_grid(points, width, height):
+    """Population-weighted mean per pixel with unbuffered np.add.at"""
+    canvas = Canvas(width, height, CANVAS_BBOX)
+    idx = canvas.pixel_index(points["latitude"], points["longitude"])
+    pop = points["population"].astype(np.float64)
+    weighted = np.zeros(width * height)
+    weights = np.zeros(width * height)
+    np.add.at(weighted, idx, pop * points["poverty_rate"])
+    np.add.at(weights, idx, pop)
+    with np.errstate(invalid="ignore"):
+        return (weighted / weights).reshape(height, width)
+
+
+def render(points, width, height, chunk_rows, out_path):
+    start = time.perf_counter()
+    canvas = Canvas(width, height, CANVAS_BBOX)
+    n = len(points["latitude"])
+    for a in range(0, n, chunk_rows):
+        b = a + chunk_rows
+        canvas.update(
+            points["latitude"][a:b],
+            points["longitude"][a:b],
+            points["poverty_rate"][a:b],
+            points["population"][a:b],
+        )
+    bin_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    write_png(out_path, shade(canvas.aggregate("weighted_mean"), cmap="Reds"))
+    return canvas, bin_seconds, time.perf_counter() - start
+
+
+def main(argv=None):
+    """Run the renderer benchmark"""
+    parser = argparse.ArgumentParser(description="Raster renderer benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--sizes", nargs="+", default=["960x640", "3600x2400"])
+    parser.add_argument("--chunk-rows", type=int, default=1 << 20)
+    parser.add_argument("--scatter-rows", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = os.path.join(tmp, "map.png")
+        print(f"{'points':>12}{'size':>12}{'bin s':>9}{'shade+png s':>13}{'png KB':>9}")
+        for n_rows in args.rows:
+            points = synthetic_points(n_rows)
+            for size in args.sizes:
+                width, height = (int(v) for v in size.split("x"))
+                canvas, bin_s, shade_s = render(points, width, height, args.chunk_rows, out_path)
+                kb = os.path.getsize(out_path) / 1024
+                print(f"{n_rows:>12,}{size:>12}{bin_s:>9.2f}{shade_s:>13.2f}{kb:>9.0f}")
+
+        points = synthetic_points(min(args.rows), seed=5)
+        width, height = (int(v) for v in args.sizes[0].split("x"))
+        canvas, _, _ = render(points, width, height, args.chunk_rows, out_path)
+        match = np.allclose(
+            canvas.aggregate("weighted_mean"), reference_grid(points, width, height), equal_nan=True
+        )
+        print(f"Binned grid matches np.add.at reference: {match}")
+        ok &= match
+
+        try:
+            import matplotlib
+
+            matplotlib.use("Agg")
+            import matplotlib.pyplot as plt
+        except ImportError:
+            print("matplotlib not installed; scatter comparison skipped")
+        else:
+            sample = {k: v[: args.scatter_rows] for k, v in points.items()}
+            start = time.perf_counter()
+            plt.figure(figsize=(12, 8))
+            plt.scatter(
+                sample["longitude"], sample["latitude"],
+                c=sample["poverty_rate"], cmap="Reds", alpha=0.7, s=40,
+            )
+            plt.savefig(os.path.join(tmp, "scatter.png"), dpi=300, bbox_inches="tight")
+            plt.close("all")
+            print(
+                f"matplotlib scatter, {args.scatter_rows:,} points at 300 dpi: "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+ORAIL CITIZEN AI - LLM Response Cache Benchmark
+Geospatial Poverty Mapping Framework
+
+Runs district narrative prompts through the local stand-in model twice
+(cold, then warm from the on-disk cache), and checks that concurrent
+identical requests from threads and from asyncio tasks reach the model only
+once, that prompts differing only in whitespace share an entry, that the
+store stays within its byte budget and that entries expire after the TTL.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_response_cache --districts 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from scripts.python.llm_integration.response_cache import (
+    CachedLLM,
+    LocalStandInModel,
+    ResponseCache,
+)
+
+
+def district_prompts(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return [
+        f"Write a two-sentence poverty brief for district {i}. "
+        f"Poverty rate {rng.uniform(5, 45):.1f}%, population {int(rng.integers(2e5, 4e6)):,}, "
+        f"education index {rng.uniform(0.3, 0.9):.2f}, health index {rng.uniform(0.3, 0.9):.2f}."
+        for i in range(n)
+    ]
+
+
+def main(argv=None):
+    """Run the response cache benchmark"""
+    parser = argparse.ArgumentParser(description="LLM response cache benchmark")
+    parser.add_argument("--districts", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in model seconds per call")
+    args = parser.parse_args(argv)
+
+    prompts = district_prompts(args.districts)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.sqlite")
+        model = LocalStandInModel(latency=args.latency)
+        llm = CachedLLM(model, ResponseCache(path))
+        start = time.perf_counter()
+        cold = [llm.generate(p, temperature=0.2) for p in prompts]
+        cold_seconds = time.perf_counter() - start
+        llm.cache.close()
+
+        # A new process would reopen the same file
+        llm = CachedLLM(model, ResponseCache(path))
+        calls_before = model.calls
+        start = time.perf_counter()
+        warm = [llm.generate(p, temperature=0.2, stream=False) for p in prompts]
+        warm_seconds = time.perf_counter() - start
+        ok &= warm == cold and model.calls == calls_before
+        spaced = llm.generate("\n" + prompts[0] + "  \r\n", temperature=0.2)
+        ok &= spaced == cold[0] and model.calls == calls_before
+
+        # Thread stampede: 16 threads x 10 fresh prompts
+        fresh = [p + " Mention water access." for p in prompts[:10]]
+        calls_before = model.calls
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda i: llm.generate(fresh[i % 10]), range(160)))
+        thread_calls = model.calls - calls_before
+
+        # asyncio stampede: 100 tasks over 10 fresh prompts
+        fresh_async = [p + " Mention roads." for p in prompts[:10]]
+
+        async def stampede():
+            return await asyncio.gather(*(llm.agenerate(fresh_async[i % 10]) for i in range(100)))
+
+        calls_before = model.calls
+        asyncio.run(stampede())
+        async_calls = model.calls - calls_before
+        ok &= thread_calls == 10 and async_calls == 10
+        stats = llm.cache.stats()
+        llm.cache.close()
+
+        small = ResponseCache(os.path.join(tmp, "small.sqlite"), max_bytes=20_000)
+        for i, text in enumerate(cold):
+            small.put(str(i), text)
+        small_stats = small.stats()
+        ok &= small_stats["bytes"] <= small.max_bytes and small.get(str(len(cold) - 1)) is not None
+        small.close()
+
+        expiring = ResponseCache(os.path.join(tmp, "ttl.sqlite"), ttl=0.2)
+        expiring.put("k", "v")
+        fresh_hit = expiring.get("k")
+        time.sleep(0.3)
+        ok &= fresh_hit == "v" and expiring.get("k") is None
+        expiring.close()
+
+    print(f"{args.districts} prompts, stand-in latency {args.latency * 1000:.0f} ms")
+    print(f"Cold run: {cold_seconds:.2f}s   warm run (reopened cache): {warm_seconds * 1000:.1f} ms "
+          f"({cold_seconds / max(warm_seconds, 1e-9):.0f}x)")
+    print(f"Concurrent duplicates: 160 thread calls -> {thread_calls} model calls, "
+          f"100 async calls -> {async_calls} model calls")
+    print(f"Cache: {stats['entries']} entries, hit rate {stats['hit_rate']:.1%}, "
+          f"deduplicated {stats['deduplicated']}")
+    print(f"Byte budget: {small_stats['bytes']:,}/{20_000:,} bytes after {small_stats['evictions']} evictions")
+    print(f"All checks passed: {ok}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
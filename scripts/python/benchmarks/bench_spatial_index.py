@@ -0,0 +1,124 @@
+"""
+ORAIL CITIZEN AI - Spatial Index Benchmark
+Geospatial Poverty Mapping Framework
+
+Times bounding-box, 10 km radius and k-nearest queries on the grid index
+against brute-force filtering of a pandas DataFrame, and checks that both
+return the same rows.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_spatial_index --rows 1000000
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import percentiles, synthetic_points
+from scripts.python.geospatial.spatial_index import SpatialIndex, haversine_m
+
+
+def brute_bbox(frame, min_lon, min_lat, max_lon, max_lat):
+    mask = (
+        (frame["latitude"] >= min_lat)
+        & (frame["latitude"] <= max_lat)
+        & (frame["longitude"] >= min_lon)
+        & (frame["longitude"] <= max_lon)
+    )
+    return np.flatnonzero(mask.to_numpy())
+
+
+def brute_radius(frame, lat, lon, radius_m):
+    dist = haversine_m(lat, lon, frame["latitude"].to_numpy(), frame["longitude"].to_numpy())
+    return np.flatnonzero(dist <= radius_m)
+
+
+def brute_knn(frame, lat, lon, k):
+    dist = haversine_m(lat, lon, frame["latitude"].to_numpy(), frame["longitude"].to_numpy())
+    ids = np.argpartition(dist, k - 1)[:k]
+    return ids[np.lexsort((ids, dist[ids]))]
+
+
+def _timed(func, queries):
+    times, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(func(*query))
+        times.append(time.perf_counter() - start)
+    return times, results
+
+
+def main(argv=None):
+    """Run the index vs brute-force comparison"""
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Spatial index benchmark")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--radius-m", type=float, default=10_000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    frame = pd.DataFrame(synthetic_points(args.rows))
+    lat, lon = frame["latitude"].to_numpy(), frame["longitude"].to_numpy()
+
+    start = time.perf_counter()
+    index = SpatialIndex.build(lat, lon)
+    build_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        index.save(tmp)
+        start = time.perf_counter()
+        index = SpatialIndex.load(tmp)
+        load_seconds = time.perf_counter() - start
+
+        rng = np.random.default_rng(7)
+        centres = list(
+            zip(
+                rng.uniform(14.05, 14.95, args.queries),
+                rng.uniform(120.05, 120.95, args.queries),
+            )
+        )
+        boxes = [(x - 0.05, y - 0.05, x + 0.05, y + 0.05) for y, x in centres]
+        circles = [(c_lat, c_lon, args.radius_m) for c_lat, c_lon in centres]
+        knns = [(c_lat, c_lon, args.k) for c_lat, c_lon in centres]
+
+        cases = [
+            ("bbox 0.1 deg", index.query_bbox, lambda *q: brute_bbox(frame, *q), boxes),
+            (
+                f"radius {args.radius_m / 1000:g} km",
+                index.query_radius,
+                lambda *q: brute_radius(frame, *q),
+                circles,
+            ),
+            (
+                f"knn k={args.k}",
+                lambda *q: index.query_knn(*q)[0],
+                lambda *q: brute_knn(frame, *q),
+                knns,
+            ),
+        ]
+
+        print(
+            f"Rows: {args.rows:,}  build: {build_seconds:.3f}s"
+            f"  load (mmap): {load_seconds * 1000:.2f} ms"
+        )
+        print(f"{'query':<16}{'index p50 ms':>14}{'brute p50 ms':>14}{'speedup':>10}{'match':>8}")
+        for label, indexed, brute, queries in cases:
+            t_index, r_index = _timed(indexed, queries)
+            t_brute, r_brute = _timed(brute, queries)
+            match = all(np.array_equal(a, b) for a, b in zip(r_index, r_brute))
+            p_index = percentiles(t_index)["p50"] * 1000
+            p_brute = percentiles(t_brute)["p50"] * 1000
+            print(
+                f"{label:<16}{p_index:>14.3f}{p_brute:>14.3f}"
+                f"{p_brute / max(p_index, 1e-9):>9.0f}x{str(match):>8}"
+            )
+        del index
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
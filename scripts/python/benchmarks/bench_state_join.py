@@ -0,0 +1,114 @@
+"""
+ORAIL CITIZEN AI - State Join Benchmark
+Geospatial Poverty Mapping Framework
+
+Times the vectorised point-in-polygon join on a grid of synthetic "states"
+(wavy star-shaped polygons with thousands of vertices, some with holes, all
+inside the India bounding box) or on a real polygon layer, and checks a
+random sample of points against a naive per-point ray-casting loop.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_state_join --rows 10000000
+    python -m scripts.python.benchmarks.bench_state_join --layer <India_State_Boundary.shp>
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import synthetic_points, synthetic_states
+from scripts.python.geospatial.state_join import NO_STATE, PolygonLayer, assign_states
+
+
+def naive_point_in_rings(x, y, rings):
+    """Even-odd ray casting for one point, one edge at a time"""
+    inside = False
+    for ring in rings:
+        n = len(ring)
+        for i in range(n):
+            x0, y0 = ring[i]
+            x1, y1 = ring[(i + 1) % n]
+            if y0 == y1:
+                continue
+            if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * ((x1 - x0) / (y1 - y0)):
+                inside = not inside
+    return inside
+
+
+def naive_assign(lat, lon, polygons):
+    """Per-point loop over polygons, bounding box first"""
+    boxes = [
+        (min(r[:, 0].min() for r in p), min(r[:, 1].min() for r in p),
+         max(r[:, 0].max() for r in p), max(r[:, 1].max() for r in p))
+        for p in polygons
+    ]
+    out = np.full(len(lat), NO_STATE, dtype=np.int16)
+    for i, (y, x) in enumerate(zip(lat.tolist(), lon.tolist())):
+        for pid, (rings, box) in enumerate(zip(polygons, boxes)):
+            if box[0] <= x <= box[2] and box[1] <= y <= box[3]:
+                if naive_point_in_rings(x, y, [r.tolist() for r in rings]):
+                    out[i] = pid
+                    break
+    return out
+
+
+def main(argv=None):
+    """Run the state join benchmark and correctness check"""
+    parser = argparse.ArgumentParser(description="State join benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--layer", default=None, help="shapefile (default: synthetic states)")
+    parser.add_argument("--check", type=int, default=300, help="points checked by the naive loop")
+    args = parser.parse_args(argv)
+
+    if args.layer:
+        from scripts.python.geospatial.shapefile_reader import Shapefile
+
+        with Shapefile(args.layer) as shp:
+            polygons = [shp.rings(i, lonlat=shp.is_web_mercator) for i in range(len(shp))]
+        names = None
+    else:
+        polygons, names = synthetic_states()
+
+    start = time.perf_counter()
+    layer = PolygonLayer(polygons, names)
+    prepare_seconds = time.perf_counter() - start
+    bounds = layer.bboxes
+    bbox = (
+        np.nanmin(bounds[:, 1]), np.nanmax(bounds[:, 3]),
+        np.nanmin(bounds[:, 0]), np.nanmax(bounds[:, 2]),
+    )
+    points = synthetic_points(args.rows, bbox=bbox)
+    lat, lon = points["latitude"], points["longitude"]
+    n_vertices = sum(len(r) for p in polygons for r in p)
+    print(f"Polygons: {len(layer)}  vertices: {n_vertices:,}  prepared in {prepare_seconds:.2f}s")
+
+    results = {}
+    for label, workers in (("1 process", 1), ("parallel", args.workers)):
+        start = time.perf_counter()
+        results[label] = assign_states(lat, lon, layer, workers=workers)
+        seconds = time.perf_counter() - start
+        print(
+            f"{label:<10} {args.rows:,} points in {seconds:.2f}s "
+            f"({args.rows / seconds * 60 / 1e6:,.1f} M points/min)"
+        )
+    ids = results["parallel"]
+    print(f"Single vs parallel identical: {np.array_equal(results['1 process'], ids)}")
+    print(f"Assigned: {np.mean(ids != NO_STATE):.1%} of points")
+
+    sample = np.random.default_rng(11).choice(args.rows, min(args.check, args.rows), replace=False)
+    start = time.perf_counter()
+    expected = naive_assign(lat[sample], lon[sample], polygons)
+    naive_seconds = time.perf_counter() - start
+    match = np.array_equal(expected, ids[sample])
+    print(
+        f"Naive loop on {len(sample)} points: {naive_seconds:.2f}s "
+        f"({len(sample) / naive_seconds:,.0f} points/s)  match: {match}"
+    )
+    return 0 if match else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
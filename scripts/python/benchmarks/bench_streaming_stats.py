@@ -0,0 +1,74 @@
+"""
+ORAIL CITIZEN AI - Streaming Statistics Benchmark
+Geospatial Poverty Mapping Framework
+
+Compares DataFrame.describe() on a fully loaded frame with the streaming,
+mergeable summary over a columnar store, each in a fresh process so the
+peak RSS figures are comparable. Checks that count/mean/std/min/max match
+pandas and reports the worst rank error of the 25/50/75% sketch estimates.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_streaming_stats --rows 10000000
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import BENCH_DIR, run_isolated
+from scripts.python.data_processing.poverty_store import PovertyStore
+from scripts.python.data_processing.streaming_stats import describe_store
+from scripts.python.data_processing.synthetic_data import write_synthetic_store
+
+MOMENT_ROWS = ["count", "mean", "std", "min", "max"]
+QUANTILE_ROWS = [("25%", 0.25), ("50%", 0.5), ("75%", 0.75)]
+
+
+def pandas_describe(store_path):
+    return PovertyStore(store_path).to_pandas().describe()
+
+
+def streaming_describe(store_path, workers):
+    return describe_store(store_path, workers=workers)
+
+
+def main(argv=None):
+    """Run the describe() comparison"""
+    parser = argparse.ArgumentParser(description="Streaming statistics benchmark")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    store_path = os.path.join(BENCH_DIR, f"stats_{args.rows}.store")
+    if not os.path.exists(os.path.join(store_path, "_meta.json")):
+        write_synthetic_store(store_path, args.rows)
+
+    reference, pd_seconds, pd_rss = run_isolated(pandas_describe, store_path)
+    summary, st_seconds, st_rss = run_isolated(streaming_describe, store_path, args.workers)
+
+    print(f"Rows: {args.rows:,}")
+    print(f"{'method':<22}{'seconds':>10}{'peak RSS MB':>14}")
+    print(f"{'pandas describe()':<22}{pd_seconds:>10.2f}{pd_rss:>14.0f}")
+    print(f"{'streaming summary':<22}{st_seconds:>10.2f}{st_rss:>14.0f}")
+
+    # pandas accumulates float32 columns in float32; the summary uses float64
+    moments_match = np.allclose(
+        summary.loc[MOMENT_ROWS].to_numpy(), reference.loc[MOMENT_ROWS].to_numpy(), rtol=1e-6
+    )
+    store = PovertyStore(store_path)
+    worst = 0.0
+    for name in summary.columns:
+        values = np.sort(np.asarray(store.column(name), dtype=np.float64))
+        for label, q in QUANTILE_ROWS:
+            rank = np.searchsorted(values, summary.loc[label, name]) / len(values)
+            worst = max(worst, abs(rank - q))
+    print(f"Same shape as describe(): {summary.shape == reference.shape}")
+    print(f"count/mean/std/min/max match pandas: {moments_match}")
+    print(f"Worst quantile rank error: {worst:.5f}")
+    return 0 if moments_match and worst < 0.001 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+ORAIL CITIZEN AI - Tile Pyramid Benchmark
+Geospatial Poverty Mapping Framework
+
+Builds a tile pyramid from synthetic points, rebuilds it unchanged (nothing
+should render), then edits the poverty rates inside a small box and
+rebuilds (only the tiles over that box should render). Also checks that a
+zoom level derived from the finer levels equals binning the points directly
+at that zoom.
+
+Usage:
+    python -m scripts.python.benchmarks.bench_tile_pyramid --rows 2000000 --max-zoom 12
+"""
+
+import argparse
+import sys
+import tempfile
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import synthetic_points
+from scripts.python.visualization.tile_pyramid import TilePyramid, bin_points
+
+
+def _report(label, report):
+    timings = "  ".join(f"{k} {v:.2f}s" for k, v in report["timings"].items())
+    print(
+        f"{label:<16} tiles {report['tiles']:>6,}  rendered {report['rendered']:>6,}"
+        f"  reused {report['reused']:>6,}  removed {report['removed']:>5,}  {timings}"
+    )
+
+
+def main(argv=None):
+    """Run the tile pyramid benchmark"""
+    parser = argparse.ArgumentParser(description="Tile pyramid benchmark")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--max-zoom", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    points = synthetic_points(args.rows)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        pyramid = TilePyramid(tmp)
+        first = pyramid.build([points], max_zoom=args.max_zoom, workers=args.workers)
+        _report("initial build", first)
+
+        again = TilePyramid(tmp).build([points], max_zoom=args.max_zoom, workers=args.workers)
+        _report("unchanged", again)
+        ok &= again["rendered"] == 0
+
+        edited = dict(points)
+        box = (
+            (points["latitude"] > 14.50) & (points["latitude"] < 14.52)
+            & (points["longitude"] > 120.50) & (points["longitude"] < 120.52)
+        )
+        edited["poverty_rate"] = np.where(box, 0.99, points["poverty_rate"])
+        update = TilePyramid(tmp).build([edited], max_zoom=args.max_zoom, workers=args.workers)
+        _report("small edit", update)
+        ok &= 0 < update["rendered"] <= 4 * (args.max_zoom + 1)
+        print(f"Edited {int(box.sum()):,} points; only tiles over the box re-rendered: {ok}")
+
+    derived, _ = bin_points([points], args.max_zoom)
+    for _ in range(4):
+        derived = derived.coarser()
+    direct, _ = bin_points([points], args.max_zoom - 4)
+    match = np.array_equal(derived.ids, direct.ids) and np.allclose(derived.sums, direct.sums)
+    print(f"Zoom {args.max_zoom - 4} derived from zoom {args.max_zoom} matches direct binning: {match}")
+    return 0 if ok and match else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+ORAIL CITIZEN AI - Benchmark Utilities
+Geospatial Poverty Mapping Framework
+
+Shared helpers for the benchmark scripts: peak RSS, isolated runs in a fresh
+interpreter (so one measurement's memory does not leak into the next),
+repeated timing, and synthetic points and state polygons.
+"""
+
+import importlib
+import multiprocessing
+import os
+import queue as queue_module
+import sys
+import time
+
+import numpy as np
+
+from scripts.python.data_processing.synthetic_data import DEFAULT_BBOX, generate_chunk
+
+BENCH_DIR = os.path.join("data", "cache", "bench")
+POLL_SECONDS = 1.0
+# (lat_min, lat_max, lon_min, lon_max) around mainland India
+INDIA_BBOX = (6.0, 37.0, 68.0, 98.0)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown"""
+    # VmHWM is reset on exec; ru_maxrss is inherited from the parent on Linux
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def _isolated_target(queue, func, args, kwargs, preload, setup, teardown):
+    try:
+        for name in preload:
+            importlib.import_module(name)
+        if setup is not None:
+            setup(*args, **kwargs)
+        try:
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            seconds = time.perf_counter() - start
+        finally:
+            if teardown is not None:
+                teardown(*args, **kwargs)
+        queue.put((True, result, seconds, peak_rss_mb()))
+    except BaseException as e:
+        queue.put((False, f"{type(e).__name__}: {e}", None, None))
+
+
+def run_isolated(func, *args, preload=(), setup=None, teardown=None, **kwargs):
+    """Run func in a fresh interpreter; return (result, seconds, peak_rss_mb)
+
+    func must be importable by module path (a module-level function). The
+    ``preload`` modules are imported before the timer starts, so the time of
+    a lazy import inside func is not counted. ``setup`` and ``teardown``
+    (module-level functions too) are called in the child with func's
+    arguments just before and after the timed call. Raises
+    RuntimeError if the child dies without reporting (OOM kill, segfault,
+    import error).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_isolated_target, args=(queue, func, args, kwargs, tuple(preload), setup, teardown)
+    )
+    proc.start()
+    while True:
+        try:
+            ok, result, seconds, rss = queue.get(timeout=POLL_SECONDS)
+            break
+        except queue_module.Empty:
+            if not proc.is_alive():
+                # the child may have put its result just before exiting
+                try:
+                    ok, result, seconds, rss = queue.get(timeout=POLL_SECONDS)
+                    break
+                except queue_module.Empty:
+                    proc.join()
+                    raise RuntimeError(
+                        f"Isolated benchmark died without a result (exit code {proc.exitcode})"
+                    ) from None
+    proc.join()
+    if not ok:
+        raise RuntimeError(f"Isolated benchmark failed: {result}")
+    return result, seconds, rss
+
+
+def time_repeats(func, repeat=5, warmup=1):
+    """Call func repeatedly and return the wall-clock seconds of each call"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def percentiles(times, qs=(50, 95)):
+    """{'p50': ..., 'p95': ...} of a list of timings"""
+    values = np.asarray(times, dtype=np.float64)
+    return {f"p{q}": float(np.percentile(values, q)) for q in qs}
+
+
+def synthetic_points(n_rows, seed=42, bbox=DEFAULT_BBOX):
+    """Synthetic poverty points (dict of arrays) from the seeded generator"""
+    return generate_chunk(np.random.SeedSequence(seed), n_rows, bbox)
+
+
+def synthetic_states(grid=6, vertices=4000, bbox=INDIA_BBOX, seed=3):
+    """grid x grid star-shaped polygons (every third one with a hole)"""
+    rng = np.random.default_rng(seed)
+    lat_min, lat_max, lon_min, lon_max = bbox
+    cell_lat = (lat_max - lat_min) / grid
+    cell_lon = (lon_max - lon_min) / grid
+    polygons, names = [], []
+    theta = np.linspace(0.0, 2.0 * np.pi, vertices, endpoint=False)
+    for row in range(grid):
+        for col in range(grid):
+            c_lat = lat_min + (row + 0.5) * cell_lat
+            c_lon = lon_min + (col + 0.5) * cell_lon
+            k = rng.integers(3, 9)
+            radius = 0.45 * (0.7 + 0.25 * np.sin(k * theta + rng.uniform(0, 6.3)))
+            radius = radius * (1.0 + 0.05 * rng.standard_normal(vertices))
+            outer = np.column_stack(
+                [c_lon + radius * cell_lon * np.cos(theta), c_lat + radius * cell_lat * np.sin(theta)]
+            )
+            rings = [np.vstack([outer, outer[:1]])]
+            if len(polygons) % 3 == 0:
+                hole = np.column_stack(
+                    [c_lon + 0.12 * cell_lon * np.cos(-theta), c_lat + 0.12 * cell_lat * np.sin(-theta)]
+                )
+                rings.append(np.vstack([hole, hole[:1]]))
+            polygons.append(rings)
+            names.append(f"state_{row}_{col}")
+    return polygons, names
@@ -0,0 +1,435 @@
+"""
+ORAIL CITIZEN AI - Benchmark Suite
+Geospatial Poverty Mapping Framework
+
+Performance baseline for the mapping pipeline. Times each stage on
+synthetic points with the orail_demo_data.csv schema and distributions
+(synthetic_data.py) at several sizes:
+
+    bootstrap        python -m config.bootstrap in a new process (wall time)
+    csv_load         pandas.read_csv of the CSV (sizes up to --csv-max-rows)
+    dataset_load     columnar store to a DataFrame
+    spatial_join     point-in-polygon against synthetic state polygons
+    aggregation      grid cells at the default resolutions
+    map_render       1920x1280 weighted-mean PNG
+    tile_generation  cold tile pyramid up to --max-zoom
+
+Every repeat runs in a fresh interpreter, so peak RSS belongs to that one
+case; the modules a case imports (pandas, the stage module) are loaded
+before its timer starts, so small sizes do not just measure import time.
+p50/p95 are over the repeats and peak RSS is their maximum. Each run
+is saved as one JSON file in logs/benchmarks/. ``compare`` diffs two runs
+(by default the latest against the one before it) and exits with status 1
+when a case got slower or bigger by more than the threshold, so it can gate
+a merge. ``run --check`` without an earlier run passes: that run becomes
+the baseline. Work directories and the synthetic state polygons are set up
+before the timer starts and removed after it stops.
+
+Usage:
+    python -m scripts.python.benchmarks.suite run --sizes 1k 1m 10m --repeat 5
+    python -m scripts.python.benchmarks.suite run --sizes 1k 1m --check
+    python -m scripts.python.benchmarks.suite compare --threshold 0.10
+    python -m scripts.python.benchmarks.suite compare logs/benchmarks/<old>.json logs/benchmarks/<new>.json
+"""
+
+import argparse
+import functools
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.benchmarks.bench_utils import BENCH_DIR, percentiles, run_isolated
+from scripts.python.data_processing.poverty_store import PovertyStore
+from scripts.python.data_processing.synthetic_data import DEFAULT_BBOX, write_synthetic_store
+
+HISTORY_DIR = os.path.join("logs", "benchmarks")
+DATA_DIR = os.path.join(BENCH_DIR, "suite")
+SIZES = {"1k": 1_000, "1m": 1_000_000, "10m": 10_000_000}
+CASES = ("bootstrap", "csv_load", "dataset_load", "spatial_join", "aggregation", "map_render", "tile_generation")
+DEFAULT_THRESHOLD = 0.10
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.02
+MIN_RSS_MB = 8.0
+RESULT_VERSION = 1
+# Imported in the child before timing (optional ones only if installed)
+CASE_PRELOAD = {
+    "csv_load": ("pandas",),
+    "dataset_load": ("pandas",),
+    "spatial_join": ("scripts.python.geospatial.state_join",),
+    "aggregation": ("scripts.python.geospatial.aggregation",),
+    "map_render": ("scripts.python.visualization.raster_render", "matplotlib"),
+    "tile_generation": ("scripts.python.visualization.tile_pyramid", "matplotlib"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _state_layer():
+    """Fixed 4x4 grid of synthetic states over the points' bounding box
+
+    Cached, so the setup hook builds it once before the timer starts.
+    """
+    from scripts.python.benchmarks.bench_utils import synthetic_states
+    from scripts.python.geospatial.state_join import PolygonLayer
+
+    polygons, names = synthetic_states(grid=4, vertices=2000, bbox=DEFAULT_BBOX)
+    return PolygonLayer(polygons, names)
+
+
+def case_csv_load(store_path, work_dir, settings):
+    import pandas as pd
+
+    return {"rows": len(pd.read_csv(Path(store_path).with_suffix(".csv")))}
+
+
+def case_dataset_load(store_path, work_dir, settings):
+    return {"rows": len(PovertyStore(store_path).to_pandas())}
+
+
+def case_spatial_join(store_path, work_dir, settings):
+    from scripts.python.geospatial.state_join import NO_STATE, assign_states
+
+    layer = _state_layer()
+    store = PovertyStore(store_path)
+    ids = assign_states(store.column("latitude"), store.column("longitude"), layer, workers=settings["workers"])
+    return {"assigned": round(float(np.mean(ids != NO_STATE)), 4)}
+
+
+def case_aggregation(store_path, work_dir, settings):
+    from scripts.python.geospatial.aggregation import aggregate_store
+
+    aggregator = aggregate_store(store_path, os.path.join(work_dir, "cells"))
+    return {"cells": {str(res): len(aggregator.table(res)["cell_id"]) for res in aggregator.resolutions}}
+
+
+def case_map_render(store_path, work_dir, settings):
+    from scripts.python.visualization.raster_render import render_points
+
+    render_points(store_path, os.path.join(work_dir, "map.png"), 1920, 1280)
+    return {}
+
+
+def case_tile_generation(store_path, work_dir, settings):
+    from scripts.python.visualization.tile_pyramid import TilePyramid
+
+    report = TilePyramid(os.path.join(work_dir, "tiles")).build(
+        store_path, max_zoom=settings["max_zoom"], workers=settings["workers"]
+    )
+    return {"tiles": report.get("tiles")}
+
+
+def run_bootstrap():
+    """Wall time and peak RSS of a fresh interpreter running config.bootstrap"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "config.bootstrap", "--json"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if not hasattr(os, "wait4"):
+        out, err = proc.communicate()
+        rss = None
+    else:
+        # wait4 returns the rusage of this child alone; the report is small enough not to block the pipes
+        out, err = proc.stdout.read(), proc.stderr.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is in KB on Linux and bytes on macOS
+        rss = usage.ru_maxrss / (1024 * 1024) if sys.platform == "darwin" else usage.ru_maxrss / 1024
+    seconds = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"config.bootstrap failed: {err.decode(errors='replace').strip()}")
+    report = json.loads(out)
+    return {"bootstrap_seconds": report["bootstrap_seconds"]}, seconds, rss
+
+
+def _preload(case):
+    return [name for name in CASE_PRELOAD.get(case, ()) if importlib.util.find_spec(name) is not None]
+
+
+def _setup_case(store_path, work_dir, settings):
+    """Fresh work directory, made before the timer starts"""
+    shutil.rmtree(work_dir, ignore_errors=True)
+    os.makedirs(work_dir)
+
+
+def _setup_spatial_join(store_path, work_dir, settings):
+    _setup_case(store_path, work_dir, settings)
+    _state_layer()
+
+
+def _teardown_case(store_path, work_dir, settings):
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# Untimed per-repeat setup, run in the child after the preload imports
+CASE_SETUP = {"spatial_join": _setup_spatial_join}
+
+
+def prepare_data(size, rows, csv_max_rows, seed=42):
+    """Synthetic store (and CSV for small sizes), reused across runs"""
+    store_path = os.path.join(DATA_DIR, f"points_{size}.store")
+    try:
+        reuse = len(PovertyStore(store_path)) == rows
+    except (FileNotFoundError, ValueError):
+        reuse = False
+    if not reuse:
+        write_synthetic_store(store_path, rows, seed=seed)
+    csv_path = Path(store_path).with_suffix(".csv")
+    if rows <= csv_max_rows and not csv_path.exists():
+        tmp = csv_path.with_name(f".{csv_path.name}.tmp")
+        PovertyStore(store_path).to_pandas().to_csv(tmp, index=False)
+        os.replace(tmp, csv_path)
+    return store_path
+
+
+def summarize(times, rss, extra):
+    """p50/p95/mean of the repeat timings and the highest peak RSS"""
+    rss = [r for r in rss if r is not None]
+    return {
+        "times": [round(t, 5) for t in times],
+        **{k: round(v, 5) for k, v in percentiles(times).items()},
+        "mean": round(float(np.mean(times)), 5),
+        "peak_rss_mb": round(max(rss), 1) if rss else None,
+        "extra": extra,
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment_info():
+    import pandas as pd
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(sizes=("1k", "1m"), cases=CASES, repeat=3, max_zoom=7, workers=None, csv_max_rows=1_000_000,
+              label=None, history_dir=HISTORY_DIR, progress=print):
+    """Run the selected cases at each size; returns the saved result and its path"""
+    settings = {"repeat": repeat, "max_zoom": max_zoom, "workers": workers, "csv_max_rows": csv_max_rows}
+    results = {}
+    if "bootstrap" in cases:
+        times, rss, extra = [], [], {}
+        for _ in range(repeat):
+            extra, seconds, peak = run_bootstrap()
+            times.append(seconds)
+            rss.append(peak)
+        results["bootstrap"] = {"case": "bootstrap", "size": None, "rows": 0, **summarize(times, rss, extra)}
+        progress(_format_result("bootstrap", results["bootstrap"]))
+
+    for size in sizes:
+        rows = SIZES[size]
+        store_path = prepare_data(size, rows, csv_max_rows)
+        for case in cases:
+            if case == "bootstrap" or (case == "csv_load" and rows > csv_max_rows):
+                continue
+            func = globals()[f"case_{case}"]
+            work_dir = os.path.join(DATA_DIR, f"work_{case}_{size}")
+            preload = _preload(case)
+            times, rss, extra = [], [], {}
+            for _ in range(repeat):
+                extra, seconds, peak = run_isolated(
+                    func,
+                    store_path,
+                    work_dir,
+                    settings,
+                    preload=preload,
+                    setup=CASE_SETUP.get(case, _setup_case),
+                    teardown=_teardown_case,
+                )
+                times.append(seconds)
+                rss.append(peak)
+            key = f"{case}@{size}"
+            results[key] = {"case": case, "size": size, "rows": rows, **summarize(times, rss, extra)}
+            progress(_format_result(key, results[key]))
+
+    created = datetime.now(timezone.utc)
+    record = {
+        "version": RESULT_VERSION,
+        "created": created.isoformat(timespec="seconds"),
+        "label": label,
+        "commit": _git_commit(),
+        "environment": environment_info(),
+        "settings": {**settings, "sizes": list(sizes), "cases": list(cases)},
+        "results": results,
+    }
+    os.makedirs(history_dir, exist_ok=True)
+    name = created.strftime("%Y%m%dT%H%M%SZ") + (f"_{label}" if label else "") + ".json"
+    path = Path(history_dir) / name
+    tmp = path.with_name(f".{name}.tmp")
+    tmp.write_text(json.dumps(record, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+    return record, path
+
+
+def history(history_dir=HISTORY_DIR):
+    """Saved run files, oldest first"""
+    return sorted(p for p in Path(history_dir).glob("*.json") if not p.name.startswith("."))
+
+
+def load_run(path):
+    record = json.loads(Path(path).read_text(encoding="utf-8"))
+    if record.get("version") != RESULT_VERSION:
+        raise ValueError(f"Unsupported benchmark result version in {path}: {record.get('version')}")
+    return record
+
+
+def compare_runs(baseline, current, threshold=DEFAULT_THRESHOLD, rss_threshold=None):
+    """Per-case changes between two runs; regressions are flagged
+
+    A case regresses when its p50 or p95 grows by more than ``threshold``
+    (and by more than MIN_SECONDS) with every repeat slower than the old
+    median, or its peak RSS by more than ``rss_threshold`` (and MIN_RSS_MB).
+    """
+    rss_threshold = threshold if rss_threshold is None else rss_threshold
+    rows = []
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            rows.append({"case": key, "status": "new"})
+            continue
+        row = {"case": key, "status": "ok", "flags": []}
+        # A single slow repeat is noise: every new repeat must be slower than the old median
+        consistent = min(new["times"]) > old["p50"]
+        for metric in ("p50", "p95"):
+            row[metric] = (old[metric], new[metric])
+            if (consistent and new[metric] > old[metric] * (1 + threshold)
+                    and new[metric] - old[metric] > MIN_SECONDS):
+                row["flags"].append(metric)
+        if old.get("peak_rss_mb") is not None and new.get("peak_rss_mb") is not None:
+            row["peak_rss_mb"] = (old["peak_rss_mb"], new["peak_rss_mb"])
+            grew = new["peak_rss_mb"] - old["peak_rss_mb"]
+            if new["peak_rss_mb"] > old["peak_rss_mb"] * (1 + rss_threshold) and grew > MIN_RSS_MB:
+                row["flags"].append("peak_rss_mb")
+        if row["flags"]:
+            row["status"] = "REGRESSION"
+        elif new["p50"] < old["p50"] * (1 - threshold) and old["p50"] - new["p50"] > MIN_SECONDS:
+            row["status"] = "faster"
+        rows.append(row)
+    for key in baseline["results"]:
+        if key not in current["results"]:
+            rows.append({"case": key, "status": "missing"})
+    return rows
+
+
+def _format_result(key, result):
+    rss = f"{result['peak_rss_mb']:8.1f} MB" if result["peak_rss_mb"] is not None else "       n/a"
+    return f"  {key:<24} p50 {result['p50']:9.4f}s  p95 {result['p95']:9.4f}s  peak RSS {rss}"
+
+
+def _change(pair, unit, digits):
+    old, new = pair
+    ratio = f"{(new / old - 1):+7.1%}" if old else "    n/a"
+    return f"{old:9.{digits}f}{unit} -> {new:9.{digits}f}{unit} {ratio}"
+
+
+def print_comparison(rows, baseline, current):
+    print(f"Baseline: {baseline['created']} ({baseline.get('commit') or 'unknown commit'})")
+    print(f"Current:  {current['created']} ({current.get('commit') or 'unknown commit'})")
+    differs = [k for k in ("python", "numpy", "pandas", "machine", "cpu_count")
+               if baseline["environment"].get(k) != current["environment"].get(k)]
+    if differs:
+        print(f"Warning: environments differ in {', '.join(differs)}; timings may not be comparable")
+    for row in rows:
+        if "p50" not in row:
+            print(f"  {row['case']:<24} {row['status']}")
+            continue
+        line = f"  {row['case']:<24} p50 {_change(row['p50'], 's', 4)}"
+        if "peak_rss_mb" in row:
+            line += f"  RSS {_change(row['peak_rss_mb'], 'MB', 1)}"
+        flags = f" ({', '.join(row['flags'])})" if row["flags"] else ""
+        print(f"{line}  {row['status']}{flags}")
+
+
+def _compare_command(baseline_path, current_path, threshold, rss_threshold, history_dir, missing_ok=False):
+    if current_path is None or baseline_path is None:
+        runs = history(history_dir)
+        if current_path is None:
+            if not runs:
+                raise FileNotFoundError(f"No benchmark runs in {history_dir}")
+            current_path = runs[-1]
+        if baseline_path is None:
+            keys = set(load_run(current_path)["results"])
+            # Latest earlier run that measured at least one of the same cases
+            earlier = [p for p in runs if p.name < Path(current_path).name and Path(p).resolve() !=
+                       Path(current_path).resolve() and keys & set(load_run(p)["results"])]
+            if not earlier and missing_ok:
+                print(f"No earlier run with the same cases in {history_dir}: "
+                      f"{Path(current_path).name} is the baseline, nothing to compare")
+                return 0
+            if not earlier:
+                raise FileNotFoundError(f"No earlier benchmark run in {history_dir} with the same cases")
+            baseline_path = earlier[-1]
+    baseline, current = load_run(baseline_path), load_run(current_path)
+    rows = compare_runs(baseline, current, threshold, rss_threshold)
+    print_comparison(rows, baseline, current)
+    regressions = [row for row in rows if row["status"] == "REGRESSION"]
+    print(f"{len(regressions)} regression(s) over {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    """Run the benchmark suite or compare stored runs"""
+    parser = argparse.ArgumentParser(description="Mapping pipeline benchmark suite")
+    parser.add_argument("--history-dir", default=HISTORY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the suite and save the results")
+    run.add_argument("--sizes", nargs="+", default=["1k", "1m"], choices=list(SIZES))
+    run.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--max-zoom", type=int, default=7)
+    run.add_argument("--workers", type=int, default=None)
+    run.add_argument("--csv-max-rows", type=int, default=1_000_000)
+    run.add_argument("--label", default=None, help="suffix for the result file name")
+    run.add_argument("--check", action="store_true", help="compare with the previous run afterwards")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare = commands.add_parser("compare", help="compare two runs (default: latest vs previous)")
+    compare.add_argument("baseline", nargs="?", default=None)
+    compare.add_argument("current", nargs="?", default=None)
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="allowed fractional slowdown of p50/p95 (default 0.10)")
+    compare.add_argument("--rss-threshold", type=float, default=None,
+                         help="allowed fractional peak RSS growth (default: --threshold)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "run":
+            if args.repeat < 1:
+                raise ValueError("--repeat must be at least 1")
+            print(f"Benchmark suite: sizes {', '.join(args.sizes)}, {args.repeat} repeat(s)")
+            record, path = run_suite(args.sizes, args.cases, args.repeat, args.max_zoom, args.workers,
+                                     args.csv_max_rows, args.label, args.history_dir)
+            print(f"Saved {path}")
+            if args.check:
+                return _compare_command(None, path, args.threshold, None, args.history_dir, missing_ok=True)
+            return 0
+        return _compare_command(args.baseline, args.current, args.threshold, args.rss_threshold,
+                                args.history_dir)
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""
+ORAIL CITIZEN AI - Columnar Poverty Store
+Geospatial Poverty Mapping Framework
+
+Typed, columnar on-disk storage for the poverty point dataset
+(data/processed/orail_demo_data.csv schema). Each column is one raw
+little-endian binary file, so columns open as memory-mapped, zero-copy NumPy
+views and a reader only touches the columns it asks for. Rows are split into
+row groups with per-group min/max statistics, which lets readers skip whole
+groups (for example by bounding box) and lets writers stream chunk by chunk.
+
+Layout:
+    <store>/_meta.json          schema, row count, row groups + statistics
+    <store>/<column>.bin        one contiguous array per column
+
+Usage:
+    python -m scripts.python.data_processing.poverty_store convert \\
+        data/processed/orail_demo_data.csv data/processed/orail_demo_data.store
+
+    store = PovertyStore("data/processed/orail_demo_data.store")
+    lat, lon = store.column("latitude"), store.column("longitude")
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+STORE_VERSION = 1
+META_FILE = "_meta.json"
+DEFAULT_ROW_GROUP_SIZE = 1 << 20
+
+# Column order and dtypes of the poverty point dataset. Coordinates stay
+# float64 so conversion from CSV is lossless; the indices and rates are
+# bounded in [0, 1] and fit comfortably in float32.
+POVERTY_SCHEMA = {
+    "latitude": "<f8",
+    "longitude": "<f8",
+    "poverty_rate": "<f4",
+    "population": "<i4",
+    "education_index": "<f4",
+    "health_index": "<f4",
+    "infrastructure_index": "<f4",
+}
+
+
+def _column_path(path, name):
+    return Path(path) / f"{name}.bin"
+
+
+def _chunk_columns(chunk, schema):
+    """Return {column: array} cast to the schema dtypes"""
+    columns = {}
+    for name, dtype in schema.items():
+        if name not in chunk:
+            raise KeyError(f"Chunk is missing column '{name}'")
+        values = chunk[name]
+        values = values.to_numpy() if hasattr(values, "to_numpy") else values
+        columns[name] = np.ascontiguousarray(values, dtype=np.dtype(dtype))
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return columns
+
+
+def group_stats(columns, start, stop):
+    """Min/max per column for rows [start, stop)"""
+    stats = {}
+    for name, values in columns.items():
+        part = values[start:stop]
+        if len(part):
+            stats[name] = [part.min().item(), part.max().item()]
+    return stats
+
+
+class StoreWriter:
+    """Streams chunks into a new columnar store
+
+    Each appended chunk (a DataFrame or dict of arrays) is split into row
+    groups of at most ``row_group_size`` rows. Nothing beyond the current
+    chunk is held in memory.
+    """
+
+    def __init__(self, path, schema=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        self.path = Path(path)
+        self.schema = dict(schema or POVERTY_SCHEMA)
+        self.row_group_size = int(row_group_size)
+        self.row_groups = []
+        self.n_rows = 0
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta = self.path / META_FILE
+        if meta.exists():
+            meta.unlink()
+        self._files = {
+            name: open(_column_path(self.path, name), "wb") for name in self.schema
+        }
+
+    def append(self, chunk):
+        """Append a chunk of rows"""
+        columns = _chunk_columns(chunk, self.schema)
+        n = len(next(iter(columns.values()))) if columns else 0
+        for start in range(0, n, self.row_group_size):
+            stop = min(start + self.row_group_size, n)
+            self.row_groups.append(
+                {
+                    "offset": self.n_rows + start,
+                    "n_rows": stop - start,
+                    "stats": group_stats(columns, start, stop),
+                }
+            )
+        for name, values in columns.items():
+            values.tofile(self._files[name])
+        self.n_rows += n
+
+    def close(self):
+        """Flush column files and write the metadata"""
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        write_meta(self.path, self.schema, self.n_rows, self.row_groups, self.row_group_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            for f in self._files.values():
+                f.close()
+
+
+def allocate_store(path, n_rows, schema=None):
+    """Create zero-filled column files for ``n_rows`` rows
+
+    Used by parallel writers that fill disjoint row ranges through
+    open_column_writer() and then call write_meta() once all are done.
+    """
+    path = Path(path)
+    schema = dict(schema or POVERTY_SCHEMA)
+    path.mkdir(parents=True, exist_ok=True)
+    meta = path / META_FILE
+    if meta.exists():
+        meta.unlink()
+    for name, dtype in schema.items():
+        with open(_column_path(path, name), "wb") as f:
+            f.truncate(int(n_rows) * np.dtype(dtype).itemsize)
+    return schema
+
+
+def open_column_writer(path, name, dtype, n_rows):
+    """Writable memory map over a column file created by allocate_store()"""
+    return np.memmap(
+        _column_path(path, name), dtype=np.dtype(dtype), mode="r+", shape=(int(n_rows),)
+    )
+
+
+def add_column(path, name, dtype):
+    """Add a zero-filled column to an existing store and register it in _meta.json
+
+    Derived columns (for example a state id from a spatial join) are then
+    filled in place through open_column_writer(). Returns the row count.
+    """
+    path = Path(path)
+    meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+    n_rows = meta["n_rows"]
+    with open(_column_path(path, name), "wb") as f:
+        f.truncate(int(n_rows) * np.dtype(dtype).itemsize)
+    schema = dict(meta["schema"])
+    schema[name] = np.dtype(dtype).str
+    write_meta(path, schema, n_rows, meta["row_groups"], meta["row_group_size"])
+    return n_rows
+
+
+def write_meta(path, schema, n_rows, row_groups, row_group_size):
+    """Write _meta.json last, so a store without it is known to be incomplete"""
+    meta = {
+        "version": STORE_VERSION,
+        "schema": schema,
+        "n_rows": int(n_rows),
+        "row_group_size": int(row_group_size),
+        "row_groups": row_groups,
+    }
+    tmp = Path(path) / (META_FILE + ".tmp")
+    tmp.write_text(json.dumps(meta, indent=1), encoding="utf-8")
+    os.replace(tmp, Path(path) / META_FILE)
+
+
+def write_store(path, data, schema=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Write a DataFrame or dict of arrays as a columnar store"""
+    with StoreWriter(path, schema=schema, row_group_size=row_group_size) as writer:
+        writer.append(data)
+    return PovertyStore(path)
+
+
+class PovertyStore:
+    """Read-only view of a columnar store
+
+    Columns are np.memmap views over the column files: opening a store reads
+    only _meta.json, and pages are loaded on first touch.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        meta_path = self.path / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Not a poverty store (no {META_FILE}): {path}")
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported store version: {meta.get('version')}")
+        self.schema = meta["schema"]
+        self.n_rows = meta["n_rows"]
+        self.row_group_size = meta["row_group_size"]
+        self.row_groups = meta["row_groups"]
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name):
+        """Memory-mapped, read-only view of one column"""
+        if name not in self.schema:
+            raise KeyError(f"Unknown column '{name}'")
+        if name not in self._columns:
+            dtype = np.dtype(self.schema[name])
+            if self.n_rows == 0:
+                self._columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(
+                    _column_path(self.path, name),
+                    dtype=dtype,
+                    mode="r",
+                    shape=(self.n_rows,),
+                )
+        return self._columns[name]
+
+    def read(self, columns=None, start=0, stop=None):
+        """Zero-copy views of the projected columns for rows [start, stop)"""
+        columns = self.columns if columns is None else list(columns)
+        return {name: self.column(name)[start:stop] for name in columns}
+
+    def iter_row_groups(self, columns=None, groups=None):
+        """Yield {column: view} for each row group (or the selected ones)"""
+        for group in self.row_groups if groups is None else groups:
+            start = group["offset"]
+            yield self.read(columns, start, start + group["n_rows"])
+
+    def iter_chunks(self, columns=None, chunk_rows=DEFAULT_ROW_GROUP_SIZE):
+        """Yield {column: view} in fixed-size chunks regardless of row groups"""
+        for start in range(0, self.n_rows, chunk_rows):
+            yield self.read(columns, start, min(start + chunk_rows, self.n_rows))
+
+    def groups_in_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Row groups whose coordinate range overlaps a bounding box"""
+        selected = []
+        for group in self.row_groups:
+            stats = group["stats"]
+            lat_lo, lat_hi = stats.get("latitude", (-90.0, 90.0))
+            lon_lo, lon_hi = stats.get("longitude", (-180.0, 180.0))
+            if (
+                lat_hi >= min_lat
+                and lat_lo <= max_lat
+                and lon_hi >= min_lon
+                and lon_lo <= max_lon
+            ):
+                selected.append(group)
+        return selected
+
+    def to_pandas(self, columns=None):
+        """Materialise the projected columns as a pandas DataFrame"""
+        import pandas as pd
+
+        return pd.DataFrame({name: np.asarray(v) for name, v in self.read(columns).items()})
+
+
+def convert_csv(
+    csv_path,
+    store_path,
+    schema=None,
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    chunksize=1_000_000,
+):
+    """Convert a poverty CSV into a columnar store, chunk by chunk"""
+    import pandas as pd
+
+    schema = dict(schema or POVERTY_SCHEMA)
+    reader = pd.read_csv(
+        csv_path,
+        usecols=list(schema),
+        dtype={name: np.dtype(dtype) for name, dtype in schema.items()},
+        chunksize=chunksize,
+    )
+    with StoreWriter(store_path, schema=schema, row_group_size=row_group_size) as writer:
+        for chunk in reader:
+            writer.append(chunk)
+    return PovertyStore(store_path)
+
+
+def write_frame(path, frame, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """Write an arbitrary DataFrame (or dict of arrays) as a store
+
+    Text and categorical columns are dictionary-encoded as int32 codes with
+    <column>.labels.json ({"no_value": -1, "names": [...]}) beside them,
+    like joined state ids. Booleans become uint8 and 64-bit integers
+    float64, so every column is readable with R's readBin.
+    """
+    data, schema, labels = {}, {}, {}
+    for name in frame.keys():
+        values = frame[name]
+        values = values.to_numpy() if hasattr(values, "to_numpy") else np.asarray(values)
+        kind, size = values.dtype.kind, values.dtype.itemsize
+        if kind in "OUS":
+            import pandas as pd
+
+            codes, names = pd.factorize(values, sort=True)
+            values, labels[name] = codes.astype("<i4"), [str(v) for v in names]
+            schema[name] = "<i4"
+        elif kind == "b":
+            schema[name] = "|u1"
+        elif kind in "iu" and (size > 4 or (kind == "u" and size == 4)):
+            schema[name] = "<f8"
+        elif kind == "f" and size < 4:
+            schema[name] = "<f4"
+        elif kind in "iuf":
+            schema[name] = values.dtype.newbyteorder("<").str
+        else:
+            raise TypeError(f"Column '{name}' has unsupported dtype {values.dtype}")
+        data[name] = values
+    write_store(path, data, schema=schema, row_group_size=row_group_size)
+    for name, names in labels.items():
+        labels_path = Path(path) / f"{name}.labels.json"
+        labels_path.write_text(json.dumps({"no_value": -1, "names": names}, indent=1), encoding="utf-8")
+    return PovertyStore(path)
+
+
+def read_frame(path, columns=None):
+    """DataFrame of a store, with dictionary-encoded columns as categoricals"""
+    import pandas as pd
+
+    store = PovertyStore(path)
+    frame = store.to_pandas(columns)
+    for name in frame.columns:
+        labels_path = store.path / f"{name}.labels.json"
+        if labels_path.exists():
+            labels = json.loads(labels_path.read_text(encoding="utf-8"))
+            codes = frame[name].to_numpy()
+            codes = np.where(codes == labels["no_value"], -1, codes)
+            frame[name] = pd.Categorical.from_codes(codes, labels["names"])
+    return frame
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="ORAIL columnar poverty store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="convert a CSV into a store")
+    convert.add_argument("csv_path")
+    convert.add_argument("store_path")
+    convert.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+
+    info = sub.add_parser("info", help="describe a store")
+    info.add_argument("store_path")
+
+    args = parser.parse_args(argv)
+    if args.command == "convert":
+        store = convert_csv(args.csv_path, args.store_path, row_group_size=args.row_group_size)
+        print(f"Converted {store.n_rows} rows into {len(store.row_groups)} row group(s)")
+        print(f"Store: {store.path}")
+    else:
+        store = PovertyStore(args.store_path)
+        print(f"Rows: {store.n_rows}")
+        print(f"Row groups: {len(store.row_groups)} (size {store.row_group_size})")
+        for name, dtype in store.schema.items():
+            print(f"  {name}: {np.dtype(dtype).name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
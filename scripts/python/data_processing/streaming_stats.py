@@ -0,0 +1,323 @@
+"""
+ORAIL CITIZEN AI - Streaming Summary Statistics
+Geospatial Poverty Mapping Framework
+
+One-pass, mergeable replacement for ``DataFrame.describe()`` on datasets
+that do not fit in memory. Per column it keeps:
+
+    count, mean, M2        exact and numerically stable: each chunk is
+                           summarised with a two-pass mean/M2, then merged
+                           with Chan's parallel update of Welford's method
+    min, max               exact
+    quantiles              a merging t-digest (centroid sketch); the
+                           25/50/75% estimates are typically within 0.1%
+                           in rank of the exact ones
+
+and the same again weighted by a column (population by default), so
+population-weighted means, deviations and quantiles come out of the same
+pass. Summaries built by different workers merge exactly for the moments
+and approximately (within the sketch bound) for the quantiles.
+
+``describe()`` returns a DataFrame with the same index and columns as
+``DataFrame.describe()``, so existing reporting code keeps working.
+
+Usage:
+    summary = describe_store("data/processed/orail_demo_data.store", workers=4)
+    print(summary)                                   # like poverty_data.describe()
+
+    stats = StreamingSummary(weight="population")
+    for chunk in pd.read_csv(path, chunksize=1_000_000):
+        stats.update(chunk)
+    weighted = stats.describe(weighted=True)
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import DEFAULT_ROW_GROUP_SIZE, PovertyStore
+
+DEFAULT_COMPRESSION = 400
+
+
+class TDigest:
+    """Merging t-digest: weighted centroids, compressed on the arcsine scale"""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def total_weight(self):
+        return float(self.weights.sum())
+
+    def _compress(self, means, weights, presorted=False):
+        if not presorted:
+            order = np.argsort(means, kind="stable")
+            means, weights = means[order], weights[order]
+        cum = np.cumsum(weights)
+        total = cum[-1] if len(cum) else 0.0
+        if total <= 0:
+            self.means, self.weights = np.empty(0), np.empty(0)
+            return
+        # Quantile at the left edge of each item, mapped to the k1 scale;
+        # consecutive items sharing an integer k bucket become one centroid
+        q_left = (cum - weights) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q_left - 1, -1.0, 1.0))
+        bucket = np.floor(k - k[0])
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+
+    def update(self, values, weights=None, presorted=False):
+        """Add values (sorted ascending if presorted) with optional weights"""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64)
+        chunk = TDigest(self.compression)
+        chunk._compress(values, weights, presorted)
+        self.merge(chunk)
+
+    def merge(self, other):
+        if len(other.means):
+            self._compress(
+                np.concatenate([self.means, other.means]),
+                np.concatenate([self.weights, other.weights]),
+            )
+
+    def quantile(self, qs, lo=None, hi=None):
+        """Interpolated quantiles; lo/hi pin the ends to the exact min/max"""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if len(self.means) == 0:
+            return np.full(len(qs), np.nan)
+        total = self.weights.sum()
+        centres = (np.cumsum(self.weights) - self.weights / 2) / total
+        xp, fp = centres, self.means
+        if lo is not None and hi is not None:
+            xp = np.concatenate([[0.0], centres, [1.0]])
+            fp = np.concatenate([[lo], self.means, [hi]])
+        return np.interp(qs, xp, fp)
+
+
+class ColumnStats:
+    """Mergeable one-pass statistics of one column (optionally weighted)"""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.w_sum = 0.0
+        self.w_mean = 0.0
+        self.w_m2 = 0.0
+        self.digest = TDigest(compression)
+        self.w_digest = TDigest(compression)
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        keep = np.isfinite(values)
+        values = values[keep]
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)[keep]
+        n = len(values)
+        if n == 0:
+            return
+        mean = float(values.mean())
+        self._merge_moments(n, mean, float(((values - mean) ** 2).sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        # One sort of the chunk serves both sketches
+        if weights is None:
+            values = np.sort(values)
+        else:
+            order = np.argsort(values)
+            values, weights = values[order], weights[order]
+        self.digest.update(values, presorted=True)
+        if weights is not None:
+            # A NaN or negative weight only drops the row from the weighted statistics
+            w_keep = np.isfinite(weights) & (weights >= 0)
+            if not w_keep.all():
+                values, weights = values[w_keep], weights[w_keep]
+            w_sum = float(weights.sum())
+            if w_sum > 0:
+                w_mean = float((weights * values).sum() / w_sum)
+                w_m2 = float((weights * (values - w_mean) ** 2).sum())
+                self._merge_weighted(w_sum, w_mean, w_m2)
+                self.w_digest.update(values, weights, presorted=True)
+
+    def _merge_moments(self, n_b, mean_b, m2_b):
+        # Chan et al. pairwise update
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+
+    def _merge_weighted(self, w_b, mean_b, m2_b):
+        w_a = self.w_sum
+        w = w_a + w_b
+        delta = mean_b - self.w_mean
+        self.w_mean += delta * w_b / w
+        self.w_m2 += m2_b + delta * delta * w_a * w_b / w
+        self.w_sum = w
+
+    def merge(self, other):
+        if other.count:
+            self._merge_moments(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.digest.merge(other.digest)
+        if other.w_sum > 0:
+            self._merge_weighted(other.w_sum, other.w_mean, other.w_m2)
+            self.w_digest.merge(other.w_digest)
+
+    def describe(self, weighted=False, percentiles=(0.25, 0.5, 0.75)):
+        """[count, mean, std, min, <percentiles>, max] like pandas"""
+        if self.count == 0:
+            return [0.0] + [np.nan] * (len(percentiles) + 4)
+        if weighted:
+            mean = self.w_mean
+            # Frequency weights: the weighted analogue of ddof=1
+            std = np.sqrt(self.w_m2 / (self.w_sum - 1)) if self.w_sum > 1 else np.nan
+            qs = self.w_digest.quantile(percentiles, self.min, self.max)
+        else:
+            mean = self.mean
+            std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+            qs = self.digest.quantile(percentiles, self.min, self.max)
+        return [float(self.count), mean, std, self.min, *qs.tolist(), self.max]
+
+
+class StreamingSummary:
+    """Chunk-by-chunk describe() over numeric columns, mergeable across workers"""
+
+    def __init__(self, columns=None, weight="population", compression=DEFAULT_COMPRESSION):
+        self.columns = list(columns) if columns is not None else None
+        self.weight = weight
+        self.compression = compression
+        self.stats = {}
+
+    def update(self, chunk):
+        """Add a chunk (DataFrame or dict of arrays)"""
+        names = self.columns if self.columns is not None else list(chunk.keys())
+        weights = None
+        if self.weight is not None and self.weight in chunk:
+            weights = np.asarray(chunk[self.weight], dtype=np.float64)
+        for name in names:
+            values = np.asarray(chunk[name])
+            if values.dtype.kind not in "biuf":
+                continue
+            if name not in self.stats:
+                self.stats[name] = ColumnStats(self.compression)
+            self.stats[name].update(values, weights)
+        return self
+
+    def merge(self, other):
+        """Fold another summary (for example from a worker) into this one"""
+        for name, stats in other.stats.items():
+            if name not in self.stats:
+                self.stats[name] = ColumnStats(self.compression)
+            self.stats[name].merge(stats)
+        return self
+
+    def describe(self, weighted=False, percentiles=(0.25, 0.5, 0.75)):
+        """Same layout as DataFrame.describe(); a dict of lists without pandas"""
+        index = ["count", "mean", "std", "min"] + [f"{q * 100:g}%" for q in percentiles] + ["max"]
+        data = {name: s.describe(weighted, percentiles) for name, s in self.stats.items()}
+        try:
+            import pandas as pd
+        except ImportError:
+            return {"index": index, **data}
+        return pd.DataFrame(data, index=index)
+
+
+def _describe_rows(path, start, stop, columns, weight, compression):
+    """Worker: summarise rows [start, stop) of a store"""
+    store = PovertyStore(path)
+    names = list(columns) + ([weight] if weight and weight not in columns else [])
+    return StreamingSummary(columns, weight, compression).update(store.read(names, start, stop))
+
+
+def summarize_store(
+    path,
+    columns=None,
+    weight="population",
+    workers=None,
+    chunk_rows=DEFAULT_ROW_GROUP_SIZE,
+    compression=DEFAULT_COMPRESSION,
+):
+    """StreamingSummary of a columnar store, chunks spread over processes"""
+    store = PovertyStore(path)
+    columns = list(columns) if columns is not None else store.columns
+    if weight is not None and weight not in store.schema:
+        weight = None
+    ranges = [(a, min(a + chunk_rows, store.n_rows)) for a in range(0, store.n_rows, chunk_rows)]
+    workers = workers or os.cpu_count() or 1
+    summary = StreamingSummary(columns, weight, compression)
+    if workers == 1 or len(ranges) <= 1:
+        parts = [_describe_rows(path, a, b, columns, weight, compression) for a, b in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [
+                pool.submit(_describe_rows, path, a, b, columns, weight, compression)
+                for a, b in ranges
+            ]
+            parts = [future.result() for future in futures]
+    for part in parts:
+        summary.merge(part)
+    return summary
+
+
+def describe_store(path, weighted=False, **kwargs):
+    """DataFrame.describe() equivalent for a columnar store"""
+    return summarize_store(path, **kwargs).describe(weighted=weighted)
+
+
+def describe_csv(csv_path, weighted=False, weight="population", chunksize=1_000_000):
+    """DataFrame.describe() equivalent for a CSV read in chunks"""
+    import pandas as pd
+
+    summary = StreamingSummary(weight=weight)
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        summary.update(chunk.select_dtypes("number"))
+    return summary.describe(weighted=weighted)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Streaming describe() for large datasets")
+    parser.add_argument("source", help="columnar store directory or CSV file")
+    parser.add_argument("--weighted", action="store_true", help="population-weighted statistics")
+    parser.add_argument("--weight", default="population")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if str(args.source).lower().endswith(".csv"):
+        summary = describe_csv(args.source, args.weighted, args.weight, args.chunk_rows)
+    else:
+        summary = describe_store(
+            args.source,
+            weighted=args.weighted,
+            weight=args.weight,
+            workers=args.workers,
+            chunk_rows=args.chunk_rows,
+        )
+    seconds = time.perf_counter() - start
+    print("Data Summary:" if not args.weighted else f"Data Summary (weighted by {args.weight}):")
+    print(summary)
+    print(f"\nComputed in {seconds:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+ORAIL CITIZEN AI - Synthetic Poverty Data Generator
+Geospatial Poverty Mapping Framework
+
+Reproducible generator for load-testing datasets with the same distributions
+as the starter notebook: uniform coordinates inside a bounding box,
+beta(2, 5) poverty rates, uniform population and development indices.
+
+Rows are produced in fixed-size chunks. Chunk i always draws from child i of
+np.random.SeedSequence(seed).spawn(n_chunks), so the output is bit-for-bit
+identical no matter how many worker processes fill it. Workers write their
+chunk straight into a preallocated columnar store (poverty_store.py), so the
+full frame is never held in memory.
+
+Usage:
+    python -m scripts.python.data_processing.synthetic_data \\
+        data/processed/synthetic_50m.store --rows 50000000 --workers 8
+
+    sample_data = generate_frame(1000, seed=42)
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import (
+    POVERTY_SCHEMA,
+    PovertyStore,
+    allocate_store,
+    group_stats,
+    open_column_writer,
+    write_meta,
+)
+
+DEFAULT_CHUNK_ROWS = 1 << 20
+
+# Bounding box of the starter notebook sample (lat_min, lat_max, lon_min, lon_max)
+DEFAULT_BBOX = (14.0, 15.0, 120.0, 121.0)
+
+
+def generate_chunk(seed_seq, n_rows, bbox=DEFAULT_BBOX):
+    """Generate one chunk of rows from its own SeedSequence"""
+    rng = np.random.default_rng(seed_seq)
+    lat_min, lat_max, lon_min, lon_max = bbox
+    return {
+        "latitude": rng.uniform(lat_min, lat_max, n_rows),
+        "longitude": rng.uniform(lon_min, lon_max, n_rows),
+        "poverty_rate": rng.beta(2, 5, n_rows),
+        "population": rng.integers(100, 10000, n_rows),
+        "education_index": rng.uniform(0.3, 0.9, n_rows),
+        "health_index": rng.uniform(0.4, 0.95, n_rows),
+        "infrastructure_index": rng.uniform(0.2, 0.8, n_rows),
+    }
+
+
+def chunk_plan(n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42):
+    """List of (chunk index, start row, rows, SeedSequence) covering n_rows"""
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    return [
+        (i, i * chunk_rows, min(chunk_rows, n_rows - i * chunk_rows), seeds[i])
+        for i in range(n_chunks)
+        if n_rows - i * chunk_rows > 0
+    ]
+
+
+def generate_frame(n_rows, seed=42, chunk_rows=DEFAULT_CHUNK_ROWS, bbox=DEFAULT_BBOX):
+    """Generate a small dataset in memory as a pandas DataFrame
+
+    Uses the same chunk plan as write_synthetic_store(), so the rows match
+    the first n_rows of a store generated with the same seed and chunk size.
+    """
+    import pandas as pd
+
+    chunks = [
+        generate_chunk(seed_seq, rows, bbox)
+        for _, _, rows, seed_seq in chunk_plan(n_rows, chunk_rows, seed)
+    ]
+    frame = pd.DataFrame(
+        {
+            name: np.concatenate([c[name] for c in chunks]) if chunks else np.empty(0, dtype)
+            for name, dtype in POVERTY_SCHEMA.items()
+        }
+    )
+    return frame.astype(POVERTY_SCHEMA)
+
+
+def _write_chunk(path, n_rows, schema, start, rows, seed_seq, bbox):
+    """Worker: generate one chunk and write it into its slice of the store"""
+    chunk = generate_chunk(seed_seq, rows, bbox)
+    columns = {}
+    for name, dtype in schema.items():
+        values = chunk[name].astype(np.dtype(dtype))
+        out = open_column_writer(path, name, dtype, n_rows)
+        out[start : start + rows] = values
+        out.flush()
+        del out
+        columns[name] = values
+    return {"offset": start, "n_rows": rows, "stats": group_stats(columns, 0, rows)}
+
+
+def write_synthetic_store(
+    path,
+    n_rows,
+    seed=42,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    workers=None,
+    bbox=DEFAULT_BBOX,
+    schema=None,
+):
+    """Generate n_rows into a columnar store using a pool of worker processes
+
+    Each chunk becomes one row group. Returns the opened PovertyStore.
+    """
+    schema = allocate_store(path, n_rows, schema)
+    plan = chunk_plan(n_rows, chunk_rows, seed)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(plan) <= 1:
+        groups = [
+            _write_chunk(path, n_rows, schema, start, rows, seed_seq, bbox)
+            for _, start, rows, seed_seq in plan
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(plan))) as pool:
+            futures = [
+                pool.submit(_write_chunk, path, n_rows, schema, start, rows, seed_seq, bbox)
+                for _, start, rows, seed_seq in plan
+            ]
+            groups = [future.result() for future in futures]
+
+    write_meta(path, schema, n_rows, groups, chunk_rows)
+    return PovertyStore(path)
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Generate synthetic poverty data")
+    parser.add_argument("store_path")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--bbox",
+        type=float,
+        nargs=4,
+        default=DEFAULT_BBOX,
+        metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"),
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    store = write_synthetic_store(
+        args.store_path,
+        args.rows,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        bbox=tuple(args.bbox),
+    )
+    seconds = time.perf_counter() - start
+    print(f"Generated {store.n_rows:,} rows in {len(store.row_groups)} chunk(s)")
+    print(f"Time: {seconds:.2f}s ({store.n_rows / max(seconds, 1e-9):,.0f} rows/s)")
+    print(f"Store: {store.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+ORAIL CITIZEN AI - Grid/Hex Aggregation
+Geospatial Poverty Mapping Framework
+
+Population-weighted aggregation of the poverty points to regular square
+cells or hexagons, at several resolutions in one pass. Coordinates are
+mapped to integer cell ids with vectorised arithmetic (cells are anchored
+at lon -180 / lat -90, so ids are stable across datasets), and each chunk
+is reduced with np.unique + np.bincount instead of a pandas groupby on
+float keys.
+
+Input is consumed chunk by chunk (a columnar store, CSV chunks or any
+iterable of frames); only the per-cell partial sums are kept, so memory is
+bounded by the number of occupied cells, not by the number of rows.
+
+Each resolution is written as a small columnar store (poverty_store.py)
+with one row per cell, plus cells.json describing the set:
+
+    <out>/cells.json
+    <out>/grid_0.25.store/...          cell_id, latitude, longitude (centre),
+                                       count, population, poverty_rate, ...
+
+Usage:
+    python -m scripts.python.geospatial.aggregation \\
+        data/processed/orail_demo_data.store data/processed/cells \\
+        --kind hex --resolutions 0.5 0.1 0.02
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import (
+    DEFAULT_ROW_GROUP_SIZE,
+    PovertyStore,
+    write_store,
+)
+
+DEFAULT_RESOLUTIONS = (1.0, 0.25, 0.05)
+WEIGHTED_COLUMNS = ("poverty_rate", "education_index", "health_index", "infrastructure_index")
+COMPACT_ROWS = 1 << 21
+HEX_OFFSET = 1 << 30
+DENSE_MIN_CELLS = 1 << 16
+SQRT3 = np.sqrt(3.0)
+
+CELL_SCHEMA = {
+    "cell_id": "<i8",
+    "latitude": "<f8",
+    "longitude": "<f8",
+    "count": "<i8",
+    "population": "<i8",
+    "poverty_rate": "<f4",
+    "poverty_rate_unweighted": "<f4",
+    "education_index": "<f4",
+    "health_index": "<f4",
+    "infrastructure_index": "<f4",
+}
+
+
+def _grid_cols(cell_deg):
+    return int(np.ceil(360.0 / cell_deg))
+
+
+def grid_cell_coords(lat, lon, cell_deg):
+    """Integer (row, col) of square cells anchored at (-90, -180)"""
+    rows = np.floor((np.asarray(lat) + 90.0) / cell_deg).astype(np.int64)
+    cols = np.floor((np.asarray(lon) + 180.0) / cell_deg).astype(np.int64)
+    return rows, np.clip(cols, 0, _grid_cols(cell_deg) - 1)
+
+
+def grid_pack(rows, cols, cell_deg):
+    """Row-major cell id from (row, col)"""
+    return rows * _grid_cols(cell_deg) + cols
+
+
+def grid_cell_ids(lat, lon, cell_deg):
+    """Row-major square-cell ids"""
+    return grid_pack(*grid_cell_coords(lat, lon, cell_deg), cell_deg)
+
+
+def grid_cell_centres(cell_ids, cell_deg):
+    """(lat, lon) centres of square cells"""
+    rows, cols = np.divmod(np.asarray(cell_ids, dtype=np.int64), _grid_cols(cell_deg))
+    return (rows + 0.5) * cell_deg - 90.0, (cols + 0.5) * cell_deg - 180.0
+
+
+def hex_cell_coords(lat, lon, size_deg):
+    """Axial (q, r) of pointy-top hexagons, size = centre-to-vertex in degrees"""
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / size_deg
+    y = (np.asarray(lat, dtype=np.float64) + 90.0) / size_deg
+    q = (SQRT3 / 3.0) * x - y / 3.0
+    r = (2.0 / 3.0) * y
+
+    # Cube rounding: round all three axes, then fix the one that moved most
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+def hex_pack(q, r):
+    """Hexagon id from axial (q, r)"""
+    return (q + HEX_OFFSET) * (1 << 32) + (r + HEX_OFFSET)
+
+
+def hex_cell_ids(lat, lon, size_deg):
+    """Hexagon ids (axial q/r packed into int64)"""
+    return hex_pack(*hex_cell_coords(lat, lon, size_deg))
+
+
+def hex_cell_centres(cell_ids, size_deg):
+    """(lat, lon) centres of hexagon cells"""
+    q, r = np.divmod(np.asarray(cell_ids, dtype=np.int64), 1 << 32)
+    q, r = q - HEX_OFFSET, r - HEX_OFFSET
+    lon = size_deg * SQRT3 * (q + r / 2.0) - 180.0
+    lat = size_deg * 1.5 * r - 90.0
+    return lat, lon
+
+
+# kind -> (point to integer coords, (coords, resolution) to id, id to centre);
+# hex ids do not depend on the cell size
+CELL_KINDS = {
+    "grid": (grid_cell_coords, grid_pack, grid_cell_centres),
+    "hex": (hex_cell_coords, lambda q, r, size_deg: hex_pack(q, r), hex_cell_centres),
+}
+
+
+def _reduce(ids, sums):
+    """Sum rows of ``sums`` sharing a cell id; returns (unique ids, sums)"""
+    cells, inverse = np.unique(ids, return_inverse=True)
+    reduced = np.empty((len(cells), sums.shape[1]), dtype=np.float64)
+    for j in range(sums.shape[1]):
+        reduced[:, j] = np.bincount(inverse, weights=sums[:, j], minlength=len(cells))
+    return cells, reduced
+
+
+def _reduce_coords(a, b, sums, pack, res):
+    """Per-cell sums of one chunk from integer cell coordinates
+
+    When the chunk's coordinate window is small (the usual case: a chunk
+    covers a region, not the globe) cells are numbered densely inside the
+    window and summed with np.bincount, with no sort at all. Otherwise fall
+    back to np.unique on the packed ids.
+    """
+    if len(a) == 0:
+        return np.empty(0, np.int64), np.empty((0, sums.shape[1]))
+    a0, b0 = a.min(), b.min()
+    n_a, n_b = int(a.max() - a0) + 1, int(b.max() - b0) + 1
+    if n_a * n_b > max(4 * len(a), DENSE_MIN_CELLS):
+        return _reduce(pack(a, b, res), sums)
+    local = (a - a0) * n_b + (b - b0)
+    counts = np.bincount(local, minlength=n_a * n_b)
+    occupied = np.flatnonzero(counts)
+    reduced = np.empty((len(occupied), sums.shape[1]), dtype=np.float64)
+    for j in range(sums.shape[1]):
+        reduced[:, j] = np.bincount(local, weights=sums[:, j], minlength=n_a * n_b)[occupied]
+    oa, ob = np.divmod(occupied, n_b)
+    return pack(oa + a0, ob + b0, res), reduced
+
+
+class CellAggregator:
+    """Streaming population-weighted aggregation at several resolutions"""
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, kind="grid", weighted=WEIGHTED_COLUMNS):
+        if kind not in CELL_KINDS:
+            raise ValueError(f"Unknown cell kind '{kind}' (expected one of {sorted(CELL_KINDS)})")
+        self.kind = kind
+        self.resolutions = [float(r) for r in resolutions]
+        self.weighted = list(weighted)
+        self.n_rows = 0
+        self._parts = {res: [] for res in self.resolutions}
+        self._part_rows = {res: 0 for res in self.resolutions}
+
+    def update(self, chunk):
+        """Add a chunk (DataFrame or dict of arrays) of points"""
+
+        def col(name, dtype=np.float64):
+            values = chunk[name]
+            values = values.to_numpy() if hasattr(values, "to_numpy") else values
+            return np.asarray(values, dtype=dtype)
+
+        lat, lon = col("latitude"), col("longitude")
+        pop = col("population")
+        pov = col("poverty_rate")
+        # count, population, unweighted poverty sum, then population x value sums
+        sums = np.empty((len(lat), 3 + len(self.weighted)), dtype=np.float64)
+        sums[:, 0] = 1.0
+        sums[:, 1] = pop
+        sums[:, 2] = pov
+        for j, name in enumerate(self.weighted):
+            sums[:, 3 + j] = pop * (pov if name == "poverty_rate" else col(name))
+
+        to_coords, pack, _ = CELL_KINDS[self.kind]
+        for res in self.resolutions:
+            part = _reduce_coords(*to_coords(lat, lon, res), sums, pack, res)
+            self._parts[res].append(part)
+            self._part_rows[res] += len(part[0])
+            if self._part_rows[res] > COMPACT_ROWS:
+                self._compact(res)
+        self.n_rows += len(lat)
+
+    def _compact(self, res):
+        parts = self._parts[res]
+        if len(parts) > 1:
+            ids = np.concatenate([p[0] for p in parts])
+            sums = np.concatenate([p[1] for p in parts])
+            parts[:] = [_reduce(ids, sums)]
+        self._part_rows[res] = len(parts[0][0]) if parts else 0
+
+    def table(self, res):
+        """Cell table (dict of arrays, CELL_SCHEMA columns) for one resolution"""
+        self._compact(res)
+        parts = self._parts[res]
+        if parts:
+            cells, sums = parts[0]
+        else:
+            cells, sums = np.empty(0, np.int64), np.empty((0, 3 + len(self.weighted)))
+        lat, lon = CELL_KINDS[self.kind][2](cells, res)
+        count, pop = sums[:, 0], sums[:, 1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table = {
+                "cell_id": cells,
+                "latitude": lat,
+                "longitude": lon,
+                "count": count.astype(np.int64),
+                "population": pop.astype(np.int64),
+                "poverty_rate_unweighted": sums[:, 2] / count,
+            }
+            for j, name in enumerate(self.weighted):
+                table[name] = np.where(pop > 0, sums[:, 3 + j] / pop, np.nan)
+        return table
+
+    def save(self, out_dir):
+        """Write one cell store per resolution plus cells.json; returns the manifest"""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {"kind": self.kind, "n_points": self.n_rows, "resolutions": []}
+        schema = dict(CELL_SCHEMA)
+        for name in self.weighted:
+            schema.setdefault(name, "<f4")
+        for res in self.resolutions:
+            table = self.table(res)
+            store_name = f"{self.kind}_{res:g}.store"
+            write_store(out_dir / store_name, table, schema=schema)
+            manifest["resolutions"].append(
+                {"resolution": res, "store": store_name, "n_cells": len(table["cell_id"])}
+            )
+        tmp = out_dir / "cells.json.tmp"
+        tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(tmp, out_dir / "cells.json")
+        return manifest
+
+
+def load_cells(out_dir, resolution=None):
+    """Open the cell store for a resolution (the finest one by default)"""
+    out_dir = Path(out_dir)
+    manifest = json.loads((out_dir / "cells.json").read_text(encoding="utf-8"))
+    entries = manifest["resolutions"]
+    if resolution is None:
+        entry = min(entries, key=lambda e: e["resolution"])
+    else:
+        matches = [e for e in entries if np.isclose(e["resolution"], resolution)]
+        if not matches:
+            raise KeyError(f"No cells at resolution {resolution} in {out_dir}")
+        entry = matches[0]
+    return PovertyStore(out_dir / entry["store"])
+
+
+def aggregate_store(
+    store_path,
+    out_dir=None,
+    resolutions=DEFAULT_RESOLUTIONS,
+    kind="grid",
+    chunk_rows=DEFAULT_ROW_GROUP_SIZE,
+):
+    """Aggregate a columnar store chunk by chunk; saves to out_dir if given"""
+    store = PovertyStore(store_path)
+    columns = ["latitude", "longitude", "population", *WEIGHTED_COLUMNS]
+    aggregator = CellAggregator(resolutions, kind)
+    for chunk in store.iter_chunks(columns, chunk_rows=chunk_rows):
+        aggregator.update(chunk)
+    if out_dir is not None:
+        aggregator.save(out_dir)
+    return aggregator
+
+
+def aggregate_csv(csv_path, out_dir=None, resolutions=DEFAULT_RESOLUTIONS, kind="grid", chunksize=1_000_000):
+    """Aggregate a poverty CSV read in pandas chunks"""
+    import pandas as pd
+
+    columns = ["latitude", "longitude", "population", *WEIGHTED_COLUMNS]
+    aggregator = CellAggregator(resolutions, kind)
+    for chunk in pd.read_csv(csv_path, usecols=columns, chunksize=chunksize):
+        aggregator.update(chunk)
+    if out_dir is not None:
+        aggregator.save(out_dir)
+    return aggregator
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Aggregate poverty points to cells")
+    parser.add_argument("source", help="columnar store directory or CSV file")
+    parser.add_argument("out_dir")
+    parser.add_argument("--kind", choices=sorted(CELL_KINDS), default="grid")
+    parser.add_argument("--resolutions", type=float, nargs="+", default=list(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if str(args.source).lower().endswith(".csv"):
+        aggregator = aggregate_csv(
+            args.source, args.out_dir, args.resolutions, args.kind, chunksize=args.chunk_rows
+        )
+    else:
+        aggregator = aggregate_store(
+            args.source, args.out_dir, args.resolutions, args.kind, chunk_rows=args.chunk_rows
+        )
+    seconds = time.perf_counter() - start
+    print(f"Aggregated {aggregator.n_rows:,} points in {seconds:.2f}s")
+    manifest = json.loads((Path(args.out_dir) / "cells.json").read_text(encoding="utf-8"))
+    for entry in manifest["resolutions"]:
+        print(f"  {args.kind} {entry['resolution']:g}: {entry['n_cells']:,} cells -> {entry['store']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
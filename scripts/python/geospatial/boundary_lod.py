@@ -0,0 +1,392 @@
+"""
+ORAIL CITIZEN AI - Boundary Level of Detail
+Geospatial Poverty Mapping Framework
+
+Precomputed Douglas-Peucker simplifications of polygon layers (the
+Datasource India state and country boundaries) at several tolerances,
+cached on disk and picked automatically for a map scale.
+
+Simplifying every ring on its own opens gaps and overlaps between
+neighbouring states, because each side of a shared border is simplified
+differently. Instead the layer is first split into arcs: rings are cut at
+nodes (vertices where three or more boundaries meet), identical arcs are
+stored once, each arc is simplified once, and rings are rebuilt from the
+simplified arcs. Shared borders therefore stay identical. After
+simplification every polygon is checked for segment crossings; arcs of a
+polygon that gained crossings are re-simplified at half the tolerance until
+it is as valid as the source.
+
+Levels are cached under data/cache/lod/<layer>-<source hash>/ as ordinary
+shapefiles (with the source attributes) plus lod.json, so a changed source
+file gets a fresh cache and an unchanged one is reused.
+
+Usage:
+    lod = BoundaryLOD.build(INDIA_STATE_BOUNDARY)
+    level = lod.level_for_scale(bbox, width_px=1920)
+    with Shapefile(level["path"]) as states:
+        ...
+
+    python -m scripts.python.geospatial.boundary_lod <layer.shp> --tolerances 100 1000 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.geospatial.shapefile_reader import (
+    INDIA_STATE_BOUNDARY,
+    Shapefile,
+    lonlat_to_mercator,
+    mercator_to_lonlat,
+    write_polygons,
+)
+from scripts.python.provisioning.manifest import hash_bytes, hash_file, write_json_if_changed
+
+LOD_CACHE_DIR = os.path.join("data", "cache", "lod")
+LOD_VERSION = 1
+# Web Mercator metres; for a lon/lat layer pass degrees instead
+DEFAULT_TOLERANCES = (100.0, 500.0, 2000.0, 8000.0)
+MAX_REPAIR_ROUNDS = 6
+SWEEP_BLOCK = 512
+
+
+def douglas_peucker(points, tolerance):
+    """Indices of the points kept by Douglas-Peucker (endpoints always kept)"""
+    n = len(points)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        a, b = points[i], points[j]
+        seg = points[i + 1 : j]
+        d = b - a
+        length = np.hypot(*d)
+        if length == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (seg[:, 1] - a[1]) - d[1] * (seg[:, 0] - a[0])) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            m = i + 1 + k
+            keep[m] = True
+            stack.append((i, m))
+            stack.append((m, j))
+    return np.flatnonzero(keep)
+
+
+def _segments(rings):
+    """(n, 4) segments x0, y0, x1, y1 of closed rings"""
+    parts = [np.column_stack([r[:-1], r[1:]]) for r in rings if len(r) > 1]
+    return np.concatenate(parts) if parts else np.empty((0, 4))
+
+
+def count_crossings(rings):
+    """Proper crossings between non-adjacent segments of a polygon's rings
+
+    Sweep over segments sorted by min x: each block is only compared with
+    the segments whose x-range can overlap it.
+    """
+    segs = _segments(rings)
+    if len(segs) < 4:
+        return 0
+    xmin = np.minimum(segs[:, 0], segs[:, 2])
+    order = np.argsort(xmin, kind="stable")
+    segs, xmin = segs[order], xmin[order]
+    xmax = np.maximum(segs[:, 0], segs[:, 2])
+    ymin = np.minimum(segs[:, 1], segs[:, 3])
+    ymax = np.maximum(segs[:, 1], segs[:, 3])
+
+    def orient(ax, ay, bx, by, cx, cy):
+        return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+    crossings = 0
+    for a in range(0, len(segs), SWEEP_BLOCK):
+        b = min(a + SWEEP_BLOCK, len(segs))
+        stop = int(np.searchsorted(xmin, xmax[a:b].max(), side="right"))
+        i = np.arange(a, b)[:, None]
+        j = np.arange(a, stop)[None, :]
+        cand = (j > i) & (xmin[j] <= xmax[i]) & (ymin[j] <= ymax[i]) & (ymin[i] <= ymax[j])
+        ii, jj = np.nonzero(cand)
+        if not len(ii):
+            continue
+        p, q = segs[ii + a], segs[jj + a]
+        # Segments that share an endpoint are neighbours along a ring, not crossings
+        shared = (
+            ((p[:, 0] == q[:, 0]) & (p[:, 1] == q[:, 1]))
+            | ((p[:, 0] == q[:, 2]) & (p[:, 1] == q[:, 3]))
+            | ((p[:, 2] == q[:, 0]) & (p[:, 3] == q[:, 1]))
+            | ((p[:, 2] == q[:, 2]) & (p[:, 3] == q[:, 3]))
+        )
+        o1 = orient(p[:, 0], p[:, 1], p[:, 2], p[:, 3], q[:, 0], q[:, 1])
+        o2 = orient(p[:, 0], p[:, 1], p[:, 2], p[:, 3], q[:, 2], q[:, 3])
+        o3 = orient(q[:, 0], q[:, 1], q[:, 2], q[:, 3], p[:, 0], p[:, 1])
+        o4 = orient(q[:, 0], q[:, 1], q[:, 2], q[:, 3], p[:, 2], p[:, 3])
+        crossings += int(np.sum(~shared & (o1 * o2 < 0) & (o3 * o4 < 0)))
+    return crossings
+
+
+class ArcTopology:
+    """A polygon layer decomposed into shared arcs"""
+
+    def __init__(self, polygons):
+        rings = [np.asarray(r, dtype=np.float64) for p in polygons for r in p]
+        ring_polygon = np.repeat(np.arange(len(polygons)), [len(p) for p in polygons])
+        # Drop the closing vertex; rings are handled as cycles
+        opened = [r[:-1] if len(r) > 1 and np.array_equal(r[0], r[-1]) else r for r in rings]
+        lengths = np.array([len(r) for r in opened])
+        coords = np.concatenate(opened) if opened else np.empty((0, 2))
+        packed = np.ascontiguousarray(coords).view(np.dtype((np.void, 16))).ravel()
+        _, first, vertex = np.unique(packed, return_index=True, return_inverse=True)
+        self.vertices = coords[first]
+
+        # A vertex is a node when it has other than two distinct neighbours
+        starts = np.cumsum(lengths) - lengths
+        nxt = np.arange(len(vertex)) + 1
+        ends = starts + lengths
+        nxt[ends[lengths > 0] - 1] = starts[lengths > 0]
+        edges = np.sort(np.column_stack([vertex, vertex[nxt]]), axis=1)
+        edges = np.unique(edges[edges[:, 0] != edges[:, 1]], axis=0)
+        degree = np.bincount(edges.ravel(), minlength=len(self.vertices))
+        is_node = degree != 2
+
+        self.arcs = []
+        self._arc_index = {}
+        self.polygon_rings = [[] for _ in polygons]
+        for r, (start, length) in enumerate(zip(starts, lengths)):
+            ids = vertex[start : start + length]
+            if length < 3:
+                continue
+            node_pos = np.flatnonzero(is_node[ids])
+            if len(node_pos) == 0:
+                pieces = [self._closed_loop(ids)]
+            else:
+                ids = np.roll(ids, -node_pos[0])
+                cuts = list(node_pos - node_pos[0]) + [length]
+                pieces = [
+                    np.append(ids[a:b], ids[b % length]) for a, b in zip(cuts[:-1], cuts[1:])
+                ]
+            self.polygon_rings[ring_polygon[r]].append([self._add_arc(p) for p in pieces])
+
+    @staticmethod
+    def _closed_loop(ids):
+        """Canonical rotation of a node-less ring, closed on its first vertex"""
+        ids = np.roll(ids, -int(np.argmin(ids)))
+        return np.append(ids, ids[0])
+
+    def _add_arc(self, ids):
+        """Arc reference (index, reversed) for a vertex id sequence"""
+        forward, backward = tuple(ids.tolist()), tuple(ids[::-1].tolist())
+        if ids[0] == ids[-1]:
+            # Closed loop: the reversed loop rotated to the same start
+            backward = tuple(self._closed_loop(ids[:-1][::-1]).tolist())
+        if forward in self._arc_index:
+            return self._arc_index[forward], False
+        if backward in self._arc_index:
+            return self._arc_index[backward], True
+        self._arc_index[forward] = len(self.arcs)
+        self.arcs.append(np.asarray(ids))
+        return len(self.arcs) - 1, False
+
+    def simplify_arc(self, arc, tolerance):
+        """Vertex ids of one arc after Douglas-Peucker"""
+        ids = self.arcs[arc]
+        points = self.vertices[ids]
+        if ids[0] == ids[-1] and len(ids) > 3:
+            # Closed loop: split at the farthest vertex so the ring keeps three corners
+            far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+            first = douglas_peucker(points[: far + 1], tolerance)
+            second = douglas_peucker(points[far:], tolerance) + far
+            kept = np.concatenate([first, second[1:]])
+            if len(kept) < 4:
+                inner = points[1:-1]
+                line = points[far] - points[0]
+                off = np.abs(line[0] * (inner[:, 1] - points[0, 1]) - line[1] * (inner[:, 0] - points[0, 0]))
+                kept = np.unique(np.array([0, far, 1 + int(np.argmax(off)), len(ids) - 1]))
+            return ids[kept]
+        return ids[douglas_peucker(points, tolerance)]
+
+    def rebuild(self, simplified):
+        """Polygons (lists of closed (N, 2) rings) from simplified arcs"""
+        polygons = []
+        for rings in self.polygon_rings:
+            out = []
+            for refs in rings:
+                ids = []
+                for arc, rev in refs:
+                    part = simplified[arc][::-1] if rev else simplified[arc]
+                    ids.extend(part[1:] if ids else part)
+                coords = self.vertices[np.asarray(ids)]
+                if len(coords) >= 4:
+                    out.append(coords)
+            polygons.append(out)
+        return polygons
+
+
+def simplify_layer(polygons, tolerance, repair=True):
+    """Topology-preserving simplification of a polygon layer
+
+    Returns (polygons, report). Shared borders are simplified once; if a
+    polygon gains segment crossings, its arcs are refined at half the
+    tolerance (up to MAX_REPAIR_ROUNDS times).
+    """
+    topo = ArcTopology(polygons)
+    arc_tol = np.full(len(topo.arcs), float(tolerance))
+    simplified = [topo.simplify_arc(a, tolerance) for a in range(len(topo.arcs))]
+    result = topo.rebuild(simplified)
+    report = {"arcs": len(topo.arcs), "repaired": 0, "invalid": 0}
+    if repair:
+        source_crossings = [count_crossings(topo.rebuild(topo.arcs)[i]) for i in range(len(polygons))]
+        for _ in range(MAX_REPAIR_ROUNDS):
+            bad = [
+                i for i, rings in enumerate(result)
+                if count_crossings(rings) > source_crossings[i]
+            ]
+            if not bad:
+                break
+            for i in bad:
+                for refs in topo.polygon_rings[i]:
+                    for arc, _ in refs:
+                        arc_tol[arc] /= 2.0
+                        simplified[arc] = topo.simplify_arc(arc, arc_tol[arc])
+            report["repaired"] += len(bad)
+            result = topo.rebuild(simplified)
+        else:
+            report["invalid"] = len(bad)
+    return result, report
+
+
+def read_layer(path):
+    """(polygons, records, fields, prj, is_web_mercator) of a polygon shapefile"""
+    with Shapefile(path) as layer:
+        polygons = [[np.array(r) for r in layer.rings(i)] for i in range(len(layer))]
+        records, fields = [{} for _ in polygons], []
+        if layer.dbf is not None:
+            records = [layer.dbf.record(i) or {} for i in range(len(layer))]
+            fields = [(name, ftype, size, dec) for name, ftype, _, size, dec in layer.dbf.fields]
+        return polygons, records, fields, layer.crs_wkt, layer.is_web_mercator
+
+
+class BoundaryLOD:
+    """Cached simplification levels of one polygon layer"""
+
+    def __init__(self, cache_dir, meta):
+        self.cache_dir = Path(cache_dir)
+        self.meta = meta
+        self.levels = meta["levels"]
+
+    @staticmethod
+    def source_hash(path):
+        """Hash of the layer's .shp/.shx/.dbf content"""
+        with Shapefile(path) as shp:
+            parts = [hash_file(p) or "" for p in (shp.shp_path, shp.shx_path, shp.dbf_path)]
+        return hash_bytes("\n".join(parts).encode("utf-8"))
+
+    @classmethod
+    def build(cls, path, tolerances=DEFAULT_TOLERANCES, cache_root=LOD_CACHE_DIR, force=False):
+        """Open the cached levels for a layer, computing any that are missing"""
+        tolerances = sorted(float(t) for t in tolerances)
+        digest = cls.source_hash(path)
+        cache_dir = Path(cache_root) / f"{Path(path).stem}-{digest[:16]}"
+        meta_path = cache_dir / "lod.json"
+        meta = None
+        if meta_path.exists() and not force:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            cached = {level["tolerance"] for level in meta["levels"]}
+            if meta.get("version") != LOD_VERSION or not set(tolerances) <= cached:
+                meta = None
+        if meta is None:
+            polygons, records, fields, prj, is_mercator = read_layer(path)
+            levels = [
+                {
+                    "tolerance": 0.0,
+                    "path": str(Path(path).with_suffix(".shp")),
+                    "vertices": sum(len(r) for p in polygons for r in p),
+                    "repaired": 0,
+                    "invalid": 0,
+                }
+            ]
+            for tolerance in tolerances:
+                start = time.perf_counter()
+                simplified, report = simplify_layer(polygons, tolerance)
+                level_path = cache_dir / f"level_{tolerance:g}.shp"
+                write_polygons(level_path, simplified, records, fields, prj_wkt=prj)
+                levels.append(
+                    {
+                        "tolerance": tolerance,
+                        "path": str(level_path),
+                        "vertices": sum(len(r) for p in simplified for r in p),
+                        "repaired": report["repaired"],
+                        "invalid": report["invalid"],
+                        "seconds": round(time.perf_counter() - start, 3),
+                    }
+                )
+            meta = {
+                "version": LOD_VERSION,
+                "source": str(path),
+                "source_hash": digest,
+                "units": "metres" if is_mercator else "crs units",
+                "levels": levels,
+            }
+            write_json_if_changed(meta_path, meta)
+        return cls(cache_dir, meta)
+
+    def level_for_scale(self, bbox, width_px, pixel_fraction=0.5):
+        """Coarsest level whose tolerance stays under a fraction of a pixel
+
+        ``bbox`` is (min_x, min_y, max_x, max_y) in the layer's units.
+        """
+        pixel = (bbox[2] - bbox[0]) / float(width_px)
+        fitting = [lv for lv in self.levels if lv["tolerance"] <= pixel * pixel_fraction]
+        return max(fitting, key=lambda lv: lv["tolerance"]) if fitting else self.levels[0]
+
+    def rings_for_scale(self, bbox_lonlat, width_px):
+        """Rings (lon/lat) of the level suited to a lon/lat map extent"""
+        min_lon, min_lat, max_lon, max_lat = bbox_lonlat
+        if self.meta["units"] == "metres":
+            corners = lonlat_to_mercator(np.array([[min_lon, min_lat], [max_lon, max_lat]]))
+            bbox = (*corners[0], *corners[1])
+        else:
+            bbox = bbox_lonlat
+        level = self.level_for_scale(bbox, width_px)
+        rings = []
+        with Shapefile(level["path"]) as layer:
+            for i in range(len(layer)):
+                for ring in layer.rings(i):
+                    ring = np.array(ring)
+                    rings.append(mercator_to_lonlat(ring) if self.meta["units"] == "metres" else ring)
+        return level, rings
+
+
+def main(argv=None):
+    """Build (or reuse) the LOD cache of a layer and print its levels"""
+    parser = argparse.ArgumentParser(description="Boundary level-of-detail cache")
+    parser.add_argument("path", nargs="?", default=INDIA_STATE_BOUNDARY)
+    parser.add_argument("--tolerances", type=float, nargs="+", default=list(DEFAULT_TOLERANCES))
+    parser.add_argument("--cache-root", default=LOD_CACHE_DIR)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    try:
+        lod = BoundaryLOD.build(args.path, args.tolerances, args.cache_root, args.force)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Cache: {lod.cache_dir}")
+    print(f"{'tolerance':>10}{'vertices':>12}{'repaired':>10}{'invalid':>9}")
+    for level in lod.levels:
+        print(f"{level['tolerance']:>10g}{level['vertices']:>12,}{level['repaired']:>10}{level['invalid']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+"""
+ORAIL CITIZEN AI - Satellite Image Chip Extractor
+Geospatial Poverty Mapping Framework
+
+Cuts fixed-size image chips centred on survey points out of satellite
+scenes for CNN training, without loading whole scenes:
+
+    rasters   ENVI rasters (raw .bin/.img + .hdr, any interleave) are
+              memory-mapped, so a chip reads only the pages it touches;
+              GeoTIFFs go through rasterio windowed reads when installed
+    grouping  points are assigned to source tiles with vectorised bounds
+              tests, then sorted by tile and row, so each tile is opened
+              once per job and reads move forward through the file
+    parallel  jobs (a run of points from one tile) run in worker processes
+              that write their chips straight into the output shards
+    output    chips.json + shard_NNNNN.npy arrays (n, bands, size, size),
+              readable with np.load(mmap_mode="r"), and index.store, a
+              columnar store (poverty_store.py) mapping each chip to its
+              point id, shard, offset, tile, coordinates, the fraction of
+              valid pixels and any label columns
+
+Chips that run past a tile's edge are padded with the nodata value (and
+have valid_fraction < 1); points outside every tile are listed as missing.
+
+Usage:
+    python -m scripts.python.geospatial.chip_extractor \\
+        data/processed/orail_demo_data.store data/raw/scenes/*.hdr data/processed/chips \\
+        --size 64 --labels poverty_rate
+
+    chips = ChipDataset("data/processed/chips")
+    chip, label = chips[123], chips.labels("poverty_rate")[123]
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import PovertyStore, write_store
+from scripts.python.geospatial.shapefile_reader import lonlat_to_mercator
+
+DEFAULT_CHIP_SIZE = 64
+DEFAULT_SHARD_CHIPS = 4096
+JOB_CHIPS = 512
+ENVI_DTYPES = {1: "u1", 2: "i2", 3: "i4", 4: "f4", 5: "f8", 12: "u2", 13: "u4", 14: "i8", 15: "u8"}
+ENVI_CODES = {np.dtype(v).str[1:]: k for k, v in ENVI_DTYPES.items()}
+INDEX_SCHEMA = {
+    "point_id": "<i8",
+    "shard": "<i4",
+    "offset": "<i4",
+    "tile": "<i2",
+    "latitude": "<f8",
+    "longitude": "<f8",
+    "valid_fraction": "<f4",
+}
+
+_RASTERS = {}
+
+
+def _header_value(text, key):
+    match = re.search(rf"^\s*{re.escape(key)}\s*=\s*(\{{.*?\}}|[^\n]*)", text, re.I | re.M | re.S)
+    if not match:
+        return None
+    value = match.group(1).strip()
+    return value[1:-1].strip() if value.startswith("{") else value
+
+
+def read_envi_header(path):
+    """Layout and georeferencing of an ENVI raster from its .hdr"""
+    text = Path(path).with_suffix(".hdr").read_text(encoding="ascii", errors="replace")
+    if not text.lstrip().startswith("ENVI"):
+        raise ValueError(f"Not an ENVI header: {path}")
+    data_type = int(_header_value(text, "data type"))
+    if data_type not in ENVI_DTYPES:
+        raise ValueError(f"Unsupported ENVI data type {data_type} in {path}")
+    byte_order = ">" if int(_header_value(text, "byte order") or 0) else "<"
+    map_info = _header_value(text, "map info")
+    if map_info is None:
+        raise ValueError(f"ENVI header has no map info: {path}")
+    parts = [p.strip() for p in map_info.split(",")]
+    ref_col, ref_row, ref_x, ref_y, dx, dy = (float(v) for v in parts[1:7])
+    names = _header_value(text, "band names")
+    nodata = _header_value(text, "data ignore value")
+    header = {
+        "samples": int(_header_value(text, "samples")),
+        "lines": int(_header_value(text, "lines")),
+        "bands": int(_header_value(text, "bands")),
+        "offset": int(_header_value(text, "header offset") or 0),
+        "dtype": np.dtype(byte_order + ENVI_DTYPES[data_type]),
+        "interleave": (_header_value(text, "interleave") or "bsq").lower(),
+        "mercator": "mercator" in parts[0].lower(),
+        "origin": (ref_x - (ref_col - 1) * dx, ref_y + (ref_row - 1) * dy),
+        "pixel_size": (dx, dy),
+        "band_names": [b.strip() for b in names.split(",")] if names else None,
+        "nodata": float(nodata) if nodata is not None else None,
+    }
+    return header
+
+
+def write_envi_raster(path, data, bounds, mercator=False, interleave="bsq", band_names=None, nodata=None):
+    """Write a (bands, rows, cols) array as an ENVI raster; bounds are lon/lat"""
+    path = Path(path).with_suffix(".bin")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = np.asarray(data)
+    bands, rows, cols = data.shape
+    dtype = data.dtype.newbyteorder("<") if data.dtype.itemsize > 1 else data.dtype
+    code = ENVI_CODES.get(dtype.str[1:])
+    if code is None:
+        raise ValueError(f"dtype {data.dtype} has no ENVI data type")
+    min_x, min_y, max_x, max_y = (float(v) for v in bounds)
+    if mercator:
+        (min_x, min_y), (max_x, max_y) = lonlat_to_mercator(np.array([[min_x, min_y], [max_x, max_y]])).tolist()
+    order = {"bsq": (0, 1, 2), "bil": (1, 0, 2), "bip": (1, 2, 0)}[interleave]
+    projection = "Pseudo Mercator" if mercator else "Geographic Lat/Lon"
+    units = "Meters" if mercator else "Degrees"
+    lines = [
+        "ENVI",
+        f"samples = {cols}",
+        f"lines = {rows}",
+        f"bands = {bands}",
+        "header offset = 0",
+        "file type = ENVI Standard",
+        f"data type = {code}",
+        f"interleave = {interleave}",
+        "byte order = 0",
+        f"map info = {{{projection}, 1, 1, {min_x!r}, {max_y!r}, "
+        f"{(max_x - min_x) / cols!r}, {(max_y - min_y) / rows!r}, WGS-84, units={units}}}",
+    ]
+    if band_names:
+        lines.append(f"band names = {{{', '.join(band_names)}}}")
+    if nodata is not None:
+        lines.append(f"data ignore value = {nodata:g}")
+    tmp = path.with_name(f".{path.name}.tmp")
+    np.ascontiguousarray(data.astype(dtype, copy=False).transpose(order)).tofile(tmp)
+    os.replace(tmp, path)
+    path.with_suffix(".hdr").write_text("\n".join(lines) + "\n", encoding="ascii")
+    return path
+
+
+class EnviRaster:
+    """Memory-mapped ENVI raster with boundless window reads"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.header = read_envi_header(self.path)
+        h = self.header
+        data_path = next(
+            (p for p in (self.path.with_suffix(s) for s in (".bin", ".img", ".dat", ".raw", "")) if p.is_file()),
+            None,
+        )
+        if data_path is None or data_path.suffix == ".hdr":
+            raise FileNotFoundError(f"No raster data file next to {self.path.with_suffix('.hdr')}")
+        shape = {
+            "bsq": (h["bands"], h["lines"], h["samples"]),
+            "bil": (h["lines"], h["bands"], h["samples"]),
+            "bip": (h["lines"], h["samples"], h["bands"]),
+        }[h["interleave"]]
+        self.data = np.memmap(data_path, dtype=h["dtype"], mode="r", offset=h["offset"], shape=shape)
+        self.bands, self.rows, self.cols = h["bands"], h["lines"], h["samples"]
+        self.dtype = h["dtype"]
+        self.nodata = h["nodata"]
+        self.band_names = h["band_names"]
+
+    @property
+    def bounds(self):
+        """(min_lon, min_lat, max_lon, max_lat) of the raster"""
+        (x0, y0), (dx, dy) = self.header["origin"], self.header["pixel_size"]
+        corners = np.array([[x0, y0 - self.rows * dy], [x0 + self.cols * dx, y0]])
+        if self.header["mercator"]:
+            from scripts.python.geospatial.shapefile_reader import mercator_to_lonlat
+
+            corners = mercator_to_lonlat(corners)
+        return (float(corners[0, 0]), float(corners[0, 1]), float(corners[1, 0]), float(corners[1, 1]))
+
+    def pixel(self, lat, lon):
+        """Fractional (row, col) of points"""
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        if self.header["mercator"]:
+            xy = lonlat_to_mercator(np.stack([lon, lat], axis=-1))
+            x, y = xy[..., 0], xy[..., 1]
+        else:
+            x, y = lon, lat
+        (x0, y0), (dx, dy) = self.header["origin"], self.header["pixel_size"]
+        return (y0 - y) / dy, (x - x0) / dx
+
+    def window(self, row0, col0, height, width, fill=0):
+        """(bands, height, width) block; pixels outside the raster are ``fill``"""
+        out = np.full((self.bands, height, width), fill, dtype=self.dtype)
+        r0, r1 = max(row0, 0), min(row0 + height, self.rows)
+        c0, c1 = max(col0, 0), min(col0 + width, self.cols)
+        if r0 >= r1 or c0 >= c1:
+            return out, 0
+        target = out[:, r0 - row0:r1 - row0, c0 - col0:c1 - col0]
+        interleave = self.header["interleave"]
+        if interleave == "bsq":
+            target[...] = self.data[:, r0:r1, c0:c1]
+        elif interleave == "bil":
+            target[...] = self.data[r0:r1, :, c0:c1].transpose(1, 0, 2)
+        else:
+            target[...] = self.data[r0:r1, c0:c1, :].transpose(2, 0, 1)
+        return out, (r1 - r0) * (c1 - c0)
+
+
+class RasterioRaster:
+    """GeoTIFF (or any GDAL raster) through rasterio windowed reads"""
+
+    def __init__(self, path):
+        try:
+            import rasterio
+        except ImportError:
+            raise ImportError("Reading GeoTIFFs needs rasterio (pip install rasterio); "
+                              "or convert scenes to ENVI with gdal_translate -of ENVI") from None
+        from rasterio.windows import Window
+
+        self._window_cls = Window
+        self.src = rasterio.open(path)
+        self.path = Path(path)
+        self.bands, self.rows, self.cols = self.src.count, self.src.height, self.src.width
+        self.dtype = np.dtype(self.src.dtypes[0])
+        self.nodata = self.src.nodata
+        self.band_names = list(self.src.descriptions) if any(self.src.descriptions) else None
+        self.mercator = self.src.crs is not None and self.src.crs.to_epsg() == 3857
+
+    @property
+    def bounds(self):
+        b = self.src.bounds
+        if self.mercator:
+            from scripts.python.geospatial.shapefile_reader import mercator_to_lonlat
+
+            (x0, y0), (x1, y1) = mercator_to_lonlat(np.array([[b.left, b.bottom], [b.right, b.top]]))
+            return (float(x0), float(y0), float(x1), float(y1))
+        return (b.left, b.bottom, b.right, b.top)
+
+    def pixel(self, lat, lon):
+        lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+        if self.mercator:
+            xy = lonlat_to_mercator(np.stack([lon, lat], axis=-1))
+            lon, lat = xy[..., 0], xy[..., 1]
+        inverse = ~self.src.transform
+        cols = inverse.a * lon + inverse.b * lat + inverse.c
+        rows = inverse.d * lon + inverse.e * lat + inverse.f
+        return rows, cols
+
+    def window(self, row0, col0, height, width, fill=0):
+        r0, r1 = max(row0, 0), min(row0 + height, self.rows)
+        c0, c1 = max(col0, 0), min(col0 + width, self.cols)
+        data = self.src.read(window=self._window_cls(col0, row0, width, height), boundless=True, fill_value=fill)
+        return data, max(r1 - r0, 0) * max(c1 - c0, 0)
+
+
+def open_raster(path):
+    """EnviRaster for .hdr/.bin/.img files, RasterioRaster otherwise"""
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Raster not found: {path}")
+    if path.suffix.lower() in (".hdr", ".bin", ".img", ".dat", ".raw") and path.with_suffix(".hdr").is_file():
+        return EnviRaster(path)
+    return RasterioRaster(path)
+
+
+def _raster(path):
+    """Per-process cache of open rasters"""
+    raster = _RASTERS.get(path)
+    if raster is None:
+        raster = _RASTERS[path] = open_raster(path)
+    return raster
+
+
+def assign_tiles(lat, lon, bounds):
+    """Index of the first tile containing each point, -1 if none"""
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    tile = np.full(len(lat), -1, dtype=np.int32)
+    for i, (min_lon, min_lat, max_lon, max_lat) in enumerate(bounds):
+        inside = (tile < 0) & (lon >= min_lon) & (lon < max_lon) & (lat > min_lat) & (lat <= max_lat)
+        tile[inside] = i
+    return tile
+
+
+def _extract_job(tile_path, out_dir, shard, offset, rows, cols, size, fill):
+    """Write chips for one run of points from one tile into a shard"""
+    raster = _raster(tile_path)
+    chips = np.load(Path(out_dir) / f"shard_{shard:05d}.npy", mmap_mode="r+")
+    valid = np.empty(len(rows), dtype=np.float32)
+    half = size // 2
+    for k, (r, c) in enumerate(zip(rows, cols)):
+        block, n_valid = raster.window(int(r) - half, int(c) - half, size, size, fill)
+        chips[offset + k] = block
+        valid[k] = n_valid / (size * size)
+    chips.flush()
+    return valid
+
+
+def _is_chip_set(path):
+    return (path / "chips.json").exists() or any(path.glob("shard_*.npy"))
+
+
+def _check_out_dir(path):
+    """Refuse to replace a non-empty directory that is not a chip set"""
+    if not path.exists():
+        return
+    if not path.is_dir():
+        raise FileExistsError(f"Output path exists and is not a directory: {path}")
+    if any(path.iterdir()) and not _is_chip_set(path):
+        raise FileExistsError(f"Output directory is not empty and holds no chip set: {path}")
+
+
+def _replace_dir(new, target):
+    """Move a finished chip set into place, removing the one it replaces"""
+    old = None
+    if target.exists():
+        old = target.with_name(f".{target.name}.old-{os.getpid()}")
+        os.replace(target, old)
+    os.replace(new, target)
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def extract_chips(
+    source,
+    rasters,
+    out_dir,
+    size=DEFAULT_CHIP_SIZE,
+    labels=(),
+    shard_chips=DEFAULT_SHARD_CHIPS,
+    workers=None,
+    fill=None,
+):
+    """Cut a chip around every point of a store/CSV/dict; returns a report
+
+    ``rasters`` are scene paths; the first tile containing a point is
+    used. ``labels`` are source columns copied into the index.
+    """
+    start = time.perf_counter()
+    if isinstance(source, dict):
+        data = {k: np.asarray(v) for k, v in source.items()}
+    elif str(source).lower().endswith(".csv"):
+        import pandas as pd
+
+        frame = pd.read_csv(source, usecols=["latitude", "longitude", *labels])
+        data = {c: frame[c].to_numpy() for c in frame.columns}
+    else:
+        store = PovertyStore(source)
+        data = {c: store.column(c) for c in ["latitude", "longitude", *labels]}
+    lat = np.asarray(data["latitude"], dtype=np.float64)
+    lon = np.asarray(data["longitude"], dtype=np.float64)
+
+    paths = [str(p) for p in rasters]
+    if not paths:
+        raise ValueError("No rasters given")
+    opened = [open_raster(p) for p in paths]
+    first = opened[0]
+    if any(r.bands != first.bands or r.dtype != first.dtype for r in opened):
+        raise ValueError("All rasters must have the same band count and data type")
+    fill = fill if fill is not None else (first.nodata if first.nodata is not None else 0)
+
+    tile = assign_tiles(lat, lon, [r.bounds for r in opened])
+    found = np.flatnonzero(tile >= 0)
+    pixel_rows = np.zeros(len(lat))
+    pixel_cols = np.zeros(len(lat))
+    for i, raster in enumerate(opened):
+        members = found[tile[found] == i]
+        pixel_rows[members], pixel_cols[members] = raster.pixel(lat[members], lon[members])
+    pixel_rows = np.floor(pixel_rows).astype(np.int64)
+    pixel_cols = np.floor(pixel_cols).astype(np.int64)
+    # Tile, then row, then column: each job walks one file front to back
+    order = found[np.lexsort((pixel_cols[found], pixel_rows[found], tile[found]))]
+    n_chips = len(order)
+
+    # Built in a hidden sibling and swapped in at the end, so a failed run
+    # leaves the previous chip set untouched
+    target = Path(out_dir)
+    _check_out_dir(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    out_dir = target.with_name(f".{target.name}.tmp-{os.getpid()}")
+    shutil.rmtree(out_dir, ignore_errors=True)
+    out_dir.mkdir()
+    try:
+        shape = (first.bands, size, size)
+        shards = []
+        for shard, a in enumerate(range(0, max(n_chips, 1), shard_chips)):
+            n = min(shard_chips, n_chips - a)
+            np.lib.format.open_memmap(out_dir / f"shard_{shard:05d}.npy", mode="w+", dtype=first.dtype,
+                                      shape=(max(n, 0), *shape))
+            shards.append({"file": f"shard_{shard:05d}.npy", "chips": max(n, 0)})
+
+        # Jobs never cross a tile change or a shard boundary
+        jobs = []
+        a = 0
+        while a < n_chips:
+            shard, offset = divmod(a, shard_chips)
+            b = min(a + JOB_CHIPS, (shard + 1) * shard_chips, n_chips)
+            t = tile[order[a]]
+            b = a + int(np.argmax(np.append(tile[order[a:b]] != t, True)))
+            jobs.append(
+                (paths[t], str(out_dir), shard, offset, pixel_rows[order[a:b]], pixel_cols[order[a:b]], a, b)
+            )
+            a = b
+
+        valid = np.zeros(n_chips, dtype=np.float32)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(jobs) <= 1:
+            for path, out, shard, offset, rows, cols, a, b in jobs:
+                valid[a:b] = _extract_job(path, out, shard, offset, rows, cols, size, fill)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    (pool.submit(_extract_job, path, out, shard, offset, rows, cols, size, fill), a, b)
+                    for path, out, shard, offset, rows, cols, a, b in jobs
+                ]
+                for future, a, b in futures:
+                    valid[a:b] = future.result()
+
+        slots = np.arange(n_chips)
+        index = {
+            "point_id": order.astype(np.int64),
+            "shard": (slots // shard_chips).astype(np.int32),
+            "offset": (slots % shard_chips).astype(np.int32),
+            "tile": tile[order].astype(np.int16),
+            "latitude": lat[order],
+            "longitude": lon[order],
+            "valid_fraction": valid,
+        }
+        for name in labels:
+            index[name] = np.asarray(data[name])[order]
+        schema = dict(INDEX_SCHEMA)
+        for name in labels:
+            schema[name] = index[name].dtype.newbyteorder("<").str
+        write_store(out_dir / "index.store", index, schema)
+
+        meta = {
+            "version": 1,
+            "chip_size": size,
+            "bands": first.bands,
+            "band_names": first.band_names,
+            "dtype": first.dtype.str,
+            "fill": fill,
+            "n_chips": n_chips,
+            "n_points": int(len(lat)),
+            "missing": int(len(lat) - n_chips),
+            "shard_chips": shard_chips,
+            "shards": shards,
+            "tiles": paths,
+            "labels": list(labels),
+        }
+        tmp = out_dir / "chips.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=1), encoding="utf-8")
+        os.replace(tmp, out_dir / "chips.json")
+    except BaseException:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        raise
+    _replace_dir(out_dir, target)
+    return {
+        "chips": n_chips,
+        "missing": meta["missing"],
+        "edge_chips": int(np.count_nonzero(valid < 1)),
+        "tiles_used": int(len(np.unique(tile[found]))),
+        "jobs": len(jobs),
+        "shards": len(shards),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class ChipDataset:
+    """Random-access reader for extracted chips (len/getitem like a torch Dataset)"""
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        meta_path = self.out_dir / "chips.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No complete chip set in {out_dir} (chips.json missing)")
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        self.shards = [np.load(self.out_dir / s["file"], mmap_mode="r") for s in self.meta["shards"]]
+        self.index = PovertyStore(self.out_dir / "index.store")
+        self._shard = self.index.column("shard")
+        self._offset = self.index.column("offset")
+
+    def __len__(self):
+        return self.meta["n_chips"]
+
+    def __getitem__(self, i):
+        return self.shards[self._shard[i]][self._offset[i]]
+
+    def batch(self, indices):
+        """(len(indices), bands, size, size) array, read shard by shard"""
+        indices = np.asarray(indices, dtype=np.int64)
+        out = np.empty((len(indices), self.meta["bands"], self.meta["chip_size"], self.meta["chip_size"]),
+                       dtype=np.dtype(self.meta["dtype"]))
+        shard, offset = self._shard[indices], self._offset[indices]
+        for s in np.unique(shard):
+            picks = np.flatnonzero(shard == s)
+            # Sorted offsets turn the gather into forward reads through the shard
+            by_offset = picks[np.argsort(offset[picks])]
+            out[by_offset] = self.shards[s][offset[by_offset]]
+        return out
+
+    def labels(self, name):
+        return self.index.column(name)
+
+    def point_ids(self):
+        return self.index.column("point_id")
+
+
+def main(argv=None):
+    """Extract chips for a point set from a list of scenes"""
+    parser = argparse.ArgumentParser(description="Extract CNN image chips around points")
+    parser.add_argument("source", help="columnar store or CSV with latitude/longitude")
+    parser.add_argument("rasters", nargs="+", help="scene files (ENVI .hdr/.bin, or GeoTIFF with rasterio)")
+    parser.add_argument("out_dir")
+    parser.add_argument("--size", type=int, default=DEFAULT_CHIP_SIZE)
+    parser.add_argument("--labels", nargs="*", default=[])
+    parser.add_argument("--shard-chips", type=int, default=DEFAULT_SHARD_CHIPS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        report = extract_chips(args.source, args.rasters, args.out_dir, args.size, args.labels,
+                               args.shard_chips, args.workers)
+    except (FileNotFoundError, FileExistsError, ValueError, KeyError, ImportError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"{report['chips']:,} chips from {report['tiles_used']} tiles in {report['shards']} shards "
+          f"({report['missing']:,} points outside all tiles, {report['edge_chips']:,} padded at edges) "
+          f"in {report['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
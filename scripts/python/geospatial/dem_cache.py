@@ -0,0 +1,500 @@
+"""
+ORAIL CITIZEN AI - Elevation Tile Cache
+Geospatial Poverty Mapping Framework
+
+Offline cache of elevation tiles for the 3D (rayshader) pipeline. Tiles are
+the AWS Terrain Tiles that elevatr's ``src = "aws"`` reads: 256x256
+Terrarium PNGs on the Web Mercator XYZ grid, where
+
+    elevation (m) = R * 256 + G + B / 256 - 32768
+
+Each tile is decoded once and kept as a float32 .npy under
+data/cache/dem/<source>/<z>/<x>/<y>.npy, opened memory-mapped, so a mosaic
+for a bounding box copies only the windows it needs from the tiles it
+touches. Missing tiles are downloaded (unless offline) or can be seeded
+beforehand from local Terrarium tile folders, ESRI ASCII grids or, when
+rasterio is installed, GeoTIFFs.
+
+Mosaics can be written as ENVI raw rasters (.bin + .hdr) that terra reads
+directly, which is how orail_launch.r picks up the cached DEM instead of
+calling get_elev_raster on every run.
+
+Usage:
+    cache = DemCache()
+    dem = cache.mosaic((74.5, 8.0, 77.5, 12.8), zoom=8)      # min_lon, min_lat, max_lon, max_lat
+    dem["elevation"]                                         # (rows, cols) float32
+
+    python -m scripts.python.geospatial.dem_cache mosaic --bbox 74.5 8.0 77.5 12.8 \\
+        --zoom 8 --out data/cache/dem/kerala_z8.bin
+    python -m scripts.python.geospatial.dem_cache seed <tiles dir | grid.asc | dem.tif> --zoom 8
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.geospatial.shapefile_reader import WEB_MERCATOR_RADIUS, lonlat_to_mercator
+
+DEM_CACHE_DIR = os.path.join("data", "cache", "dem")
+TERRARIUM_URL = "https://s3.amazonaws.com/elevation-tiles-prod/terrarium/{z}/{x}/{y}.png"
+TILE_SIZE = 256
+MAX_MERCATOR_LAT = 85.0511287798
+DEFAULT_FETCH_WORKERS = 8
+ENVI_NODATA = -32768.0
+ASCII_GRID_KEYS = (
+    "ncols", "nrows", "xllcorner", "yllcorner", "xllcenter", "yllcenter", "cellsize", "nodata_value"
+)
+PSEUDO_MERCATOR_WKT = (
+    'PROJCS["WGS 84 / Pseudo-Mercator",GEOGCS["WGS 84",DATUM["WGS_1984",'
+    'SPHEROID["WGS 84",6378137,298.257223563]],PRIMEM["Greenwich",0],'
+    'UNIT["degree",0.0174532925199433]],PROJECTION["Mercator_1SP"],'
+    'PARAMETER["central_meridian",0],PARAMETER["scale_factor",1],'
+    'PARAMETER["false_easting",0],PARAMETER["false_northing",0],UNIT["metre",1]]'
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+PIL_MODES = {"L": 1, "LA": 2, "RGB": 3, "RGBA": 4}
+
+
+def decode_png(data):
+    """(height, width, channels) uint8 array of an 8-bit, non-interlaced PNG
+
+    Uses Pillow when it is installed; otherwise the PNG is decoded here.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return _decode_png(data)
+    import io
+
+    with Image.open(io.BytesIO(data)) as image:
+        if image.format != "PNG":
+            raise ValueError("Not a PNG file")
+        if image.mode not in PIL_MODES:
+            raise ValueError(f"Unsupported PNG (mode {image.mode})")
+        pixels = np.asarray(image)
+    return pixels.reshape(image.height, image.width, PIL_MODES[image.mode])
+
+
+def _unfilter_scalar(ftype, line, prior, bpp):
+    """Average (3) or Paeth (4) filtered row, on Python ints
+
+    Both depend on the reconstructed left byte, so they cannot be
+    vectorised along the row; plain bytearray indexing is far cheaper
+    than NumPy calls on 1-pixel slices.
+    """
+    row = bytearray(line)
+    up = bytes(prior)
+    if ftype == 3:
+        for i in range(bpp):
+            row[i] = (row[i] + (up[i] >> 1)) & 0xFF
+        for i in range(bpp, len(row)):
+            row[i] = (row[i] + ((row[i - bpp] + up[i]) >> 1)) & 0xFF
+        return row
+    for i in range(bpp):
+        # left and upper-left are 0, so Paeth picks the byte above
+        row[i] = (row[i] + up[i]) & 0xFF
+    for i in range(bpp, len(row)):
+        a, b, c = row[i - bpp], up[i], up[i - bpp]
+        pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+        if pa <= pb and pa <= pc:
+            pred = a
+        elif pb <= pc:
+            pred = b
+        else:
+            pred = c
+        row[i] = (row[i] + pred) & 0xFF
+    return row
+
+
+def _decode_png(data):
+    """Pure Python/NumPy PNG decoder used when Pillow is not installed"""
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file")
+    pos, idat, header = 8, [], None
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos : pos + 8])
+        body = data[pos + 8 : pos + 8 + length]
+        if tag == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif tag == b"IDAT":
+            idat.append(body)
+        elif tag == b"IEND":
+            break
+        pos += 12 + length
+    width, height, depth, color, _, _, interlace = header
+    if depth != 8 or interlace or color not in PNG_CHANNELS:
+        raise ValueError(f"Unsupported PNG (bit depth {depth}, colour type {color}, interlace {interlace})")
+    bpp = PNG_CHANNELS[color]
+    stride = width * bpp
+    raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8).reshape(height, stride + 1)
+    out = np.zeros((height, stride), dtype=np.uint8)
+    prior = np.zeros(stride, dtype=np.uint8)
+    for r in range(height):
+        ftype, line = raw[r, 0], raw[r, 1:]
+        if ftype == 0:
+            row = line.copy()
+        elif ftype == 1:
+            row = (np.cumsum(line.reshape(width, bpp), axis=0, dtype=np.int64) % 256).astype(np.uint8).ravel()
+        elif ftype == 2:
+            row = line + prior
+        else:
+            row = np.frombuffer(_unfilter_scalar(ftype, line.tobytes(), prior.tobytes(), bpp), dtype=np.uint8)
+        out[r] = row
+        prior = out[r]
+    return out.reshape(height, width, bpp)
+
+
+def terrarium_to_elevation(rgb):
+    """Elevation in metres (float32) from Terrarium-encoded RGB"""
+    rgb = rgb.astype(np.float32)
+    return rgb[..., 0] * 256.0 + rgb[..., 1] + rgb[..., 2] / 256.0 - 32768.0
+
+
+def elevation_to_terrarium(elevation):
+    """Terrarium RGB (uint8) for elevations in metres"""
+    v = np.clip(np.asarray(elevation, dtype=np.float64) + 32768.0, 0, 65535.996)
+    r = np.floor(v / 256.0)
+    g = np.floor(v - r * 256.0)
+    b = np.floor((v - r * 256.0 - g) * 256.0)
+    return np.stack([r, g, b], axis=-1).astype(np.uint8)
+
+
+def global_pixels(lon, lat, zoom):
+    """Fractional global pixel (x, y) of lon/lat at a zoom level"""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    xy = lonlat_to_mercator(np.stack([np.asarray(lon, dtype=np.float64), lat], axis=-1))
+    half = math.pi * WEB_MERCATOR_RADIUS
+    world = float(TILE_SIZE << zoom)
+    return (xy[..., 0] + half) / (2 * half) * world, (half - xy[..., 1]) / (2 * half) * world
+
+
+def pixel_bounds(px0, py0, px1, py1, zoom):
+    """Web Mercator (min_x, min_y, max_x, max_y) of a global pixel window"""
+    half = math.pi * WEB_MERCATOR_RADIUS
+    size = 2 * half / (TILE_SIZE << zoom)
+    return (px0 * size - half, half - py1 * size, px1 * size - half, half - py0 * size)
+
+
+def _pixel_window(bbox, zoom):
+    """Global pixel window [px0, px1) x [py0, py1) covering a lon/lat bbox"""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    x, y = global_pixels([min_lon, max_lon], [max_lat, min_lat], zoom)
+    limit = TILE_SIZE << zoom
+    px0, py0 = max(int(math.floor(x[0])), 0), max(int(math.floor(y[0])), 0)
+    px1, py1 = min(int(math.ceil(x[1])), limit), min(int(math.ceil(y[1])), limit)
+    return px0, py0, max(px1, px0 + 1), max(py1, py0 + 1)
+
+
+def tiles_for_bbox(bbox, zoom):
+    """(z, x, y) of every tile overlapping a lon/lat bbox"""
+    px0, py0, px1, py1 = _pixel_window(bbox, zoom)
+    return [
+        (zoom, x, y)
+        for x in range(px0 // TILE_SIZE, (px1 - 1) // TILE_SIZE + 1)
+        for y in range(py0 // TILE_SIZE, (py1 - 1) // TILE_SIZE + 1)
+    ]
+
+
+class DemCache:
+    """Elevation tiles on disk as memory-mapped float32 arrays keyed by (z, x, y)"""
+
+    def __init__(self, root=DEM_CACHE_DIR, source="terrarium", url=TERRARIUM_URL, offline=False, timeout=30):
+        self.root = Path(root) / source
+        self.url = url
+        self.offline = offline
+        self.timeout = timeout
+        self.stats = {"hits": 0, "fetched": 0, "seeded": 0, "bytes_read": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key, n=1):
+        # fetch() and tile() run in worker threads
+        with self._lock:
+            self.stats[key] += n
+
+    def tile_path(self, z, x, y):
+        return self.root / str(z) / str(x) / f"{y}.npy"
+
+    def has_tile(self, z, x, y):
+        return self.tile_path(z, x, y).exists()
+
+    def put_tile(self, z, x, y, elevation):
+        """Store a (256, 256) elevation tile atomically"""
+        elevation = np.asarray(elevation, dtype=np.float32)
+        if elevation.shape != (TILE_SIZE, TILE_SIZE):
+            raise ValueError(f"Tile must be {TILE_SIZE}x{TILE_SIZE}, got {elevation.shape}")
+        path = self.tile_path(z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".npy")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, elevation)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+    def fetch(self, z, x, y):
+        """Download and store one tile; returns its path"""
+        if self.offline:
+            raise FileNotFoundError(f"Elevation tile {z}/{x}/{y} is not cached and the cache is offline")
+        url = self.url.format(z=z, x=x, y=y)
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            data = response.read()
+        path = self.put_tile(z, x, y, terrarium_to_elevation(decode_png(data)[..., :3]))
+        self._count("fetched")
+        return path
+
+    def ensure(self, tiles, workers=DEFAULT_FETCH_WORKERS):
+        """Fetch the tiles that are not cached yet (downloads run in threads)"""
+        missing = [t for t in tiles if not self.has_tile(*t)]
+        if missing and self.offline:
+            raise FileNotFoundError(
+                f"{len(missing)} elevation tiles are not cached (first: {'/'.join(map(str, missing[0]))}); "
+                "seed the cache or run once with network access"
+            )
+        if len(missing) <= 1 or workers == 1:
+            for tile in missing:
+                self.fetch(*tile)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+                list(pool.map(lambda t: self.fetch(*t), missing))
+        return missing
+
+    def tile(self, z, x, y):
+        """Memory-mapped (256, 256) float32 elevation tile, fetched if missing"""
+        path = self.tile_path(z, x, y)
+        if not path.exists():
+            self.fetch(z, x, y)
+        else:
+            self._count("hits")
+        return np.load(path, mmap_mode="r")
+
+    def mosaic(self, bbox, zoom, workers=DEFAULT_FETCH_WORKERS):
+        """Elevation over a lon/lat bbox on the zoom level's pixel grid
+
+        Returns {"elevation", "bounds" (Web Mercator), "bbox", "zoom", "tiles"}.
+        Only the overlapping window of each tile is read.
+        """
+        tiles = tiles_for_bbox(bbox, zoom)
+        self.ensure(tiles, workers)
+        px0, py0, px1, py1 = _pixel_window(bbox, zoom)
+        out = np.empty((py1 - py0, px1 - px0), dtype=np.float32)
+        for z, x, y in tiles:
+            tx0, ty0 = x * TILE_SIZE, y * TILE_SIZE
+            c0, c1 = max(px0, tx0), min(px1, tx0 + TILE_SIZE)
+            r0, r1 = max(py0, ty0), min(py1, ty0 + TILE_SIZE)
+            window = self.tile(z, x, y)[r0 - ty0 : r1 - ty0, c0 - tx0 : c1 - tx0]
+            out[r0 - py0 : r1 - py0, c0 - px0 : c1 - px0] = window
+            self._count("bytes_read", window.nbytes)
+        return {
+            "elevation": out,
+            "bounds": pixel_bounds(px0, py0, px1, py1, zoom),
+            "bbox": tuple(bbox),
+            "zoom": zoom,
+            "tiles": len(tiles),
+        }
+
+    def seed_tiles(self, directory, zoom=None, overwrite=False):
+        """Import a local z/x/y Terrarium tile folder (.png or .npy); returns the count"""
+        directory = Path(directory)
+        count = 0
+        for path in sorted(directory.glob("*/*/*")):
+            if path.suffix.lower() not in (".png", ".npy"):
+                continue
+            try:
+                z, x, y = int(path.parent.parent.name), int(path.parent.name), int(path.stem)
+            except ValueError:
+                continue
+            if (zoom is not None and z != zoom) or (self.has_tile(z, x, y) and not overwrite):
+                continue
+            if path.suffix.lower() == ".png":
+                elevation = terrarium_to_elevation(decode_png(path.read_bytes())[..., :3])
+            else:
+                elevation = np.load(path)
+            self.put_tile(z, x, y, elevation)
+            count += 1
+        self._count("seeded", count)
+        return count
+
+    def seed_grid(self, grid, bbox, zoom, overwrite=False):
+        """Resample a north-up lon/lat grid covering ``bbox`` into tiles at a zoom
+
+        Pixels outside the grid stay NaN, or keep the values of an existing
+        tile unless ``overwrite``. Returns the number of tiles written.
+        """
+        grid = np.asarray(grid, dtype=np.float64)
+        min_lon, min_lat, max_lon, max_lat = bbox
+        rows, cols = grid.shape
+        half = math.pi * WEB_MERCATOR_RADIUS
+        count = 0
+        for z, x, y in tiles_for_bbox(bbox, zoom):
+            # Pixel centres of the tile in lon/lat
+            size = 2 * half / (TILE_SIZE << zoom)
+            mx = ((x * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) * size) - half
+            my = half - ((y * TILE_SIZE + np.arange(TILE_SIZE) + 0.5) * size)
+            lon = np.degrees(mx / WEB_MERCATOR_RADIUS)
+            lat = np.degrees(2.0 * np.arctan(np.exp(my / WEB_MERCATOR_RADIUS)) - np.pi / 2.0)
+            # Fractional grid coordinates of the pixel centres (cell centres at +0.5)
+            fc = (lon - min_lon) / (max_lon - min_lon) * cols - 0.5
+            fr = (max_lat - lat) / (max_lat - min_lat) * rows - 0.5
+            c0 = np.clip(np.floor(fc).astype(np.int64), 0, cols - 1)
+            r0 = np.clip(np.floor(fr).astype(np.int64), 0, rows - 1)
+            c1, r1 = np.minimum(c0 + 1, cols - 1), np.minimum(r0 + 1, rows - 1)
+            tc = np.clip(fc - c0, 0.0, 1.0)[None, :]
+            tr = np.clip(fr - r0, 0.0, 1.0)[:, None]
+            top = grid[r0][:, c0] * (1 - tc) + grid[r0][:, c1] * tc
+            bottom = grid[r1][:, c0] * (1 - tc) + grid[r1][:, c1] * tc
+            tile = top * (1 - tr) + bottom * tr
+            inside = ((fr >= -0.5) & (fr <= rows - 0.5))[:, None] & ((fc >= -0.5) & (fc <= cols - 0.5))[None, :]
+            tile = np.where(inside, tile, np.nan)
+            if self.has_tile(z, x, y) and not overwrite:
+                existing = np.load(self.tile_path(z, x, y))
+                tile = np.where(np.isnan(existing), tile, existing)
+            self.put_tile(z, x, y, tile)
+            count += 1
+        self._count("seeded", count)
+        return count
+
+    def seed_file(self, path, zoom, overwrite=False):
+        """Seed from a tile folder, an ESRI ASCII grid (.asc) or a GeoTIFF"""
+        path = Path(path)
+        if path.is_dir():
+            return self.seed_tiles(path, zoom, overwrite)
+        if path.suffix.lower() == ".asc":
+            grid, bbox = read_ascii_grid(path)
+        elif path.suffix.lower() in (".tif", ".tiff"):
+            grid, bbox = read_geotiff(path)
+        else:
+            raise ValueError(f"Unsupported elevation source: {path}")
+        return self.seed_grid(grid, bbox, zoom, overwrite)
+
+
+def read_ascii_grid(path):
+    """(grid, bbox) of an ESRI ASCII grid in lon/lat; NODATA becomes NaN"""
+    header = {}
+    with open(path, encoding="ascii") as f:
+        # NODATA_value (and xll/yll corner vs centre) vary; read keyword lines until the data starts
+        line = f.readline()
+        while line.split() and line.split()[0].lower() in ASCII_GRID_KEYS:
+            key, value = line.split()[:2]
+            header[key.lower()] = float(value)
+            line = f.readline()
+        grid = np.loadtxt(itertools.chain([line], f), dtype=np.float64, ndmin=2)
+    cols, rows, cell = int(header["ncols"]), int(header["nrows"]), header["cellsize"]
+    x0 = header.get("xllcorner", header.get("xllcenter", 0.0) - cell / 2)
+    y0 = header.get("yllcorner", header.get("yllcenter", 0.0) - cell / 2)
+    if "nodata_value" in header:
+        grid[grid == header["nodata_value"]] = np.nan
+    return grid.reshape(rows, cols), (x0, y0, x0 + cols * cell, y0 + rows * cell)
+
+
+def read_geotiff(path):
+    """(grid, bbox) of a north-up lon/lat GeoTIFF; needs rasterio"""
+    try:
+        import rasterio
+    except ImportError as e:
+        raise ImportError("Reading GeoTIFFs needs rasterio (pip install rasterio)") from e
+    with rasterio.open(path) as src:
+        grid = src.read(1, masked=True).astype(np.float64).filled(np.nan)
+        b = src.bounds
+        return grid, (b.left, b.bottom, b.right, b.top)
+
+
+def write_envi(path, mosaic, nodata=ENVI_NODATA):
+    """Write a mosaic as an ENVI raw float32 raster (.bin + .hdr) for terra/GDAL"""
+    path = Path(path).with_suffix(".bin")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    elevation = np.where(np.isnan(mosaic["elevation"]), nodata, mosaic["elevation"]).astype("<f4")
+    rows, cols = elevation.shape
+    min_x, min_y, max_x, max_y = mosaic["bounds"]
+    header = "\n".join(
+        [
+            "ENVI",
+            f"samples = {cols}",
+            f"lines = {rows}",
+            "bands = 1",
+            "header offset = 0",
+            "file type = ENVI Standard",
+            "data type = 4",
+            "interleave = bsq",
+            "byte order = 0",
+            f"map info = {{Pseudo Mercator, 1, 1, {min_x!r}, {max_y!r}, "
+            f"{(max_x - min_x) / cols!r}, {(max_y - min_y) / rows!r}, units=Meters}}",
+            f"coordinate system string = {{{PSEUDO_MERCATOR_WKT}}}",
+            f"data ignore value = {nodata:g}",
+            "band names = {elevation}",
+            "",
+        ]
+    )
+    tmp = path.with_name(f".{path.name}.tmp")
+    elevation.tofile(tmp)
+    os.replace(tmp, path)
+    path.with_suffix(".hdr").write_text(header, encoding="ascii")
+    return path
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Offline elevation tile cache")
+    parser.add_argument("--root", default=DEM_CACHE_DIR)
+    parser.add_argument("--offline", action="store_true", help="never download; fail on missing tiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    mosaic_cmd = sub.add_parser("mosaic", help="assemble (and cache) the DEM for a bbox")
+    mosaic_cmd.add_argument(
+        "--bbox", type=float, nargs=4, required=True,
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+    )
+    mosaic_cmd.add_argument("--zoom", type=int, default=8)
+    mosaic_cmd.add_argument("--out", default=None, help="ENVI .bin output for terra")
+    seed_cmd = sub.add_parser("seed", help="import local tiles or grids")
+    seed_cmd.add_argument("path")
+    seed_cmd.add_argument("--zoom", type=int, default=8)
+    seed_cmd.add_argument("--overwrite", action="store_true")
+    sub.add_parser("info", help="list cached tiles per zoom")
+    args = parser.parse_args(argv)
+
+    cache = DemCache(args.root, offline=args.offline)
+    start = time.perf_counter()
+    try:
+        if args.command == "mosaic":
+            mosaic = cache.mosaic(args.bbox, args.zoom)
+            rows, cols = mosaic["elevation"].shape
+            print(f"Mosaic {rows}x{cols} from {mosaic['tiles']} tiles at z{args.zoom} "
+                  f"({cache.stats['fetched']} downloaded, {cache.stats['hits']} cached)")
+            if args.out:
+                print(f"Saved: {write_envi(args.out, mosaic)}")
+        elif args.command == "seed":
+            count = cache.seed_file(args.path, args.zoom, args.overwrite)
+            print(f"Seeded {count} tiles into {cache.root}")
+        else:
+            counts = {}
+            for path in cache.root.glob("*/*/*.npy"):
+                counts[path.parent.parent.name] = counts.get(path.parent.parent.name, 0) + 1
+            print(json.dumps({f"z{z}": n for z, n in sorted(counts.items(), key=lambda kv: int(kv[0]))}, indent=2))
+    except (FileNotFoundError, ValueError, ImportError, urllib.error.URLError) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
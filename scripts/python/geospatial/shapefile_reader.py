@@ -0,0 +1,458 @@
+"""
+ORAIL CITIZEN AI - Shapefile Reader
+Geospatial Poverty Mapping Framework
+
+Lightweight ESRI shapefile reader for the Datasource India boundary layers,
+without fiona/GDAL. The .shp is memory-mapped and the .shx offsets give
+random access to any record, so one state's polygon is decoded straight from
+the mapped bytes as NumPy views. Per-record bounding boxes for the whole
+layer are gathered in one vectorised read. Attributes are read from the .dbf
+record by record (streamed or by index).
+
+The India layers are stored in Web Mercator (EPSG:3857, see the .prj);
+pass ``lonlat=True`` to get longitude/latitude degrees instead.
+
+A small polygon writer is included for derived layers (simplified
+boundaries, synthetic test layers).
+
+Usage:
+    with Shapefile(INDIA_STATE_BOUNDARY) as states:
+        kerala = states.find("State_Name", "Kerala")
+        rings = states.rings(kerala, lonlat=True)
+
+    python -m scripts.python.geospatial.shapefile_reader <layer.shp> --record 0
+"""
+
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+DATASOURCE_DIR = os.path.join(
+    "Datasource",
+    "India-State-and-Country-Shapefile-Updated-Jan-2020-master",
+    "India-State-and-Country-Shapefile-Updated-Jan-2020-master",
+)
+INDIA_STATE_BOUNDARY = os.path.join(DATASOURCE_DIR, "India_State_Boundary.shp")
+INDIA_COUNTRY_BOUNDARY = os.path.join(DATASOURCE_DIR, "India_Country_Boundary.shp")
+
+SHAPE_NULL = 0
+SHAPE_POINT = 1
+SHAPE_POLYLINE = 3
+SHAPE_POLYGON = 5
+SHAPE_MULTIPOINT = 8
+
+# Z and M variants share the XY layout of their base type
+BASE_SHAPE_TYPE = {
+    0: 0, 1: 1, 3: 3, 5: 5, 8: 8,
+    11: 1, 13: 3, 15: 5, 18: 8,
+    21: 1, 23: 3, 25: 5, 28: 8,
+}
+
+WEB_MERCATOR_RADIUS = 6378137.0
+HEADER_SIZE = 100
+
+
+def mercator_to_lonlat(xy):
+    """Convert Web Mercator metres (N, 2) to longitude/latitude degrees"""
+    xy = np.asarray(xy, dtype=np.float64)
+    lon = np.degrees(xy[..., 0] / WEB_MERCATOR_RADIUS)
+    lat = np.degrees(2.0 * np.arctan(np.exp(xy[..., 1] / WEB_MERCATOR_RADIUS)) - np.pi / 2.0)
+    return np.stack([lon, lat], axis=-1)
+
+
+def lonlat_to_mercator(lonlat):
+    """Convert longitude/latitude degrees (N, 2) to Web Mercator metres"""
+    lonlat = np.asarray(lonlat, dtype=np.float64)
+    x = np.radians(lonlat[..., 0]) * WEB_MERCATOR_RADIUS
+    y = np.log(np.tan(np.pi / 4.0 + np.radians(lonlat[..., 1]) / 2.0)) * WEB_MERCATOR_RADIUS
+    return np.stack([x, y], axis=-1)
+
+
+def _sibling(path, suffix):
+    path = Path(path)
+    stem = path.with_suffix("") if path.suffix.lower() in (".shp", ".shx", ".dbf") else path
+    for candidate in (stem.with_suffix(suffix), stem.with_suffix(suffix.upper())):
+        if candidate.exists():
+            return candidate
+    return stem.with_suffix(suffix)
+
+
+def _map_file(path):
+    """Read-only memory map of a whole file (None for an empty file)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class DbfReader:
+    """dBASE III attribute table reader with random access and streaming"""
+
+    def __init__(self, path, encoding=None):
+        self.path = Path(path)
+        if encoding is None:
+            cpg = self.path.with_suffix(".cpg")
+            encoding = cpg.read_text().strip() if cpg.exists() else "latin-1"
+        self.encoding = encoding
+        self._mm = _map_file(self.path)
+        n_records, header_len, record_len = struct.unpack("<IHH", self._mm[4:12])
+        self.n_records = n_records
+        self.header_len = header_len
+        self.record_len = record_len
+
+        self.fields = []
+        pos, offset = 32, 1  # each record starts with a deletion flag byte
+        while self._mm[pos] != 0x0D and pos < header_len:
+            raw = self._mm[pos : pos + 32]
+            name = raw[:11].split(b"\0", 1)[0].decode("ascii", "replace")
+            ftype = chr(raw[11])
+            size, decimals = raw[16], raw[17]
+            self.fields.append((name, ftype, offset, size, decimals))
+            offset += size
+            pos += 32
+        self.field_names = [f[0] for f in self.fields]
+
+    def __len__(self):
+        return self.n_records
+
+    def _decode(self, ftype, raw, decimals):
+        if ftype == "C":
+            return raw.decode(self.encoding, "replace").rstrip(" \0")
+        text = raw.decode("ascii", "replace").strip(" \0")
+        if ftype in "NF":
+            if not text or set(text) <= {"*", "?"}:
+                return None
+            value = float(text)
+            return int(value) if ftype == "N" and decimals == 0 else value
+        if ftype == "L":
+            return {"T": True, "Y": True, "F": False, "N": False}.get(text.upper()[:1])
+        if ftype == "D":
+            try:
+                return datetime.date(int(text[:4]), int(text[4:6]), int(text[6:8]))
+            except ValueError:
+                return None
+        return text
+
+    def record(self, i):
+        """Attributes of record i as a dict, or None if the record is deleted"""
+        if not 0 <= i < self.n_records:
+            raise IndexError(f"Record {i} out of range (0..{self.n_records - 1})")
+        start = self.header_len + i * self.record_len
+        raw = self._mm[start : start + self.record_len]
+        if raw[:1] == b"*":
+            return None
+        return {
+            name: self._decode(ftype, raw[offset : offset + size], decimals)
+            for name, ftype, offset, size, decimals in self.fields
+        }
+
+    def iter_records(self):
+        """Stream (index, attributes) for every record that is not deleted"""
+        for i in range(self.n_records):
+            record = self.record(i)
+            if record is not None:
+                yield i, record
+
+    def column(self, name):
+        """All values of one field as a list"""
+        for field, ftype, offset, size, decimals in self.fields:
+            if field == name:
+                values = []
+                for i in range(self.n_records):
+                    start = self.header_len + i * self.record_len + offset
+                    values.append(self._decode(ftype, self._mm[start : start + size], decimals))
+                return values
+        raise KeyError(f"Unknown field '{name}'")
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+class Shapefile:
+    """Memory-mapped shapefile (.shp + .shx, with .dbf/.prj when present)"""
+
+    def __init__(self, path):
+        self.shp_path = _sibling(path, ".shp")
+        self.shx_path = _sibling(path, ".shx")
+        self.dbf_path = _sibling(path, ".dbf")
+        self.prj_path = _sibling(path, ".prj")
+
+        # The .shx alone gives the record count, offsets and layer extent
+        shx = np.fromfile(self.shx_path, dtype=np.uint8)
+        self.shape_type, self.bbox = self._parse_header(shx[:HEADER_SIZE].tobytes())
+        index = shx[HEADER_SIZE:].view(">i4").reshape(-1, 2).astype(np.int64)
+        self.offsets = index[:, 0] * 2  # bytes, pointing at the record header
+        self.lengths = index[:, 1] * 2  # bytes of record content
+
+        self.crs_wkt = self.prj_path.read_text().strip() if self.prj_path.exists() else None
+        self.dbf = DbfReader(self.dbf_path) if self.dbf_path.exists() else None
+        self._mm = None
+        self._bboxes = None
+
+    @staticmethod
+    def _parse_header(header):
+        file_code = struct.unpack(">i", header[:4])[0]
+        if file_code != 9994:
+            raise ValueError(f"Not a shapefile (file code {file_code})")
+        shape_type = struct.unpack("<i", header[32:36])[0]
+        xmin, ymin, xmax, ymax = struct.unpack("<4d", header[36:68])
+        return shape_type, (xmin, ymin, xmax, ymax)
+
+    @property
+    def is_web_mercator(self):
+        wkt = (self.crs_wkt or "").lower()
+        return "web_mercator" in wkt or "pseudo-mercator" in wkt or "3857" in wkt
+
+    @property
+    def mm(self):
+        """Memory map of the .shp, opened on first use"""
+        if self._mm is None:
+            if not self.shp_path.exists():
+                raise FileNotFoundError(
+                    f"Shape geometry file is missing: {self.shp_path} "
+                    "(the .shx/.dbf are present; fetch the full layer)"
+                )
+            self._mm = _map_file(self.shp_path)
+        return self._mm
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Release the memory maps"""
+        self._bboxes = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # shape views are still alive; the map closes when they go
+            self._mm = None
+        if self.dbf is not None:
+            self.dbf.close()
+
+    def _check_index(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(f"Record {i} out of range (0..{len(self) - 1})")
+
+    def _lonlat_bbox(self, bbox):
+        corners = mercator_to_lonlat(np.asarray(bbox, dtype=np.float64).reshape(-1, 2))
+        return corners.reshape(np.shape(bbox))
+
+    def bboxes(self, lonlat=False):
+        """(n, 4) array of per-record (xmin, ymin, xmax, ymax)
+
+        Gathered in one vectorised read from the record headers; point and
+        null records get NaN boxes.
+        """
+        if self._bboxes is None:
+            n = len(self)
+            buf = np.frombuffer(self.mm, dtype=np.uint8)
+            content = self.offsets + 8
+            types = buf[content[:, None] + np.arange(4)].copy().view("<i4").ravel()
+            has_box = np.isin(types, [t for t, base in BASE_SHAPE_TYPE.items() if base > 1])
+            boxes = np.full((n, 4), np.nan)
+            if has_box.any():
+                idx = content[has_box][:, None] + 4 + np.arange(32)
+                boxes[has_box] = buf[idx].copy().view("<f8").reshape(-1, 4)
+            self._bboxes = boxes
+        if lonlat:
+            return self._lonlat_bbox(self._bboxes)
+        return self._bboxes
+
+    def shape(self, i, lonlat=False):
+        """Decode record i: {'shape_type', 'bbox', 'parts', 'points'}
+
+        ``points`` is an (N, 2) float64 view on the mapped file (a converted
+        copy with ``lonlat=True``); ``parts`` holds the start index of each
+        ring or line.
+        """
+        self._check_index(i)
+        start = int(self.offsets[i]) + 8
+        shape_type = struct.unpack_from("<i", self.mm, start)[0]
+        base = BASE_SHAPE_TYPE.get(shape_type)
+        if base is None:
+            raise ValueError(f"Unsupported shape type {shape_type} in record {i}")
+
+        if base == SHAPE_NULL:
+            parts, points, bbox = np.zeros(0, np.int32), np.zeros((0, 2)), None
+        elif base == SHAPE_POINT:
+            points = np.frombuffer(self.mm, "<f8", 2, start + 4).reshape(1, 2)
+            parts, bbox = np.zeros(1, np.int32), (points[0, 0], points[0, 1]) * 2
+        elif base == SHAPE_MULTIPOINT:
+            bbox = struct.unpack_from("<4d", self.mm, start + 4)
+            n_points = struct.unpack_from("<i", self.mm, start + 36)[0]
+            points = np.frombuffer(self.mm, "<f8", 2 * n_points, start + 40).reshape(-1, 2)
+            parts = np.zeros(1, np.int32)
+        else:
+            bbox = struct.unpack_from("<4d", self.mm, start + 4)
+            n_parts, n_points = struct.unpack_from("<2i", self.mm, start + 36)
+            parts = np.frombuffer(self.mm, "<i4", n_parts, start + 44)
+            points = np.frombuffer(
+                self.mm, "<f8", 2 * n_points, start + 44 + 4 * n_parts
+            ).reshape(-1, 2)
+
+        if lonlat and len(points):
+            points = mercator_to_lonlat(points)
+            bbox = tuple(self._lonlat_bbox(bbox))
+        return {"shape_type": base, "bbox": bbox, "parts": parts, "points": points}
+
+    def rings(self, i, lonlat=False):
+        """List of (N, 2) arrays, one per ring/part of record i"""
+        shape = self.shape(i, lonlat=lonlat)
+        bounds = list(shape["parts"]) + [len(shape["points"])]
+        return [shape["points"][a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def iter_shapes(self, lonlat=False):
+        """Stream decoded shapes in record order"""
+        for i in range(len(self)):
+            yield self.shape(i, lonlat=lonlat)
+
+    def record(self, i):
+        """DBF attributes of record i"""
+        self._check_index(i)
+        if self.dbf is None:
+            raise FileNotFoundError(f"No attribute table: {self.dbf_path}")
+        return self.dbf.record(i)
+
+    def find(self, field, value):
+        """Index of the first record whose attribute equals value"""
+        if self.dbf is None:
+            raise FileNotFoundError(f"No attribute table: {self.dbf_path}")
+        for i, record in self.dbf.iter_records():
+            if record.get(field) == value:
+                return i
+        raise KeyError(f"No record with {field} == {value!r}")
+
+
+def write_polygons(path, polygons, records=None, fields=None, prj_wkt=None):
+    """Write a polygon shapefile (.shp, .shx, .dbf, optional .prj)
+
+    ``polygons`` is a list of ring lists, each ring an (N, 2) array of x/y.
+    ``fields`` is a list of (name, 'C'|'N'|'F', size, decimals) and
+    ``records`` a list of dicts with those keys.
+    """
+    path = Path(path).with_suffix("")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fields = list(fields or [])
+    records = list(records or [{} for _ in polygons])
+    if len(records) != len(polygons):
+        raise ValueError("polygons and records must have the same length")
+
+    contents = []
+    for rings in polygons:
+        rings = [np.asarray(r, dtype="<f8").reshape(-1, 2) for r in rings]
+        points = np.concatenate(rings) if rings else np.zeros((0, 2))
+        parts = np.cumsum([0] + [len(r) for r in rings[:-1]]).astype("<i4")
+        bbox = (
+            (*points.min(axis=0), *points.max(axis=0)) if len(points) else (0.0,) * 4
+        )
+        contents.append(
+            struct.pack("<i4d2i", SHAPE_POLYGON, *bbox, len(rings), len(points))
+            + parts.tobytes()
+            + points.astype("<f8").tobytes()
+        )
+
+    all_points = [np.asarray(r).reshape(-1, 2) for rings in polygons for r in rings]
+    if all_points:
+        stacked = np.concatenate(all_points)
+        extent = (*stacked.min(axis=0), *stacked.max(axis=0))
+    else:
+        extent = (0.0,) * 4
+
+    def header(length_bytes):
+        return (
+            struct.pack(">7i", 9994, 0, 0, 0, 0, 0, length_bytes // 2)
+            + struct.pack("<2i", 1000, SHAPE_POLYGON)
+            + struct.pack("<4d", *extent)
+            + struct.pack("<4d", 0, 0, 0, 0)
+        )
+
+    shp_len = HEADER_SIZE + sum(8 + len(c) for c in contents)
+    with open(path.with_suffix(".shp"), "wb") as shp, open(path.with_suffix(".shx"), "wb") as shx:
+        shp.write(header(shp_len))
+        shx.write(header(HEADER_SIZE + 8 * len(contents)))
+        offset = HEADER_SIZE
+        for number, content in enumerate(contents, start=1):
+            shp.write(struct.pack(">2i", number, len(content) // 2) + content)
+            shx.write(struct.pack(">2i", offset // 2, len(content) // 2))
+            offset += 8 + len(content)
+
+    record_len = 1 + sum(size for _, _, size, _ in fields)
+    header_len = 32 + 32 * len(fields) + 1
+    today = datetime.date.today()
+    with open(path.with_suffix(".dbf"), "wb") as dbf:
+        dbf.write(
+            struct.pack(
+                "<4BIHH20x",
+                3, today.year - 1900, today.month, today.day,
+                len(records), header_len, record_len,
+            )
+        )
+        for name, ftype, size, decimals in fields:
+            dbf.write(
+                struct.pack("<11sc4xBB14x", name.encode("ascii")[:11], ftype.encode(), size, decimals)
+            )
+        dbf.write(b"\r")
+        for record in records:
+            row = b" "
+            for name, ftype, size, decimals in fields:
+                value = record.get(name)
+                if value is None:
+                    text = ""
+                elif ftype in "NF":
+                    text = f"{value:.{decimals}f}" if decimals else str(int(value))
+                    text = text.rjust(size)
+                else:
+                    text = str(value)
+                row += text.encode("utf-8")[:size].ljust(size)
+            dbf.write(row)
+        dbf.write(b"\x1a")
+    path.with_suffix(".cpg").write_text("UTF-8")
+    if prj_wkt:
+        path.with_suffix(".prj").write_text(prj_wkt)
+    return path.with_suffix(".shp")
+
+
+def main(argv=None):
+    """Describe a shapefile layer and optionally one record"""
+    parser = argparse.ArgumentParser(description="Inspect a shapefile")
+    parser.add_argument("path", nargs="?", default=INDIA_STATE_BOUNDARY)
+    parser.add_argument("--record", type=int, default=None)
+    parser.add_argument("--lonlat", action="store_true")
+    args = parser.parse_args(argv)
+
+    with Shapefile(args.path) as layer:
+        print(f"Layer: {layer.shp_path}")
+        print(f"Records: {len(layer)}  shape type: {layer.shape_type}")
+        print(f"Extent: {layer.bbox}")
+        print(f"Web Mercator: {layer.is_web_mercator}")
+        if layer.dbf is not None:
+            print(f"Fields: {', '.join(layer.dbf.field_names)}")
+        if args.record is not None:
+            print(f"Attributes: {layer.record(args.record)}")
+            try:
+                shape = layer.shape(args.record, lonlat=args.lonlat)
+            except FileNotFoundError as e:
+                print(f"Error: {e}")
+                return 1
+            print(f"Parts: {len(shape['parts'])}  points: {len(shape['points'])}")
+            print(f"Bounding box: {shape['bbox']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
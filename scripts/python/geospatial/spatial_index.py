@@ -0,0 +1,218 @@
+"""
+ORAIL CITIZEN AI - Spatial Index
+Geospatial Poverty Mapping Framework
+
+Uniform grid index over point latitude/longitude for bounding-box, haversine
+radius and k-nearest-neighbour queries. The build is fully vectorised: every
+point gets an integer cell id, points are sorted by cell, and a CSR-style
+offsets array gives each cell's slice of the sorted order. Because cell ids
+are row-major, the cells of one grid row within a query box form a single
+contiguous slice, so a box query is one slice per grid row followed by an
+exact coordinate filter.
+
+The index saves to a directory of .npy files that load memory-mapped, so a
+dashboard process can reuse an index built once by a batch job.
+
+Usage:
+    index = SpatialIndex.build(store.column("latitude"), store.column("longitude"))
+    rows = index.query_radius(14.6, 120.98, 10_000)     # within 10 km
+    index.save("data/cache/spatial_index")
+    index = SpatialIndex.load("data/cache/spatial_index")
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_008.8
+TARGET_POINTS_PER_CELL = 16
+MAX_GRID_CELLS = 1 << 24
+INDEX_VERSION = 1
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres (vectorised over NumPy arrays)"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def radius_bbox(lat, lon, radius_m):
+    """Bounding box (min_lon, min_lat, max_lon, max_lat) enclosing a circle"""
+    dlat = np.degrees(radius_m / EARTH_RADIUS_M)
+    max_abs_lat = min(abs(lat) + dlat, 90.0)
+    if max_abs_lat >= 90.0:
+        return -180.0, max(lat - dlat, -90.0), 180.0, min(lat + dlat, 90.0)
+    dlon = np.degrees(radius_m / (EARTH_RADIUS_M * np.cos(np.radians(max_abs_lat))))
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+class SpatialIndex:
+    """Grid index over (latitude, longitude) points"""
+
+    def __init__(self, meta, order, cell_start, lat_sorted, lon_sorted):
+        self.meta = meta
+        self.order = order
+        self.cell_start = cell_start
+        self.lat_sorted = lat_sorted
+        self.lon_sorted = lon_sorted
+        self.min_lat = meta["min_lat"]
+        self.min_lon = meta["min_lon"]
+        self.cell_deg = meta["cell_deg"]
+        self.n_rows = meta["n_rows"]
+        self.n_cols = meta["n_cols"]
+
+    def __len__(self):
+        return len(self.order)
+
+    @classmethod
+    def build(cls, lat, lon, cell_deg=None):
+        """Bulk-build an index from coordinate arrays"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        if lat.shape != lon.shape or lat.ndim != 1:
+            raise ValueError("lat and lon must be 1-D arrays of equal length")
+        n = len(lat)
+        if n == 0:
+            min_lat = min_lon = 0.0
+            span_lat = span_lon = 1.0
+        else:
+            min_lat, min_lon = float(lat.min()), float(lon.min())
+            span_lat = max(float(lat.max()) - min_lat, 1e-9)
+            span_lon = max(float(lon.max()) - min_lon, 1e-9)
+
+        if cell_deg is None:
+            target_cells = max(1, n // TARGET_POINTS_PER_CELL)
+            cell_deg = np.sqrt(span_lat * span_lon / target_cells)
+        cell_deg = max(float(cell_deg), np.sqrt(span_lat * span_lon / MAX_GRID_CELLS))
+        n_rows = int(span_lat // cell_deg) + 1
+        n_cols = int(span_lon // cell_deg) + 1
+
+        meta = {
+            "version": INDEX_VERSION,
+            "min_lat": min_lat,
+            "min_lon": min_lon,
+            "cell_deg": cell_deg,
+            "n_rows": n_rows,
+            "n_cols": n_cols,
+            "n_points": n,
+        }
+        rows = ((lat - min_lat) // cell_deg).astype(np.int64)
+        cols = ((lon - min_lon) // cell_deg).astype(np.int64)
+        cell_ids = rows * n_cols + cols
+
+        order = np.argsort(cell_ids, kind="stable")
+        order = order.astype(np.int32 if n < 2**31 else np.int64)
+        counts = np.bincount(cell_ids, minlength=n_rows * n_cols)
+        cell_start = np.zeros(n_rows * n_cols + 1, dtype=np.int64)
+        np.cumsum(counts, out=cell_start[1:])
+        return cls(meta, order, cell_start, lat[order], lon[order])
+
+    def _cell_range(self, min_lon, min_lat, max_lon, max_lat):
+        """Clipped grid (row0, row1, col0, col1), or None if outside the grid"""
+        r0 = int(np.floor((min_lat - self.min_lat) / self.cell_deg))
+        r1 = int(np.floor((max_lat - self.min_lat) / self.cell_deg))
+        c0 = int(np.floor((min_lon - self.min_lon) / self.cell_deg))
+        c1 = int(np.floor((max_lon - self.min_lon) / self.cell_deg))
+        if r1 < 0 or c1 < 0 or r0 >= self.n_rows or c0 >= self.n_cols:
+            return None
+        return (
+            max(r0, 0),
+            min(r1, self.n_rows - 1),
+            max(c0, 0),
+            min(c1, self.n_cols - 1),
+        )
+
+    def _candidates(self, min_lon, min_lat, max_lon, max_lat):
+        """Positions in sorted order of points in the cells covering a box"""
+        cell_range = self._cell_range(min_lon, min_lat, max_lon, max_lat)
+        if cell_range is None:
+            return np.empty(0, dtype=np.int64)
+        r0, r1, c0, c1 = cell_range
+        row_base = np.arange(r0, r1 + 1, dtype=np.int64) * self.n_cols
+        starts = self.cell_start[row_base + c0]
+        stops = self.cell_start[row_base + c1 + 1]
+        lengths = stops - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # Concatenate the per-row slices [start, stop) without a Python loop
+        out_start = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.repeat(starts - out_start, lengths)
+        return np.arange(total, dtype=np.int64) + offsets
+
+    def query_bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Row ids (ascending) of points inside a bounding box, edges included"""
+        pos = self._candidates(min_lon, min_lat, max_lon, max_lat)
+        lat = self.lat_sorted[pos]
+        lon = self.lon_sorted[pos]
+        keep = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        return np.sort(self.order[pos[keep]])
+
+    def query_radius(self, lat, lon, radius_m, return_distances=False):
+        """Row ids (ascending) of points within radius_m metres of (lat, lon)"""
+        pos = self._candidates(*radius_bbox(lat, lon, radius_m))
+        dist = haversine_m(lat, lon, self.lat_sorted[pos], self.lon_sorted[pos])
+        keep = dist <= radius_m
+        ids = self.order[pos[keep]]
+        sort = np.argsort(ids, kind="stable")
+        if return_distances:
+            return ids[sort], dist[keep][sort]
+        return ids[sort]
+
+    def query_knn(self, lat, lon, k):
+        """(row ids, distances in metres) of the k nearest points, nearest first"""
+        k = min(int(k), len(self))
+        if k <= 0:
+            return np.empty(0, dtype=self.order.dtype), np.empty(0)
+
+        # Grow a square window of cells around the query until it holds k points
+        row = int(np.clip((lat - self.min_lat) // self.cell_deg, 0, self.n_rows - 1))
+        col = int(np.clip((lon - self.min_lon) // self.cell_deg, 0, self.n_cols - 1))
+        ring = 1
+        while True:
+            half = ring * self.cell_deg
+            lat0 = self.min_lat + row * self.cell_deg
+            lon0 = self.min_lon + col * self.cell_deg
+            pos = self._candidates(lon0 - half, lat0 - half, lon0 + half, lat0 + half)
+            covers_grid = ring >= max(self.n_rows, self.n_cols)
+            if len(pos) >= k or covers_grid:
+                break
+            ring *= 2
+
+        # The k-th nearest candidate bounds the answer; one exact radius query
+        dist = haversine_m(lat, lon, self.lat_sorted[pos], self.lon_sorted[pos])
+        bound = np.partition(dist, k - 1)[k - 1]
+        ids, dist = self.query_radius(lat, lon, bound, return_distances=True)
+        nearest = np.lexsort((ids, dist))[:k]
+        return ids[nearest], dist[nearest]
+
+    def save(self, path):
+        """Save as a directory of .npy files plus index.json"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("order", "cell_start", "lat_sorted", "lon_sorted"):
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+        tmp = path / "index.json.tmp"
+        tmp.write_text(json.dumps(self.meta, indent=1), encoding="utf-8")
+        os.replace(tmp, path / "index.json")
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved index; arrays are memory-mapped by default"""
+        path = Path(path)
+        meta = json.loads((path / "index.json").read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version: {meta.get('version')}")
+        mode = "r" if mmap else None
+        arrays = [
+            np.load(path / f"{name}.npy", mmap_mode=mode)
+            for name in ("order", "cell_start", "lat_sorted", "lon_sorted")
+        ]
+        return cls(meta, *arrays)
@@ -0,0 +1,154 @@
+"""
+ORAIL CITIZEN AI - State Join Tests
+Geospatial Poverty Mapping Framework
+
+Checks the vectorised point-in-polygon join against a brute-force loop that
+ray-casts every point against every edge of every polygon.
+
+Usage:
+    python -m pytest scripts/python/geospatial/test_state_join.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from scripts.python.data_processing.poverty_store import PovertyStore, write_store
+from scripts.python.geospatial.state_join import (
+    NO_STATE,
+    PolygonLayer,
+    assign_states,
+    join_store,
+)
+
+
+def square(x0, y0, x1, y1, clockwise=False):
+    """Closed rectangular ring"""
+    ring = [(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, y0)]
+    return np.array(ring[::-1] if clockwise else ring, dtype=np.float64)
+
+
+def star(cx, cy, radius, vertices=60, k=5, seed=0):
+    """Closed wavy star-shaped ring (concave, many edges)"""
+    rng = np.random.default_rng(seed)
+    theta = np.linspace(0.0, 2.0 * np.pi, vertices, endpoint=False)
+    r = radius * (0.7 + 0.25 * np.sin(k * theta)) * (1.0 + 0.05 * rng.standard_normal(vertices))
+    ring = np.column_stack([cx + r * np.cos(theta), cy + r * np.sin(theta)])
+    return np.vstack([ring, ring[:1]])
+
+
+def brute_force_assign(lat, lon, polygons):
+    """First polygon (in order) whose rings contain each point, by even-odd rule"""
+    out = np.full(len(lat), NO_STATE, dtype=np.int16)
+    for i, (y, x) in enumerate(zip(lat.tolist(), lon.tolist())):
+        for pid, rings in enumerate(polygons):
+            inside = False
+            for ring in rings:
+                ring = ring.tolist()
+                for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+                    if y0 == y1:
+                        continue
+                    if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * ((x1 - x0) / (y1 - y0)):
+                        inside = not inside
+            if inside:
+                out[i] = pid
+                break
+    return out
+
+
+@pytest.fixture
+def polygons():
+    """Layer with a hole, a multipart state, a touching neighbour and a concave star"""
+    return [
+        # 0: square with a square hole (hole wound the other way)
+        [square(0.0, 0.0, 4.0, 4.0), square(1.0, 1.0, 3.0, 3.0, clockwise=True)],
+        # 1: multipart state, two disjoint squares
+        [square(5.0, 0.0, 6.0, 1.0), square(5.0, 3.0, 6.0, 4.0)],
+        # 2: shares the edge x = 4 with polygon 0
+        [square(4.0, 0.0, 5.0, 1.0)],
+        # 3: concave star with many edges
+        [star(10.0, 2.0, 1.5)],
+        # 4: island inside the hole of polygon 0
+        [square(1.5, 1.5, 2.5, 2.5)],
+    ]
+
+
+def random_points(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-1.0, 5.0, n), rng.uniform(-1.0, 12.0, n)
+
+
+def edge_points(polygons):
+    """Every vertex and edge midpoint of every ring, as (lat, lon)"""
+    pts = []
+    for rings in polygons:
+        for ring in rings:
+            pts.append(ring)
+            pts.append((ring[:-1] + ring[1:]) / 2.0)
+    pts = np.vstack(pts)
+    return pts[:, 1].copy(), pts[:, 0].copy()
+
+
+def test_assign_matches_brute_force(polygons):
+    lat, lon = random_points(3000)
+    layer = PolygonLayer(polygons)
+    np.testing.assert_array_equal(layer.assign(lat, lon), brute_force_assign(lat, lon, polygons))
+
+
+def test_points_on_edges_and_vertices_match_brute_force(polygons):
+    lat, lon = edge_points(polygons)
+    layer = PolygonLayer(polygons)
+    np.testing.assert_array_equal(layer.assign(lat, lon), brute_force_assign(lat, lon, polygons))
+
+
+def test_holes_multipart_and_outside(polygons):
+    layer = PolygonLayer(polygons)
+    lon = np.array([0.5, 1.2, 2.0, 5.5, 5.5, 5.5, 10.0, 20.0, -3.0])
+    lat = np.array([0.5, 1.2, 2.0, 0.5, 3.5, 2.0, 2.0, 2.0, 2.0])
+    expected = [0, NO_STATE, 4, 1, 1, NO_STATE, 3, NO_STATE, NO_STATE]
+    np.testing.assert_array_equal(layer.assign(lat, lon), expected)
+
+
+def test_shared_edge_is_assigned_once(polygons):
+    layer = PolygonLayer(polygons)
+    # x = 4 is the right edge of polygon 0 and the left edge of polygon 2:
+    # the half-open rule gives it to exactly one of them
+    lat = np.linspace(0.1, 0.9, 9)
+    lon = np.full(9, 4.0)
+    np.testing.assert_array_equal(layer.assign(lat, lon), np.full(9, 2))
+
+
+def test_empty_input(polygons):
+    layer = PolygonLayer(polygons)
+    assert len(layer.assign(np.empty(0), np.empty(0))) == 0
+
+
+def test_assign_states_parallel_matches_brute_force(polygons):
+    lat, lon = random_points(4000, seed=2)
+    layer = PolygonLayer(polygons)
+    expected = brute_force_assign(lat, lon, polygons)
+    np.testing.assert_array_equal(assign_states(lat, lon, layer, chunk_rows=1000, workers=1), expected)
+    np.testing.assert_array_equal(assign_states(lat, lon, layer, chunk_rows=1000, workers=2), expected)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_join_store_matches_brute_force(tmp_path, polygons, workers):
+    lat, lon = random_points(2500, seed=3)
+    path = tmp_path / "points.store"
+    write_store(path, {"latitude": lat, "longitude": lon}, schema={"latitude": "<f8", "longitude": "<f8"})
+    names = [f"state_{i}" for i in range(len(polygons))]
+
+    summary = join_store(path, PolygonLayer(polygons, names), chunk_rows=700, workers=workers)
+
+    expected = brute_force_assign(lat, lon, polygons)
+    store = PovertyStore(path)
+    np.testing.assert_array_equal(store.column("state_id"), expected)
+    counts = np.bincount(expected + 1, minlength=len(polygons) + 1)
+    assert summary["(none)"] == counts[0]
+    assert summary == {
+        **{name: int(n) for name, n in zip(names, counts[1:]) if n},
+        "(none)": int(counts[0]),
+    }
+    labels = json.loads((path / "state_id.labels.json").read_text(encoding="utf-8"))
+    assert labels == {"no_value": NO_STATE, "names": names}
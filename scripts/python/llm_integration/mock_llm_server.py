@@ -0,0 +1,169 @@
+"""
+ORAIL CITIZEN AI - Mock LLM Server
+Geospatial Poverty Mapping Framework
+
+Local OpenAI-compatible HTTP endpoint for testing LLM pipelines offline.
+Answers POST /v1/completions (``prompt`` may be a list: one round trip for
+a batch) and POST /v1/chat/completions with text from LocalStandInModel,
+after a configurable latency. It can inject failures (HTTP 500 at a given
+rate) and enforce a request rate limit (HTTP 429 with Retry-After), so
+retry and rate-limiting code paths get exercised. GET /stats returns the
+request counters.
+
+Usage:
+    server = create_mock_server(port=0, latency=0.05, error_rate=0.02, rate_limit=200)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    python -m scripts.python.llm_integration.mock_llm_server --port 8099
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.python.llm_integration.response_cache import LocalStandInModel
+
+
+class _RateWindow:
+    """Server-side token bucket (requests per second)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def make_handler(latency, per_prompt_latency, error_rate, rate_limit, seed):
+    """Request handler class bound to the mock settings"""
+    model = LocalStandInModel(latency=0)
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    window = _RateWindow(rate_limit) if rate_limit else None
+    stats = {"requests": 0, "prompts": 0, "errors": 0, "rate_limited": 0}
+    stats_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _count(self, key, n=1):
+            with stats_lock:
+                stats[key] += n
+
+        def do_GET(self):
+            if self.path == "/stats":
+                with stats_lock:
+                    self._send(200, dict(stats))
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            self._count("requests")
+            if window is not None and not window.allow():
+                self._count("rate_limited")
+                self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0.2"})
+                return
+            with rng_lock:
+                fail = rng.random() < error_rate
+            if fail:
+                self._count("errors")
+                self._send(500, {"error": {"message": "injected failure"}})
+                return
+
+            params = {k: v for k, v in request.items() if k in ("temperature", "max_tokens", "top_p")}
+            if self.path == "/v1/completions":
+                prompts = request.get("prompt", "")
+                prompts = prompts if isinstance(prompts, list) else [prompts]
+                time.sleep(latency + per_prompt_latency * len(prompts))
+                choices = [
+                    {"index": i, "text": model.generate(p, **params), "finish_reason": "stop"}
+                    for i, p in enumerate(prompts)
+                ]
+            elif self.path == "/v1/chat/completions":
+                prompts = [request.get("messages", [])]
+                time.sleep(latency + per_prompt_latency)
+                text = model.generate(json.dumps(prompts[0], sort_keys=True), **params)
+                choices = [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]
+            else:
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            self._count("prompts", len(prompts))
+            words = sum(len(c.get("text", c.get("message", {}).get("content", "")).split()) for c in choices)
+            self._send(
+                200,
+                {
+                    "object": "text_completion" if self.path == "/v1/completions" else "chat.completion",
+                    "model": request.get("model", "mock"),
+                    "choices": choices,
+                    "usage": {"completion_tokens": words},
+                },
+            )
+
+    Handler.stats = stats
+    return Handler
+
+
+def create_mock_server(host="127.0.0.1", port=0, latency=0.05, per_prompt_latency=0.002,
+                       error_rate=0.0, rate_limit=None, seed=0):
+    """ThreadingHTTPServer serving the mock API (port 0 picks a free port)"""
+    handler = make_handler(latency, per_prompt_latency, error_rate, rate_limit, seed)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.stats = handler.stats
+    return server
+
+
+def main(argv=None):
+    """Serve the mock API until interrupted"""
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second")
+    args = parser.parse_args(argv)
+
+    server = create_mock_server(args.host, args.port, args.latency, error_rate=args.error_rate,
+                                rate_limit=args.rate_limit)
+    print(f"Mock LLM server on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""
+ORAIL CITIZEN AI - Batch Narrative Generation
+Geospatial Poverty Mapping Framework
+
+Writes an LLM poverty brief for every grid cell or district, from the
+aggregated statistics, with many requests in flight instead of one call
+at a time:
+
+    concurrency   an asyncio.Semaphore bounds the requests in flight
+    rate limit    a token bucket spaces requests (requests per second,
+                  with a burst allowance)
+    retries       HTTP 429 / 5xx, timeouts and connection errors are
+                  retried with exponential backoff and jitter, honouring
+                  Retry-After
+    batching      backends that accept several prompts per request (the
+                  OpenAI-style /v1/completions with a list ``prompt``, or
+                  LocalStandInModel.batch) get up to ``batch_size`` per call
+    resume        each result is appended to a JSONL file as it arrives;
+                  a rerun skips ids already answered, so a crash or Ctrl-C
+                  loses at most the requests in flight
+    metrics       throughput, request latency percentiles, retries and
+                  errors, saved next to the output as <name>.metrics.json
+
+Records come from a cells directory (aggregation.py), a columnar store or
+a CSV. Backends: ``local`` (LocalStandInModel, offline) and ``http`` (any
+OpenAI-compatible server; mock_llm_server.py provides one for tests).
+An optional ResponseCache skips prompts answered in earlier runs.
+
+Usage:
+    python -m scripts.python.llm_integration.narratives data/processed/cells \\
+        data/processed/narratives.jsonl --backend http \\
+        --base-url http://127.0.0.1:8099/v1 --concurrency 16 --rate 20 --batch-size 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.llm_integration.response_cache import (
+    LocalStandInModel,
+    ResponseCache,
+    request_key,
+)
+
+DEFAULT_TEMPLATE = (
+    "Write a two-sentence poverty brief for {label} (centred at {latitude:.3f}, {longitude:.3f}). "
+    "Population {population:,.0f}; poverty rate {poverty_rate:.1%}; education index "
+    "{education_index:.2f}; health index {health_index:.2f}; infrastructure index "
+    "{infrastructure_index:.2f}. Plain language for district officials."
+)
+DEFAULT_PARAMS = {"temperature": 0.2, "max_tokens": 160}
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 8
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+REQUEST_TIMEOUT = 120
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+LABEL_COLUMNS = ("district", "name", "region", "state")
+
+
+def load_records(source, resolution=None, limit=None):
+    """Rows of a cells directory, columnar store or CSV as dicts with an id"""
+    from scripts.python.data_processing.poverty_store import PovertyStore
+    from scripts.python.geospatial.aggregation import load_cells
+
+    source = Path(source)
+    if (source / "cells.json").exists():
+        frame = load_cells(source, resolution).to_pandas()
+    elif (source / "_meta.json").exists():
+        frame = PovertyStore(source).to_pandas()
+    elif source.is_file():
+        import pandas as pd
+
+        frame = pd.read_csv(source, nrows=limit)
+    else:
+        raise FileNotFoundError(f"No cells, store or CSV at {source}")
+    if limit is not None:
+        frame = frame.iloc[:limit]
+
+    label_column = next((c for c in LABEL_COLUMNS if c in frame.columns), None)
+    records = []
+    for i, row in enumerate(frame.to_dict("records")):
+        if "cell_id" in row:
+            row["id"] = str(int(row["cell_id"]))
+            row.setdefault("label", f"grid cell {row['id']}")
+        else:
+            row["id"] = str(row[label_column]) if label_column else str(i)
+            row.setdefault("label", str(row[label_column]) if label_column else f"area {i}")
+        records.append(row)
+    return records
+
+
+def render_prompt(template, record):
+    """Fill the template from a record (numpy scalars become Python numbers)"""
+    values = {k: v.item() if isinstance(v, np.generic) else v for k, v in record.items()}
+    return template.format_map(values)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        # The lock makes callers queue in order instead of racing for refills
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+                self.waited += wait
+                await asyncio.sleep(wait)
+
+
+class LocalBackend:
+    """LocalStandInModel (or any object with generate/batch) as a backend"""
+
+    def __init__(self, model=None, max_batch=DEFAULT_BATCH_SIZE):
+        self.model = model or LocalStandInModel()
+        self.name = getattr(self.model, "name", "local")
+        self.max_batch = max_batch if hasattr(self.model, "batch") else 1
+
+    async def complete(self, prompts, params):
+        if len(prompts) > 1:
+            return await asyncio.to_thread(self.model.batch, prompts, **params)
+        if hasattr(self.model, "agenerate"):
+            return [await self.model.agenerate(prompts[0], **params)]
+        return [await asyncio.to_thread(self.model.generate, prompts[0], **params)]
+
+
+class HTTPBackend:
+    """OpenAI-compatible endpoint: /completions (batched) or /chat/completions"""
+
+    def __init__(self, base_url, model, api_key=None, chat=False, max_batch=DEFAULT_BATCH_SIZE,
+                 timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.name = model
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY")
+        self.chat = chat
+        # Chat completions take one conversation per request
+        self.max_batch = 1 if chat else max_batch
+        self.timeout = timeout
+
+    def _post(self, route, body):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}{route}", data=json.dumps(body).encode("utf-8"), headers=headers, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def _complete(self, prompts, params):
+        if self.chat:
+            messages = [{"role": "user", "content": prompts[0]}]
+            answer = self._post("/chat/completions", {"model": self.name, "messages": messages, **params})
+            return [answer["choices"][0]["message"]["content"]]
+        answer = self._post("/completions", {"model": self.name, "prompt": prompts, **params})
+        choices = sorted(answer["choices"], key=lambda c: c.get("index", 0))
+        if len(choices) != len(prompts):
+            raise ValueError(f"Expected {len(prompts)} completions, got {len(choices)}")
+        return [c["text"] for c in choices]
+
+    async def complete(self, prompts, params):
+        return await asyncio.to_thread(self._complete, prompts, params)
+
+
+def _retry_delay(error, attempt, backoff):
+    """Seconds to wait before retrying, or None if the error is permanent"""
+    retry_after = 0.0
+    if isinstance(error, urllib.error.HTTPError):
+        if error.code not in RETRY_STATUS:
+            return None
+        try:
+            retry_after = min(float(error.headers.get("Retry-After") or 0), BACKOFF_MAX)
+        except (AttributeError, ValueError):
+            pass
+    elif not isinstance(error, (urllib.error.URLError, TimeoutError, ConnectionError)):
+        return None
+    # Full jitter on top of Retry-After keeps retries from arriving in lockstep
+    return retry_after + random.uniform(0, min(BACKOFF_MAX, backoff * 2 ** attempt))
+
+
+def read_results(path):
+    """Latest entry per id of a results file; a torn last line is dropped"""
+    results = {}
+    path = Path(path)
+    if not path.exists():
+        return results
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].splitlines():
+        if line.strip():
+            entry = json.loads(line)
+            results[entry["id"]] = entry
+    return results
+
+
+def _percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4), "max": round(max(values), 4)}
+
+
+async def agenerate_narratives(
+    records,
+    out_path,
+    backend,
+    template=DEFAULT_TEMPLATE,
+    params=None,
+    concurrency=DEFAULT_CONCURRENCY,
+    rate=None,
+    burst=None,
+    batch_size=None,
+    max_retries=MAX_RETRIES,
+    backoff=BACKOFF_BASE,
+    cache=None,
+):
+    """Generate narratives for records not yet in out_path; returns the metrics"""
+    params = dict(DEFAULT_PARAMS if params is None else params)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    done = {k for k, v in read_results(out_path).items() if "text" in v}
+    pending = [r for r in records if r["id"] not in done]
+    batch_size = max(1, min(batch_size or backend.max_batch, backend.max_batch))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = TokenBucket(rate, burst) if rate else None
+    latencies = []
+    metrics = {
+        "records": len(records),
+        "skipped": len(records) - len(pending),
+        "completed": 0,
+        "cache_hits": 0,
+        "failed": 0,
+        "requests": 0,
+        "retries": 0,
+        "rate_limited": 0,
+        "words": 0,
+    }
+
+    out = open(out_path, "a", encoding="utf-8")
+
+    def write(entries):
+        # Whole lines in one write: an interrupted run leaves at most a torn tail
+        out.write("".join(json.dumps(e) + "\n" for e in entries))
+        out.flush()
+
+    async def run_batch(batch):
+        prompts = [render_prompt(template, r) for r in batch]
+        keys = [request_key(backend.name, p, params) for p in prompts]
+        texts = [cache.get(k) if cache is not None else None for k in keys]
+        todo = [i for i, t in enumerate(texts) if t is None]
+        metrics["cache_hits"] += len(batch) - len(todo)
+        error = None
+        for attempt in range(max_retries + 1):
+            if not todo:
+                break
+            if bucket is not None:
+                await bucket.acquire()
+            async with semaphore:
+                start = time.perf_counter()
+                metrics["requests"] += 1
+                try:
+                    answers = await backend.complete([prompts[i] for i in todo], params)
+                except Exception as e:  # noqa: BLE001 - classified below
+                    error = e
+                else:
+                    latencies.append(time.perf_counter() - start)
+                    for i, text in zip(todo, answers):
+                        texts[i] = text
+                        if cache is not None:
+                            cache.put(keys[i], text, backend.name)
+                    todo = []
+                    break
+            if isinstance(error, urllib.error.HTTPError) and error.code == 429:
+                metrics["rate_limited"] += 1
+            delay = _retry_delay(error, attempt, backoff)
+            if delay is None or attempt == max_retries:
+                break
+            metrics["retries"] += 1
+            await asyncio.sleep(delay)
+
+        entries = []
+        for i, record in enumerate(batch):
+            if texts[i] is not None:
+                metrics["completed"] += 1
+                metrics["words"] += len(texts[i].split())
+                entries.append({"id": record["id"], "label": record.get("label"), "text": texts[i]})
+            else:
+                metrics["failed"] += 1
+                entries.append({"id": record["id"], "label": record.get("label"), "error": repr(error)})
+        write(entries)
+
+    # urllib calls run in threads: size the default executor to the concurrency
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    loop.set_default_executor(executor)
+    start = time.perf_counter()
+    try:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        await asyncio.gather(*(run_batch(b) for b in batches))
+    finally:
+        out.close()
+        elapsed = time.perf_counter() - start
+        metrics.update(
+            {
+                "backend": backend.name,
+                "concurrency": concurrency,
+                "rate": rate,
+                "batch_size": batch_size,
+                "seconds": round(elapsed, 3),
+                "records_per_second": round(metrics["completed"] / elapsed, 2) if elapsed > 0 else None,
+                "requests_per_second": round(metrics["requests"] / elapsed, 2) if elapsed > 0 else None,
+                "request_latency": _percentiles(latencies),
+                "rate_limit_wait": round(bucket.waited, 3) if bucket is not None else 0.0,
+                "interrupted": metrics["completed"] + metrics["failed"] < len(pending),
+            }
+        )
+        tmp = out_path.with_suffix(".metrics.json.tmp")
+        tmp.write_text(json.dumps(metrics, indent=1), encoding="utf-8")
+        os.replace(tmp, out_path.with_suffix(".metrics.json"))
+    return metrics
+
+
+def generate_narratives(records, out_path, backend, **kwargs):
+    """Blocking wrapper around agenerate_narratives"""
+    return asyncio.run(agenerate_narratives(records, out_path, backend, **kwargs))
+
+
+def main(argv=None):
+    """Generate narratives for a cells directory, store or CSV"""
+    parser = argparse.ArgumentParser(description="Batch LLM narrative generation")
+    parser.add_argument("source", help="cells directory, columnar store or CSV")
+    parser.add_argument("output", help="results JSONL (appended to; reruns resume)")
+    parser.add_argument("--resolution", type=float, default=None, help="cell resolution (cells directory)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--backend", choices=("local", "http"), default="local")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", "http://127.0.0.1:8099/v1"))
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--chat", action="store_true", help="use /chat/completions (no batching)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=None, help="requests per second")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES)
+    parser.add_argument("--template", default=None, help="file with a str.format prompt template")
+    parser.add_argument("--cache", action="store_true", help="use the LLM response cache")
+    args = parser.parse_args(argv)
+
+    try:
+        records = load_records(args.source, args.resolution, args.limit)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {e}")
+        return 1
+    template = Path(args.template).read_text(encoding="utf-8") if args.template else DEFAULT_TEMPLATE
+    if args.backend == "http":
+        backend = HTTPBackend(args.base_url, args.model, chat=args.chat, max_batch=args.batch_size)
+    else:
+        backend = LocalBackend(max_batch=args.batch_size)
+    cache = ResponseCache() if args.cache else None
+
+    try:
+        metrics = generate_narratives(
+            records, args.output, backend, template=template, concurrency=args.concurrency,
+            rate=args.rate, batch_size=args.batch_size, max_retries=args.retries, cache=cache,
+        )
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume from {args.output}")
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+
+    latency = metrics["request_latency"]
+    print(f"{metrics['completed']:,} narratives ({metrics['skipped']:,} already done, "
+          f"{metrics['cache_hits']:,} from cache, {metrics['failed']:,} failed) in {metrics['seconds']:.1f}s")
+    print(f"{metrics['records_per_second']} records/s over {metrics['requests']:,} requests "
+          f"({metrics['retries']} retries, {metrics['rate_limited']} rate limited)")
+    if latency["p50"] is not None:
+        print(f"Request latency p50 {latency['p50'] * 1000:.0f} ms, p95 {latency['p95'] * 1000:.0f} ms, "
+              f"p99 {latency['p99'] * 1000:.0f} ms")
+    return 0 if metrics["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
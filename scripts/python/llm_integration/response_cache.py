@@ -0,0 +1,401 @@
+"""
+ORAIL CITIZEN AI - LLM Response Cache
+Geospatial Poverty Mapping Framework
+
+Persistent cache for LLM calls, so regenerating district narratives does
+not re-issue prompts that were already answered.
+
+    key     sha256 of the normalised (model, prompt or messages, parameters):
+            text is NFC-normalised with line-end whitespace stripped,
+            parameters are sorted and ones that do not change the output
+            (stream, timeout, user, ...) are dropped
+    store   SQLite file under data/cache/llm/, values as JSON, bounded in
+            bytes with least-recently-used eviction and an optional TTL
+    flight  identical requests already in progress are not sent again:
+            later callers wait for the first one (threads and asyncio)
+
+It plugs into the call paths of test_llm_stack.py's stack: CachedLLM wraps
+any ``prompt -> text`` callable (including LocalStandInModel, a
+deterministic offline model for tests), cached_chat_completion wraps an
+OpenAI client call, and LangChainCache adapts the store to LangChain's
+set_llm_cache when langchain-core is installed.
+
+Usage:
+    cache = ResponseCache(max_bytes=256 << 20, ttl=30 * 86400)
+    llm = CachedLLM(LocalStandInModel(), cache)
+    text = llm.generate("Summarise poverty in Wayanad ...", temperature=0.2)
+
+    from langchain_core.globals import set_llm_cache
+    set_llm_cache(LangChainCache(cache))
+
+    python -m scripts.python.llm_integration.response_cache stats
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+
+LLM_CACHE_PATH = os.path.join("data", "cache", "llm", "responses.sqlite")
+DEFAULT_MAX_BYTES = 256 << 20
+# Request fields that change transport behaviour but not the generated text
+IGNORED_PARAMS = {"stream", "timeout", "request_timeout", "user", "max_retries", "callbacks", "tags", "metadata"}
+# Cache miss marker (None is a valid cached value) and "owner was cancelled, retry"
+_MISSING = object()
+_RETRY = object()
+
+
+def normalize_text(text):
+    """NFC text with line-end whitespace and surrounding blank space removed"""
+    text = unicodedata.normalize("NFC", str(text)).replace("\r\n", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def _normalize_value(value):
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {k: _normalize_value(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_normalize_value(v) for v in value]
+    return value
+
+
+def request_key(model, prompt, params=None):
+    """Cache key of one LLM request; ``prompt`` is text or a message list"""
+    params = {k: v for k, v in (params or {}).items() if k not in IGNORED_PARAMS and v is not None}
+    payload = {"model": str(model), "prompt": _normalize_value(prompt), "params": _normalize_value(params)}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded, LRU-evicting, optionally expiring on-disk response store"""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttl=None):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER,"
+            " created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._async_pending = {}
+        self.counters = {"hits": 0, "misses": 0, "deduplicated": 0, "evictions": 0, "expired": 0}
+
+    def _lookup(self, key):
+        """Cached value or _MISSING; the caller holds self._lock"""
+        now = time.time()
+        row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        if self.ttl is not None and now - row[1] > self.ttl:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.counters["expired"] += 1
+            return _MISSING
+        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def get(self, key, default=None):
+        """Cached value, or ``default`` on a miss (expired entries are dropped)"""
+        with self._lock:
+            value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def put(self, key, value, model=""):
+        """Store a JSON-serialisable value, evicting least recently used entries"""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, data, size, now, now),
+            )
+            self._evict()
+        return True
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop oldest-accessed entries until back under 90% of the budget
+        target = total - int(self.max_bytes * 0.9)
+        freed, victims = 0, []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.counters["evictions"] += len(victims)
+
+    def get_or_compute(self, key, compute, model=""):
+        """(value, hit): cached value, or compute() once even if called concurrently
+
+        The cache lookup and registering as the computing thread happen
+        under one lock, so a thread can never miss both the stored value and
+        the pending entry. If the computing thread fails, one waiter retries.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    self.counters["deduplicated" if waited else "hits"] += 1
+                    return value, True
+                event = self._pending.get(key)
+                if event is None:
+                    event = self._pending[key] = threading.Event()
+                    self.counters["misses"] += 1
+                    break
+            event.wait()
+            waited = True
+        try:
+            value = compute()
+            self.put(key, value, model)
+            return value, False
+        finally:
+            # put() ran first: later lookups see the value or the pending entry
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    async def aget_or_compute(self, key, compute, model=""):
+        """Async get_or_compute; ``compute`` returns an awaitable
+
+        Cancelling the computing task does not cancel the callers waiting on
+        it: the first of them takes over and computes the value itself.
+        """
+        waited = False
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                self.counters["deduplicated" if waited else "hits"] += 1
+                return value, True
+            future = self._async_pending.get(key)
+            if future is None:
+                break
+            value = await asyncio.shield(future)
+            if value is _RETRY:
+                continue
+            self.counters["deduplicated"] += 1
+            return value, True
+        future = asyncio.get_running_loop().create_future()
+        self._async_pending[key] = future
+        try:
+            self.counters["misses"] += 1
+            value = await compute()
+            self.put(key, value, model)
+            future.set_result(value)
+            return value, False
+        except asyncio.CancelledError:
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters get the error; nobody else awaits it otherwise
+            future.exception()
+            raise
+        finally:
+            del self._async_pending[key]
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+            **self.counters,
+        }
+
+    def prune(self):
+        """Delete expired entries; returns how many"""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        self.counters["expired"] += cursor.rowcount
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        self._db.close()
+
+
+class LocalStandInModel:
+    """Deterministic offline model: same prompt and parameters, same text
+
+    Writes a short pseudo-narrative echoing the numbers in the prompt after
+    a fixed latency, so pipelines and caches can be exercised without
+    network access or API keys.
+    """
+
+    name = "local-stand-in"
+
+    def __init__(self, latency=0.05, words=60):
+        self.latency = latency
+        self.words = words
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _text(self, prompt, params):
+        seed = int(request_key(self.name, prompt, params)[:16], 16)
+        rng = random.Random(seed)
+        numbers = [t.strip(",.;:%()") for t in str(prompt).split() if any(c.isdigit() for c in t)]
+        vocabulary = (
+            "poverty households access services rural district coverage health education "
+            "infrastructure gap indicators improved remains higher lower than average population"
+        ).split()
+        body = " ".join(rng.choice(vocabulary) for _ in range(self.words))
+        return f"{body}. Key figures: {', '.join(numbers[:6]) or 'none'}."
+
+    def generate(self, prompt, **params):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return self._text(prompt, params)
+
+    async def agenerate(self, prompt, **params):
+        with self._lock:
+            self.calls += 1
+        await asyncio.sleep(self.latency)
+        return self._text(prompt, params)
+
+    def batch(self, prompts, **params):
+        """One round trip for several prompts"""
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return [self._text(p, params) for p in prompts]
+
+    def __call__(self, prompt, **params):
+        return self.generate(prompt, **params)
+
+
+class CachedLLM:
+    """Cache in front of a model: a callable ``prompt -> text`` or an object
+    with generate()/agenerate()"""
+
+    def __init__(self, model, cache=None, model_name=None):
+        self.model = model
+        self.cache = cache if cache is not None else ResponseCache()
+        self.model_name = model_name or getattr(model, "name", None) or getattr(model, "model_name", None) or repr(model)
+
+    def generate(self, prompt, **params):
+        key = request_key(self.model_name, prompt, params)
+        call = getattr(self.model, "generate", self.model)
+        value, _ = self.cache.get_or_compute(key, lambda: call(prompt, **params), self.model_name)
+        return value
+
+    async def agenerate(self, prompt, **params):
+        key = request_key(self.model_name, prompt, params)
+        if hasattr(self.model, "agenerate"):
+            compute = lambda: self.model.agenerate(prompt, **params)  # noqa: E731
+        else:
+            call = getattr(self.model, "generate", self.model)
+            compute = lambda: asyncio.to_thread(call, prompt, **params)  # noqa: E731
+        value, _ = await self.cache.aget_or_compute(key, compute, self.model_name)
+        return value
+
+    __call__ = generate
+
+
+def cached_chat_completion(client, cache, **request):
+    """client.chat.completions.create(**request) through the cache; returns a dict"""
+    params = {k: v for k, v in request.items() if k not in ("model", "messages")}
+    key = request_key(request.get("model", ""), request.get("messages", []), params)
+
+    def compute():
+        response = client.chat.completions.create(**request)
+        return response.model_dump() if hasattr(response, "model_dump") else response
+
+    value, _ = cache.get_or_compute(key, compute, request.get("model", ""))
+    return value
+
+
+try:
+    from langchain_core.caches import BaseCache as _LangChainBaseCache
+    from langchain_core.load import dumps as _lc_dumps
+    from langchain_core.load import loads as _lc_loads
+except ImportError:
+    _LangChainBaseCache = None
+
+if _LangChainBaseCache is not None:
+
+    class LangChainCache(_LangChainBaseCache):
+        """ResponseCache behind LangChain's set_llm_cache()"""
+
+        def __init__(self, cache=None):
+            self.cache = cache if cache is not None else ResponseCache()
+
+        def lookup(self, prompt, llm_string):
+            value = self.cache.get(request_key(llm_string, prompt))
+            self.cache.counters["hits" if value is not None else "misses"] += 1
+            return _lc_loads(value) if value is not None else None
+
+        def update(self, prompt, llm_string, return_val):
+            self.cache.put(request_key(llm_string, prompt), _lc_dumps(return_val), llm_string[:200])
+
+        def clear(self, **kwargs):
+            self.cache.clear()
+
+else:
+
+    class LangChainCache:
+        """Placeholder: LangChain integration needs langchain-core"""
+
+        def __init__(self, *args, **kwargs):
+            raise ImportError("LangChainCache needs langchain-core (pip install langchain-core)")
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="LLM response cache")
+    parser.add_argument("command", choices=("stats", "prune", "clear"))
+    parser.add_argument("--path", default=LLM_CACHE_PATH)
+    parser.add_argument("--ttl", type=float, default=None, help="seconds; used by prune")
+    args = parser.parse_args(argv)
+
+    cache = ResponseCache(args.path, ttl=args.ttl)
+    if args.command == "prune":
+        print(f"Removed {cache.prune()} expired responses")
+    elif args.command == "clear":
+        cache.clear()
+        print("Cache cleared")
+    stats = cache.stats()
+    print(f"Responses: {stats['entries']:,}  size {stats['bytes'] / (1 << 20):.1f}/"
+          f"{stats['max_bytes'] / (1 << 20):.0f} MB  ({cache.path})")
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
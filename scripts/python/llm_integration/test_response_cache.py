@@ -0,0 +1,146 @@
+"""
+ORAIL CITIZEN AI - LLM Response Cache Tests
+Geospatial Poverty Mapping Framework
+
+Checks the in-flight deduplication of ResponseCache under threads and
+asyncio, and that cached None values count as hits.
+
+Usage:
+    python -m pytest scripts/python/llm_integration/test_response_cache.py
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scripts.python.llm_integration.response_cache import (
+    CachedLLM,
+    LocalStandInModel,
+    ResponseCache,
+    request_key,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"))
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("latency", [0.0, 0.001, 0.02])
+def test_threads_on_one_key_compute_once(cache, latency):
+    calls, results = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(32)
+
+    def compute():
+        with lock:
+            calls.append(1)
+        time.sleep(latency)
+        return "text"
+
+    def worker():
+        start.wait()
+        for _ in range(20):
+            value = cache.get_or_compute("key", compute)
+            with lock:
+                results.append(value)
+
+    threads = [threading.Thread(target=worker) for _ in range(32)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(results) == [("text", False)] + [("text", True)] * (32 * 20 - 1)
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] + stats["deduplicated"] == 32 * 20 - 1
+
+
+def test_failed_compute_lets_a_waiter_retry(cache):
+    attempts = []
+
+    def compute():
+        attempts.append(1)
+        time.sleep(0.05)
+        if len(attempts) == 1:
+            raise RuntimeError("model unavailable")
+        return "text"
+
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(cache.get_or_compute("key", compute))
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 1
+    assert len(attempts) == 2
+    assert [value for value, _ in results] == ["text"] * 7
+
+
+def test_cached_none_is_a_hit(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+
+    assert cache.get_or_compute("key", compute) == (None, False)
+    assert cache.get_or_compute("key", compute) == (None, True)
+    assert len(calls) == 1
+    assert cache.get("missing", "default") == "default"
+
+
+def test_async_cached_none_is_a_hit(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+
+    async def run():
+        return [await cache.aget_or_compute("key", compute) for _ in range(2)]
+
+    assert asyncio.run(run()) == [(None, False), (None, True)]
+    assert len(calls) == 1
+
+
+def test_async_waiters_compute_once(cache):
+    model = LocalStandInModel(latency=0.02)
+    llm = CachedLLM(model, cache)
+
+    async def run():
+        return await asyncio.gather(*(llm.agenerate("hello") for _ in range(20)))
+
+    texts = asyncio.run(run())
+    assert len(set(texts)) == 1
+    assert model.calls == 1
+
+
+def test_cancelling_the_owner_does_not_cancel_waiters(cache):
+    model = LocalStandInModel(latency=0.05)
+    llm = CachedLLM(model, cache)
+
+    async def run():
+        owner = asyncio.create_task(llm.agenerate("hello 1"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(llm.agenerate("hello 1"))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await waiter
+
+    text = asyncio.run(run())
+    assert text == model.generate("hello 1")
+    assert cache.get(request_key(llm.model_name, "hello 1", {})) == text
@@ -0,0 +1,334 @@
+"""
+ORAIL CITIZEN AI - Batch Inference Engine
+Geospatial Poverty Mapping Framework
+
+Predicts poverty_rate for every row of a columnar store (every grid cell in
+the country: hundreds of millions of rows) without loading it into memory.
+
+    input     feature columns are memory-mapped and read in fixed-size
+              micro-batches (build_features from spatial_cv.py, so the
+              transforms match training)
+    compute   batches run on a thread pool (NumPy, XGBoost and TorchScript
+              release the GIL) or a process pool; at most 2 x workers
+              batches are in flight, so memory stays flat
+    output    predictions are written straight into a preallocated float32
+              column of the same store (add_column + open_column_writer),
+              each batch into its own row range
+    resume    <column>.checkpoint.json lists finished batches; it is
+              rewritten (after flushing the output) every few batches, so an
+              interrupted run redoes at most the batches since then. A
+              checkpoint for another model or batch size is discarded.
+
+Models are described by a JSON model card (save_model): a ridge model
+inline, or a pickled estimator (xgboost, scikit-learn) or a TorchScript
+file next to it. Everything runs on CPU: TorchScript is loaded with
+map_location="cpu", which is what the torch.device('cpu') fallback in
+config/environment.py selects on our servers anyway.
+
+Usage:
+    python -m scripts.python.modeling.batch_inference fit \\
+        data/processed/cells/grid_0.05.store models/poverty_ridge.json
+    python -m scripts.python.modeling.batch_inference predict \\
+        data/processed/cells/grid_0.05.store models/poverty_ridge.json --workers 4
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import PovertyStore, add_column, open_column_writer
+from scripts.python.modeling.spatial_cv import (
+    DEFAULT_FEATURES,
+    DEFAULT_TARGET,
+    RidgeModel,
+    build_features,
+    limit_threads,
+    make_model,
+)
+from scripts.python.provisioning.manifest import hash_bytes, hash_file
+
+DEFAULT_BATCH_ROWS = 1 << 16
+DEFAULT_COLUMN = "poverty_rate_pred"
+CHECKPOINT_EVERY = 16
+
+_WORKER = {}
+_WORKER_LOCK = threading.Lock()
+
+
+def save_model(model, path, features=DEFAULT_FEATURES, target=DEFAULT_TARGET):
+    """Write a model card (JSON) and, for non-ridge models, the model file beside it"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    card = {"features": list(features), "target": target}
+    if isinstance(model, RidgeModel):
+        card.update({"kind": "ridge", "ridge": model.to_dict()})
+    elif hasattr(model, "save") and type(model).__module__.startswith("torch"):
+        card.update({"kind": "torchscript", "file": path.with_suffix(".pt").name})
+        model.save(str(path.with_suffix(".pt")))
+    else:
+        card.update({"kind": "pickle", "file": path.with_suffix(".pkl").name})
+        with open(path.with_suffix(".pkl"), "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(card, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+    return card
+
+
+def model_hash(path):
+    """Content hash of a model card and its model file"""
+    path = Path(path)
+    card = json.loads(path.read_text(encoding="utf-8"))
+    parts = [hash_file(path)]
+    if card.get("file"):
+        parts.append(hash_file(path.parent / card["file"]))
+    return hash_bytes("".join(parts).encode("ascii"))
+
+
+class _TorchPredictor:
+    """TorchScript module on CPU behind a predict(X) interface"""
+
+    def __init__(self, path, threads):
+        import torch
+
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.module = torch.jit.load(str(path), map_location="cpu").eval()
+
+    def predict(self, X):
+        with self.torch.inference_mode():
+            return self.module(self.torch.from_numpy(X)).reshape(-1).numpy()
+
+
+def load_model(path, threads=1):
+    """(model with predict(X), card) from a model card"""
+    path = Path(path)
+    card = json.loads(path.read_text(encoding="utf-8"))
+    kind = card.get("kind")
+    if kind == "ridge":
+        return RidgeModel.from_dict(card["ridge"]), card
+    if kind == "torchscript":
+        try:
+            return _TorchPredictor(path.parent / card["file"], threads), card
+        except ImportError:
+            raise ImportError("PyTorch is not installed; it is needed for TorchScript models") from None
+    if kind == "pickle":
+        with open(path.parent / card["file"], "rb") as f:
+            model = pickle.load(f)
+        # Estimators trained with many threads predict with the worker's share
+        for attr in ("n_jobs", "nthread"):
+            if hasattr(model, attr):
+                setattr(model, attr, threads)
+        return model, card
+    raise ValueError(f"Unknown model kind in {path}: {kind}")
+
+
+def _init_worker(store_path, model_path, column, threads):
+    with _WORKER_LOCK:
+        if _WORKER.get("key") == (store_path, model_path, column):
+            return
+        _WORKER["limits"] = limit_threads(threads)
+        _WORKER["model"], card = load_model(model_path, threads)
+        _WORKER["features"] = card["features"]
+        store = PovertyStore(store_path)
+        _WORKER["columns"] = {name: store.column(name) for name in card["features"]}
+        _WORKER["out"] = open_column_writer(store_path, column, "<f4", len(store))
+        _WORKER["key"] = (store_path, model_path, column)
+
+
+def _predict_batch(start, stop):
+    columns = _WORKER["columns"]
+    X = build_features({name: columns[name][start:stop] for name in _WORKER["features"]}, _WORKER["features"])
+    _WORKER["out"][start:stop] = np.asarray(_WORKER["model"].predict(X), dtype=np.float32).reshape(-1)
+    return stop - start
+
+
+def _read_checkpoint(path, identity):
+    try:
+        checkpoint = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if any(checkpoint.get(k) != v for k, v in identity.items()):
+        return None
+    return checkpoint
+
+
+def _write_checkpoint(path, identity, done, complete=False):
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(dict(identity, done=sorted(done), complete=complete)), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def predict_store(
+    store_path,
+    model_path,
+    column=DEFAULT_COLUMN,
+    batch_rows=DEFAULT_BATCH_ROWS,
+    workers=None,
+    threads=1,
+    executor="thread",
+    checkpoint_every=CHECKPOINT_EVERY,
+    force=False,
+    progress=None,
+):
+    """Fill ``column`` of the store with model predictions; returns a report
+
+    ``executor`` is "thread" or "process"; each worker uses ``threads``
+    native threads. ``progress(rows_done, n_rows)`` is called after each
+    checkpoint.
+    """
+    store_path = Path(store_path)
+    store = PovertyStore(store_path)
+    n_rows = len(store)
+    card = json.loads(Path(model_path).read_text(encoding="utf-8"))
+    missing = [name for name in card["features"] if name not in store.schema]
+    if missing:
+        raise KeyError(f"Store {store_path} lacks model features: {missing}")
+    if column in card["features"]:
+        raise ValueError(f"Output column '{column}' is a model feature")
+
+    identity = {"model": model_hash(model_path), "n_rows": n_rows, "batch_rows": int(batch_rows), "column": column}
+    checkpoint_path = store_path / f"{column}.checkpoint.json"
+    checkpoint = None if force else _read_checkpoint(checkpoint_path, identity)
+    if checkpoint is None or column not in store.schema:
+        if column in store.schema:
+            # Reuse the column file, but every batch is recomputed
+            open_column_writer(store_path, column, "<f4", n_rows).flush()
+        else:
+            add_column(store_path, column, "<f4")
+        checkpoint = {"done": [], "complete": False}
+        _write_checkpoint(checkpoint_path, identity, [])
+    done = set(checkpoint["done"])
+    batches = [(a, min(a + batch_rows, n_rows)) for a in range(0, n_rows, batch_rows)]
+    todo = [(i, a, b) for i, (a, b) in enumerate(batches) if i not in done]
+    report = {"rows": n_rows, "batches": len(batches), "resumed_batches": len(done), "computed_rows": 0}
+    start = time.perf_counter()
+
+    workers = workers or os.cpu_count() or 1
+    init_args = (str(store_path), str(model_path), column, threads)
+    if executor == "process":
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args)
+    elif executor == "thread":
+        _init_worker(*init_args)
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        raise ValueError(f"Unknown executor '{executor}' (thread, process)")
+
+    # Workers write through shared file mappings; syncing this process's map
+    # of the same column puts their pages on disk too
+    output = open_column_writer(store_path, column, "<f4", n_rows)
+
+    def checkpoint_now(complete=False):
+        # Predictions must be on disk before the checkpoint claims them
+        output.flush()
+        _write_checkpoint(checkpoint_path, identity, done, complete)
+        if progress is not None:
+            progress(sum(batches[i][1] - batches[i][0] for i in done), n_rows)
+
+    try:
+        with pool:
+            pending = {}
+            since_checkpoint = 0
+            queue = iter(todo)
+            while True:
+                for i, a, b in queue:
+                    pending[pool.submit(_predict_batch, a, b)] = i
+                    if len(pending) >= 2 * workers:
+                        break
+                if not pending:
+                    break
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    report["computed_rows"] += future.result()
+                    done.add(pending.pop(future))
+                    since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every:
+                    checkpoint_now()
+                    since_checkpoint = 0
+            checkpoint_now(complete=True)
+    finally:
+        if executor == "thread":
+            if _WORKER.get("limits") is not None:
+                _WORKER["limits"].restore_original_limits()
+            _WORKER.clear()
+
+    seconds = time.perf_counter() - start
+    report.update(
+        {
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(report["computed_rows"] / seconds) if seconds > 0 else None,
+            "column": column,
+            "executor": executor,
+            "workers": workers,
+            "threads": threads,
+        }
+    )
+    return report
+
+
+def fit_store(store_path, model_path, model="ridge", params=None, features=DEFAULT_FEATURES,
+              target=DEFAULT_TARGET, sample=1_000_000, seed=0):
+    """Fit a model on a random row sample of a store and save its card"""
+    store = PovertyStore(store_path)
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(len(store), min(sample, len(store)), replace=False))
+    data = {name: store.column(name)[rows] for name in dict.fromkeys([*features, target])}
+    estimator = make_model(model, params)
+    estimator.fit(build_features(data, features), data[target])
+    return save_model(estimator, model_path, features, target)
+
+
+def main(argv=None):
+    """Fit a model on a store, or predict a store column with it"""
+    parser = argparse.ArgumentParser(description="Batch poverty inference over a columnar store")
+    parser.add_argument("command", choices=("fit", "predict"))
+    parser.add_argument("store_path")
+    parser.add_argument("model_path", help="model card (.json)")
+    parser.add_argument("--model", default="ridge", choices=("ridge", "xgboost", "hist_gbm"), help="fit only")
+    parser.add_argument("--features", nargs="+", default=list(DEFAULT_FEATURES), help="fit only")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="fit only")
+    parser.add_argument("--column", default=DEFAULT_COLUMN)
+    parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=1, help="native threads per worker")
+    parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+    parser.add_argument("--force", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "fit":
+            card = fit_store(args.store_path, args.model_path, args.model, features=args.features,
+                             target=args.target)
+            print(f"Saved {card['kind']} model for {card['target']} ~ {', '.join(card['features'])}")
+            return 0
+
+        def progress(rows, total):
+            print(f"\r  {rows:,}/{total:,} rows", end="", flush=True)
+
+        report = predict_store(
+            args.store_path, args.model_path, args.column, args.batch_rows, args.workers, args.threads,
+            args.executor, force=args.force, progress=progress,
+        )
+    except (FileNotFoundError, KeyError, ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\nInterrupted; rerun the same command to resume from the last checkpoint")
+        return 1
+
+    print(f"\n{report['computed_rows']:,} rows predicted ({report['resumed_batches']} of {report['batches']} "
+          f"batches resumed) in {report['seconds']:.2f}s, {report['rows_per_second'] or 0:,} rows/s "
+          f"-> column '{report['column']}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
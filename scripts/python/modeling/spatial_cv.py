@@ -0,0 +1,505 @@
+"""
+ORAIL CITIZEN AI - Spatial Block Cross-Validation
+Geospatial Poverty Mapping Framework
+
+Evaluates poverty models with spatially blocked folds. Random K-fold on
+spatially autocorrelated points puts near-identical neighbours on both
+sides of the split and overstates skill; here points are binned into
+square blocks (vectorised floor of latitude/longitude, the same grid as
+aggregation.py) and whole blocks are assigned to folds, balanced by point
+count. An optional buffer also drops training blocks within N blocks of
+the test fold.
+
+Folds are trained concurrently in worker processes. The feature matrix,
+target, block and fold arrays are placed in shared memory once; workers
+map them as NumPy views instead of receiving pickled copies, and write
+their out-of-fold predictions straight into a shared output array. The
+ridge model is fitted chunk by chunk from those views; xgboost and
+hist_gbm still copy X[train] in each worker, so their default worker
+count is capped by available memory. Each
+worker is limited to ``threads`` BLAS/OpenMP threads (environment
+variables, threadpoolctl when installed, and the model's own n_jobs), so
+workers x threads does not oversubscribe the machine.
+
+Models: ``ridge`` (NumPy, always available), ``xgboost`` and
+``hist_gbm`` (scikit-learn) when those packages are installed.
+
+Usage:
+    python -m scripts.python.modeling.spatial_cv data/processed/orail_demo_data.store \\
+        --model xgboost --folds 5 --block-deg 0.1 --workers 4 --threads 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.geospatial.aggregation import grid_cell_coords
+
+DEFAULT_FEATURES = ("education_index", "health_index", "infrastructure_index", "population", "latitude", "longitude")
+DEFAULT_TARGET = "poverty_rate"
+DEFAULT_BLOCK_DEG = 0.25
+DEFAULT_FOLDS = 5
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS")
+
+RIDGE_CHUNK_ROWS = 1 << 16
+# Per-worker working set of a tree model, as a multiple of its X[train] copy
+TREE_MEMORY_FACTOR = 3.0
+
+_WORKER = {}
+
+
+def build_features(data, features=DEFAULT_FEATURES):
+    """Model input matrix (float32, C order) from a dict of columns
+
+    Shared by training and inference so both apply the same transforms
+    (population enters as log1p).
+    """
+    n = len(data[features[0]])
+    X = np.empty((n, len(features)), dtype=np.float32)
+    for j, name in enumerate(features):
+        values = data[name]
+        X[:, j] = np.log1p(values) if name == "population" else values
+    return X
+
+
+def load_features(source, features=DEFAULT_FEATURES, target=DEFAULT_TARGET, limit=None):
+    """(X float32 C-order, y float32, lat, lon) from a store or CSV"""
+    columns = list(dict.fromkeys([*features, target, "latitude", "longitude"]))
+    if str(source).lower().endswith(".csv"):
+        import pandas as pd
+
+        data = pd.read_csv(source, usecols=columns, nrows=limit)
+        data = {name: data[name].to_numpy() for name in columns}
+    else:
+        from scripts.python.data_processing.poverty_store import PovertyStore
+
+        store = PovertyStore(source)
+        data = {name: store.column(name)[:limit] for name in columns}
+    X = build_features(data, features)
+    lat = np.asarray(data["latitude"], dtype=np.float64)
+    lon = np.asarray(data["longitude"], dtype=np.float64)
+    return X, np.asarray(data[target], dtype=np.float32), lat, lon
+
+
+def spatial_blocks(lat, lon, block_deg=DEFAULT_BLOCK_DEG):
+    """Dense block index per point and the (row, col) of each block"""
+    rows, cols = grid_cell_coords(lat, lon, block_deg)
+    keys, index = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+    return index.reshape(-1).astype(np.int32), keys
+
+
+def assign_folds(block_index, n_blocks, n_folds=DEFAULT_FOLDS, seed=0):
+    """Fold of each block: largest blocks first, each to the smallest fold"""
+    if n_blocks < n_folds:
+        raise ValueError(f"{n_blocks} spatial blocks cannot fill {n_folds} folds; use a smaller --block-deg")
+    sizes = np.bincount(block_index, minlength=n_blocks)
+    rng = np.random.default_rng(seed)
+    # Random tie-break so equal-sized blocks are not assigned in grid order
+    order = np.lexsort((rng.random(n_blocks), -sizes))
+    fold_of_block = np.empty(n_blocks, dtype=np.int8)
+    totals = np.zeros(n_folds, dtype=np.int64)
+    for block in order:
+        fold = int(np.argmin(totals))
+        fold_of_block[block] = fold
+        totals[fold] += sizes[block]
+    return fold_of_block
+
+
+def buffer_mask(block_rc, test_blocks, buffer):
+    """Blocks within ``buffer`` blocks (Chebyshev) of a test block, test blocks excluded"""
+    if buffer <= 0 or not len(test_blocks):
+        return np.zeros(len(block_rc), dtype=bool)
+    steps = np.arange(-buffer, buffer + 1)
+    offsets = np.stack(np.meshgrid(steps, steps, indexing="ij"), axis=-1).reshape(-1, 2)
+    near = (block_rc[test_blocks][:, None, :] + offsets[None]).reshape(-1, 2)
+    # Pack (row, col) into one int64 so membership is a single np.isin
+    span = int(block_rc[:, 1].max()) + buffer + 2
+
+    def pack(rc):
+        return rc[:, 0] * span + rc[:, 1] + buffer + 1
+
+    excluded = np.isin(pack(block_rc), pack(near))
+    excluded[test_blocks] = False
+    return excluded
+
+
+def regression_metrics(y_true, y_pred):
+    """RMSE, MAE, R2 and bias"""
+    y_true = np.asarray(y_true, dtype=np.float64)
+    err = np.asarray(y_pred, dtype=np.float64) - y_true
+    ss_tot = float(np.sum((y_true - y_true.mean()) ** 2)) if len(y_true) else 0.0
+    return {
+        "rmse": float(np.sqrt(np.mean(err ** 2))) if len(err) else None,
+        "mae": float(np.mean(np.abs(err))) if len(err) else None,
+        "r2": 1.0 - float(np.sum(err ** 2)) / ss_tot if ss_tot > 0 else None,
+        "bias": float(np.mean(err)) if len(err) else None,
+    }
+
+
+class RidgeModel:
+    """Standardised ridge regression solved with NumPy
+
+    fit() and predict() take an optional boolean ``rows`` mask and walk X in
+    chunks of ``chunk_rows``, so a fold is trained from views of the shared
+    matrix: only one float64 chunk is materialised at a time, never X[train].
+    """
+
+    def __init__(self, alpha=1.0, chunk_rows=RIDGE_CHUNK_ROWS):
+        self.alpha = alpha
+        self.chunk_rows = int(chunk_rows)
+
+    def _chunks(self, X, y=None, rows=None):
+        """Yield float64 (X, y) chunks of the selected rows"""
+        for start in range(0, len(X), self.chunk_rows):
+            stop = min(start + self.chunk_rows, len(X))
+            keep = slice(None) if rows is None else rows[start:stop]
+            Xc = np.asarray(X[start:stop][keep], dtype=np.float64)
+            yc = None if y is None else np.asarray(y[start:stop][keep], dtype=np.float64)
+            yield Xc, yc
+
+    def fit(self, X, y, rows=None):
+        n_features = X.shape[1]
+        # Pass 1: means; pass 2: centred cross-products (avoids the
+        # cancellation of raw sums on columns like latitude)
+        n, x_sum, y_sum = 0, np.zeros(n_features), 0.0
+        for Xc, yc in self._chunks(X, y, rows):
+            n += len(Xc)
+            x_sum += Xc.sum(axis=0)
+            y_sum += float(yc.sum())
+        if n == 0:
+            raise ValueError("Cannot fit a ridge model on zero rows")
+        self.mean = x_sum / n
+        self.intercept = y_sum / n
+        cross = np.zeros((n_features, n_features))
+        xty = np.zeros(n_features)
+        for Xc, yc in self._chunks(X, y, rows):
+            Xc -= self.mean
+            cross += Xc.T @ Xc
+            xty += Xc.T @ (yc - self.intercept)
+        self.scale = np.sqrt(np.diag(cross) / n)
+        self.scale[self.scale == 0] = 1.0
+        # Gram matrix of the standardised features: D^-1 (Xc^T Xc) D^-1
+        gram = cross / np.outer(self.scale, self.scale) + self.alpha * np.eye(n_features)
+        self.coef = np.linalg.solve(gram, xty / self.scale)
+        return self
+
+    def predict(self, X, rows=None):
+        if rows is None and len(X) <= self.chunk_rows:
+            return ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale) @ self.coef + self.intercept
+        parts = [
+            ((Xc - self.mean) / self.scale) @ self.coef + self.intercept
+            for Xc, _ in self._chunks(X, rows=rows)
+        ]
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def to_dict(self):
+        return {
+            "alpha": self.alpha,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "intercept": self.intercept,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data["alpha"])
+        model.mean = np.asarray(data["mean"])
+        model.scale = np.asarray(data["scale"])
+        model.coef = np.asarray(data["coef"])
+        model.intercept = float(data["intercept"])
+        return model
+
+
+def make_model(name, params=None, threads=1):
+    """Model instance by name, with its own thread count set to ``threads``"""
+    params = dict(params or {})
+    if name == "ridge":
+        return RidgeModel(**params)
+    if name == "xgboost":
+        try:
+            import xgboost
+        except ImportError:
+            raise ImportError("xgboost is not installed (conda install -c conda-forge xgboost)") from None
+        params.setdefault("tree_method", "hist")
+        return xgboost.XGBRegressor(n_jobs=threads, **params)
+    if name == "hist_gbm":
+        try:
+            from sklearn.ensemble import HistGradientBoostingRegressor
+        except ImportError:
+            raise ImportError("scikit-learn is not installed (conda install scikit-learn)") from None
+        return HistGradientBoostingRegressor(**params)
+    raise ValueError(f"Unknown model '{name}' (ridge, xgboost, hist_gbm)")
+
+
+def limit_threads(threads):
+    """Cap thread pools already loaded in this process (threadpoolctl, if installed)"""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return None
+    return threadpool_limits(limits=threads)
+
+
+class SharedArrays:
+    """NumPy arrays copied once into named shared memory blocks"""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        self.arrays = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.blocks.append(shm)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+                view[...] = array
+                self.arrays[name] = view
+                self.spec[name] = (shm.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self.arrays = {}
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def attach_shared(spec):
+    """Map the blocks of SharedArrays.spec as arrays (no copy); returns (arrays, handles)"""
+    arrays, handles = {}, []
+    for name, (shm_name, shape, dtype) in spec.items():
+        # Spawned workers share the parent's resource tracker, which unlinks once
+        shm = shared_memory.SharedMemory(name=shm_name)
+        handles.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return arrays, handles
+
+
+def _init_worker(spec, threads):
+    _WORKER["limits"] = limit_threads(threads)
+    _WORKER["arrays"], _WORKER["handles"] = attach_shared(spec)
+    _WORKER["threads"] = threads
+
+
+def _run_fold(fold, model_name, params, block_rc, buffer):
+    arrays = _WORKER["arrays"]
+    X, y, blocks, folds, oof = arrays["X"], arrays["y"], arrays["blocks"], arrays["folds"], arrays["oof"]
+    test = folds == fold
+    train = ~test
+    excluded_blocks = 0
+    if buffer > 0:
+        excluded = buffer_mask(block_rc, np.unique(blocks[test]), buffer)
+        excluded_blocks = int(excluded.sum())
+        train &= ~excluded[blocks]
+    if not train.any():
+        raise ValueError(f"Fold {fold} has no training points left after the {buffer}-block buffer")
+
+    model = make_model(model_name, params, _WORKER["threads"])
+    start = time.perf_counter()
+    if isinstance(model, RidgeModel):
+        # Chunked over the shared matrix; no per-worker copy of X[train]
+        model.fit(X, y, rows=train)
+        fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predictions = model.predict(X, rows=test)
+    else:
+        # Tree libraries need their own contiguous copy (and build binned
+        # data on top of it); see default_workers()
+        model.fit(X[train], y[train])
+        fit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predictions = model.predict(X[test])
+    oof[test] = predictions
+    result = {
+        "fold": int(fold),
+        "n_train": int(train.sum()),
+        "n_test": int(test.sum()),
+        "test_blocks": int(len(np.unique(blocks[test]))),
+        "buffer_blocks": excluded_blocks,
+        "fit_seconds": round(fit_seconds, 4),
+        "predict_seconds": round(time.perf_counter() - start, 4),
+        "pid": os.getpid(),
+    }
+    result.update(regression_metrics(y[test], predictions))
+    return result
+
+
+def available_memory():
+    """Bytes of memory available to new processes, or None if unknown"""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        return None
+
+
+def default_workers(X, model, n_folds, cpus=None):
+    """Fold workers that fit in memory: one per fold, capped by CPUs and RAM
+
+    Ridge workers only hold a chunk of X at a time. Tree models copy
+    X[train] (about (n_folds - 1) / n_folds of X) in every worker and build
+    their own binned data on top, so the count is capped to keep
+    workers x TREE_MEMORY_FACTOR x X[train] within available memory.
+    """
+    workers = min(cpus or os.cpu_count() or 1, n_folds)
+    if model == "ridge":
+        return workers
+    memory = available_memory()
+    if memory is None:
+        return workers
+    per_worker = TREE_MEMORY_FACTOR * X.nbytes * (n_folds - 1) / n_folds
+    # Leave room for the shared arrays themselves
+    return max(1, min(workers, int((memory - X.nbytes) // max(per_worker, 1))))
+
+
+def spatial_cv(
+    X,
+    y,
+    lat,
+    lon,
+    model="ridge",
+    params=None,
+    n_folds=DEFAULT_FOLDS,
+    block_deg=DEFAULT_BLOCK_DEG,
+    buffer=0,
+    workers=None,
+    threads=None,
+    seed=0,
+):
+    """Spatial block cross-validation; returns fold metrics and out-of-fold predictions
+
+    ``workers`` processes train folds concurrently (default: one per fold,
+    capped at the CPU count and, for tree models, at what fits in memory;
+    see default_workers()) with ``threads`` native threads each (default:
+    CPUs divided among the workers).
+    """
+    cpus = os.cpu_count() or 1
+    X = np.asarray(X, dtype=np.float32)
+    workers = min(workers, n_folds) if workers else default_workers(X, model, n_folds, cpus)
+    threads = threads or max(1, cpus // workers)
+    blocks, block_rc = spatial_blocks(lat, lon, block_deg)
+    fold_of_block = assign_folds(blocks, len(block_rc), n_folds, seed)
+    folds = fold_of_block[blocks]
+    arrays = {
+        "X": X,
+        "y": np.asarray(y, dtype=np.float32),
+        "blocks": blocks,
+        "folds": folds,
+        "oof": np.full(len(y), np.nan, dtype=np.float32),
+    }
+    start = time.perf_counter()
+    if workers == 1:
+        _WORKER.update({"arrays": arrays, "threads": threads})
+        try:
+            results = [_run_fold(f, model, params, block_rc, buffer) for f in range(n_folds)]
+        finally:
+            _WORKER.clear()
+        oof = arrays["oof"]
+    else:
+        with SharedArrays(arrays) as shared:
+            # Spawned workers are started by submit() and read the thread
+            # variables when NumPy loads its BLAS, so set them around it
+            saved = dict(os.environ)
+            os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+            try:
+                pool = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=get_context("spawn"),
+                    initializer=_init_worker, initargs=(shared.spec, threads),
+                )
+                futures = [pool.submit(_run_fold, f, model, params, block_rc, buffer) for f in range(n_folds)]
+            finally:
+                os.environ.clear()
+                os.environ.update(saved)
+            with pool:
+                results = [future.result() for future in futures]
+            oof = shared.arrays["oof"].copy()
+    seconds = time.perf_counter() - start
+
+    summary = regression_metrics(arrays["y"], oof)
+    summary.update(
+        {
+            "model": model,
+            "n_points": int(len(y)),
+            "n_blocks": int(len(block_rc)),
+            "n_folds": n_folds,
+            "block_deg": block_deg,
+            "buffer": buffer,
+            "workers": workers,
+            "threads_per_worker": threads,
+            "seconds": round(seconds, 4),
+        }
+    )
+    return {"summary": summary, "folds": results, "oof": oof, "fold_of_point": folds}
+
+
+def main(argv=None):
+    """Cross-validate a poverty model with spatial blocks"""
+    parser = argparse.ArgumentParser(description="Spatial block cross-validation")
+    parser.add_argument("source", help="columnar store or CSV with point features")
+    parser.add_argument("--model", default="ridge", choices=("ridge", "xgboost", "hist_gbm"))
+    parser.add_argument("--params", default="{}", help="model parameters as JSON")
+    parser.add_argument("--features", nargs="+", default=list(DEFAULT_FEATURES))
+    parser.add_argument("--target", default=DEFAULT_TARGET)
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS)
+    parser.add_argument("--block-deg", type=float, default=DEFAULT_BLOCK_DEG)
+    parser.add_argument("--buffer", type=int, default=0, help="blocks dropped around each test fold")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="native threads per worker")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--output", default=None, help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        X, y, lat, lon = load_features(args.source, args.features, args.target, args.limit)
+        report = spatial_cv(
+            X, y, lat, lon, args.model, json.loads(args.params), args.folds, args.block_deg,
+            args.buffer, args.workers, args.threads,
+        )
+    except (FileNotFoundError, KeyError, ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    summary = report["summary"]
+    print(f"{summary['n_points']:,} points in {summary['n_blocks']:,} blocks of {args.block_deg:g} deg, "
+          f"{args.folds} folds, {summary['workers']} workers x {summary['threads_per_worker']} threads")
+    for fold in report["folds"]:
+        print(f"  fold {fold['fold']}: train {fold['n_train']:,}  test {fold['n_test']:,}  "
+              f"rmse {fold['rmse']:.4f}  r2 {fold['r2'] if fold['r2'] is None else round(fold['r2'], 4)}  "
+              f"fit {fold['fit_seconds']:.2f}s")
+    print(f"Out-of-fold: rmse {summary['rmse']:.4f}  mae {summary['mae']:.4f}  r2 {summary['r2']:.4f}  "
+          f"in {summary['seconds']:.2f}s")
+    if args.output:
+        out = {"summary": summary, "folds": report["folds"]}
+        Path(args.output).write_text(json.dumps(out, indent=1), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+ORAIL CITIZEN AI - Pipeline DAG Runner
+Geospatial Poverty Mapping Framework
+
+Runs the data -> features -> ML -> visualization flow as a graph of stages
+whose outputs are cached by content, so a rerun executes only the stages
+downstream of something that changed.
+
+Each stage declares:
+    inputs    external files or directories, hashed by content (hashes are
+              memoised by size and mtime, so unchanged inputs are not reread)
+    deps      upstream stages; the hash of their output enters the key, so
+              an upstream rerun that produces identical output does not
+              invalidate anything below it
+    params    JSON values passed to the stage function
+    code      the stage function plus any functions/modules it relies on;
+              their source is hashed as the code version (``version`` adds
+              an explicit tag on top)
+
+The stage key is the hash of all four. Outputs live in
+data/cache/pipeline/<stage>-<key16>/ with a _stage.json written last (a
+directory without it is incomplete and gets rebuilt). Stage functions are
+called as ``func(out_dir, inputs, **params)``, where ``inputs`` maps input
+and dependency names to paths; they write files into out_dir and may return
+a JSON-serialisable summary.
+
+Stages whose dependencies are done run concurrently in worker processes
+(stage functions must be module-level). Every run appends per-stage status,
+timing and keys to logs/pipeline_runs.jsonl.
+
+Usage:
+    pipeline = Pipeline(workers=4)
+    pipeline.add("points", build_points, inputs={"csv": "data/processed/orail_demo_data.csv"})
+    pipeline.add("cells", build_cells, deps=["points"], params={"resolutions": [0.25]})
+    report = pipeline.run()
+    cells_dir = pipeline.artifact("cells")
+"""
+
+import inspect
+import json
+import os
+import shutil
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from scripts.python.provisioning.manifest import hash_bytes, hash_file
+
+PIPELINE_CACHE_DIR = os.path.join("data", "cache", "pipeline")
+PIPELINE_LOG = os.path.join("logs", "pipeline_runs.jsonl")
+PIPELINE_VERSION = 1
+STAGE_MANIFEST = "_stage.json"
+
+
+def _source(obj):
+    """Source text of a function or module, for code versioning"""
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        if isinstance(obj, types.ModuleType):
+            return repr(obj)
+        return repr(getattr(obj, "__code__", obj))
+
+
+def code_version(objects, version=None):
+    """Hash of the source of functions/modules plus an optional tag"""
+    sources = [f"{getattr(o, '__module__', '')}.{getattr(o, '__qualname__', getattr(o, '__name__', ''))}\n"
+               f"{_source(o)}" for o in objects]
+    return hash_bytes(json.dumps({"sources": sources, "version": version}).encode("utf-8"))
+
+
+def tree_hash(path, file_hash=hash_file):
+    """Content hash of a file, or of a directory's relative paths and files"""
+    path = Path(path)
+    if path.is_file():
+        return file_hash(path)
+    if not path.is_dir():
+        raise FileNotFoundError(f"Pipeline input not found: {path}")
+    entries = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name == STAGE_MANIFEST:
+                continue
+            full = Path(root) / name
+            entries.append([full.relative_to(path).as_posix(), file_hash(full)])
+    return hash_bytes(json.dumps(entries).encode("utf-8"))
+
+
+class HashMemo:
+    """File hashes memoised by (path, size, mtime), persisted as JSON"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+        self.changed = False
+
+    def __call__(self, path):
+        path = Path(path)
+        st = path.stat()
+        stamp = [st.st_size, st.st_mtime_ns]
+        key = str(path.resolve())
+        entry = self.entries.get(key)
+        if entry and entry[0] == stamp:
+            return entry[1]
+        digest = hash_file(path)
+        self.entries[key] = [stamp, digest]
+        self.changed = True
+        return digest
+
+    def save(self):
+        if self.changed:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.entries), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self.changed = False
+
+
+class Stage:
+    """One node of the pipeline graph"""
+
+    def __init__(self, name, func, inputs=None, deps=(), params=None, code=(), version=None):
+        self.name = name
+        self.func = func
+        self.inputs = {k: Path(v) for k, v in (inputs or {}).items()}
+        self.deps = list(deps)
+        self.params = dict(params or {})
+        self.code = code_version([func, *code], version)
+        overlap = set(self.inputs) & set(self.deps)
+        if overlap:
+            raise ValueError(f"Stage '{name}': names used as both input and dependency: {sorted(overlap)}")
+
+    def key(self, input_hashes, dep_hashes):
+        payload = {
+            "pipeline": PIPELINE_VERSION,
+            "name": self.name,
+            "code": self.code,
+            "params": self.params,
+            "inputs": input_hashes,
+            "deps": dep_hashes,
+        }
+        return hash_bytes(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+
+
+def _execute(func, name, key, out_dir, inputs, params):
+    """Run a stage into a scratch directory, hash it and move it into place"""
+    out_dir = Path(out_dir)
+    tmp = out_dir.with_name(f"{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    try:
+        start = time.perf_counter()
+        result = func(tmp, {k: Path(v) for k, v in inputs.items()}, **params)
+        seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        manifest = {
+            "name": name,
+            "key": key,
+            "output_hash": tree_hash(tmp),
+            "seconds": round(seconds, 4),
+            "hash_seconds": round(time.perf_counter() - start, 4),
+            "result": result,
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        (tmp / STAGE_MANIFEST).write_text(json.dumps(manifest, indent=1, default=str), encoding="utf-8")
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+class Pipeline:
+    """A DAG of stages with content-addressed, memoised outputs"""
+
+    def __init__(self, cache_root=PIPELINE_CACHE_DIR, workers=None, log_path=PIPELINE_LOG):
+        self.cache_root = Path(cache_root)
+        self.workers = workers or os.cpu_count() or 1
+        self.log_path = Path(log_path) if log_path else None
+        self.stages = {}
+        self.artifacts = {}
+
+    def add(self, name, func, inputs=None, deps=(), params=None, code=(), version=None):
+        """Declare a stage; dependencies must be added first"""
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already defined")
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on undefined stages: {missing}")
+        stage = Stage(name, func, inputs, deps, params, code, version)
+        self.stages[name] = stage
+        return stage
+
+    def order(self, targets=None):
+        """Stages needed for the targets (all by default), dependencies first"""
+        wanted = list(targets) if targets else list(self.stages)
+        unknown = [t for t in wanted if t not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stages: {unknown}")
+        needed = set()
+        stack = list(wanted)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].deps)
+        # Definition order is already topological (deps must exist when added)
+        return [name for name in self.stages if name in needed]
+
+    def stage_dir(self, name, key):
+        return self.cache_root / f"{name}-{key[:16]}"
+
+    def _cached(self, name, key):
+        path = self.stage_dir(name, key) / STAGE_MANIFEST
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("key") == key else None
+
+    def _input_hashes(self, stage, memo):
+        return {k: tree_hash(p, memo) for k, p in stage.inputs.items()}
+
+    def plan(self, targets=None):
+        """[(stage, status)]: 'cached', 'run' or 'pending' (an upstream stage must run first)"""
+        memo = HashMemo(self.cache_root / "file_hashes.json")
+        outputs, plan = {}, []
+        for name in self.order(targets):
+            stage = self.stages[name]
+            if any(d not in outputs for d in stage.deps):
+                plan.append((name, "pending"))
+                continue
+            key = stage.key(self._input_hashes(stage, memo), {d: outputs[d] for d in stage.deps})
+            manifest = self._cached(name, key)
+            if manifest is None:
+                plan.append((name, "run"))
+            else:
+                outputs[name] = manifest["output_hash"]
+                plan.append((name, "cached"))
+        memo.save()
+        return plan
+
+    def run(self, targets=None, force=()):
+        """Run the stages needed for the targets; returns the run report
+
+        ``force`` names stages to rebuild even when cached. Independent
+        stages run in parallel worker processes. Raises RuntimeError (after
+        logging the run) if any stage failed; stages depending on a failed
+        stage are skipped.
+        """
+        order = self.order(targets)
+        force = set(force)
+        memo = HashMemo(self.cache_root / "file_hashes.json")
+        self.cache_root.mkdir(parents=True, exist_ok=True)
+        started = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        outputs, report, running = {}, {}, {}
+        remaining = list(order)
+        pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+
+        def finish(name, manifest, status, wall):
+            outputs[name] = manifest["output_hash"]
+            self.artifacts[name] = self.stage_dir(name, manifest["key"])
+            report[name] = {
+                "status": status,
+                "seconds": manifest["seconds"] if status == "ran" else 0.0,
+                "wall_seconds": round(wall, 4),
+                "key": manifest["key"],
+                "path": str(self.artifacts[name]),
+                "result": manifest.get("result"),
+            }
+
+        def fail(name, error):
+            report[name] = {"status": "failed", "seconds": 0.0, "error": f"{type(error).__name__}: {error}"}
+
+        try:
+            while remaining or running:
+                for name in list(remaining):
+                    stage = self.stages[name]
+                    blocked = [d for d in stage.deps if report.get(d, {}).get("status") in ("failed", "skipped")]
+                    if blocked:
+                        report[name] = {"status": "skipped", "seconds": 0.0, "blocked_by": blocked}
+                        remaining.remove(name)
+                        continue
+                    if any(d not in outputs for d in stage.deps):
+                        continue
+                    remaining.remove(name)
+                    lookup = time.perf_counter()
+                    try:
+                        key = stage.key(self._input_hashes(stage, memo), {d: outputs[d] for d in stage.deps})
+                    except FileNotFoundError as e:
+                        report[name] = {"status": "failed", "seconds": 0.0, "error": str(e)}
+                        continue
+                    manifest = None if name in force else self._cached(name, key)
+                    if manifest is not None:
+                        finish(name, manifest, "cached", time.perf_counter() - lookup)
+                        continue
+                    inputs = {k: str(p) for k, p in stage.inputs.items()}
+                    inputs.update({d: str(self.artifacts[d]) for d in stage.deps})
+                    call = (stage.func, name, key, str(self.stage_dir(name, key)), inputs, stage.params)
+                    if pool is None:
+                        try:
+                            finish(name, _execute(*call), "ran", time.perf_counter() - lookup)
+                        except Exception as e:  # noqa: BLE001 - reported per stage
+                            fail(name, e)
+                        break
+                    running[name] = (pool.submit(_execute, *call), time.perf_counter())
+                if not running:
+                    continue
+                done, _ = wait([f for f, _ in running.values()], return_when=FIRST_COMPLETED)
+                for name, (future, submitted) in list(running.items()):
+                    if future not in done:
+                        continue
+                    del running[name]
+                    try:
+                        finish(name, future.result(), "ran", time.perf_counter() - submitted)
+                    except Exception as e:  # noqa: BLE001 - reported per stage
+                        fail(name, e)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            memo.save()
+
+        run = {
+            "started": started.isoformat(timespec="seconds"),
+            "seconds": round(time.perf_counter() - start, 4),
+            "workers": self.workers,
+            "stages": {name: report[name] for name in order if name in report},
+        }
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            entry = dict(run, stages={k: {f: v.get(f) for f in ("status", "seconds", "wall_seconds", "key", "error")}
+                                      for k, v in run["stages"].items()})
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        failed = [n for n, r in run["stages"].items() if r["status"] == "failed"]
+        if failed:
+            errors = "; ".join(f"{n}: {run['stages'][n]['error']}" for n in failed)
+            raise RuntimeError(f"Pipeline stages failed: {errors}")
+        return run
+
+    def artifact(self, name):
+        """Output directory of a stage from the last run, or from the cache"""
+        if name in self.artifacts:
+            return self.artifacts[name]
+        memo = HashMemo(self.cache_root / "file_hashes.json")
+        outputs = {}
+        for stage_name in self.order([name]):
+            stage = self.stages[stage_name]
+            key = stage.key(self._input_hashes(stage, memo), {d: outputs[d] for d in stage.deps})
+            manifest = self._cached(stage_name, key)
+            if manifest is None:
+                raise KeyError(f"Stage '{stage_name}' has no up-to-date output; run the pipeline first")
+            outputs[stage_name] = manifest["output_hash"]
+            self.artifacts[stage_name] = self.stage_dir(stage_name, key)
+        return self.artifacts[name]
+
+    def prune(self, keep=None):
+        """Delete cached stage outputs other than ``keep`` (default: the last run's)"""
+        keep = {Path(p).resolve() for p in (keep if keep is not None else self.artifacts.values())}
+        removed = 0
+        if not self.cache_root.is_dir():
+            return removed
+        for path in self.cache_root.iterdir():
+            if path.is_dir() and path.resolve() not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
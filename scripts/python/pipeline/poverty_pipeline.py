@@ -0,0 +1,186 @@
+"""
+ORAIL CITIZEN AI - Poverty Mapping Pipeline
+Geospatial Poverty Mapping Framework
+
+The README's data -> features -> visualization flow as a cached DAG
+(dag.py), replacing the notebook cells that reload and recompute
+everything on every run:
+
+    points ──┬── cells            grid/hex aggregates (aggregation.py)
+             ├── map              shaded PNG (raster_render.py)
+             ├── tiles            XYZ pyramid (tile_pyramid.py)
+             └── states ── state_summary   (with --boundaries)
+
+Only stages downstream of a changed input, parameter or module rerun;
+cells, map, tiles and states run in parallel once points exists. Stage
+outputs are in data/cache/pipeline/, timings in logs/pipeline_runs.jsonl.
+
+Usage:
+    python -m scripts.python.pipeline.poverty_pipeline run \\
+        --csv data/processed/orail_demo_data.csv --max-zoom 8
+    python -m scripts.python.pipeline.poverty_pipeline plan --csv ... --cmap viridis
+    python -m scripts.python.pipeline.poverty_pipeline prune --csv ...
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing import poverty_store
+from scripts.python.geospatial import aggregation, state_join
+from scripts.python.pipeline.dag import PIPELINE_CACHE_DIR, Pipeline
+from scripts.python.visualization import raster_render, tile_pyramid
+
+DEFAULT_CSV = Path("data") / "processed" / "orail_demo_data.csv"
+
+
+def build_points(out, inputs, row_group_size=poverty_store.DEFAULT_ROW_GROUP_SIZE):
+    """CSV -> columnar point store"""
+    store = poverty_store.convert_csv(inputs["csv"], out / "points.store", row_group_size=row_group_size)
+    return {"rows": len(store)}
+
+
+def build_cells(out, inputs, resolutions, kind):
+    """Points -> grid/hex cell stores"""
+    aggregator = aggregation.aggregate_store(inputs["points"] / "points.store", out, resolutions, kind)
+    return {"points": aggregator.n_rows, "resolutions": list(resolutions)}
+
+
+def build_map(out, inputs, width, height, cmap, agg):
+    """Points -> shaded PNG"""
+    canvas = raster_render.render_points(
+        str(inputs["points"] / "points.store"), out / "poverty_map.png", width, height, agg=agg, cmap=cmap
+    )
+    return {"bbox": list(canvas.bbox)}
+
+
+def build_tiles(out, inputs, max_zoom, cmap, agg):
+    """Points -> XYZ tile pyramid"""
+    report = tile_pyramid.TilePyramid(out).build(
+        str(inputs["points"] / "points.store"), max_zoom=max_zoom, agg=agg, cmap=cmap
+    )
+    return {"tiles": report["tiles"], "points": report["points"]}
+
+
+def build_states(out, inputs, name_field):
+    """Points -> state index per point (a one-column store)"""
+    layer = state_join.PolygonLayer.from_shapefile(inputs["boundaries"], name_field)
+    points = poverty_store.PovertyStore(inputs["points"] / "points.store")
+    ids = state_join.assign_states(points.column("latitude"), points.column("longitude"), layer)
+    poverty_store.write_store(out / "states.store", {"state_id": ids}, {"state_id": "<i2"})
+    labels = {"no_value": state_join.NO_STATE, "names": layer.names}
+    (out / "states.store" / "state_id.labels.json").write_text(json.dumps(labels, indent=1), encoding="utf-8")
+    return {"states": len(layer), "unassigned": int(np.count_nonzero(ids == state_join.NO_STATE))}
+
+
+def build_state_summary(out, inputs):
+    """Population-weighted poverty and indices per state"""
+    store_path = inputs["states"] / "states.store"
+    ids = poverty_store.PovertyStore(store_path).column("state_id").astype(np.int64)
+    names = json.loads((store_path / "state_id.labels.json").read_text(encoding="utf-8"))["names"]
+    points = poverty_store.PovertyStore(inputs["points"] / "points.store")
+    n = len(names) + 1
+    weight = np.bincount(ids + 1, points.column("population").astype(np.float64), minlength=n)
+    summary = {}
+    for column in aggregation.WEIGHTED_COLUMNS:
+        values = points.column(column).astype(np.float64) * points.column("population")
+        sums = np.bincount(ids + 1, values, minlength=n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / weight
+        for i, name in enumerate(names):
+            if weight[i + 1] > 0:
+                summary.setdefault(name, {"population": int(weight[i + 1])})[column] = round(float(means[i + 1]), 5)
+    (out / "state_summary.json").write_text(json.dumps(summary, indent=1), encoding="utf-8")
+    return {"states": len(summary)}
+
+
+def build_pipeline(
+    csv=DEFAULT_CSV,
+    boundaries=None,
+    resolutions=aggregation.DEFAULT_RESOLUTIONS,
+    kind="grid",
+    width=1600,
+    height=1200,
+    cmap="Reds",
+    agg="weighted_mean",
+    max_zoom=8,
+    name_field="State_Name",
+    cache_root=PIPELINE_CACHE_DIR,
+    workers=None,
+    log_path=None,
+):
+    """The poverty mapping DAG for a CSV (and optional boundary shapefile)"""
+    kwargs = {} if log_path is None else {"log_path": log_path}
+    pipeline = Pipeline(cache_root, workers, **kwargs)
+    pipeline.add("points", build_points, inputs={"csv": csv}, code=[poverty_store])
+    pipeline.add(
+        "cells", build_cells, deps=["points"], params={"resolutions": list(resolutions), "kind": kind},
+        code=[aggregation, poverty_store],
+    )
+    pipeline.add(
+        "map", build_map, deps=["points"],
+        params={"width": width, "height": height, "cmap": cmap, "agg": agg}, code=[raster_render],
+    )
+    pipeline.add(
+        "tiles", build_tiles, deps=["points"], params={"max_zoom": max_zoom, "cmap": cmap, "agg": agg},
+        code=[tile_pyramid, raster_render],
+    )
+    if boundaries is not None:
+        shp = Path(boundaries)
+        inputs = {"boundaries": shp}
+        for suffix in (".dbf", ".shx", ".prj"):
+            if shp.with_suffix(suffix).exists():
+                inputs[f"boundaries{suffix.replace('.', '_')}"] = shp.with_suffix(suffix)
+        pipeline.add(
+            "states", build_states, inputs=inputs, deps=["points"], params={"name_field": name_field},
+            code=[state_join],
+        )
+        pipeline.add("state_summary", build_state_summary, deps=["points", "states"], code=[aggregation])
+    return pipeline
+
+
+def main(argv=None):
+    """Run, plan or prune the poverty mapping pipeline"""
+    parser = argparse.ArgumentParser(description="Cached poverty mapping pipeline")
+    parser.add_argument("command", choices=("run", "plan", "prune"))
+    parser.add_argument("--csv", default=str(DEFAULT_CSV))
+    parser.add_argument("--boundaries", default=None, help="state boundary shapefile (.shp)")
+    parser.add_argument("--resolutions", type=float, nargs="+", default=list(aggregation.DEFAULT_RESOLUTIONS))
+    parser.add_argument("--kind", choices=("grid", "hex"), default="grid")
+    parser.add_argument("--cmap", default="Reds")
+    parser.add_argument("--max-zoom", type=int, default=8)
+    parser.add_argument("--targets", nargs="*", default=None, help="stages to bring up to date (default: all)")
+    parser.add_argument("--force", nargs="*", default=(), help="stages to rebuild even if cached")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=PIPELINE_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    pipeline = build_pipeline(
+        args.csv, args.boundaries, args.resolutions, args.kind, cmap=args.cmap, max_zoom=args.max_zoom,
+        cache_root=args.cache_dir, workers=args.workers,
+    )
+    try:
+        if args.command == "plan":
+            for name, status in pipeline.plan(args.targets):
+                print(f"  {name:<14} {status}")
+            return 0
+        if args.command == "prune":
+            pipeline.run(args.targets)
+            print(f"Removed {pipeline.prune()} stale stage outputs")
+            return 0
+        report = pipeline.run(args.targets, force=args.force)
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    for name, stage in report["stages"].items():
+        print(f"  {name:<14} {stage['status']:<7} {stage['seconds']:8.2f}s  {stage.get('path', '')}")
+    print(f"Pipeline: {report['seconds']:.2f}s with {report['workers']} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
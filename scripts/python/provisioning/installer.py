@@ -0,0 +1,267 @@
+"""
+ORAIL CITIZEN AI - Dependency Installer
+Geospatial Poverty Mapping Framework
+
+Installs only the packages that are missing, with one resolver run for the
+whole set instead of one pip subprocess per package. Downloads are kept in a
+local wheelhouse (data/cache/wheelhouse) and any source distributions are
+built into wheels in parallel, so later worker nodes that share the
+wheelhouse install offline from local wheels.
+
+Phases (each one timed):
+    probe     read installed distributions from package metadata
+    offline   try installing the missing set from the wheelhouse alone
+    download  pip download the missing set into the wheelhouse (one resolve)
+    build     build wheels for downloaded sdists, in parallel (build
+              requirements such as setuptools come from the index)
+    install   pip install the missing set from the wheelhouse
+
+Usage:
+    python -m scripts.python.provisioning.installer geopandas rasterio fiona
+    python -m scripts.python.provisioning.installer --offline geopandas
+"""
+
+import argparse
+import importlib.metadata
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_WHEELHOUSE = os.path.join("data", "cache", "wheelhouse")
+SDIST_SUFFIXES = (".tar.gz", ".zip", ".tar.bz2")
+
+_LIST_DISTRIBUTIONS = (
+    "import importlib.metadata, json;"
+    "print(json.dumps({d.metadata['Name']: d.version"
+    " for d in importlib.metadata.distributions() if d.metadata['Name']}))"
+)
+
+
+def normalize_name(name):
+    """Normalise a distribution name as pip does (PEP 503)"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def requirement_name(requirement):
+    """Distribution name from a requirement string such as 'numpy>=1.26'"""
+    match = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)", requirement)
+    if not match:
+        raise ValueError(f"Invalid requirement: {requirement!r}")
+    return match.group(1)
+
+
+def _same_interpreter(python_exe):
+    if not python_exe:
+        return True
+    try:
+        return os.path.samefile(python_exe, sys.executable)
+    except OSError:
+        return False
+
+
+def installed_distributions(python_exe=None):
+    """Return {normalised name: version} for the target interpreter"""
+    if _same_interpreter(python_exe):
+        return {
+            normalize_name(dist.metadata["Name"]): dist.version
+            for dist in importlib.metadata.distributions()
+            if dist.metadata["Name"]
+        }
+    proc = subprocess.run(
+        [python_exe, "-c", _LIST_DISTRIBUTIONS],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return {normalize_name(k): v for k, v in json.loads(proc.stdout).items()}
+
+
+def missing_requirements(requirements, python_exe=None):
+    """Requirements whose distribution is not installed
+
+    Only presence is checked; version specifiers are passed through to pip
+    for packages that are missing.
+    """
+    installed = installed_distributions(python_exe)
+    return [
+        req
+        for req in dict.fromkeys(requirements)
+        if normalize_name(requirement_name(req)) not in installed
+    ]
+
+
+def _pip(python_exe, *args):
+    """Run a pip command, returning the CompletedProcess"""
+    cmd = [python_exe or sys.executable, "-m", "pip", *args]
+    return subprocess.run(cmd, capture_output=True, text=True)
+
+
+def _error_tail(proc):
+    lines = (proc.stderr or proc.stdout or "").strip().splitlines()
+    return lines[-1] if lines else f"exit code {proc.returncode}"
+
+
+def _sdists(wheelhouse):
+    return [
+        path
+        for path in Path(wheelhouse).iterdir()
+        if path.is_file() and path.name.endswith(SDIST_SUFFIXES)
+    ]
+
+
+def build_wheels(wheelhouse, python_exe=None, max_workers=None, use_index=True):
+    """Build wheels for every sdist in the wheelhouse, in parallel
+
+    pip download does not fetch build-system requirements (setuptools,
+    wheel, ...), so the isolated build environments may reach the package
+    index for them unless ``use_index`` is False. Successfully built sdists
+    are removed so the next run skips them. Returns a list of
+    (sdist name, error) for builds that failed.
+    """
+    sdists = _sdists(wheelhouse)
+    if not sdists:
+        return []
+    index_args = [] if use_index else ["--no-index"]
+
+    def build(sdist):
+        proc = _pip(
+            python_exe,
+            "wheel",
+            "--no-deps",
+            *index_args,
+            "--find-links",
+            str(wheelhouse),
+            "--wheel-dir",
+            str(wheelhouse),
+            str(sdist),
+        )
+        if proc.returncode != 0:
+            return sdist.name, _error_tail(proc)
+        sdist.unlink()
+        return sdist.name, None
+
+    workers = max_workers or min(len(sdists), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(build, sdists))
+    return [(name, error) for name, error in results if error]
+
+
+def install_packages(
+    requirements,
+    python_exe=None,
+    wheelhouse=DEFAULT_WHEELHOUSE,
+    offline=False,
+    dry_run=False,
+):
+    """Install the missing subset of ``requirements`` in a single resolve
+
+    Returns a report dict with the missing set, where it was installed from,
+    any errors and per-phase timings in seconds.
+    """
+    report = {
+        "missing": [],
+        "source": None,
+        "ok": True,
+        "errors": [],
+        "timings": {},
+    }
+    timings = report["timings"]
+
+    start = time.perf_counter()
+    missing = missing_requirements(requirements, python_exe)
+    timings["probe"] = time.perf_counter() - start
+    report["missing"] = missing
+    if not missing or dry_run:
+        return report
+
+    wheelhouse = Path(wheelhouse)
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    local_install = ["install", "--no-index", "--find-links", str(wheelhouse)]
+
+    # Later nodes: everything may already be in the shared wheelhouse
+    if any(wheelhouse.iterdir()):
+        start = time.perf_counter()
+        proc = _pip(python_exe, *local_install, *missing)
+        timings["offline"] = time.perf_counter() - start
+        if proc.returncode == 0:
+            report["source"] = "wheelhouse"
+            return report
+        if offline:
+            report["ok"] = False
+            report["errors"].append(_error_tail(proc))
+            return report
+    elif offline:
+        report["ok"] = False
+        report["errors"].append(f"Wheelhouse is empty: {wheelhouse}")
+        return report
+
+    start = time.perf_counter()
+    proc = _pip(python_exe, "download", "--dest", str(wheelhouse), *missing)
+    timings["download"] = time.perf_counter() - start
+    if proc.returncode != 0:
+        report["ok"] = False
+        report["errors"].append(_error_tail(proc))
+        return report
+
+    start = time.perf_counter()
+    failed = build_wheels(wheelhouse, python_exe)
+    timings["build"] = time.perf_counter() - start
+    if failed:
+        # The --no-index install below cannot succeed without these wheels
+        report["ok"] = False
+        report["errors"].extend(f"{name}: {error}" for name, error in failed)
+        return report
+
+    start = time.perf_counter()
+    proc = _pip(python_exe, *local_install, *missing)
+    timings["install"] = time.perf_counter() - start
+    if proc.returncode != 0:
+        report["ok"] = False
+        report["errors"].append(_error_tail(proc))
+    else:
+        report["source"] = "index"
+    return report
+
+
+def print_report(report):
+    """Print the install report with per-phase timings"""
+    if not report["missing"]:
+        print("  All packages already installed")
+    else:
+        print(f"  Missing: {', '.join(report['missing'])}")
+        if report["source"]:
+            print(f"  Installed from: {report['source']}")
+    for error in report["errors"]:
+        print(f"  Error: {error}")
+    for phase, seconds in report["timings"].items():
+        print(f"  {phase}: {seconds:.2f}s")
+
+
+def main(argv=None):
+    """Install missing packages named on the command line"""
+    parser = argparse.ArgumentParser(description="Install missing packages")
+    parser.add_argument("requirements", nargs="+")
+    parser.add_argument("--python", default=None, help="target interpreter")
+    parser.add_argument("--wheelhouse", default=DEFAULT_WHEELHOUSE)
+    parser.add_argument("--offline", action="store_true", help="wheelhouse only")
+    parser.add_argument("--dry-run", action="store_true", help="only list missing")
+    args = parser.parse_args(argv)
+
+    report = install_packages(
+        args.requirements,
+        python_exe=args.python,
+        wheelhouse=args.wheelhouse,
+        offline=args.offline,
+        dry_run=args.dry_run,
+    )
+    print_report(report)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+ORAIL CITIZEN AI - Setup Manifest
+Geospatial Poverty Mapping Framework
+
+Content-hash manifest that makes the setup scripts incremental. Every setup
+step is keyed on a hash of its inputs (the step's own source code plus the
+configuration values it reads) and records hashes of the files it wrote. A
+step is skipped when its inputs are unchanged and its outputs are still on
+disk as written; a dry run reports which steps would run and why.
+
+Usage:
+    manifest = SetupManifest(os.path.join(root, "data", "cache", "setup_manifest.json"))
+    env_path = manifest.run("create_environment_config", create_environment_config,
+                            inputs=config_values)
+    manifest.save()
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    """SHA-256 hex digest of bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    """SHA-256 of a file's content, 'dir' for directories, None if missing"""
+    path = Path(path)
+    if path.is_dir():
+        return "dir"
+    if not path.is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, content, encoding="utf-8"):
+    """Write text to path only if it differs from what is there
+
+    The write goes through a temporary file and a rename so an interrupted
+    setup never leaves a half-written file. Returns True if it wrote.
+    """
+    path = Path(path)
+    data = content.encode(encoding) if isinstance(content, str) else content
+    if path.is_file() and hash_file(path) == hash_bytes(data):
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+
+def write_json_if_changed(path, obj, indent=2):
+    """json.dump equivalent of write_if_changed"""
+    return write_if_changed(path, json.dumps(obj, indent=indent))
+
+
+def inputs_hash(step, inputs=None):
+    """Hash a step's source code together with its input values"""
+    try:
+        code = inspect.getsource(step)
+    except (OSError, TypeError):
+        code = repr(getattr(step, "__code__", step))
+    payload = json.dumps(
+        {"code": code, "inputs": inputs}, sort_keys=True, default=repr
+    )
+    return hash_bytes(payload.encode("utf-8"))
+
+
+def _as_paths(result):
+    """Normalise a step's return value into a list of output paths"""
+    if result is None:
+        return []
+    if isinstance(result, (str, os.PathLike)):
+        return [os.fspath(result)]
+    return [os.fspath(p) for p in result if isinstance(p, (str, os.PathLike))]
+
+
+class SetupManifest:
+    """Records step input hashes and output file hashes between setup runs"""
+
+    def __init__(self, path, dry_run=False, force=False):
+        self.path = Path(path)
+        self.dry_run = dry_run
+        self.force = force
+        self.steps = {}
+        self.actions = []
+        if self.path.is_file():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == MANIFEST_VERSION:
+                self.steps = data.get("steps", {})
+
+    def status(self, name, step_hash):
+        """Reason a step must run, or None if it is up to date"""
+        if self.force:
+            return "forced"
+        entry = self.steps.get(name)
+        if entry is None:
+            return "never run"
+        if entry["inputs"] != step_hash:
+            return "inputs changed"
+        for output, recorded in entry["outputs"].items():
+            current = hash_file(output)
+            if current is None:
+                return f"output missing: {output}"
+            if current != recorded:
+                return f"output modified: {output}"
+        return None
+
+    def run(self, name, step, inputs=None, args=(), kwargs=None):
+        """Run a step unless it is up to date; return its (recorded) result"""
+        step_hash = inputs_hash(step, inputs)
+        reason = self.status(name, step_hash)
+        entry = self.steps.get(name)
+
+        if reason is None:
+            self.actions.append((name, "skip", "up to date"))
+            return entry.get("result")
+        if self.dry_run:
+            self.actions.append((name, "would run", reason))
+            return entry.get("result") if entry else None
+
+        result = step(*args, **(kwargs or {}))
+        self.steps[name] = {
+            "inputs": step_hash,
+            "outputs": {p: hash_file(p) for p in _as_paths(result)},
+            "result": result if isinstance(result, (str, list, tuple)) else None,
+        }
+        self.actions.append((name, "ran", reason))
+        return result
+
+    def save(self):
+        """Persist the manifest (no-op in dry-run mode)"""
+        if self.dry_run:
+            return False
+        data = {"version": MANIFEST_VERSION, "steps": self.steps}
+        return write_json_if_changed(self.path, data)
+
+    def print_summary(self):
+        """Print what each step did, or would do in a dry run"""
+        for name, action, reason in self.actions:
+            print(f"  {name}: {action} ({reason})")
@@ -0,0 +1,194 @@
+"""
+ORAIL CITIZEN AI - Package Probe
+Geospatial Poverty Mapping Framework
+
+Finds out which packages are installed, and at which version, without
+importing them. Presence comes from importlib.util.find_spec and versions
+from importlib.metadata, and packages are probed concurrently. The optional
+deep check imports each package in its own subprocess, so a crashing native
+extension (GDAL, CUDA, ...) is reported instead of killing the setup run.
+
+Usage:
+    python -m scripts.python.provisioning.package_probe geopandas rasterio
+    python -m scripts.python.provisioning.package_probe --deep torch
+"""
+
+import argparse
+import functools
+import importlib.metadata
+import importlib.util
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Distribution name -> top-level import name, where the two differ
+IMPORT_NAMES = {
+    "scikit-learn": "sklearn",
+    "python-dotenv": "dotenv",
+    "netcdf4": "netCDF4",
+    "pyyaml": "yaml",
+    "pillow": "PIL",
+    "opencv-python": "cv2",
+    "beautifulsoup4": "bs4",
+    "sentence-transformers": "sentence_transformers",
+}
+
+DEFAULT_WORKERS = 8
+DEEP_CHECK_TIMEOUT = 120
+
+
+def import_name(package):
+    """Return the top-level module name for a distribution name"""
+    return IMPORT_NAMES.get(package.lower(), package.replace("-", "_"))
+
+
+@functools.lru_cache(maxsize=None)
+def _module_distributions():
+    """Map top-level modules to the distributions that provide them"""
+    return importlib.metadata.packages_distributions()
+
+
+def _distribution_version(package, module):
+    """Look up the installed version from distribution metadata"""
+    for candidate in (package, module):
+        try:
+            return importlib.metadata.version(candidate)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    # Fall back to whichever distribution provides the module
+    for dist in _module_distributions().get(module, []):
+        try:
+            return importlib.metadata.version(dist)
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    return None
+
+
+def probe_package(package):
+    """Probe one package without importing it"""
+    module = import_name(package)
+    result = {
+        "package": package,
+        "module": module,
+        "installed": False,
+        "version": None,
+        "location": None,
+        "error": None,
+    }
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+    if spec is None:
+        return result
+
+    result["installed"] = True
+    result["location"] = spec.origin
+    result["version"] = _distribution_version(package, module)
+    return result
+
+
+def deep_import_check(package, python_exe=None, timeout=DEEP_CHECK_TIMEOUT):
+    """Import a package in an isolated subprocess
+
+    Returns (ok, message). A negative return code means the interpreter was
+    killed by a signal, which is how native extension crashes show up.
+    """
+    module = import_name(package)
+    cmd = [python_exe or sys.executable, "-c", f"import {module}"]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"import timed out after {timeout}s"
+    except OSError as e:
+        return False, f"could not start interpreter: {e}"
+
+    if proc.returncode == 0:
+        return True, "import ok"
+    if proc.returncode < 0:
+        return False, f"interpreter crashed (signal {-proc.returncode})"
+    lines = (proc.stderr or "").strip().splitlines()
+    return False, lines[-1] if lines else f"exit code {proc.returncode}"
+
+
+def probe_packages(
+    packages,
+    deep=False,
+    max_workers=DEFAULT_WORKERS,
+    python_exe=None,
+    timeout=DEEP_CHECK_TIMEOUT,
+):
+    """Probe packages concurrently, returning {package: result} in input order
+
+    With ``deep=True`` every installed package is also imported in its own
+    subprocess and ``result["import_ok"]`` / ``result["import_message"]``
+    record the outcome.
+    """
+    packages = list(dict.fromkeys(packages))
+    workers = max(1, min(max_workers, len(packages) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = dict(zip(packages, pool.map(probe_package, packages)))
+
+        if deep:
+            installed = [p for p in packages if results[p]["installed"]]
+            checks = pool.map(
+                lambda p: deep_import_check(p, python_exe=python_exe, timeout=timeout),
+                installed,
+            )
+            for package, (ok, message) in zip(installed, checks):
+                results[package]["import_ok"] = ok
+                results[package]["import_message"] = message
+
+    return results
+
+
+def installed_versions(results):
+    """Reduce probe results to {package: version} for installed packages"""
+    return {
+        name: result["version"] or "unknown"
+        for name, result in results.items()
+        if result["installed"]
+    }
+
+
+def missing_packages(results):
+    """List packages that are not installed or failed the deep check"""
+    return [
+        name
+        for name, result in results.items()
+        if not result["installed"] or result.get("import_ok") is False
+    ]
+
+
+def format_result(result):
+    """One-line status for a probe result"""
+    name = result["package"]
+    if not result["installed"]:
+        return f"{name}: Not installed"
+    line = f"{name}: {result['version'] or 'unknown version'}"
+    if result.get("import_ok") is False:
+        line += f" (import failed: {result['import_message']})"
+    return line
+
+
+def main(argv=None):
+    """Probe packages named on the command line"""
+    parser = argparse.ArgumentParser(description="Probe installed packages")
+    parser.add_argument("packages", nargs="+")
+    parser.add_argument("--deep", action="store_true", help="import in subprocesses")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = probe_packages(args.packages, deep=args.deep, max_workers=args.workers)
+    for result in results.values():
+        print(f"  {format_result(result)}")
+    print(f"Probed {len(results)} packages in {time.perf_counter() - start:.3f}s")
+    return 0 if not missing_packages(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+ORAIL CITIZEN AI - R Environment
+Geospatial Poverty Mapping Framework
+
+Locates the R installation described in
+config/environments/r_environment_config.json (written by the R setup
+scripts). Python tools that drive R (the 3D render orchestrator, the R
+worker pool) take the Rscript path from here, falling back to Rscript on
+PATH when the configured one does not exist on this machine.
+
+Usage:
+    python -m scripts.python.provisioning.r_environment
+"""
+
+import json
+import os
+import shutil
+import sys
+
+R_CONFIG_PATH = os.path.join("config", "environments", "r_environment_config.json")
+
+
+def load_r_config(path=R_CONFIG_PATH):
+    """The R environment config as a dict ({} if the file is missing)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def find_rscript(config=None, path=R_CONFIG_PATH):
+    """Path of the Rscript executable: R_SCRIPT from the config, else PATH"""
+    config = load_r_config(path) if config is None else config
+    configured = config.get("R_SCRIPT")
+    if configured and os.path.exists(configured):
+        return configured
+    found = shutil.which("Rscript")
+    if found:
+        return found
+    raise FileNotFoundError(
+        f"Rscript not found (R_SCRIPT={configured!r} in {path} does not exist and Rscript is not on PATH)"
+    )
+
+
+def main():
+    """Print the resolved R installation"""
+    config = load_r_config()
+    try:
+        rscript = find_rscript(config)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Rscript: {rscript}")
+    print(f"Libraries installed: {', '.join(config.get('LIBRARIES_INSTALLED', [])) or 'unknown'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""
+ORAIL CITIZEN AI - Persistent R Worker Pool
+Geospatial Poverty Mapping Framework
+
+Keeps a pool of long-lived R processes (scripts/r/worker_server.r) with
+tidyverse, sf, terra and rayshader loaded once, so an R step costs the work
+itself instead of R startup plus library loading on every Rscript call.
+
+Protocol: one JSON request per line on the worker's stdin, one answer line
+on its stdout prefixed with @@ORAIL@@ (other output is kept as a log).
+Each task runs in a fresh R environment, so variables do not leak between
+tasks while packages stay loaded. Data frames are passed as columnar stores
+(poverty_store format: one raw little-endian file per column, text columns
+dictionary-encoded) written to /dev/shm when available, which R reads with
+readBin - no CSV parsing in either direction.
+
+Rscript comes from R_SCRIPT in config/environments/r_environment_config.json.
+
+Usage:
+    with RWorkerPool(size=2) as pool:
+        pool.run("nrow(points)", inputs={"points": frame})            # -> value
+        summary = pool.run("aggregate(poverty_rate ~ state, points, mean)",
+                           inputs={"points": frame}, output=True)     # -> DataFrame
+        pool.run_script("verify_packages.r")
+
+    python -m scripts.python.r_integration.r_workers --size 2 --tasks 20
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.python.data_processing.poverty_store import read_frame, write_frame
+from scripts.python.provisioning.r_environment import find_rscript
+
+WORKER_SCRIPT = os.path.join("scripts", "r", "worker_server.r")
+DEFAULT_LIBRARIES = ("tidyverse", "sf", "terra", "rayshader")
+MARKER = "@@ORAIL@@"
+STARTUP_TIMEOUT = 300
+TASK_TIMEOUT = 3600
+LOG_LINES = 200
+SCRATCH_ROOT = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+class RWorker:
+    """One long-lived R process speaking the line protocol"""
+
+    def __init__(self, rscript, libraries=DEFAULT_LIBRARIES, startup_timeout=STARTUP_TIMEOUT):
+        self.rscript = rscript
+        self.libraries = tuple(libraries)
+        self.tasks = 0
+        self.log = collections.deque(maxlen=LOG_LINES)
+        self._answers = queue.Queue()
+        self.proc = subprocess.Popen(
+            [rscript, WORKER_SCRIPT, *self.libraries],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+        start = time.perf_counter()
+        self.info = self._answer(startup_timeout)
+        self.startup_seconds = time.perf_counter() - start
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            if line.startswith(MARKER):
+                self._answers.put(json.loads(line[len(MARKER):]))
+            else:
+                self.log.append(line.rstrip("\n"))
+        self._answers.put(None)
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            self.log.append(line.rstrip("\n"))
+
+    def _answer(self, timeout):
+        try:
+            answer = self._answers.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise TimeoutError(f"R worker did not answer within {timeout}s") from None
+        if answer is None:
+            raise RuntimeError("R worker exited:\n" + "\n".join(list(self.log)[-20:]))
+        return answer
+
+    @property
+    def alive(self):
+        return self.proc.poll() is None
+
+    def request(self, payload, timeout=TASK_TIMEOUT):
+        """Send one request and wait for its answer"""
+        self.proc.stdin.write(json.dumps(payload) + "\n")
+        self.proc.stdin.flush()
+        answer = self._answer(timeout)
+        self.tasks += 1
+        return answer
+
+    def close(self, timeout=10):
+        if self.alive:
+            try:
+                self.request({"id": 0, "op": "shutdown"}, timeout=timeout)
+                self.proc.wait(timeout=timeout)
+            except (OSError, TimeoutError, RuntimeError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self):
+        if self.alive:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class RWorkerPool:
+    """A fixed number of persistent R workers shared by concurrent callers
+
+    Workers are started lazily and replaced when they crash or time out.
+    ``max_tasks`` recycles a worker after that many tasks (bounds memory
+    growth in long sessions).
+    """
+
+    def __init__(self, size=2, rscript=None, libraries=DEFAULT_LIBRARIES, max_tasks=None,
+                 task_timeout=TASK_TIMEOUT):
+        self.size = int(size)
+        self.rscript = rscript or find_rscript()
+        self.libraries = tuple(libraries)
+        self.max_tasks = max_tasks
+        self.task_timeout = task_timeout
+        self._idle = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=self.size)
+        self.stats = {"tasks": 0, "errors": 0, "restarts": 0, "startup_seconds": 0.0}
+
+    def _acquire(self):
+        with self._lock:
+            start_new = self._idle.empty() and self._started < self.size
+            if start_new:
+                self._started += 1
+        if start_new:
+            try:
+                worker = RWorker(self.rscript, self.libraries)
+            except BaseException:
+                with self._lock:
+                    self._started -= 1
+                raise
+            self.stats["startup_seconds"] += worker.startup_seconds
+            return worker
+        return self._idle.get()
+
+    def _release(self, worker):
+        if not worker.alive or (self.max_tasks and worker.tasks >= self.max_tasks):
+            worker.close()
+            with self._lock:
+                self._started -= 1
+                self.stats["restarts"] += 1
+            return
+        self._idle.put(worker)
+
+    def warm_up(self):
+        """Start every worker now instead of on first use"""
+        workers = [self._acquire() for _ in range(self.size - self._idle.qsize())]
+        for worker in workers:
+            self._release(worker)
+        return self
+
+    def _execute(self, payload, inputs, output):
+        scratch = tempfile.mkdtemp(prefix="orail_r_", dir=SCRATCH_ROOT)
+        try:
+            payload["inputs"] = {}
+            for name, data in (inputs or {}).items():
+                if isinstance(data, (str, os.PathLike)):
+                    payload["inputs"][name] = os.path.abspath(data)
+                else:
+                    path = os.path.join(scratch, f"in_{name}")
+                    write_frame(path, data)
+                    payload["inputs"][name] = path
+            if output:
+                payload["output_path"] = os.path.join(scratch, "out")
+            payload["id"] = next(self._ids)
+
+            worker = self._acquire()
+            try:
+                answer = worker.request(payload, self.task_timeout)
+            except (TimeoutError, RuntimeError, OSError):
+                worker.kill()
+                raise
+            finally:
+                self._release(worker)
+            self.stats["tasks"] += 1
+            if answer.get("status") != "ok":
+                self.stats["errors"] += 1
+                raise RuntimeError(f"R task failed: {answer.get('error')}")
+            if output:
+                if "output_path" not in answer:
+                    raise RuntimeError("R task returned no data frame")
+                answer["frame"] = read_frame(answer["output_path"])
+            return answer
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def submit(self, code=None, script=None, inputs=None, args=None, output=False, result=None):
+        """Queue a task; returns a Future of the answer dict
+
+        ``code`` is R source evaluated for its value, or ``script`` a file
+        run with sys.source (``result`` names a variable to return).
+        ``inputs`` maps R variable names to DataFrames / dicts of arrays or
+        existing store paths; ``args`` are plain JSON values. With
+        ``output=True`` the value must be a data frame, returned as
+        answer["frame"].
+        """
+        if (code is None) == (script is None):
+            raise ValueError("Pass exactly one of code or script")
+        payload = {"args": args or {}}
+        if code is not None:
+            payload["code"] = code
+        else:
+            payload["script"] = os.path.abspath(script)
+            payload["result"] = result
+        return self._executor.submit(self._execute, payload, inputs, output)
+
+    def run(self, code, inputs=None, args=None, output=False):
+        """Evaluate R code; the value (or DataFrame with output=True)"""
+        answer = self.submit(code, inputs=inputs, args=args, output=output).result()
+        return answer["frame"] if output else answer.get("value")
+
+    def run_script(self, path, inputs=None, args=None, result=None, output=False):
+        """Source an R script in a worker; returns the answer dict"""
+        return self.submit(script=path, inputs=inputs, args=args, output=output, result=result).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._idle.empty():
+            self._idle.get().close()
+        self._started = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main(argv=None):
+    """Compare per-task latency of Rscript per task against the worker pool"""
+    parser = argparse.ArgumentParser(description="Persistent R worker pool")
+    parser.add_argument("--size", type=int, default=2)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--libraries", nargs="*", default=list(DEFAULT_LIBRARIES))
+    args = parser.parse_args(argv)
+
+    try:
+        rscript = find_rscript()
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+
+    loads = "; ".join(f"suppressPackageStartupMessages(library({lib}))" for lib in args.libraries)
+    start = time.perf_counter()
+    subprocess.run([rscript, "-e", f"{loads}; invisible(sum(1:10))"], check=True, capture_output=True)
+    spawn_seconds = time.perf_counter() - start
+    print(f"Rscript per task (startup + libraries): {spawn_seconds:.2f}s")
+
+    with RWorkerPool(args.size, rscript, args.libraries) as pool:
+        start = time.perf_counter()
+        pool.warm_up()
+        print(f"Pool of {args.size} started in {time.perf_counter() - start:.2f}s")
+        latencies = []
+        for i in range(args.tasks):
+            start = time.perf_counter()
+            pool.run("sum(seq_len(n))", args={"n": i + 1})
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"Pool per task: median {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms over {args.tasks} tasks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
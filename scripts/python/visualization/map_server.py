@@ -0,0 +1,370 @@
+"""
+ORAIL CITIZEN AI - Local Map Server
+Geospatial Poverty Mapping Framework
+
+Small stdlib HTTP server for the citizen dashboard. It serves pre-rendered
+tiles (tile_pyramid.py), files under outputs/ (maps, visualizations) and
+JSON aggregate queries over a columnar point store. Hot responses are kept
+in a bounded LRU cache that accounts for the byte size of every entry.
+Requests run on a thread per connection (ThreadingHTTPServer); the NumPy
+work behind queries releases the GIL. Nothing outside this process is
+needed, so it can be load-tested on one machine.
+
+Endpoints:
+    GET /tiles/<z>/<x>/<y>.png          tile PNG (204 when the tile is empty)
+    GET /files/<path>                   a file under the outputs directory
+    GET /query/bbox?min_lon=&min_lat=&max_lon=&max_lat=
+                                        count, population, poverty rates in a box
+    GET /query/states                   per-state stats (needs a state_id column)
+    GET /metrics                        cache hit rate, bytes, latency percentiles
+    GET /health
+
+Usage:
+    python -m scripts.python.visualization.map_server \\
+        --tiles outputs/tiles --store data/processed/orail_demo_data.store --port 8765
+"""
+
+import argparse
+import json
+import mimetypes
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import PovertyStore
+from scripts.python.geospatial.spatial_index import SpatialIndex
+from scripts.python.visualization.tile_pyramid import TilePyramid
+
+DEFAULT_CACHE_BYTES = 64 << 20
+ROUTES = ("/tiles", "/files", "/query/bbox", "/query/states", "/metrics", "/health")
+OTHER_ROUTE = "other"
+LATENCY_WINDOW = 2048
+
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values in bytes"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Insert a bytes-like value; values larger than the cache are not kept"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[key] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """(value, hit) for key, computing and caching the value on a miss
+
+        Concurrent misses on the same key compute it once; the other
+        requests wait for that result instead of repeating the work.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = threading.Event()
+        if not owner:
+            pending.wait()
+            with self._lock:
+                value = self._items.get(key)
+            if value is not None:
+                return value, True
+            # Too large to cache, or the computing request failed
+            return compute(), False
+        try:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+            return value, False
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class Metrics:
+    """Per-route request counters and a rolling window of latencies"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+        self.started = time.time()
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.counts[route] += 1
+            if status >= 400:
+                self.errors[route] += 1
+            self.latencies[route].append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            routes = {}
+            for route, count in self.counts.items():
+                values = np.asarray(self.latencies[route]) * 1000
+                routes[route] = {
+                    "requests": count,
+                    "errors": self.errors[route],
+                    "p50_ms": float(np.percentile(values, 50)) if len(values) else None,
+                    "p95_ms": float(np.percentile(values, 95)) if len(values) else None,
+                    "p99_ms": float(np.percentile(values, 99)) if len(values) else None,
+                }
+            return {"uptime_s": time.time() - self.started, "routes": routes}
+
+
+class MapData:
+    """Tiles, output files and the point store behind the server"""
+
+    def __init__(self, tiles_dir=None, store_path=None, files_dir="outputs", index_path=None):
+        self.pyramid = TilePyramid(tiles_dir) if tiles_dir else None
+        self.files_dir = Path(files_dir).resolve() if files_dir else None
+        self.store = PovertyStore(store_path) if store_path else None
+        self.index = None
+        if self.store is not None:
+            if index_path and Path(index_path, "index.json").exists():
+                self.index = SpatialIndex.load(index_path)
+            else:
+                self.index = SpatialIndex.build(
+                    self.store.column("latitude"), self.store.column("longitude")
+                )
+                if index_path:
+                    self.index.save(index_path)
+
+    def tile(self, z, x, y):
+        if self.pyramid is None:
+            raise LookupError("No tile pyramid configured")
+        path = self.pyramid.tile_path(z, x, y)
+        return path.read_bytes() if path is not None else b""
+
+    def file(self, relative):
+        if self.files_dir is None:
+            raise LookupError("No files directory configured")
+        path = (self.files_dir / relative).resolve()
+        if self.files_dir not in path.parents or not path.is_file():
+            raise LookupError(f"No such file: {relative}")
+        return path.read_bytes()
+
+    def _summary(self, rows):
+        pop = self.store.column("population")[rows].astype(np.float64)
+        pov = self.store.column("poverty_rate")[rows].astype(np.float64)
+        total = float(pop.sum())
+        return {
+            "count": int(len(rows)),
+            "population": int(total),
+            "poverty_rate_mean": float(pov.mean()) if len(rows) else None,
+            "poverty_rate_weighted": float((pop * pov).sum() / total) if total else None,
+            "poor_population": int(round(float((pop * pov).sum()))),
+        }
+
+    def bbox_summary(self, min_lon, min_lat, max_lon, max_lat):
+        if self.store is None:
+            raise LookupError("No point store configured")
+        rows = self.index.query_bbox(min_lon, min_lat, max_lon, max_lat)
+        summary = self._summary(rows)
+        summary["bbox"] = [min_lon, min_lat, max_lon, max_lat]
+        return summary
+
+    def state_stats(self, column="state_id"):
+        if self.store is None or column not in self.store.schema:
+            raise LookupError(f"Store has no '{column}' column (run state_join first)")
+        labels = json.loads((self.store.path / f"{column}.labels.json").read_text(encoding="utf-8"))
+        ids = self.store.column(column).astype(np.int64) + 1
+        pop = self.store.column("population").astype(np.float64)
+        pov = self.store.column("poverty_rate").astype(np.float64)
+        n = len(labels["names"]) + 1
+        count = np.bincount(ids, minlength=n)
+        pop_sum = np.bincount(ids, weights=pop, minlength=n)
+        poor = np.bincount(ids, weights=pop * pov, minlength=n)
+        stats = {}
+        for i, name in enumerate(["(none)"] + labels["names"]):
+            if count[i]:
+                stats[name] = {
+                    "count": int(count[i]),
+                    "population": int(pop_sum[i]),
+                    "poverty_rate_weighted": float(poor[i] / pop_sum[i]) if pop_sum[i] else None,
+                }
+        return stats
+
+
+def make_handler(data, cache, metrics):
+    """Request handler class bound to the server's data, cache and metrics"""
+
+    class MapRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; avoid the delayed-ACK stall
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, content_type, cache_status=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            if cache_status:
+                self.send_header("X-Cache", cache_status)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def _send_error(self, status, message):
+            try:
+                self._send(status, json.dumps({"error": message}).encode("utf-8"), "application/json")
+            except OSError:
+                # the client is gone; nothing left to tell it
+                self.close_connection = True
+
+        def _cached(self, key, compute):
+            value, hit = cache.get_or_compute(key, compute)
+            return value, "HIT" if hit else "MISS"
+
+        def do_GET(self):
+            start = time.perf_counter()
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            route = "/" + "/".join(parts[:2]) if parts[:1] == ["query"] else "/" + (parts[0] if parts else "")
+            if route not in ROUTES:
+                # One bucket for unknown paths, so scanners cannot grow the metrics
+                route = OTHER_ROUTE
+            status = 200
+            try:
+                if parts[:1] == ["tiles"] and len(parts) == 4 and parts[3].endswith(".png"):
+                    z, x, y = int(parts[1]), int(parts[2]), int(parts[3][:-4])
+                    body, hit = self._cached(("tile", z, x, y), lambda: data.tile(z, x, y))
+                    status = 200 if body else 204
+                    self._send(status, body, "image/png", hit)
+                elif parts[:1] == ["files"] and len(parts) > 1:
+                    relative = "/".join(parts[1:])
+                    body, hit = self._cached(("file", relative), lambda: data.file(relative))
+                    content_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+                    self._send(200, body, content_type, hit)
+                elif parts == ["query", "bbox"]:
+                    query = parse_qs(url.query)
+                    box = [float(query[k][0]) for k in ("min_lon", "min_lat", "max_lon", "max_lat")]
+                    body, hit = self._cached(
+                        ("bbox", *box), lambda: json.dumps(data.bbox_summary(*box)).encode("utf-8")
+                    )
+                    self._send(200, body, "application/json", hit)
+                elif parts == ["query", "states"]:
+                    body, hit = self._cached(
+                        ("states",), lambda: json.dumps(data.state_stats()).encode("utf-8")
+                    )
+                    self._send(200, body, "application/json", hit)
+                elif parts == ["metrics"]:
+                    body = json.dumps({"cache": cache.stats(), **metrics.snapshot()}).encode("utf-8")
+                    self._send(200, body, "application/json")
+                elif parts == ["health"]:
+                    self._send(200, b'{"status": "ok"}', "application/json")
+                else:
+                    status = 404
+                    self._send(404, b'{"error": "not found"}', "application/json")
+            except (KeyError, ValueError) as e:
+                status = 400
+                self._send_error(400, f"bad request: {e}")
+            except (LookupError, FileNotFoundError) as e:
+                status = 404
+                self._send_error(404, str(e))
+            except ConnectionError:
+                # client disconnected mid-response
+                status = 499
+                self.close_connection = True
+            except Exception as e:
+                status = 500
+                self._send_error(500, f"{type(e).__name__}: {e}")
+            finally:
+                metrics.record(route, time.perf_counter() - start, status)
+
+    return MapRequestHandler
+
+
+def create_server(data, host="127.0.0.1", port=8765, cache_bytes=DEFAULT_CACHE_BYTES):
+    """ThreadingHTTPServer with .cache and .metrics attached; port 0 picks a free one"""
+    cache = ByteLRUCache(cache_bytes)
+    metrics = Metrics()
+    server = ThreadingHTTPServer((host, port), make_handler(data, cache, metrics))
+    server.daemon_threads = True
+    server.cache = cache
+    server.metrics = metrics
+    return server
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Serve poverty map tiles and queries")
+    parser.add_argument("--tiles", default=None, help="tile pyramid directory")
+    parser.add_argument("--store", default=None, help="columnar point store")
+    parser.add_argument("--index", default=None, help="spatial index directory (built if missing)")
+    parser.add_argument("--files", default="outputs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_CACHE_BYTES / (1 << 20))
+    args = parser.parse_args(argv)
+
+    data = MapData(args.tiles, args.store, args.files, args.index)
+    server = create_server(data, args.host, args.port, int(args.cache_mb * (1 << 20)))
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port}  (metrics: /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+ORAIL CITIZEN AI - Raster Point Renderer
+Geospatial Poverty Mapping Framework
+
+Renders millions of poverty points to a PNG without plotting each marker.
+Points are binned straight into a pixel grid with np.bincount (count, sum
+of poverty_rate, population and population x poverty_rate), chunk by
+chunk, and the finished grid is shaded through a colormap. Binning is one
+pass over the data; shading and PNG encoding depend only on the number of
+pixels.
+
+Colormaps come from matplotlib when it is installed; a few (Reds, viridis,
+magma, Greys) are built in so rendering also works without it. The PNG is
+written with zlib directly.
+
+State or country outlines can be drawn on top; the boundary level of detail
+is picked from the map scale so a country-wide map does not trace every
+vertex of the source layer.
+
+Usage:
+    python -m scripts.python.visualization.raster_render \\
+        data/processed/orail_demo_data.store outputs/visualizations/orail_first_map.png \\
+        --agg weighted_mean --cmap Reds --width 3600 --height 2400 \
+        --boundaries Datasource/India-State-and-Country-Shapefile-Updated-Jan-2020-master/.../India_State_Boundary.shp
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import DEFAULT_ROW_GROUP_SIZE, PovertyStore
+from scripts.python.geospatial.boundary_lod import BoundaryLOD
+
+AGGREGATIONS = ("count", "mean", "weighted_mean")
+# Degenerate extents (one point, all points on one latitude) are padded to this, in degrees
+MIN_EXTENT = 1e-6
+
+# Anchor colours of the built-in colormaps (matplotlib's own where available)
+BUILTIN_CMAPS = {
+    "Reds": ["#fff5f0", "#fee0d2", "#fcbba1", "#fc9272", "#fb6a4a", "#ef3b2c", "#cb181d", "#a50f15", "#67000d"],
+    "viridis": ["#440154", "#482878", "#3e4989", "#31688e", "#26828e", "#1f9e89", "#35b779", "#6ece58", "#b5de2b", "#fde725"],
+    "magma": ["#000004", "#1c1044", "#4f127b", "#812581", "#b5367a", "#e55964", "#fb8761", "#fec287", "#fcfdbf"],
+    "Greys": ["#ffffff", "#000000"],
+}
+
+
+def colormap_lut(name, n=256):
+    """(n, 4) uint8 RGBA lookup table for a colormap name"""
+    try:
+        import matplotlib
+
+        cmap = matplotlib.colormaps[name]
+        return (cmap(np.linspace(0.0, 1.0, n)) * 255).round().astype(np.uint8)
+    except (ImportError, KeyError):
+        pass
+    if name not in BUILTIN_CMAPS:
+        raise KeyError(f"Unknown colormap '{name}' (built in: {sorted(BUILTIN_CMAPS)})")
+    anchors = np.array(
+        [[int(c[i : i + 2], 16) for i in (1, 3, 5)] for c in BUILTIN_CMAPS[name]], dtype=np.float64
+    )
+    t = np.linspace(0.0, 1.0, len(anchors))
+    x = np.linspace(0.0, 1.0, n)
+    lut = np.empty((n, 4), dtype=np.uint8)
+    for channel in range(3):
+        lut[:, channel] = np.interp(x, t, anchors[:, channel]).round()
+    lut[:, 3] = 255
+    return lut
+
+
+class Canvas:
+    """Pixel-grid accumulator over a lon/lat bounding box
+
+    ``bbox`` is (min_lon, min_lat, max_lon, max_lat); row 0 is the top edge.
+    A zero-width or zero-height bbox is padded to MIN_EXTENT around its centre.
+    """
+
+    def __init__(self, width, height, bbox):
+        self.width = int(width)
+        self.height = int(height)
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox)
+        if not all(np.isfinite([min_lon, min_lat, max_lon, max_lat])):
+            raise ValueError(f"Canvas bbox must be finite: {bbox}")
+        if max_lon - min_lon < MIN_EXTENT:
+            mid = (min_lon + max_lon) / 2.0
+            min_lon, max_lon = mid - MIN_EXTENT / 2.0, mid + MIN_EXTENT / 2.0
+        if max_lat - min_lat < MIN_EXTENT:
+            mid = (min_lat + max_lat) / 2.0
+            min_lat, max_lat = mid - MIN_EXTENT / 2.0, mid + MIN_EXTENT / 2.0
+        self.bbox = (min_lon, min_lat, max_lon, max_lat)
+        n = self.width * self.height
+        self.count = np.zeros(n, dtype=np.float64)
+        self.value_sum = np.zeros(n, dtype=np.float64)
+        self.weight_sum = np.zeros(n, dtype=np.float64)
+        self.weighted_value_sum = np.zeros(n, dtype=np.float64)
+        self.n_points = 0
+
+    def pixel_index(self, lat, lon):
+        """Flat pixel index per point, -1 outside the canvas"""
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        col = np.floor((lon - min_lon) * (self.width / (max_lon - min_lon))).astype(np.int64)
+        row = np.floor((max_lat - lat) * (self.height / (max_lat - min_lat))).astype(np.int64)
+        # Points exactly on the far edges belong to the last pixel
+        col[col == self.width] = self.width - 1
+        row[row == self.height] = self.height - 1
+        inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        return np.where(inside, row * self.width + col, -1)
+
+    def update(self, lat, lon, value=None, weight=None):
+        """Bin one chunk of points"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        idx = self.pixel_index(lat, lon)
+        keep = idx >= 0
+        if not keep.all():
+            idx = idx[keep]
+            value = None if value is None else np.asarray(value)[keep]
+            weight = None if weight is None else np.asarray(weight)[keep]
+        n = self.width * self.height
+        self.count += np.bincount(idx, minlength=n)
+        if value is not None:
+            value = np.asarray(value, dtype=np.float64)
+            self.value_sum += np.bincount(idx, weights=value, minlength=n)
+            if weight is not None:
+                weight = np.asarray(weight, dtype=np.float64)
+                self.weight_sum += np.bincount(idx, weights=weight, minlength=n)
+                self.weighted_value_sum += np.bincount(idx, weights=weight * value, minlength=n)
+        self.n_points += len(idx)
+
+    def aggregate(self, how="count"):
+        """(height, width) grid of the chosen aggregate; NaN where empty"""
+        if how not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation '{how}' (expected one of {AGGREGATIONS})")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if how == "count":
+                grid = np.where(self.count > 0, self.count, np.nan)
+            elif how == "mean":
+                grid = self.value_sum / self.count
+            else:
+                grid = self.weighted_value_sum / self.weight_sum
+        return grid.reshape(self.height, self.width)
+
+
+def shade(grid, cmap="Reds", how="linear", span=None, background=(255, 255, 255, 0)):
+    """Map a grid to (height, width, 4) uint8 RGBA; NaN pixels get the background
+
+    ``how`` is 'linear', 'log' or 'eq_hist' (rank-based, good for counts
+    with a long tail). ``span`` fixes (low, high) for linear/log scaling.
+    """
+    lut = colormap_lut(cmap)
+    valid = np.isfinite(grid)
+    values = grid[valid]
+    t = np.zeros(len(values))
+    if len(values):
+        if how == "eq_hist":
+            ranked = np.sort(values)
+            t = np.searchsorted(ranked, values, side="right") / len(ranked)
+        else:
+            if how == "log":
+                values = np.log1p(np.maximum(values, 0.0))
+            elif how != "linear":
+                raise ValueError(f"Unknown shading '{how}'")
+            low, high = span if span is not None else (values.min(), values.max())
+            if how == "log" and span is not None:
+                low, high = np.log1p(max(low, 0.0)), np.log1p(max(high, 0.0))
+            t = (values - low) / max(high - low, 1e-12)
+    image = np.empty(grid.shape + (4,), dtype=np.uint8)
+    image[:] = background
+    image[valid] = lut[np.clip((t * (len(lut) - 1)).round(), 0, len(lut) - 1).astype(np.int64)]
+    return image
+
+
+def draw_outlines(image, bbox, rings, color=(60, 60, 60, 255)):
+    """Draw lon/lat rings onto an RGBA image covering ``bbox`` (in place)
+
+    Each segment is sampled about once per pixel, so the cost follows the
+    drawn length rather than the vertex count.
+    """
+    height, width = image.shape[:2]
+    min_lon, min_lat, max_lon, max_lat = bbox
+    scale = np.array([width / (max_lon - min_lon), height / (max_lat - min_lat)])
+    rings = [np.asarray(r, dtype=np.float64) for r in rings if len(r) > 1]
+    if not rings:
+        return image
+    starts = np.concatenate([r[:-1] for r in rings])
+    ends = np.concatenate([r[1:] for r in rings])
+    p0 = (starts - (min_lon, max_lat)) * scale * (1, -1)
+    p1 = (ends - (min_lon, max_lat)) * scale * (1, -1)
+    steps = np.ceil(np.abs(p1 - p0).max(axis=1)).astype(np.int64) + 1
+    seg = np.repeat(np.arange(len(p0)), steps)
+    t = (np.arange(len(seg)) - np.repeat(np.cumsum(steps) - steps, steps)) / np.maximum(
+        steps[seg] - 1, 1
+    )
+    xy = p0[seg] + (p1[seg] - p0[seg]) * t[:, None]
+    col = np.floor(xy[:, 0]).astype(np.int64)
+    row = np.floor(xy[:, 1]).astype(np.int64)
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    image[row[inside], col[inside]] = color
+    return image
+
+
+def encode_png(image, compress_level=6):
+    """PNG bytes of an (height, width, 3|4) uint8 array"""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width, channels = image.shape
+    color_type = {3: 2, 4: 6}[channels]
+    # Filter type 0 (None) byte in front of every scanline
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, -1)
+
+    def chunk(tag, data):
+        return (
+            struct.pack(">I", len(data))
+            + tag
+            + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+        )
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw.tobytes(), compress_level))
+        + chunk(b"IEND", b"")
+    )
+
+
+def write_png(path, image, compress_level=6):
+    """Write an (height, width, 3|4) uint8 array as a PNG"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(encode_png(image, compress_level))
+    os.replace(tmp, path)
+    return path
+
+
+def iter_source(source, chunk_rows, optional=()):
+    """Yield column dicts from a store directory, a CSV, or an iterable of chunks
+
+    ``optional`` columns are included when the source has them.
+    """
+    columns = ["latitude", "longitude", "poverty_rate", "population"]
+    if isinstance(source, (str, Path)):
+        if str(source).lower().endswith(".csv"):
+            import pandas as pd
+
+            wanted = set(columns) | set(optional)
+            yield from pd.read_csv(source, usecols=lambda c: c in wanted, chunksize=chunk_rows)
+        else:
+            store = PovertyStore(source)
+            columns += [name for name in optional if name in store.schema]
+            yield from store.iter_chunks(columns, chunk_rows=chunk_rows)
+    else:
+        yield from source
+
+
+def source_bbox(source, chunk_rows=DEFAULT_ROW_GROUP_SIZE):
+    """(min_lon, min_lat, max_lon, max_lat) of a source
+
+    Stores answer from their row-group statistics without reading points.
+    Raises ValueError for a source without points.
+    """
+    if isinstance(source, (str, Path)) and not str(source).lower().endswith(".csv"):
+        groups = [g for g in PovertyStore(source).row_groups if g["n_rows"]]
+        if not groups:
+            raise ValueError(f"Cannot compute a bbox: no points in {source}")
+        lats = [g["stats"]["latitude"] for g in groups]
+        lons = [g["stats"]["longitude"] for g in groups]
+        return (
+            min(v[0] for v in lons), min(v[0] for v in lats),
+            max(v[1] for v in lons), max(v[1] for v in lats),
+        )
+    bbox = [np.inf, np.inf, -np.inf, -np.inf]
+    for chunk in iter_source(source, chunk_rows):
+        lat, lon = np.asarray(chunk["latitude"]), np.asarray(chunk["longitude"])
+        if not len(lat):
+            continue
+        bbox = [
+            min(bbox[0], lon.min()), min(bbox[1], lat.min()),
+            max(bbox[2], lon.max()), max(bbox[3], lat.max()),
+        ]
+    if not np.isfinite(bbox).all():
+        raise ValueError("Cannot compute a bbox: the source has no points")
+    return tuple(bbox)
+
+
+def render_points(
+    source,
+    out_path,
+    width=1920,
+    height=1280,
+    bbox=None,
+    agg="weighted_mean",
+    cmap="Reds",
+    how="linear",
+    span=None,
+    chunk_rows=DEFAULT_ROW_GROUP_SIZE,
+    boundaries=None,
+):
+    """Bin a point source chunk by chunk and write the shaded PNG; returns the Canvas
+
+    ``boundaries`` is an optional polygon layer whose outlines are drawn at
+    the level of detail matching the map width.
+    """
+    if bbox is None:
+        bbox = source_bbox(source, chunk_rows)
+    canvas = Canvas(width, height, bbox)
+    for chunk in iter_source(source, chunk_rows):
+        canvas.update(
+            chunk["latitude"], chunk["longitude"], chunk["poverty_rate"], chunk["population"]
+        )
+    image = shade(canvas.aggregate(agg), cmap=cmap, how=how, span=span)
+    if boundaries is not None:
+        level, rings = BoundaryLOD.build(boundaries).rings_for_scale(bbox, width)
+        draw_outlines(image, bbox, rings)
+        canvas.boundary_level = level
+    write_png(out_path, image)
+    return canvas
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render poverty points to a PNG")
+    parser.add_argument("source", help="columnar store directory or CSV file")
+    parser.add_argument("out_path")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1280)
+    parser.add_argument(
+        "--bbox", type=float, nargs=4, default=None,
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+    )
+    parser.add_argument("--agg", choices=AGGREGATIONS, default="weighted_mean")
+    parser.add_argument("--cmap", default="Reds")
+    parser.add_argument("--how", choices=("linear", "log", "eq_hist"), default="linear")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument("--boundaries", default=None, help="polygon shapefile to outline")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        canvas = render_points(
+            args.source,
+            args.out_path,
+            width=args.width,
+            height=args.height,
+            bbox=args.bbox,
+            agg=args.agg,
+            cmap=args.cmap,
+            how=args.how,
+            chunk_rows=args.chunk_rows,
+            boundaries=args.boundaries,
+        )
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        return 1
+    seconds = time.perf_counter() - start
+    print(f"Rendered {canvas.n_points:,} points to {args.width}x{args.height} in {seconds:.2f}s")
+    print(f"Map saved to: {args.out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
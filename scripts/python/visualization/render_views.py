@@ -0,0 +1,368 @@
+"""
+ORAIL CITIZEN AI - 3D View Render Orchestrator
+Geospatial Poverty Mapping Framework
+
+Renders the rayshader camera views of a region in parallel. The R scripts
+(orail_launch.r, kerala_realistic_mapping.r) rebuild the heightmap and its
+shading before drawing any view, then render the views one after another.
+Here the scene is prepared once and cached:
+
+    heightmap   the DEM mosaic from the elevation cache, NaNs filled
+    texture     elevation colours x hillshade x cast shadows, as a PNG
+
+keyed by a hash of the elevation values and shading parameters under
+data/cache/render/<key>/. The views are then split over a pool of Rscript
+processes (scripts/r/render_views.r, Rscript taken from
+r_environment_config.json); each loads the cached scene, calls plot_3d once
+and renders its share of views with render_camera/render_snapshot.
+
+A view is skipped when its PNG exists and was produced from the same scene,
+camera parameters, render settings and R script (recorded in views.json in
+the output folder). Wall-clock time is reported per view.
+
+Usage:
+    python -m scripts.python.visualization.render_views outputs/kerala_realistic \\
+        --bbox 74.5 8.0 77.5 12.8 --zoom 8 --workers 4
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.geospatial.dem_cache import DEM_CACHE_DIR, DemCache
+from scripts.python.provisioning.manifest import hash_bytes, hash_file, write_json_if_changed
+from scripts.python.provisioning.r_environment import find_rscript
+from scripts.python.visualization.raster_render import write_png
+
+RENDER_CACHE_DIR = os.path.join("data", "cache", "render")
+RENDER_SCRIPT = os.path.join("scripts", "r", "render_views.r")
+MANIFEST_NAME = "views.json"
+RENDER_TIMEOUT = 1800
+
+# Camera views used by the Kerala scripts
+DEFAULT_VIEWS = [
+    {"name": "main", "phi": 35, "theta": 45, "zoom": 0.8},
+    {"name": "aerial", "phi": 80, "theta": 45, "zoom": 0.8},
+    {"name": "western_ghats", "phi": 25, "theta": 90, "zoom": 0.8},
+    {"name": "coastal", "phi": 45, "theta": 0, "zoom": 0.8},
+]
+DEFAULT_RENDER = {"windowsize": [1200, 1000], "zscale": 30, "fov": 0}
+
+# Elevation colours (metres -> RGB), an Imhof-like earthy ramp
+TERRAIN_STOPS = [
+    (-50.0, (70, 120, 80)),
+    (50.0, (120, 160, 95)),
+    (300.0, (185, 190, 125)),
+    (800.0, (205, 180, 130)),
+    (1500.0, (165, 130, 100)),
+    (2500.0, (235, 230, 225)),
+]
+
+
+def terrain_colours(elevation):
+    """(rows, cols, 3) float colours in [0, 1] from the elevation ramp"""
+    levels = np.array([s[0] for s in TERRAIN_STOPS])
+    colours = np.array([s[1] for s in TERRAIN_STOPS], dtype=np.float64) / 255.0
+    return np.stack([np.interp(elevation, levels, colours[:, c]) for c in range(3)], axis=-1)
+
+
+def hillshade(elevation, cellsize, azimuth=315.0, altitude=35.0):
+    """Lambertian hillshade in [0, 1]; azimuth clockwise from north, degrees"""
+    dz_drow, dz_dx = np.gradient(elevation, cellsize)
+    # Rows run north to south, so the northward slope is -dz/drow
+    dz_dy = -dz_drow
+    az, alt = np.radians(azimuth), np.radians(altitude)
+    sun = (np.sin(az) * np.cos(alt), np.cos(az) * np.cos(alt), np.sin(alt))
+    shade = (-dz_dx * sun[0] - dz_dy * sun[1] + sun[2]) / np.sqrt(1.0 + dz_dx**2 + dz_dy**2)
+    return np.clip(shade, 0.0, 1.0)
+
+
+def cast_shadows(elevation, cellsize, azimuth=315.0, altitude=35.0, max_steps=400):
+    """1 where a pixel sees the sun, down to 0 deep in a terrain shadow
+
+    Marches towards the sun one pixel at a time for the whole grid at once,
+    tracking how far the horizon rises above the sun ray.
+    """
+    rows, cols = elevation.shape
+    az, rise = np.radians(azimuth), math.tan(math.radians(altitude))
+    dx, dy = math.sin(az), -math.cos(az)
+    relief = float(np.nanmax(elevation) - np.nanmin(elevation))
+    steps = min(max_steps, int(relief / (cellsize * rise)) + 1)
+    excess = np.zeros_like(elevation)
+    r_idx, c_idx = np.mgrid[0:rows, 0:cols]
+    for s in range(1, steps + 1):
+        r = r_idx + int(round(s * dy))
+        c = c_idx + int(round(s * dx))
+        inside = (r >= 0) & (r < rows) & (c >= 0) & (c < cols)
+        if not inside.any():
+            break
+        above = np.where(
+            inside,
+            elevation[np.clip(r, 0, rows - 1), np.clip(c, 0, cols - 1)] - elevation - s * cellsize * rise,
+            0.0,
+        )
+        np.maximum(excess, above, out=excess)
+    # Soft edge: fully dark once the horizon is ~3 cells' rise above the ray
+    return 1.0 - np.clip(excess / (3 * cellsize * rise), 0.0, 1.0)
+
+
+def prepare_scene(
+    bbox,
+    zoom=8,
+    azimuth=315.0,
+    altitude=35.0,
+    cache_root=RENDER_CACHE_DIR,
+    dem_root=DEM_CACHE_DIR,
+    offline=False,
+):
+    """Heightmap and shaded texture of a bbox, computed once and cached
+
+    Returns the scene dict from scene.json (paths, shape, cellsize, key,
+    plus ``cached`` and ``seconds``).
+    """
+    start = time.perf_counter()
+    mosaic = DemCache(dem_root, offline=offline).mosaic(bbox, zoom)
+    elevation = mosaic["elevation"].astype(np.float64)
+    elevation[np.isnan(elevation)] = np.nanmean(elevation)
+    params = {"azimuth": azimuth, "altitude": altitude, "zoom": zoom, "bbox": list(bbox), "version": 1}
+    key = hash_bytes(elevation.astype("<f4").tobytes() + json.dumps(params, sort_keys=True).encode())
+    scene_dir = Path(cache_root) / key[:16]
+    scene_path = scene_dir / "scene.json"
+    if scene_path.exists():
+        scene = json.loads(scene_path.read_text(encoding="utf-8"))
+        scene.update(cached=True, seconds=time.perf_counter() - start)
+        return scene
+
+    min_x, min_y, max_x, max_y = mosaic["bounds"]
+    rows, cols = elevation.shape
+    # Web Mercator metres shrink by cos(latitude) on the ground
+    mid_lat = math.radians((bbox[1] + bbox[3]) / 2.0)
+    cellsize = (max_x - min_x) / cols * math.cos(mid_lat)
+    light = 0.35 + 0.65 * hillshade(elevation, cellsize, azimuth, altitude) * cast_shadows(
+        elevation, cellsize, azimuth, altitude
+    )
+    rgb = terrain_colours(elevation) * light[..., None]
+    texture = np.empty((rows, cols, 4), dtype=np.uint8)
+    texture[..., :3] = np.clip(rgb * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    texture[..., 3] = 255
+
+    scene_dir.mkdir(parents=True, exist_ok=True)
+    elevation_path = scene_dir / "elevation.bin"
+    tmp = scene_dir / ".elevation.bin.tmp"
+    elevation.astype("<f4").tofile(tmp)
+    os.replace(tmp, elevation_path)
+    texture_path = write_png(scene_dir / "texture.png", texture)
+    scene = {
+        "key": key,
+        "rows": rows,
+        "cols": cols,
+        "cellsize": cellsize,
+        "elevation": str(elevation_path),
+        "texture": str(texture_path),
+        **params,
+    }
+    write_json_if_changed(scene_path, scene)
+    scene.update(cached=False, seconds=time.perf_counter() - start)
+    return scene
+
+
+def view_key(scene, view, render, script_hash):
+    """Hash of everything that determines one view's PNG"""
+    payload = {"scene": scene["key"], "view": view, "render": render, "script": script_hash}
+    return hash_bytes(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+
+def _run_worker(rscript, job_path, timeout):
+    """Run one Rscript worker; returns (per-view seconds, wall seconds, error text)
+
+    Views reported before a timeout still count as rendered.
+    """
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(
+            [rscript, RENDER_SCRIPT, str(job_path)],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+        stdout, error = proc.stdout, proc.stderr[-2000:] if proc.returncode else ""
+    except subprocess.TimeoutExpired as e:
+        stdout = e.stdout.decode(errors="replace") if isinstance(e.stdout, bytes) else e.stdout or ""
+        error = f"Rscript timed out after {timeout}s"
+    seconds = {}
+    for line in stdout.splitlines():
+        parts = line.split("\t")
+        if len(parts) == 3 and parts[0] == "VIEW":
+            seconds[parts[1]] = float(parts[2])
+    return seconds, time.perf_counter() - start, error
+
+
+def _run_worker_safe(rscript, job_path, timeout):
+    """_run_worker that reports a crash (e.g. Rscript missing) as the worker's error"""
+    start = time.perf_counter()
+    try:
+        return _run_worker(rscript, job_path, timeout)
+    except Exception as e:
+        return {}, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def render_views(
+    bbox,
+    out_dir,
+    views=DEFAULT_VIEWS,
+    zoom=8,
+    render=None,
+    workers=None,
+    rscript=None,
+    prefix="view",
+    force=False,
+    offline=False,
+    dem_root=DEM_CACHE_DIR,
+    timeout=RENDER_TIMEOUT,
+):
+    """Render camera views of a bbox in parallel Rscript workers
+
+    Returns a report: {"scene": {...}, "views": [{name, output, status,
+    seconds}], "workers", "seconds"}. Status is rendered, skipped or failed.
+    """
+    start = time.perf_counter()
+    render = {**DEFAULT_RENDER, **(render or {})}
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+
+    scene = prepare_scene(bbox, zoom, dem_root=dem_root, offline=offline)
+    script_hash = hash_file(RENDER_SCRIPT) or ""
+    results, todo = [], []
+    for view in views:
+        view = {"fov": render["fov"], **view}
+        output = out_dir / f"{prefix}_{view['name']}.png"
+        key = view_key(scene, view, render, script_hash)
+        entry = manifest.get(output.name, {})
+        current = not force and entry.get("key") == key and entry.get("output") == hash_file(output)
+        result = {"name": view["name"], "output": str(output), "key": key}
+        if current:
+            results.append({**result, "status": "skipped", "seconds": 0.0})
+        else:
+            todo.append((view, result))
+
+    worker_seconds = []
+    if todo:
+        rscript = rscript or find_rscript()
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        jobs = []
+        try:
+            for w in range(workers):
+                share = todo[w::workers]
+                job = {
+                    "scene": scene,
+                    "render": render,
+                    "views": [{**view, "output": result["output"]} for view, result in share],
+                }
+                job_path = Path(scene["elevation"]).parent / f"job_{os.getpid()}_{w}.json"
+                jobs.append((job_path, share))
+                job_path.write_text(json.dumps(job), encoding="utf-8")
+
+            # Each worker's outcome is collected on its own, so one timeout or
+            # crash does not lose the views the other workers finished
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_run_worker_safe, rscript, job_path, timeout): share
+                    for job_path, share in jobs
+                }
+                for future in as_completed(futures):
+                    seconds, wall, error = future.result()
+                    worker_seconds.append(wall)
+                    for view, result in futures[future]:
+                        output = Path(result["output"])
+                        if view["name"] in seconds and output.exists():
+                            manifest[output.name] = {"key": result["key"], "output": hash_file(output)}
+                            seconds_view = seconds[view["name"]]
+                            results.append({**result, "status": "rendered", "seconds": seconds_view})
+                        else:
+                            results.append({**result, "status": "failed", "seconds": None, "error": error})
+        finally:
+            for job_path, _ in jobs:
+                job_path.unlink(missing_ok=True)
+            write_json_if_changed(manifest_path, manifest)
+
+    order = {view["name"]: i for i, view in enumerate(views)}
+    results.sort(key=lambda r: order[r["name"]])
+    return {
+        "scene": scene,
+        "views": results,
+        "workers": worker_seconds,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def parse_view(text):
+    """name:phi:theta[:zoom] -> view dict"""
+    parts = text.split(":")
+    if len(parts) not in (3, 4):
+        raise argparse.ArgumentTypeError(f"Expected name:phi:theta[:zoom], got '{text}'")
+    view = {"name": parts[0], "phi": float(parts[1]), "theta": float(parts[2])}
+    view["zoom"] = float(parts[3]) if len(parts) == 4 else 0.8
+    return view
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Render rayshader views in parallel")
+    parser.add_argument("out_dir")
+    parser.add_argument(
+        "--bbox", type=float, nargs=4, default=[74.5, 8.0, 77.5, 12.8],
+        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"),
+    )
+    parser.add_argument("--zoom", type=int, default=8)
+    parser.add_argument("--view", type=parse_view, action="append", dest="views",
+                        help="name:phi:theta[:zoom]; repeatable (default: the Kerala views)")
+    parser.add_argument("--prefix", default="kerala_3d")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--windowsize", type=int, nargs=2, default=DEFAULT_RENDER["windowsize"])
+    parser.add_argument("--zscale", type=float, default=DEFAULT_RENDER["zscale"])
+    parser.add_argument("--offline", action="store_true", help="use cached elevation tiles only")
+    parser.add_argument("--force", action="store_true", help="re-render up-to-date views")
+    args = parser.parse_args(argv)
+
+    try:
+        report = render_views(
+            args.bbox,
+            args.out_dir,
+            views=args.views or DEFAULT_VIEWS,
+            zoom=args.zoom,
+            render={"windowsize": args.windowsize, "zscale": args.zscale},
+            workers=args.workers,
+            prefix=args.prefix,
+            force=args.force,
+            offline=args.offline,
+        )
+    except (FileNotFoundError, subprocess.TimeoutExpired) as e:
+        print(f"Error: {e}")
+        return 1
+
+    scene = report["scene"]
+    print(f"Scene {scene['rows']}x{scene['cols']} "
+          f"({'cached' if scene['cached'] else 'computed'} in {scene['seconds']:.2f}s)")
+    for result in report["views"]:
+        seconds = "" if result["seconds"] is None else f"{result['seconds']:.2f}s"
+        print(f"  {result['name']:<16}{result['status']:<10}{seconds:>8}  {result['output']}")
+        if result["status"] == "failed" and result.get("error"):
+            print("    " + result["error"].strip().splitlines()[-1])
+    if report["workers"]:
+        print(f"Workers: {len(report['workers'])}, slowest {max(report['workers']):.2f}s")
+    print(f"Total: {report['seconds']:.2f}s")
+    return 0 if all(r["status"] != "failed" for r in report["views"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
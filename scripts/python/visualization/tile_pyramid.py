@@ -0,0 +1,356 @@
+"""
+ORAIL CITIZEN AI - XYZ Tile Pyramid
+Geospatial Poverty Mapping Framework
+
+Pre-renders a Web Mercator z/x/y PNG tile pyramid (256 px tiles) of the
+poverty surface for pan-and-zoom dashboards.
+
+Points are read once, chunk by chunk, and binned into a sparse table of
+occupied pixels at the finest zoom (pixel id -> count, sum of values,
+sum of weights, sum of weight x value). Every coarser zoom is derived from
+the level below by halving pixel coordinates and summing, so the raw points
+are never rescanned. Tiles are rendered in parallel worker processes.
+
+Tiles live in a content-addressed cache: a tile's key is the hash of its
+pixel sums plus the rendering parameters, and its PNG is stored once under
+objects/<key[:2]>/<key>.png. tiles.json maps "z/x/y" to keys. Rerunning
+after a data change renders only the tiles whose pixels changed; all other
+tiles keep their existing objects.
+
+Layout:
+    <out>/tiles.json                params, zoom range, {"z/x/y": key}
+    <out>/objects/ab/abcd....png    one PNG per distinct tile content
+
+Usage:
+    python -m scripts.python.visualization.tile_pyramid \\
+        data/processed/orail_demo_data.store outputs/tiles --max-zoom 12
+
+    pyramid = TilePyramid("outputs/tiles")
+    png_path = pyramid.tile_path(8, 213, 118)
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from scripts.python.data_processing.poverty_store import DEFAULT_ROW_GROUP_SIZE
+from scripts.python.provisioning.manifest import hash_bytes, write_if_changed, write_json_if_changed
+from scripts.python.visualization.raster_render import encode_png, iter_source, shade
+
+TILE_SIZE = 256
+TILE_BITS = 8
+MAX_MERCATOR_LAT = 85.05112878
+PYRAMID_VERSION = 1
+DEFAULT_SPANS = {"count": (1.0, 1000.0), "mean": (0.0, 1.0), "weighted_mean": (0.0, 1.0)}
+
+
+def mercator_pixels(lat, lon, zoom):
+    """Global integer pixel (x, y) of points at a zoom level"""
+    world = float(TILE_SIZE << zoom)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * world
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0 * world
+    limit = (TILE_SIZE << zoom) - 1
+    return (
+        np.clip(x.astype(np.int64), 0, limit),
+        np.clip(y.astype(np.int64), 0, limit),
+    )
+
+
+def tile_bounds(z, x, y):
+    """(min_lon, min_lat, max_lon, max_lat) of a tile"""
+    n = 2.0 ** z
+    lon0, lon1 = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    lat1 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / n))))
+    lat0 = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 1) / n))))
+    return lon0, lat0, lon1, lat1
+
+
+def _reduce(ids, sums):
+    """Sum rows of ``sums`` sharing an id; returns (sorted unique ids, sums)"""
+    cells, inverse = np.unique(ids, return_inverse=True)
+    reduced = np.empty((len(cells), sums.shape[1]), dtype=np.float64)
+    for j in range(sums.shape[1]):
+        reduced[:, j] = np.bincount(inverse, weights=sums[:, j], minlength=len(cells))
+    return cells, reduced
+
+
+def _merge(parts):
+    return _reduce(np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts]))
+
+
+class PixelLevel:
+    """Sparse occupied-pixel table of one zoom level
+
+    ``ids`` are y * world_width + x; ``sums`` columns are count, value sum,
+    weight sum and weight x value sum.
+    """
+
+    def __init__(self, zoom, ids, sums):
+        self.zoom = zoom
+        self.ids = ids
+        self.sums = sums
+
+    @property
+    def width(self):
+        return TILE_SIZE << self.zoom
+
+    def coarser(self):
+        """The level above, by merging each 2x2 block of pixels"""
+        y, x = np.divmod(self.ids, self.width)
+        parent = (y >> 1) * (self.width >> 1) + (x >> 1)
+        return PixelLevel(self.zoom - 1, *_reduce(parent, self.sums))
+
+    def tiles(self):
+        """Yield ((x, y), local pixel index, sums) per occupied tile"""
+        y, x = np.divmod(self.ids, self.width)
+        tiles_per_row = 1 << self.zoom
+        tile = (y >> TILE_BITS) * tiles_per_row + (x >> TILE_BITS)
+        order = np.argsort(tile, kind="stable")
+        tile, y, x = tile[order], y[order], x[order]
+        sums = self.sums[order]
+        local = (y & (TILE_SIZE - 1)) * TILE_SIZE + (x & (TILE_SIZE - 1))
+        keys, starts = np.unique(tile, return_index=True)
+        bounds = list(starts) + [len(tile)]
+        for key, a, b in zip(keys, bounds[:-1], bounds[1:]):
+            ty, tx = divmod(int(key), tiles_per_row)
+            yield (tx, ty), local[a:b], sums[a:b]
+
+
+def _column(chunk, name):
+    return np.asarray(chunk[name], dtype=np.float64)
+
+
+def bin_points(source, zoom, chunk_rows=DEFAULT_ROW_GROUP_SIZE):
+    """Stream a point source into the finest PixelLevel
+
+    Each point adds (1, poverty_rate, population, population x poverty_rate).
+    An aggregated cell store (it has a ``count`` column) contributes its
+    cells with their counts instead; the unweighted sum then comes from
+    ``poverty_rate_unweighted``, since a cell's ``poverty_rate`` is
+    population-weighted.
+    """
+    width = TILE_SIZE << zoom
+    parts = []
+    n_points = 0
+    for chunk in iter_source(source, chunk_rows, optional=("count", "poverty_rate_unweighted")):
+        x, y = mercator_pixels(_column(chunk, "latitude"), _column(chunk, "longitude"), zoom)
+        value, weight = _column(chunk, "poverty_rate"), _column(chunk, "population")
+        if "count" in chunk:
+            count = _column(chunk, "count")
+            if "poverty_rate_unweighted" in chunk:
+                value_sum = _column(chunk, "poverty_rate_unweighted") * count
+            else:
+                value_sum = value * count
+        else:
+            count = np.ones(len(x))
+            value_sum = value
+        sums = np.column_stack([count, value_sum, weight, weight * value])
+        parts.append(_reduce(y * width + x, sums))
+        n_points += len(x)
+        if len(parts) > 8:
+            parts = [_merge(parts)]
+    if not parts:
+        return PixelLevel(zoom, np.empty(0, np.int64), np.empty((0, 4))), 0
+    return PixelLevel(zoom, *_merge(parts)), n_points
+
+
+def _tile_grid(local, sums, agg):
+    grid = np.full(TILE_SIZE * TILE_SIZE, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if agg == "count":
+            values = sums[:, 0]
+        elif agg == "mean":
+            values = sums[:, 1] / sums[:, 0]
+        else:
+            values = sums[:, 3] / sums[:, 2]
+    grid[local] = values
+    return grid.reshape(TILE_SIZE, TILE_SIZE)
+
+
+def tile_key(local, sums, params):
+    """Content key of a tile: its pixel sums plus the rendering parameters"""
+    return hash_bytes(
+        json.dumps(params, sort_keys=True).encode("utf-8")
+        + np.ascontiguousarray(local, dtype="<i4").tobytes()
+        + np.ascontiguousarray(sums, dtype="<f8").tobytes()
+    )
+
+
+def _render_tile(object_path, local, sums, params):
+    """Worker: shade one tile and store its PNG object"""
+    grid = _tile_grid(local, sums, params["agg"])
+    image = shade(grid, cmap=params["cmap"], how=params["how"], span=params["span"])
+    write_if_changed(object_path, encode_png(image))
+    return object_path
+
+
+class TilePyramid:
+    """On-disk tile pyramid with a content-addressed object cache"""
+
+    def __init__(self, out_dir):
+        self.out_dir = Path(out_dir)
+        self.index_path = self.out_dir / "tiles.json"
+        if self.index_path.exists():
+            self.index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        else:
+            self.index = {"version": PYRAMID_VERSION, "params": None, "tiles": {}}
+
+    def object_path(self, key):
+        return self.out_dir / "objects" / key[:2] / f"{key}.png"
+
+    def tile_key(self, z, x, y):
+        """Content key of a tile, or None if the tile is empty"""
+        return self.index["tiles"].get(f"{z}/{x}/{y}")
+
+    def tile_path(self, z, x, y):
+        """Path of a tile's PNG, or None if the tile is empty"""
+        key = self.tile_key(z, x, y)
+        return self.object_path(key) if key else None
+
+    def build(
+        self,
+        source,
+        min_zoom=0,
+        max_zoom=10,
+        agg="weighted_mean",
+        cmap="Reds",
+        how="linear",
+        span=None,
+        workers=None,
+        chunk_rows=DEFAULT_ROW_GROUP_SIZE,
+        prune=True,
+    ):
+        """Render (or update) the pyramid from a point or cell source
+
+        Returns a report with tile counts and timings. ``span`` fixes the
+        colour scale for every tile; it defaults per aggregation so that
+        unchanged tiles keep the same key across runs.
+        """
+        params = {
+            "agg": agg,
+            "cmap": cmap,
+            "how": how,
+            "span": list(span or DEFAULT_SPANS[agg]),
+            "tile_size": TILE_SIZE,
+        }
+        report = {"tiles": 0, "rendered": 0, "reused": 0, "removed": 0, "timings": {}}
+
+        start = time.perf_counter()
+        level, report["points"] = bin_points(source, max_zoom, chunk_rows)
+        report["timings"]["bin"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tiles, todo = {}, []
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            for (x, y), local, sums in level.tiles():
+                key = tile_key(local, sums, params)
+                tiles[f"{zoom}/{x}/{y}"] = key
+                path = self.object_path(key)
+                if path.exists():
+                    report["reused"] += 1
+                else:
+                    todo.append((str(path), local, sums))
+            if zoom > min_zoom:
+                level = level.coarser()
+        report["timings"]["pyramid"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # Tiles with identical content share one object and render once
+        unique = {path: (path, local, sums) for path, local, sums in todo}
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(unique) <= 1:
+            for path, local, sums in unique.values():
+                _render_tile(path, local, sums, params)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(_render_tile, path, local, sums, params)
+                    for path, local, sums in unique.values()
+                ]
+                for future in futures:
+                    future.result()
+        report["rendered"] = len(unique)
+        report["timings"]["render"] = time.perf_counter() - start
+
+        if prune:
+            live = set(tiles.values())
+            for path in (self.out_dir / "objects").glob("*/*.png"):
+                if path.stem not in live:
+                    path.unlink()
+                    report["removed"] += 1
+
+        self.index = {
+            "version": PYRAMID_VERSION,
+            "params": params,
+            "min_zoom": min_zoom,
+            "max_zoom": max_zoom,
+            "tiles": tiles,
+        }
+        write_json_if_changed(self.index_path, self.index, indent=0)
+        report["tiles"] = len(tiles)
+        return report
+
+    def export(self, target_dir):
+        """Materialise a plain z/x/y.png directory (hard links where possible)"""
+        target_dir = Path(target_dir)
+        for name, key in self.index["tiles"].items():
+            dest = target_dir / f"{name}.png"
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if dest.exists():
+                dest.unlink()
+            try:
+                os.link(self.object_path(key), dest)
+            except OSError:
+                shutil.copyfile(self.object_path(key), dest)
+        return target_dir
+
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Build an XYZ tile pyramid")
+    parser.add_argument("source", help="columnar store (points or cells) or CSV file")
+    parser.add_argument("out_dir")
+    parser.add_argument("--min-zoom", type=int, default=0)
+    parser.add_argument("--max-zoom", type=int, default=10)
+    parser.add_argument("--agg", choices=sorted(DEFAULT_SPANS), default="weighted_mean")
+    parser.add_argument("--cmap", default="Reds")
+    parser.add_argument("--how", choices=("linear", "log"), default="linear")
+    parser.add_argument("--span", type=float, nargs=2, default=None, metavar=("LOW", "HIGH"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--export", default=None, help="also write a plain z/x/y.png tree here")
+    args = parser.parse_args(argv)
+
+    pyramid = TilePyramid(args.out_dir)
+    report = pyramid.build(
+        args.source,
+        min_zoom=args.min_zoom,
+        max_zoom=args.max_zoom,
+        agg=args.agg,
+        cmap=args.cmap,
+        how=args.how,
+        span=args.span,
+        workers=args.workers,
+    )
+    timings = "  ".join(f"{k}: {v:.2f}s" for k, v in report["timings"].items())
+    print(f"Points: {report['points']:,}  zooms {args.min_zoom}-{args.max_zoom}")
+    print(
+        f"Tiles: {report['tiles']:,}  rendered: {report['rendered']:,}"
+        f"  reused: {report['reused']:,}  removed: {report['removed']:,}"
+    )
+    print(f"Timings: {timings}")
+    if args.export:
+        pyramid.export(args.export)
+        print(f"Exported to: {args.export}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# =============================================================================
+# ORAIL GeoPoverty Mapping - Render Worker for 3D Views
+# Renders a share of camera views from a prepared (cached) scene
+# Started by scripts/python/visualization/render_views.py:
+#   Rscript scripts/r/render_views.r <job.json>
+# =============================================================================
+
+suppressPackageStartupMessages({
+  library(jsonlite)
+  library(png)
+  library(rayshader)
+})
+
+args <- commandArgs(trailingOnly = TRUE)
+if (length(args) != 1) {
+  stop("Usage: Rscript scripts/r/render_views.r <job.json>")
+}
+
+job <- fromJSON(args[1], simplifyVector = FALSE)
+scene <- job$scene
+render <- job$render
+
+# Heightmap: little-endian float32, row-major (north to south)
+con <- file(scene$elevation, "rb")
+values <- readBin(con, what = "numeric", n = scene$rows * scene$cols, size = 4, endian = "little")
+close(con)
+elev_matrix <- matrix(values, nrow = scene$rows, ncol = scene$cols, byrow = TRUE)
+
+# Shaded texture prepared once on the Python side (RGBA in [0, 1])
+texture <- readPNG(scene$texture)
+
+plot_3d(texture, elev_matrix,
+        zscale = render$zscale,
+        windowsize = unlist(render$windowsize),
+        solid = TRUE,
+        shadow = TRUE)
+
+for (view in job$views) {
+  start <- Sys.time()
+  render_camera(phi = view$phi, theta = view$theta, zoom = view$zoom, fov = view$fov)
+
+  # Write next to the target and rename, so a killed worker never leaves a partial PNG
+  tmp_file <- paste0(view$output, ".tmp.png")
+  render_snapshot(filename = tmp_file, clear = FALSE)
+  file.rename(tmp_file, view$output)
+
+  elapsed <- as.numeric(difftime(Sys.time(), start, units = "secs"))
+  cat(sprintf("VIEW\t%s\t%.3f\n", view$name, elapsed))
+  flush(stdout())
+}
+
+rgl::close3d()
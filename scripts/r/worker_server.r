@@ -0,0 +1,140 @@
+# =============================================================================
+# ORAIL GeoPoverty Mapping - Persistent R Worker
+# Long-lived R process for scripts/python/r_integration/r_workers.py
+#   Rscript scripts/r/worker_server.r tidyverse sf terra rayshader
+#
+# Libraries are loaded once at startup. Requests arrive as one JSON object
+# per line on stdin; each answer is one line on stdout starting with the
+# @@ORAIL@@ marker (anything else on stdout is ignored by the pool).
+# Data frames travel as columnar stores (<dir>/_meta.json + <column>.bin).
+# =============================================================================
+
+suppressPackageStartupMessages(library(jsonlite))
+
+MARKER <- "@@ORAIL@@"
+R_TYPES <- list(
+  "<f8" = list(what = "numeric", size = 8, signed = TRUE),
+  "<f4" = list(what = "numeric", size = 4, signed = TRUE),
+  "<i4" = list(what = "integer", size = 4, signed = TRUE),
+  "<i2" = list(what = "integer", size = 2, signed = TRUE),
+  "|i1" = list(what = "integer", size = 1, signed = TRUE),
+  "<u2" = list(what = "integer", size = 2, signed = FALSE),
+  "|u1" = list(what = "integer", size = 1, signed = FALSE)
+)
+
+respond <- function(x) {
+  cat(MARKER, toJSON(x, auto_unbox = TRUE, null = "null", na = "null", digits = NA), "\n", sep = "")
+  flush(stdout())
+}
+
+read_store <- function(path) {
+  meta <- fromJSON(file.path(path, "_meta.json"), simplifyVector = FALSE)
+  columns <- list()
+  for (name in names(meta$schema)) {
+    type <- R_TYPES[[meta$schema[[name]]]]
+    if (is.null(type)) stop(sprintf("Column '%s' has a dtype R cannot read: %s", name, meta$schema[[name]]))
+    con <- file(file.path(path, paste0(name, ".bin")), "rb")
+    values <- readBin(con, what = type$what, n = meta$n_rows, size = type$size,
+                      signed = type$signed, endian = "little")
+    close(con)
+    labels_file <- file.path(path, paste0(name, ".labels.json"))
+    if (file.exists(labels_file)) {
+      labels <- fromJSON(labels_file)
+      values[values == labels$no_value] <- NA
+      values <- factor(labels$names[values + 1], levels = labels$names)
+    }
+    columns[[name]] <- values
+  }
+  as.data.frame(columns, stringsAsFactors = FALSE, check.names = FALSE)
+}
+
+write_store <- function(df, path) {
+  df <- as.data.frame(df)
+  dir.create(path, recursive = TRUE, showWarnings = FALSE)
+  schema <- list()
+  for (name in names(df)) {
+    values <- df[[name]]
+    if (is.character(values)) values <- factor(values)
+    if (is.factor(values)) {
+      levels_out <- levels(values)
+      values <- as.integer(values) - 1L
+      values[is.na(values)] <- -1L
+      writeLines(toJSON(list(no_value = -1, names = levels_out), auto_unbox = TRUE),
+                 file.path(path, paste0(name, ".labels.json")))
+    }
+    if (is.logical(values)) values <- as.integer(values)
+    if (is.integer(values)) {
+      schema[[name]] <- "<i4"
+    } else if (is.numeric(values)) {
+      schema[[name]] <- "<f8"
+      values <- as.double(values)
+    } else {
+      stop(sprintf("Column '%s' of class %s cannot be written", name, class(values)[1]))
+    }
+    con <- file(file.path(path, paste0(name, ".bin")), "wb")
+    writeBin(values, con, size = if (is.integer(values)) 4 else 8, endian = "little")
+    close(con)
+  }
+  n_rows <- nrow(df)
+  meta <- list(version = 1, schema = schema, n_rows = n_rows, row_group_size = max(n_rows, 1),
+               row_groups = list(list(offset = 0, n_rows = n_rows, stats = setNames(list(), character(0)))))
+  # _meta.json last: a store without it is incomplete
+  tmp <- file.path(path, "_meta.json.tmp")
+  writeLines(toJSON(meta, auto_unbox = TRUE, digits = NA), tmp)
+  file.rename(tmp, file.path(path, "_meta.json"))
+  path
+}
+
+loaded <- character(0)
+failed <- character(0)
+for (pkg in commandArgs(trailingOnly = TRUE)) {
+  ok <- suppressPackageStartupMessages(
+    suppressWarnings(library(pkg, character.only = TRUE, quietly = TRUE, logical.return = TRUE))
+  )
+  if (ok) loaded <- c(loaded, pkg) else failed <- c(failed, pkg)
+}
+
+home_dir <- getwd()
+respond(list(status = "ready", pid = Sys.getpid(), loaded = I(loaded), failed = I(failed),
+             version = R.version.string))
+
+input <- file("stdin", open = "r")
+repeat {
+  line <- readLines(input, n = 1)
+  if (length(line) == 0) break
+  request <- fromJSON(line, simplifyVector = FALSE)
+  if (identical(request$op, "shutdown")) {
+    respond(list(id = request$id, status = "ok"))
+    break
+  }
+
+  started <- proc.time()[["elapsed"]]
+  answer <- tryCatch({
+    # A fresh environment per task: packages stay loaded, variables do not leak
+    env <- new.env(parent = globalenv())
+    for (name in names(request$args)) assign(name, request$args[[name]], envir = env)
+    for (name in names(request$inputs)) assign(name, read_store(request$inputs[[name]]), envir = env)
+    value <- NULL
+    printed <- capture.output({
+      if (!is.null(request$script)) {
+        sys.source(request$script, envir = env, chdir = FALSE)
+        value <- if (!is.null(request$result)) get(request$result, envir = env) else NULL
+      } else {
+        value <- eval(parse(text = request$code), envir = env)
+      }
+    })
+    reply <- list(id = request$id, status = "ok", output = paste(printed, collapse = "\n"))
+    if (!is.null(request$output_path) && !is.null(value)) {
+      write_store(value, request$output_path)
+      reply$output_path <- request$output_path
+    } else if (is.atomic(value) && length(value) <= 100000) {
+      reply$value <- value
+    }
+    reply
+  }, error = function(e) {
+    list(id = request$id, status = "error", error = conditionMessage(e))
+  })
+  setwd(home_dir)
+  answer$seconds <- proc.time()[["elapsed"]] - started
+  respond(answer)
+}